@@ -0,0 +1,128 @@
+"""
+缓存基准：进程内 LLMCache（不压缩 / zlib）、SQLiteLLMCache、RedisLLMCache 与 TieredCache 的 get / set 延迟
+（sqlite 写入临时目录；redis 不可达时跳过后两者）
+"""
+import itertools
+import tempfile
+
+from benchmarks.fixtures import get_captured
+from benchmarks.harness import SkipBenchmark, benchmark
+from src.state_of_mind.config import config
+
+_OPS = 200
+_keys = itertools.count()
+
+
+async def _payload():
+    """以真实流水线结果作为缓存值（与整体缓存写入的数据同构）"""
+    return (await get_captured())["report_data"]
+
+
+_local_cache = None
+_local_zlib_cache = None
+_sqlite_cache = None
+_redis_cache = None
+_tiered_cache = None
+
+
+async def _setup_local():
+    global _local_cache
+    if _local_cache is None:
+        from src.state_of_mind.cache.llm_cache import LLMCache
+        _local_cache = LLMCache(max_size=_OPS * 10, ttl_seconds=3600, max_bytes=0, compression="none")
+    return _local_cache, await _payload()
+
+
+async def _setup_local_zlib():
+    global _local_zlib_cache
+    if _local_zlib_cache is None:
+        from src.state_of_mind.cache.llm_cache import LLMCache
+        _local_zlib_cache = LLMCache(max_size=_OPS * 10, ttl_seconds=3600, max_bytes=0, compression="zlib")
+    return _local_zlib_cache, await _payload()
+
+
+async def _setup_sqlite():
+    global _sqlite_cache
+    if _sqlite_cache is None:
+        from src.state_of_mind.cache.sqlite import SQLiteLLMCache
+        path = f"{tempfile.mkdtemp(prefix='bench_sqlite_')}/llm_cache.sqlite3"
+        _sqlite_cache = SQLiteLLMCache(path=path, max_size=_OPS * 10, ttl_seconds=3600, max_bytes=0,
+                                       compression="none")
+    return _sqlite_cache, await _payload()
+
+
+async def _require_redis():
+    try:
+        import redis.asyncio as aioredis
+        client = aioredis.Redis(host=config.REDIS_HOST, port=config.REDIS_PORT,
+                                password=config.REDIS_PASSWORD or None, socket_connect_timeout=1)
+        await client.ping()
+        await client.aclose()
+    except Exception as e:
+        raise SkipBenchmark(f"redis 不可达 {config.REDIS_HOST}:{config.REDIS_PORT} ({type(e).__name__})")
+
+
+async def _setup_redis():
+    global _redis_cache
+    if _redis_cache is None:
+        await _require_redis()
+        from src.state_of_mind.cache.redis import RedisLLMCache
+        _redis_cache = RedisLLMCache(config)
+    return _redis_cache, await _payload()
+
+
+async def _setup_tiered():
+    global _tiered_cache
+    if _tiered_cache is None:
+        await _require_redis()
+        from src.state_of_mind.cache.tiered import TieredCache
+        _tiered_cache = TieredCache(config)
+    return _tiered_cache, await _payload()
+
+
+async def _set_then_get(state):
+    cache, payload = state
+    keys = [f"bench:{next(_keys)}" for _ in range(_OPS)]
+    for key in keys:
+        await cache.set(key, payload)
+    for key in keys:
+        response = await cache.get(key)
+        if not response.get("success"):
+            raise RuntimeError(f"缓存读取失败: {response.get('error')}")
+
+
+async def _get_hits(state):
+    cache, payload = state
+    key = "bench:hot"
+    await cache.set(key, payload)
+    for _ in range(_OPS):
+        await cache.get(key)
+
+
+_many_primed = set()
+
+
+async def _get_many_hits(state):
+    """与 get_hit 相同数量的读取，合并为一次 get_many（首次调用以 set_many 写入，在预热轮完成）"""
+    cache, payload = state
+    keys = [f"bench:many:{i}" for i in range(_OPS)]
+    if id(cache) not in _many_primed:
+        await cache.set_many({key: payload for key in keys})
+        _many_primed.add(id(cache))
+    response = await cache.get_many(keys)
+    if not response.get("success"):
+        raise RuntimeError(f"批量读取失败: {response.get('error')}")
+
+
+async def _get_misses(state):
+    cache, _ = state
+    for i in range(_OPS):
+        await cache.get(f"bench:absent:{i}")
+
+
+for _name, _setup in (("local", _setup_local), ("local_zlib", _setup_local_zlib), ("sqlite", _setup_sqlite),
+                      ("redis", _setup_redis), ("tiered", _setup_tiered)):
+    benchmark(f"cache.{_name}.set_get_x{_OPS}", setup=_setup, repeat=10, group="cache")(_set_then_get)
+    benchmark(f"cache.{_name}.get_hit_x{_OPS}", setup=_setup, repeat=10, group="cache")(_get_hits)
+    benchmark(f"cache.{_name}.get_miss_x{_OPS}", setup=_setup, repeat=10, group="cache")(_get_misses)
+    benchmark(f"cache.{_name}.get_many_hit_x{_OPS}", setup=_setup, repeat=10, group="cache")(_get_many_hits)
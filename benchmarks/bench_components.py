@@ -0,0 +1,61 @@
+"""
+组件基准：结构校验、结果组装与终审、prompt 构建、HTML 渲染
+"""
+import copy
+
+from benchmarks.fixtures import get_captured, get_pipeline, large_step_output
+from benchmarks.harness import benchmark
+from src.state_of_mind.stages.perception.constants import CATEGORY_RAW, LLM_PARTICIPANTS_EXTRACTION, \
+    LLM_PERCEPTION_VISUAL_EXTRACTION
+from src.state_of_mind.stages.perception.data_validator import DataValidator
+
+_LARGE_STEPS = (LLM_PARTICIPANTS_EXTRACTION, LLM_PERCEPTION_VISUAL_EXTRACTION)
+
+
+def _setup_validate():
+    return {step: large_step_output(step) for step in _LARGE_STEPS}
+
+
+@benchmark("validator.validate_large", setup=_setup_validate, repeat=10, group="components")
+def bench_validate_large(outputs):
+    """约 200 项列表的大体量步骤输出（参与者 + 视觉感知）"""
+    validator = DataValidator()
+    for step, data in outputs.items():
+        validator.validate(data, CATEGORY_RAW, step)
+
+
+async def _setup_assemble():
+    captured = await get_captured()
+    return copy.deepcopy(captured["context"]), copy.deepcopy(captured["basic_data"])
+
+
+@benchmark("assembler.assemble_final_data", setup=_setup_assemble, repeat=20, group="components")
+def bench_assemble(state):
+    context, basic_data = state
+    get_pipeline().result_assembler.assemble_final_data(context, basic_data)
+
+
+async def _setup_validate_final():
+    captured = await get_captured()
+    context, basic_data = copy.deepcopy(captured["context"]), copy.deepcopy(captured["basic_data"])
+    return get_pipeline().result_assembler.assemble_final_data(context, basic_data)
+
+
+@benchmark("assembler.validate_final_result", setup=_setup_validate_final, repeat=20, group="components")
+def bench_validate_final(result):
+    get_pipeline().result_assembler.validate_final_result(result)
+
+
+@benchmark("prompt_builder.build_raw", repeat=20, number=5, group="components")
+def bench_build_raw():
+    get_pipeline().prompt_builder.build_raw()
+
+
+async def _setup_render():
+    return (await get_captured())["report_data"]
+
+
+@benchmark("report.render_report_to_html", setup=_setup_render, repeat=10, group="components")
+def bench_render_html(data):
+    if get_pipeline().report_generator.render_report_to_html(data) is None:
+        raise RuntimeError("HTML 渲染失败")
@@ -0,0 +1,67 @@
+"""
+端到端基准：模拟后端下的完整 async_extract 耗时与各阶段开销
+"""
+from typing import Any, Dict, List
+
+from benchmarks.fixtures import get_pipeline, unique_input
+from benchmarks.harness import benchmark
+from src.state_of_mind.stages.perception.constants import EVENT_PHASE_START, EVENT_PHASE_END, EVENT_STEP_RESULT
+
+
+class _PhaseRecorder:
+    """按 phase_start / phase_end 事件统计阶段跨度（ms），并累计步骤耗时"""
+
+    def __init__(self):
+        self.starts: Dict[str, float] = {}
+        self.spans: Dict[str, float] = {}
+        self.step_ms: List[float] = []
+
+    async def on_event(self, message: Dict[str, Any]) -> None:
+        event = message.get("event")
+        if event == EVENT_PHASE_START:
+            self.starts[message["phase"]] = message["elapsed_ms"]
+        elif event == EVENT_PHASE_END and message["phase"] in self.starts:
+            span = message["elapsed_ms"] - self.starts.pop(message["phase"])
+            self.spans[message["phase"]] = self.spans.get(message["phase"], 0.0) + span
+        elif event == EVENT_STEP_RESULT and message.get("duration_ms") is not None:
+            self.step_ms.append(message["duration_ms"])
+
+    def metrics(self) -> Dict[str, float]:
+        out = {f"phase_ms.{phase}": span for phase, span in self.spans.items()}
+        out["steps"] = len(self.step_ms)
+        out["step_ms_total"] = sum(self.step_ms)
+        return out
+
+
+@benchmark("pipeline.async_extract", repeat=5, group="pipeline")
+async def bench_async_extract():
+    """完整流程（含 HTML 报告），每次使用新文本避免缓存命中；延迟取 XINJING_MOCK_LATENCY_MS"""
+    recorder = _PhaseRecorder()
+    result = await get_pipeline().run(unique_input(), on_event=recorder.on_event, render_report=True)
+    if not result.get("report_url"):
+        raise RuntimeError("async_extract 未产出报告")
+    return recorder.metrics()
+
+
+@benchmark("pipeline.async_extract_no_html", repeat=5, group="pipeline")
+async def bench_async_extract_no_html():
+    recorder = _PhaseRecorder()
+    await get_pipeline().run(unique_input(), on_event=recorder.on_event, render_report=False)
+    return recorder.metrics()
+
+
+_CACHED_INPUT = "这是一段用于整体缓存命中基准的固定文本，我和同事因为项目进度争执了一下午。"
+_cache_warmed = False
+
+
+async def _setup_cached_hit():
+    global _cache_warmed
+    if not _cache_warmed:
+        await get_pipeline().run(_CACHED_INPUT, render_report=False)
+        _cache_warmed = True
+
+
+@benchmark("pipeline.cached_hit", setup=_setup_cached_hit, repeat=20, number=5, group="pipeline")
+async def bench_cached_hit(_):
+    """整体缓存命中路径（预热写入缓存后重复请求同一文本）"""
+    await get_pipeline().run(_CACHED_INPUT, render_report=False)
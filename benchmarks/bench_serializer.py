@@ -0,0 +1,63 @@
+"""
+Redis 缓存序列化基准：各格式 / 压缩组合对真实流水线结果的编码、解码耗时与体积
+（体积以附加指标 bytes / ratio_vs_json 给出；缺少 orjson / msgpack / zstandard 时跳过对应组合）
+"""
+import json
+
+from benchmarks.fixtures import get_captured
+from benchmarks.harness import SkipBenchmark, benchmark
+
+_OPS = 50
+_VARIANTS = [
+    (fmt, codec)
+    for fmt in ("json", "orjson", "msgpack")
+    for codec in ("none", "zlib", "zstd")
+]
+
+
+def _serializer(fmt: str, codec: str):
+    from src.state_of_mind.cache.serializer import VersionedSerializer
+    try:
+        return VersionedSerializer(fmt, codec)
+    except RuntimeError as e:
+        raise SkipBenchmark(str(e))
+
+
+async def _payload():
+    """整体缓存写入的最终结果（含原文与全部感知块）"""
+    return (await get_captured())["report_data"]
+
+
+def _size_metrics(encoded: bytes, payload) -> dict:
+    baseline = len(json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode("utf-8"))
+    return {"bytes": len(encoded), "ratio_vs_json": baseline / len(encoded)}
+
+
+def _register(fmt: str, codec: str) -> None:
+    name = fmt if codec == "none" else f"{fmt}+{codec}"
+
+    async def _setup_encode():
+        return _serializer(fmt, codec), await _payload()
+
+    async def _setup_decode():
+        serializer, payload = _serializer(fmt, codec), await _payload()
+        return serializer, serializer.dumps(payload), payload
+
+    def _encode(state):
+        serializer, payload = state
+        for _ in range(_OPS):
+            encoded = serializer.dumps(payload)
+        return _size_metrics(encoded, payload)
+
+    def _decode(state):
+        serializer, encoded, payload = state
+        for _ in range(_OPS):
+            serializer.loads(encoded)
+        return _size_metrics(encoded, payload)
+
+    benchmark(f"serializer.{name}.encode_x{_OPS}", setup=_setup_encode, repeat=10, group="serializer")(_encode)
+    benchmark(f"serializer.{name}.decode_x{_OPS}", setup=_setup_decode, repeat=10, group="serializer")(_decode)
+
+
+for _fmt, _codec in _VARIANTS:
+    _register(_fmt, _codec)
@@ -0,0 +1,93 @@
+"""
+基准共享夹具：模拟后端下的流水线实例、样例文本与一次预热运行捕获的中间产物
+"""
+import copy
+import itertools
+import random
+from typing import Any, Dict, Optional
+
+SAMPLE_TEXTS = [
+    "今天开会时领导当众批评了我的方案，我很委屈，回家后跟妻子说了这件事，她安慰我别太在意。",
+    "我和室友因为打扫卫生的事情吵了一架，他说我从来不收拾，我觉得他根本不讲道理，现在两个人都不说话。",
+    "妈妈又打电话催我结婚，我说工作太忙，她就开始哭，我挂了电话以后一直很内疚，也很烦躁。",
+    "朋友借了我五千块钱半年没还，我提了一次他就说最近手头紧，我不知道该不该继续催，怕伤了感情。",
+]
+
+_counter = itertools.count()
+_pipeline = None
+_captured: Optional[Dict[str, Any]] = None
+
+
+def unique_input() -> str:
+    """每次调用生成不同文本，避免命中整体缓存与步骤缓存"""
+    n = next(_counter)
+    return f"{SAMPLE_TEXTS[n % len(SAMPLE_TEXTS)]}（第{n}次）"
+
+
+def get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        from src.state_of_mind.stages.perception.prompt_builder import PromptBuilder
+        from src.state_of_mind.stages.perception.stage_pipeline import PerceptionPipeline
+
+        PromptBuilder().pre_basic_data()
+        _pipeline = PerceptionPipeline()
+    return _pipeline
+
+
+async def get_captured() -> Dict[str, Any]:
+    """
+    预热运行一次完整流水线，捕获组件级基准所需的真实输入：
+    - assemble_final_data 的 (context, basic_data)
+    - render_report_to_html 的渲染数据
+    """
+    global _captured
+    if _captured is not None:
+        return _captured
+
+    pipeline = get_pipeline()
+    assembler = pipeline.result_assembler
+    generator = pipeline.report_generator
+    captured: Dict[str, Any] = {}
+    original_assemble = assembler.assemble_final_data
+    original_render = generator.render_report_to_html
+
+    def assemble_spy(context, basic_data):
+        captured["context"] = copy.deepcopy(context)
+        captured["basic_data"] = copy.deepcopy(basic_data)
+        return original_assemble(context, basic_data)
+
+    def render_spy(data):
+        captured["report_data"] = copy.deepcopy(data)
+        return original_render(data)
+
+    assembler.assemble_final_data = assemble_spy
+    generator.render_report_to_html = render_spy
+    try:
+        await pipeline.run(unique_input(), render_report=True)
+    finally:
+        del assembler.assemble_final_data
+        del generator.render_report_to_html
+
+    if "report_data" not in captured:
+        raise RuntimeError("预热运行未产出报告数据，请检查模拟后端配置（XINJING_MOCK_*_RATE 应为 0）")
+    _captured = captured
+    return captured
+
+
+def large_step_output(step_name: str, target_items: int = 200) -> Dict[str, Any]:
+    """
+    基于模拟后端的生成规则构造大体量步骤输出：将各列表字段复制扩充到约 target_items 项
+    """
+    from src.state_of_mind.llm.mock import AsyncMockLLMBackend
+
+    data = AsyncMockLLMBackend().render_step(step_name, "".join(SAMPLE_TEXTS), random.Random(0))
+
+    def _inflate(node):
+        if isinstance(node, dict):
+            return {k: _inflate(v) for k, v in node.items()}
+        if isinstance(node, list) and node and isinstance(node[0], dict):
+            return [copy.deepcopy(node[i % len(node)]) for i in range(target_items)]
+        return node
+
+    return _inflate(data)
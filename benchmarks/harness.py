@@ -0,0 +1,191 @@
+"""
+轻量基准框架（asv 风格，无第三方依赖）
+
+- @benchmark 注册基准函数（同步或异步），可选 setup（每轮 repeat 前调用一次，返回值作为参数传入）
+- 计时前先预热执行一次（不计入样本），排除惰性初始化与首次导入开销
+- 每轮执行 number 次取平均，共 repeat 轮；统计 min / median / mean / p95 / stdev
+- 基准函数可返回 Dict[str, float] 作为附加指标（如各阶段耗时），按轮次取中位数
+- 结果写为 JSON（含 git 提交、Python 与平台信息），便于跨提交比较
+"""
+import asyncio
+import inspect
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+class BenchmarkSpec(NamedTuple):
+    name: str
+    func: Callable
+    setup: Optional[Callable] = None
+    repeat: int = 5
+    number: int = 1
+    group: str = "default"
+    warmup: bool = True
+
+
+class SkipBenchmark(Exception):
+    """setup 中抛出以跳过基准（如缺少 redis-server）"""
+
+
+BENCHMARKS: List[BenchmarkSpec] = []
+
+
+def benchmark(name: Optional[str] = None, *, setup: Optional[Callable] = None, repeat: int = 5,
+              number: int = 1, group: str = "default", warmup: bool = True):
+    def decorator(func: Callable) -> Callable:
+        BENCHMARKS.append(BenchmarkSpec(name or func.__name__, func, setup, repeat, number, group, warmup))
+        return func
+
+    return decorator
+
+
+async def _maybe_await(value: Any) -> Any:
+    return await value if inspect.isawaitable(value) else value
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+async def run_benchmark(spec: BenchmarkSpec, repeat: Optional[int] = None) -> Dict[str, Any]:
+    repeat = repeat or spec.repeat
+    samples: List[float] = []
+    extras: Dict[str, List[float]] = {}
+    try:
+        if spec.warmup:
+            state = await _maybe_await(spec.setup()) if spec.setup else None
+            await _maybe_await(spec.func(state) if spec.setup else spec.func())
+        for _ in range(repeat):
+            state = await _maybe_await(spec.setup()) if spec.setup else None
+            started = time.perf_counter()
+            for _ in range(spec.number):
+                extra = await _maybe_await(spec.func(state) if spec.setup else spec.func())
+                if isinstance(extra, dict):
+                    for key, value in extra.items():
+                        extras.setdefault(key, []).append(float(value))
+            samples.append((time.perf_counter() - started) / spec.number)
+    except SkipBenchmark as e:
+        return {"group": spec.group, "skipped": str(e)}
+
+    return {
+        "group": spec.group,
+        "unit": "s",
+        "repeat": repeat,
+        "number": spec.number,
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "p95": percentile(samples, 95),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "samples": samples,
+        "extra": {key: statistics.median(values) for key, values in sorted(extras.items())},
+    }
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=ROOT_DIR, capture_output=True, text=True, timeout=10, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def collect_metadata(settings: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "branch": _git("rev-parse", "--abbrev-ref", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": settings,
+    }
+
+
+def write_results(results: Dict[str, Any], output_dir: Path = RESULTS_DIR) -> Path:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    meta = results["meta"]
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    commit = (meta.get("commit") or "nogit")[:10] + ("-dirty" if meta.get("dirty") else "")
+    path = output_dir / f"{stamp}_{commit}.json"
+    path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+def _format_seconds(value: float) -> str:
+    if value >= 1:
+        return f"{value:.3f}s"
+    if value >= 1e-3:
+        return f"{value * 1e3:.3f}ms"
+    return f"{value * 1e6:.1f}µs"
+
+
+def render_table(results: Dict[str, Any]) -> str:
+    lines = []
+    entries = results["benchmarks"]
+    width = max((len(name) for name in entries), default=10)
+    lines.append(f"{'benchmark'.ljust(width)}  {'median':>12}  {'min':>12}  {'p95':>12}")
+    for name, entry in entries.items():
+        if "skipped" in entry:
+            lines.append(f"{name.ljust(width)}  skipped: {entry['skipped']}")
+            continue
+        lines.append(
+            f"{name.ljust(width)}  {_format_seconds(entry['median']):>12}  "
+            f"{_format_seconds(entry['min']):>12}  {_format_seconds(entry['p95']):>12}"
+        )
+        for key, value in entry.get("extra", {}).items():
+            lines.append(f"{'':{width}}    {key} = {value:.3f}")
+    return "\n".join(lines)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> (str, List[str]):
+    """按中位数比较；比值超过 1 + threshold 记为回归"""
+    regressions = []
+    lines = [
+        f"baseline: {(baseline['meta'].get('commit') or '?')[:10]}  "
+        f"current: {(current['meta'].get('commit') or '?')[:10]}  threshold: +{threshold:.0%}"
+    ]
+    for name, entry in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if not base or "median" not in base or "median" not in entry or base["median"] <= 0:
+            continue
+        ratio = entry["median"] / base["median"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  (improved)"
+        lines.append(
+            f"{name}: {_format_seconds(base['median'])} -> {_format_seconds(entry['median'])} ({ratio:.2f}x){flag}"
+        )
+    return "\n".join(lines), regressions
+
+
+def run_all(specs: List[BenchmarkSpec], repeat: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    async def _run():
+        out = {}
+        for spec in specs:
+            print(f"▶ {spec.name} ...", flush=True)
+            out[spec.name] = await run_benchmark(spec, repeat)
+        return out
+
+    return asyncio.run(_run())
@@ -0,0 +1,99 @@
+"""
+🌊 心海基准入口（模拟后端，不访问网络）
+
+用法：
+    python -m benchmarks.run                                  # 全部基准，结果写入 benchmarks/results/
+    python -m benchmarks.run --filter cache --quick           # 仅缓存基准，快速模式
+    python -m benchmarks.run --mock-latency-ms 50             # 端到端基准叠加 50ms 模拟延迟
+    python -m benchmarks.run --compare benchmarks/results/<基线>.json --fail-on-regression
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+# 必须在导入 src 之前设置：环境变量优先于 app.json
+os.environ.setdefault("XINJING_LLM_BACKEND", "mock")
+os.environ.setdefault("XINJING_STORAGE_BACKEND", "local")
+os.environ.setdefault("XINJING_REDIS_HOST", "127.0.0.1")
+for _key in ("XINJING_MOCK_ERROR_RATE", "XINJING_MOCK_RATE_LIMIT_RATE", "XINJING_MOCK_MALFORMED_RATE"):
+    os.environ.setdefault(_key, "0")
+
+
+def _quiet_console_logging() -> None:
+    """只保留文件日志，避免控制台输出干扰计时"""
+    from src.state_of_mind.utils.logger import LoggerManager
+    for handler in LoggerManager.get_logger().handlers:
+        if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
+            handler.setLevel(logging.ERROR)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="心海基准")
+    parser.add_argument("--filter", "-k", action="append", default=[],
+                        help="仅运行名称包含该子串的基准（可重复）")
+    parser.add_argument("--list", action="store_true", help="列出基准后退出")
+    parser.add_argument("--quick", action="store_true", help="每个基准只跑 2 轮")
+    parser.add_argument("--repeat", type=int, help="覆盖每个基准的轮数")
+    parser.add_argument("--mock-latency-ms", type=float, help="模拟后端单次调用延迟（ms），默认取配置")
+    parser.add_argument("--output-dir", default=None, help="结果 JSON 目录，默认 benchmarks/results")
+    parser.add_argument("--no-save", action="store_true", help="不写结果文件")
+    parser.add_argument("--compare", help="基线结果 JSON，按中位数比较")
+    parser.add_argument("--threshold", type=float, default=0.10, help="回归阈值（相对变慢比例），默认 0.10")
+    parser.add_argument("--fail-on-regression", action="store_true", help="存在回归时以退出码 1 结束")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.mock_latency_ms is not None:
+        os.environ["XINJING_MOCK_LATENCY_MS"] = str(args.mock_latency_ms)
+
+    from benchmarks import harness
+    from benchmarks import bench_cache, bench_components, bench_pipeline, bench_serializer  # noqa: F401  注册基准
+    from src.state_of_mind.config import config
+
+    specs = [s for s in harness.BENCHMARKS if not args.filter or any(f in s.name for f in args.filter)]
+    if args.list:
+        for spec in specs:
+            print(f"{spec.group:<12} {spec.name}")
+        return 0
+    if not specs:
+        print("❌ 没有匹配的基准", file=sys.stderr)
+        return 2
+
+    _quiet_console_logging()
+    settings = {
+        "llm_backend": config.LLM_BACKEND,
+        "storage_backend": config.STORAGE_BACKEND,
+        "mock_seed": config.MOCK_SEED,
+        "mock_latency_distribution": config.MOCK_LATENCY_DISTRIBUTION,
+        "mock_latency_ms": config.MOCK_LATENCY_MS,
+        "mock_latency_sigma": config.MOCK_LATENCY_SIGMA,
+        "quick": args.quick,
+    }
+    results = {
+        "meta": harness.collect_metadata(settings),
+        "benchmarks": harness.run_all(specs, repeat=2 if args.quick else args.repeat),
+    }
+    print()
+    print(harness.render_table(results))
+
+    if not args.no_save:
+        output_dir = Path(args.output_dir) if args.output_dir else harness.RESULTS_DIR
+        print(f"\n结果已写入: {harness.write_results(results, output_dir)}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        report, regressions = harness.compare(baseline, results, args.threshold)
+        print("\n" + report)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,21 @@
+import asyncio
+import json
 import os
 from pathlib import Path
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from starlette.responses import HTMLResponse
+from starlette.responses import HTMLResponse, StreamingResponse
 from starlette.staticfiles import StaticFiles
+from src.state_of_mind.core.job_queue import JobManager, JobQueueFullError, create_job_queue
 from src.state_of_mind.core.orchestration import MetaCognitiveOrchestrator
 from src.state_of_mind.config import config
-from src.state_of_mind.stages.perception.constants import DEFAULT_API_URLS, ALL_STEPS_FOR_FRONTEND
+from src.state_of_mind.stages.perception.constants import DEFAULT_API_URLS, ALL_STEPS_FOR_FRONTEND, EVENT_ERROR
 from src.state_of_mind.utils.constants import PATH_FILE_APP_JSON, LLMModelConst
 from src.state_of_mind.utils.file_util import FileUtil
 from src.state_of_mind.utils.logger import LoggerManager as logger
+from src.state_of_mind.utils.registry import GlobalSingletonRegistry
+from src.state_of_mind.utils.retry_util import get_retry_status
 logger.inject_config(config)
 CHINESE_NAME = "FastAPI启动中心"
 logger.info("🚀 应用启动中...", module_name=CHINESE_NAME)
@@ -24,6 +29,13 @@ else:
     logger.warning(f"⚠️ 静态目录不存在: {static_dir}", module_name=CHINESE_NAME)
 
 orchestrator = MetaCognitiveOrchestrator()
+job_manager = JobManager(orchestrator, create_job_queue(config), workers=config.JOB_WORKERS)
+# 任何一项变化都需要重建任务队列（仅 worker 数变化时保留原队列）
+JOB_QUEUE_CONFIG_KEYS = (
+    "JOB_QUEUE_BACKEND", "JOB_QUEUE_MAX_SIZE", "JOB_RESULT_TTL", "CACHE_NAMESPACE",
+    "REDIS_HOST", "REDIS_PORT", "REDIS_DB", "REDIS_PASSWORD", "REDIS_TIMEOUT",
+)
+job_reconfigure_task = None
 
 # 允许前端跨域（开发时用）
 app.add_middleware(
@@ -41,6 +53,53 @@ class AnalysisRequest(BaseModel):
     title: str = "文本多模态感知分析报告"
 
 
+def _ensure_prompt_steps_loaded():
+    """流水线依赖 pre_basic_data 填充的步骤常量，未经 /api/steps 预加载时在此补齐"""
+    if not ALL_STEPS_FOR_FRONTEND:
+        from src.state_of_mind.stages.perception.prompt_builder import PromptBuilder
+        PromptBuilder().pre_basic_data()
+
+
+async def _load_cache_snapshot():
+    """XINJING_CACHE_SNAPSHOT_PATH 指向的快照存在时导入，失败不影响启动"""
+    path = config.CACHE_SNAPSHOT_PATH
+    if not path or not Path(path).is_file():
+        return
+    from src.state_of_mind.cache.snapshot import CacheSnapshot
+    try:
+        await CacheSnapshot(orchestrator.stages["perception"].llm_cache).load(path)
+    except Exception as e:
+        logger.warning(f"⚠️ 导入缓存快照失败，以空缓存启动: {e}", module_name=CHINESE_NAME)
+
+
+async def _export_cache_snapshot():
+    path = config.CACHE_SNAPSHOT_PATH
+    if not path or not config.CACHE_SNAPSHOT_EXPORT_ON_SHUTDOWN:
+        return
+    from src.state_of_mind.cache.snapshot import CacheSnapshot
+    try:
+        await CacheSnapshot(orchestrator.stages["perception"].llm_cache).export(path)
+    except Exception as e:
+        logger.warning(f"⚠️ 导出缓存快照失败: {e}", module_name=CHINESE_NAME)
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    _ensure_prompt_steps_loaded()
+    await _load_cache_snapshot()
+    await GlobalSingletonRegistry.async_prewarm(
+        config.LLM_BACKEND, min(config.LLM_HTTP_PREWARM, config.LLM_HTTP_MAX_KEEPALIVE)
+    )
+    await job_manager.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_manager.stop()
+    await _export_cache_snapshot()
+    await GlobalSingletonRegistry.async_close_all()
+
+
 # === 配置读取接口 ===
 @app.get("/api/config")
 async def get_config():
@@ -72,8 +131,8 @@ async def save_config(request: Request):
         # 1. XINJING_STORAGE_BACKEND: str, 限定值
         backend = new_config.get("XINJING_STORAGE_BACKEND")
         if backend is not None:
-            if not isinstance(backend, str) or backend not in {"local", "redis"}:
-                errors.append("XINJING_STORAGE_BACKEND 必须是 'local' 或 'redis'")
+            if not isinstance(backend, str) or backend not in {"local", "redis", "tiered", "sqlite"}:
+                errors.append("XINJING_STORAGE_BACKEND 必须是 'local'、'redis'、'tiered' 或 'sqlite'")
 
         # 2. XINJING_LLM_CACHE_MAX_SIZE: int > 0
         cache_size = new_config.get("XINJING_LLM_CACHE_MAX_SIZE")
@@ -172,8 +231,8 @@ async def save_config(request: Request):
         # 14. XINJING_LLM_BACKEND: str, 限定值
         llm_backend = new_config.get("XINJING_LLM_BACKEND")
         if llm_backend is not None:
-            if not isinstance(llm_backend, str) or llm_backend not in {"deepseek", "qwen"}:
-                errors.append("XINJING_LLM_BACKEND 必须是 'deepseek'或'qwen'")
+            if not isinstance(llm_backend, str) or llm_backend not in {"deepseek", "qwen", "mock", "router"}:
+                errors.append("XINJING_LLM_BACKEND 必须是 'deepseek'、'qwen'、'mock'（本地模拟）或 'router'（多后端路由）")
 
         # 15. XINJING_LLM_MODEL: str
         llm_model = new_config.get("XINJING_LLM_MODEL")
@@ -202,7 +261,7 @@ async def save_config(request: Request):
                     "DeepSeek: https://platform.deepseek.com/docs/api-reference | "
                     "Qwen: https://help.aliyun.com/zh/dashscope/developer-reference/"
                 )
-        if llm_backend and api_url is None:
+        if llm_backend in DEFAULT_API_URLS and api_url is None:
             new_config["XINJING_LLM_API_URL"] = DEFAULT_API_URLS[llm_backend]
 
         # 17. XINJING_LLM_API_KEY: str or null
@@ -210,6 +269,335 @@ async def save_config(request: Request):
         if api_key is not None and not isinstance(api_key, str):
             errors.append("XINJING_LLM_API_KEY 必须是字符串或 null")
 
+        # 18. XINJING_JOB_QUEUE_BACKEND: str, 限定值
+        job_backend = new_config.get("XINJING_JOB_QUEUE_BACKEND")
+        if job_backend is not None:
+            if not isinstance(job_backend, str) or job_backend not in {"local", "redis"}:
+                errors.append("XINJING_JOB_QUEUE_BACKEND 必须是 'local' 或 'redis'")
+
+        # 19. XINJING_JOB_WORKERS: int > 0
+        job_workers = new_config.get("XINJING_JOB_WORKERS")
+        if job_workers is not None:
+            if isinstance(job_workers, bool) or not isinstance(job_workers, int) or job_workers <= 0:
+                errors.append("XINJING_JOB_WORKERS 必须是正整数")
+
+        # 20. XINJING_JOB_QUEUE_MAX_SIZE: int > 0
+        job_queue_size = new_config.get("XINJING_JOB_QUEUE_MAX_SIZE")
+        if job_queue_size is not None:
+            if isinstance(job_queue_size, bool) or not isinstance(job_queue_size, int) or job_queue_size <= 0:
+                errors.append("XINJING_JOB_QUEUE_MAX_SIZE 必须是正整数")
+
+        # 21. XINJING_JOB_RESULT_TTL: int >= 0
+        job_ttl = new_config.get("XINJING_JOB_RESULT_TTL")
+        if job_ttl is not None:
+            if isinstance(job_ttl, bool) or not isinstance(job_ttl, int) or job_ttl < 0:
+                errors.append("XINJING_JOB_RESULT_TTL 必须是非负整数")
+
+        # 22. XINJING_LLM_RATE_LIMIT_BACKEND: str, 限定值
+        rate_backend = new_config.get("XINJING_LLM_RATE_LIMIT_BACKEND")
+        if rate_backend is not None:
+            if not isinstance(rate_backend, str) or rate_backend not in {"local", "redis"}:
+                errors.append("XINJING_LLM_RATE_LIMIT_BACKEND 必须是 'local' 或 'redis'")
+
+        # 23. XINJING_LLM_RATE_LIMIT_RPS: number >= 0（0 表示不限制）
+        rate_rps = new_config.get("XINJING_LLM_RATE_LIMIT_RPS")
+        if rate_rps is not None:
+            if isinstance(rate_rps, bool) or not isinstance(rate_rps, (int, float)) or rate_rps < 0:
+                errors.append("XINJING_LLM_RATE_LIMIT_RPS 必须是非负数（0 表示不限制）")
+
+        # 24. XINJING_LLM_RATE_LIMIT_CONCURRENCY / XINJING_LLM_RATE_LIMIT_TPM: int >= 0（0 表示不限制）
+        for rate_key in ("XINJING_LLM_RATE_LIMIT_CONCURRENCY", "XINJING_LLM_RATE_LIMIT_TPM"):
+            rate_val = new_config.get(rate_key)
+            if rate_val is not None:
+                if isinstance(rate_val, bool) or not isinstance(rate_val, int) or rate_val < 0:
+                    errors.append(f"{rate_key} 必须是非负整数（0 表示不限制）")
+
+        # 25. XINJING_BATCH_MAX_IN_FLIGHT: int > 0
+        batch_in_flight = new_config.get("XINJING_BATCH_MAX_IN_FLIGHT")
+        if batch_in_flight is not None:
+            if isinstance(batch_in_flight, bool) or not isinstance(batch_in_flight, int) or batch_in_flight <= 0:
+                errors.append("XINJING_BATCH_MAX_IN_FLIGHT 必须是正整数")
+
+        # 26. XINJING_MOCK_SEED: int
+        mock_seed = new_config.get("XINJING_MOCK_SEED")
+        if mock_seed is not None:
+            if isinstance(mock_seed, bool) or not isinstance(mock_seed, int):
+                errors.append("XINJING_MOCK_SEED 必须是整数")
+
+        # 27. XINJING_MOCK_LATENCY_DISTRIBUTION: str, 限定值
+        mock_dist = new_config.get("XINJING_MOCK_LATENCY_DISTRIBUTION")
+        if mock_dist is not None:
+            if not isinstance(mock_dist, str) or mock_dist not in {"fixed", "uniform", "lognormal"}:
+                errors.append("XINJING_MOCK_LATENCY_DISTRIBUTION 必须是 'fixed'、'uniform' 或 'lognormal'")
+
+        # 28. XINJING_MOCK_LATENCY_MS / XINJING_MOCK_LATENCY_SIGMA: number >= 0
+        for mock_key in ("XINJING_MOCK_LATENCY_MS", "XINJING_MOCK_LATENCY_SIGMA"):
+            mock_val = new_config.get(mock_key)
+            if mock_val is not None:
+                if isinstance(mock_val, bool) or not isinstance(mock_val, (int, float)) or mock_val < 0:
+                    errors.append(f"{mock_key} 必须是非负数")
+
+        # 29. XINJING_MOCK_*_RATE: number in [0, 1]
+        for mock_key in ("XINJING_MOCK_ERROR_RATE", "XINJING_MOCK_RATE_LIMIT_RATE", "XINJING_MOCK_MALFORMED_RATE"):
+            mock_val = new_config.get(mock_key)
+            if mock_val is not None:
+                if isinstance(mock_val, bool) or not isinstance(mock_val, (int, float)) or not (0 <= mock_val <= 1):
+                    errors.append(f"{mock_key} 必须是 0~1 之间的数")
+
+        # 30. XINJING_TIERED_L1_MAX_SIZE: int > 0；XINJING_TIERED_L1_TTL / XINJING_TIERED_L1_MAX_ENTRY_BYTES: int >= 0
+        tiered_size = new_config.get("XINJING_TIERED_L1_MAX_SIZE")
+        if tiered_size is not None:
+            if isinstance(tiered_size, bool) or not isinstance(tiered_size, int) or tiered_size <= 0:
+                errors.append("XINJING_TIERED_L1_MAX_SIZE 必须是正整数")
+        for tiered_key in ("XINJING_TIERED_L1_TTL", "XINJING_TIERED_L1_MAX_ENTRY_BYTES"):
+            tiered_val = new_config.get(tiered_key)
+            if tiered_val is not None:
+                if isinstance(tiered_val, bool) or not isinstance(tiered_val, int) or tiered_val < 0:
+                    errors.append(f"{tiered_key} 必须是非负整数")
+
+        # 31. XINJING_TIERED_NEGATIVE_TTL: number >= 0（0 表示关闭负缓存）
+        negative_ttl = new_config.get("XINJING_TIERED_NEGATIVE_TTL")
+        if negative_ttl is not None:
+            if isinstance(negative_ttl, bool) or not isinstance(negative_ttl, (int, float)) or negative_ttl < 0:
+                errors.append("XINJING_TIERED_NEGATIVE_TTL 必须是非负数")
+
+        # 32. XINJING_TIERED_INVALIDATION_CHANNEL: 非空 str
+        channel = new_config.get("XINJING_TIERED_INVALIDATION_CHANNEL")
+        if channel is not None:
+            if not isinstance(channel, str) or not channel.strip():
+                errors.append("XINJING_TIERED_INVALIDATION_CHANNEL 必须是非空字符串")
+
+        # 33. XINJING_SINGLE_FLIGHT_BACKEND: str, 限定值
+        sf_backend = new_config.get("XINJING_SINGLE_FLIGHT_BACKEND")
+        if sf_backend is not None:
+            if not isinstance(sf_backend, str) or sf_backend not in {"local", "redis"}:
+                errors.append("XINJING_SINGLE_FLIGHT_BACKEND 必须是 'local' 或 'redis'")
+
+        # 34. XINJING_SINGLE_FLIGHT_LOCK_TTL / XINJING_SINGLE_FLIGHT_POLL_INTERVAL: number > 0
+        for sf_key in ("XINJING_SINGLE_FLIGHT_LOCK_TTL", "XINJING_SINGLE_FLIGHT_POLL_INTERVAL"):
+            sf_val = new_config.get(sf_key)
+            if sf_val is not None:
+                if isinstance(sf_val, bool) or not isinstance(sf_val, (int, float)) or sf_val <= 0:
+                    errors.append(f"{sf_key} 必须是正数")
+
+        # 35. XINJING_LLM_CACHE_MAX_BYTES: int >= 0（0 表示不限字节）
+        cache_bytes = new_config.get("XINJING_LLM_CACHE_MAX_BYTES")
+        if cache_bytes is not None:
+            if isinstance(cache_bytes, bool) or not isinstance(cache_bytes, int) or cache_bytes < 0:
+                errors.append("XINJING_LLM_CACHE_MAX_BYTES 必须是非负整数")
+
+        # 36. XINJING_LLM_CACHE_COMPRESSION: str, 限定值
+        compression = new_config.get("XINJING_LLM_CACHE_COMPRESSION")
+        if compression is not None:
+            if not isinstance(compression, str) or compression.lower() not in {"none", "zlib", "zstd"}:
+                errors.append("XINJING_LLM_CACHE_COMPRESSION 必须是 'none'、'zlib' 或 'zstd'")
+
+        # 37. XINJING_REDIS_SERIALIZER: str, 限定值
+        serializer = new_config.get("XINJING_REDIS_SERIALIZER")
+        if serializer is not None:
+            if not isinstance(serializer, str) or serializer.lower() not in {"json", "orjson", "msgpack"}:
+                errors.append("XINJING_REDIS_SERIALIZER 必须是 'json'、'orjson' 或 'msgpack'")
+
+        # 38. XINJING_REDIS_COMPRESSION: str, 限定值
+        redis_compression = new_config.get("XINJING_REDIS_COMPRESSION")
+        if redis_compression is not None:
+            if not isinstance(redis_compression, str) or redis_compression.lower() not in {"none", "zlib", "zstd"}:
+                errors.append("XINJING_REDIS_COMPRESSION 必须是 'none'、'zlib' 或 'zstd'")
+
+        # 39. XINJING_CACHE_SNAPSHOT_PATH: str（空字符串表示不启用）
+        snapshot_path = new_config.get("XINJING_CACHE_SNAPSHOT_PATH")
+        if snapshot_path is not None and not isinstance(snapshot_path, str):
+            errors.append("XINJING_CACHE_SNAPSHOT_PATH 必须是字符串")
+
+        # 40. XINJING_CACHE_SNAPSHOT_EXPORT_ON_SHUTDOWN: bool
+        export_on_shutdown = new_config.get("XINJING_CACHE_SNAPSHOT_EXPORT_ON_SHUTDOWN")
+        if export_on_shutdown is not None and not isinstance(export_on_shutdown, bool):
+            errors.append("XINJING_CACHE_SNAPSHOT_EXPORT_ON_SHUTDOWN 必须是布尔值")
+
+        # 41. XINJING_NEAR_DUP_ENABLED: bool
+        near_dup_enabled = new_config.get("XINJING_NEAR_DUP_ENABLED")
+        if near_dup_enabled is not None and not isinstance(near_dup_enabled, bool):
+            errors.append("XINJING_NEAR_DUP_ENABLED 必须是布尔值")
+
+        # 42. XINJING_NEAR_DUP_BACKEND: str, 限定值
+        near_dup_backend = new_config.get("XINJING_NEAR_DUP_BACKEND")
+        if near_dup_backend is not None:
+            if not isinstance(near_dup_backend, str) or near_dup_backend not in {"local", "redis"}:
+                errors.append("XINJING_NEAR_DUP_BACKEND 必须是 'local' 或 'redis'")
+
+        # 43. XINJING_NEAR_DUP_THRESHOLD: number, (0, 1]
+        near_dup_threshold = new_config.get("XINJING_NEAR_DUP_THRESHOLD")
+        if near_dup_threshold is not None:
+            if isinstance(near_dup_threshold, bool) or not isinstance(near_dup_threshold, (int, float)) \
+                    or not 0 < near_dup_threshold <= 1:
+                errors.append("XINJING_NEAR_DUP_THRESHOLD 必须是 (0, 1] 之间的数值")
+
+        # 44. XINJING_NEAR_DUP_MAX_ENTRIES: int > 0
+        near_dup_max = new_config.get("XINJING_NEAR_DUP_MAX_ENTRIES")
+        if near_dup_max is not None:
+            if isinstance(near_dup_max, bool) or not isinstance(near_dup_max, int) or near_dup_max <= 0:
+                errors.append("XINJING_NEAR_DUP_MAX_ENTRIES 必须是正整数")
+
+        # 45. XINJING_SQLITE_CACHE_PATH: str（空字符串表示使用默认路径）
+        sqlite_path = new_config.get("XINJING_SQLITE_CACHE_PATH")
+        if sqlite_path is not None and not isinstance(sqlite_path, str):
+            errors.append("XINJING_SQLITE_CACHE_PATH 必须是字符串")
+
+        # 46. XINJING_SQLITE_CACHE_MAX_BYTES: int >= 0（0 表示不限字节）
+        sqlite_bytes = new_config.get("XINJING_SQLITE_CACHE_MAX_BYTES")
+        if sqlite_bytes is not None:
+            if isinstance(sqlite_bytes, bool) or not isinstance(sqlite_bytes, int) or sqlite_bytes < 0:
+                errors.append("XINJING_SQLITE_CACHE_MAX_BYTES 必须是非负整数")
+
+        # 47. XINJING_LLM_HTTP_MAX_CONNECTIONS: int > 0；XINJING_LLM_HTTP_MAX_KEEPALIVE: 0 < int <= 最大连接数
+        max_conn = new_config.get("XINJING_LLM_HTTP_MAX_CONNECTIONS")
+        if max_conn is not None:
+            if isinstance(max_conn, bool) or not isinstance(max_conn, int) or max_conn <= 0:
+                errors.append("XINJING_LLM_HTTP_MAX_CONNECTIONS 必须是正整数")
+        max_keepalive = new_config.get("XINJING_LLM_HTTP_MAX_KEEPALIVE")
+        if max_keepalive is not None:
+            if isinstance(max_keepalive, bool) or not isinstance(max_keepalive, int) or max_keepalive <= 0:
+                errors.append("XINJING_LLM_HTTP_MAX_KEEPALIVE 必须是正整数")
+            elif isinstance(max_conn, int) and not isinstance(max_conn, bool) and max_keepalive > max_conn:
+                errors.append("XINJING_LLM_HTTP_MAX_KEEPALIVE 不能大于 XINJING_LLM_HTTP_MAX_CONNECTIONS")
+
+        # 48. XINJING_LLM_HTTP_KEEPALIVE_EXPIRY: number >= 0
+        keepalive_expiry = new_config.get("XINJING_LLM_HTTP_KEEPALIVE_EXPIRY")
+        if keepalive_expiry is not None:
+            if isinstance(keepalive_expiry, bool) or not isinstance(keepalive_expiry, (int, float)) or keepalive_expiry < 0:
+                errors.append("XINJING_LLM_HTTP_KEEPALIVE_EXPIRY 必须是非负数")
+
+        # 49. XINJING_LLM_HTTP2: bool
+        http2 = new_config.get("XINJING_LLM_HTTP2")
+        if http2 is not None and not isinstance(http2, bool):
+            errors.append("XINJING_LLM_HTTP2 必须是布尔值 (true/false)")
+
+        # 50. XINJING_LLM_CONNECT_TIMEOUT / XINJING_LLM_WRITE_TIMEOUT / XINJING_LLM_POOL_TIMEOUT: number > 0
+        for timeout_key in ("XINJING_LLM_CONNECT_TIMEOUT", "XINJING_LLM_WRITE_TIMEOUT", "XINJING_LLM_POOL_TIMEOUT"):
+            timeout_val = new_config.get(timeout_key)
+            if timeout_val is not None:
+                if isinstance(timeout_val, bool) or not isinstance(timeout_val, (int, float)) or timeout_val <= 0:
+                    errors.append(f"{timeout_key} 必须是正数")
+
+        # 51. XINJING_LLM_HTTP_PREWARM: int >= 0（0 表示不预热）
+        prewarm = new_config.get("XINJING_LLM_HTTP_PREWARM")
+        if prewarm is not None:
+            if isinstance(prewarm, bool) or not isinstance(prewarm, int) or prewarm < 0:
+                errors.append("XINJING_LLM_HTTP_PREWARM 必须是非负整数")
+
+        # 52. XINJING_LLM_STREAM: bool
+        llm_stream = new_config.get("XINJING_LLM_STREAM")
+        if llm_stream is not None and not isinstance(llm_stream, bool):
+            errors.append("XINJING_LLM_STREAM 必须是布尔值 (true/false)")
+
+        # 53. XINJING_LLM_REQUEST_SLO: number >= 0（0 表示不限制）
+        request_slo = new_config.get("XINJING_LLM_REQUEST_SLO")
+        if request_slo is not None:
+            if isinstance(request_slo, bool) or not isinstance(request_slo, (int, float)) or request_slo < 0:
+                errors.append("XINJING_LLM_REQUEST_SLO 必须是非负数（0 表示不限制）")
+
+        # 54. XINJING_LLM_HEDGE_QUANTILES: dict，键为步骤分组，值为 (0, 1] 之间的分位数
+        hedge_quantiles = new_config.get("XINJING_LLM_HEDGE_QUANTILES")
+        if hedge_quantiles is not None:
+            step_groups = {"parallel_preprocessing", "parallel_perception", "parallel_high_order", "serial_suggestion"}
+            if not isinstance(hedge_quantiles, dict):
+                errors.append("XINJING_LLM_HEDGE_QUANTILES 必须是对象，如 {\"parallel_perception\": 0.95}")
+            else:
+                for group, quantile in hedge_quantiles.items():
+                    if group not in step_groups:
+                        errors.append(f"XINJING_LLM_HEDGE_QUANTILES 包含未知步骤分组: {group}")
+                    elif isinstance(quantile, bool) or not isinstance(quantile, (int, float)) or not 0 < quantile <= 1:
+                        errors.append(f"XINJING_LLM_HEDGE_QUANTILES.{group} 必须是 (0, 1] 之间的数值")
+
+        # 55. XINJING_LLM_HEDGE_MIN_SAMPLES: int > 0
+        hedge_min_samples = new_config.get("XINJING_LLM_HEDGE_MIN_SAMPLES")
+        if hedge_min_samples is not None:
+            if isinstance(hedge_min_samples, bool) or not isinstance(hedge_min_samples, int) or hedge_min_samples <= 0:
+                errors.append("XINJING_LLM_HEDGE_MIN_SAMPLES 必须是正整数")
+
+        # 56. XINJING_LLM_ROUTES: list，每项为路由配置对象；XINJING_LLM_BACKEND=router 时不能为空
+        llm_routes = new_config.get("XINJING_LLM_ROUTES")
+        route_names = set()
+        if llm_routes is not None:
+            if not isinstance(llm_routes, list):
+                errors.append("XINJING_LLM_ROUTES 必须是数组")
+            else:
+                models_by_backend = LLMModelConst.by_backend()
+                for idx, route in enumerate(llm_routes):
+                    prefix = f"XINJING_LLM_ROUTES[{idx}]"
+                    if not isinstance(route, dict):
+                        errors.append(f"{prefix} 必须是对象")
+                        continue
+                    name = route.get("name")
+                    if not isinstance(name, str) or not name.strip():
+                        errors.append(f"{prefix}.name 必须是非空字符串")
+                    elif name in route_names:
+                        errors.append(f"{prefix}.name '{name}' 重复")
+                    else:
+                        route_names.add(name)
+                    backend = route.get("backend")
+                    if backend not in {"deepseek", "qwen", "mock"}:
+                        errors.append(f"{prefix}.backend 必须是 'deepseek'、'qwen' 或 'mock'")
+                    elif route.get("model") is not None and route["model"] not in models_by_backend[backend]:
+                        errors.append(
+                            f"{prefix}.model '{route['model']}' 不属于 {backend}，"
+                            f"可选: {', '.join(models_by_backend[backend])}"
+                        )
+                    route_url = route.get("api_url")
+                    if route_url is not None and (
+                            not isinstance(route_url, str) or not route_url.startswith(("http://", "https://"))):
+                        errors.append(f"{prefix}.api_url 必须是有效的 HTTP/HTTPS URL")
+                    if route.get("api_key") is not None and not isinstance(route["api_key"], str):
+                        errors.append(f"{prefix}.api_key 必须是字符串或 null")
+                    weight = route.get("weight")
+                    if weight is not None and (
+                            isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight <= 0):
+                        errors.append(f"{prefix}.weight 必须是正数")
+                    for key in ("rate_limit_rps", "rate_limit_concurrency", "rate_limit_tpm"):
+                        value = route.get(key)
+                        if value is not None and (
+                                isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0):
+                            errors.append(f"{prefix}.{key} 必须是非负数")
+        if llm_backend == "router" and not llm_routes:
+            errors.append("XINJING_LLM_BACKEND='router' 时必须配置 XINJING_LLM_ROUTES")
+
+        # 57. XINJING_LLM_ROUTE_PINS: dict，步骤名 -> 已配置的路由名
+        route_pins = new_config.get("XINJING_LLM_ROUTE_PINS")
+        if route_pins is not None:
+            if not isinstance(route_pins, dict):
+                errors.append("XINJING_LLM_ROUTE_PINS 必须是对象，如 {\"suggestion\": \"deepseek-main\"}")
+            else:
+                for step_name, route_name in route_pins.items():
+                    if route_name not in route_names:
+                        errors.append(f"XINJING_LLM_ROUTE_PINS.{step_name} 指向未配置的路由: {route_name}")
+
+        # 58. XINJING_LLM_BREAKER_FAILURE_RATE: number in [0, 1]（0 关闭熔断）
+        breaker_failure_rate = new_config.get("XINJING_LLM_BREAKER_FAILURE_RATE")
+        if breaker_failure_rate is not None:
+            if isinstance(breaker_failure_rate, bool) or not isinstance(breaker_failure_rate, (int, float)) \
+                    or not 0 <= breaker_failure_rate <= 1:
+                errors.append("XINJING_LLM_BREAKER_FAILURE_RATE 必须是 0~1 之间的数值（0 关闭熔断）")
+
+        # 59. XINJING_LLM_BREAKER_MIN_CALLS: int > 0
+        breaker_min_calls = new_config.get("XINJING_LLM_BREAKER_MIN_CALLS")
+        if breaker_min_calls is not None:
+            if isinstance(breaker_min_calls, bool) or not isinstance(breaker_min_calls, int) or breaker_min_calls <= 0:
+                errors.append("XINJING_LLM_BREAKER_MIN_CALLS 必须是正整数")
+
+        # 60. XINJING_LLM_BREAKER_WINDOW_SECONDS / XINJING_LLM_BREAKER_OPEN_SECONDS: number > 0
+        for breaker_key in ("XINJING_LLM_BREAKER_WINDOW_SECONDS", "XINJING_LLM_BREAKER_OPEN_SECONDS"):
+            breaker_seconds = new_config.get(breaker_key)
+            if breaker_seconds is not None:
+                if isinstance(breaker_seconds, bool) or not isinstance(breaker_seconds, (int, float)) \
+                        or breaker_seconds <= 0:
+                    errors.append(f"{breaker_key} 必须是正数（秒）")
+
+        # 61. XINJING_CACHE_NAMESPACE: 非空字符串，不含空白字符
+        cache_namespace = new_config.get("XINJING_CACHE_NAMESPACE")
+        if cache_namespace is not None:
+            if not isinstance(cache_namespace, str) or not cache_namespace or any(ch.isspace() for ch in cache_namespace):
+                errors.append("XINJING_CACHE_NAMESPACE 必须是不含空白字符的非空字符串")
+
         # --- 如果有校验错误，直接返回 ---
         if errors:
             error_msg = "配置校验失败:\n" + "\n".join(errors)
@@ -221,7 +609,10 @@ async def save_config(request: Request):
         logger.info("💾 配置已写入文件", module_name=CHINESE_NAME)
 
         # --- 重载配置 ---
+        job_queue_settings, job_workers = _job_queue_settings(), config.JOB_WORKERS
         await config.reload()
+        if _job_queue_settings() != job_queue_settings or config.JOB_WORKERS != job_workers:
+            _reconfigure_job_manager(rebuild_queue=_job_queue_settings() != job_queue_settings)
 
         return {"status": "success", "message": "配置已保存并重载"}
 
@@ -232,6 +623,21 @@ async def save_config(request: Request):
         raise HTTPException(status_code=500, detail=f"保存失败: {str(e)}")
 
 
+def _job_queue_settings():
+    return tuple(getattr(config, key) for key in JOB_QUEUE_CONFIG_KEYS)
+
+
+def _reconfigure_job_manager(rebuild_queue: bool):
+    """后台切换任务队列 / worker 数：需等待进行中的任务完成，不阻塞配置接口"""
+    global job_reconfigure_task
+    job_queue = create_job_queue(config) if rebuild_queue else job_manager.job_queue
+    logger.info(
+        f"🔄 任务队列配置已变化，切换到: {job_queue.CHINESE_NAME}, worker {config.JOB_WORKERS} 个",
+        module_name=CHINESE_NAME
+    )
+    job_reconfigure_task = asyncio.create_task(job_manager.reconfigure(job_queue, config.JOB_WORKERS))
+
+
 @app.get("/reports/{filename}", response_class=HTMLResponse)
 async def serve_report(filename: str):
     """提供 HTML 报告服务"""
@@ -266,6 +672,12 @@ async def get_steps():
         raise
 
 
+@app.get("/api/llm/status")
+async def get_llm_status():
+    """LLM 调用的重试指标与各后端熔断器状态（closed / open / half_open）"""
+    return get_retry_status()
+
+
 @app.post("/api/analyze")
 async def analyze_text(request: AnalysisRequest):
     logger.info(f"🧠 收到分析请求，标题: {request.title[:30]}...", module_name=CHINESE_NAME)
@@ -278,5 +690,72 @@ async def analyze_text(request: AnalysisRequest):
         logger.exception("💥 文本分析过程中发生错误", module_name=CHINESE_NAME)  # 记录完整堆栈
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
 
+
+@app.post("/api/analyze/stream")
+async def analyze_text_stream(request: AnalysisRequest):
+    """
+    流式分析接口（NDJSON，每行一个事件）：
+    pipeline_start → phase_start / step_result / step_skipped / phase_end ... → report
+    客户端断开后分析任务仍会执行完毕，以便结果写入缓存。
+    """
+    logger.info(f"🧠 收到流式分析请求，标题: {request.title[:30]}...", module_name=CHINESE_NAME)
+    logger.info(f"📝 原始文本长度: {len(request.text)} 字符", module_name=CHINESE_NAME)
+    _ensure_prompt_steps_loaded()
+
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    async def _run():
+        try:
+            await orchestrator.run(stage_name="perception", user_input=request.text, on_event=queue.put)
+            logger.info("✅ 流式文本分析完成", module_name=CHINESE_NAME)
+        except Exception as e:
+            logger.exception("💥 流式文本分析过程中发生错误", module_name=CHINESE_NAME)
+            await queue.put({"event": EVENT_ERROR, "detail": f"分析失败: {str(e)}"})
+        finally:
+            await queue.put(finished)
+
+    task = asyncio.create_task(_run())
+
+    async def _event_lines():
+        while True:
+            message = await queue.get()
+            if message is finished:
+                break
+            yield json.dumps(message, ensure_ascii=False, default=str) + "\n"
+        await task
+
+    return StreamingResponse(
+        _event_lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: AnalysisRequest):
+    """提交异步分析任务，立即返回 job_id；队列已满时返回 429"""
+    logger.info(f"🧠 收到异步分析任务，标题: {request.title[:30]}...", module_name=CHINESE_NAME)
+    try:
+        job = await job_manager.submit(request.text)
+    except JobQueueFullError as e:
+        logger.warning(f"⚠️ 任务队列已满，拒绝提交: {e}", module_name=CHINESE_NAME)
+        raise HTTPException(status_code=429, detail="任务队列已满，请稍后重试", headers={"Retry-After": "30"})
+    except Exception as e:
+        logger.exception("💥 提交分析任务失败", module_name=CHINESE_NAME)
+        raise HTTPException(status_code=500, detail=f"提交失败: {str(e)}")
+    job["status_url"] = f"/api/jobs/{job['job_id']}"
+    return job
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """查询异步分析任务状态、步骤进度与报告地址"""
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    job["queue_depth"] = await job_manager.depth()
+    return job
+
 logger.info("🎉 FastAPI 应用初始化完成！", module_name=CHINESE_NAME)
 logger.info("📜 本工具基于 MIT 许可证发布，商业/个人使用前请查阅 LICENSE 与 EULA 文件。", module_name=CHINESE_NAME)
\ No newline at end of file
@@ -1,7 +1,11 @@
 from src.state_of_mind.llm.deepseek import AsyncDeepSeekBackend
 from src.state_of_mind.llm.qwen import AsyncQwenLLMBackend
+from src.state_of_mind.llm.mock import AsyncMockLLMBackend
+from src.state_of_mind.llm.router import RoutingLLMBackend
 from src.state_of_mind.utils.registry import GlobalSingletonRegistry
 from src.state_of_mind.utils.constants import LLMBackendConst
 
 GlobalSingletonRegistry.register_backend(LLMBackendConst.QWEN, AsyncQwenLLMBackend)
-GlobalSingletonRegistry.register_backend(LLMBackendConst.DEEPSEEK, AsyncDeepSeekBackend)
\ No newline at end of file
+GlobalSingletonRegistry.register_backend(LLMBackendConst.DEEPSEEK, AsyncDeepSeekBackend)
+GlobalSingletonRegistry.register_backend(LLMBackendConst.MOCK, AsyncMockLLMBackend)
+GlobalSingletonRegistry.register_backend(LLMBackendConst.ROUTER, RoutingLLMBackend)
@@ -65,6 +65,25 @@ class BaseCache(ABC):
     async def _akeys_raw(self) -> List[str]:
         raise NotImplementedError
 
+    # ========== 批量底层接口（默认逐个执行，支持批量的后端应重写为单次往返）==========
+    async def _aget_many_raw(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        return [await self._aget_raw(key) for key in keys]
+
+    async def _aset_many_raw(self, items: Dict[str, Dict[str, Any]]) -> None:
+        for key, value in items.items():
+            await self._aset_raw(key, value)
+
+    async def _adelete_many_raw(self, keys: List[str]) -> None:
+        for key in keys:
+            await self._adelete_raw(key)
+
+    def hit_counts(self) -> Dict[str, int]:
+        """本地统计的命中/未命中次数（子类维护 _cache_hits / _cache_misses）"""
+        return {
+            "hits": getattr(self, "_cache_hits", 0),
+            "misses": getattr(self, "_cache_misses", 0),
+        }
+
     # ========== 统一高层异步接口（子类无需重写）==========
     async def get(self, key: str) -> Dict[str, Any]:
         try:
@@ -90,6 +109,45 @@ class BaseCache(ABC):
             logger.error(f"Cache delete failed for {key}: {e}")
             return {"success": False, "data": None, "error": str(e)}
 
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """批量读取，data 为 {key: value}，未命中的 key 对应 None"""
+        try:
+            unique_keys = list(dict.fromkeys(keys))
+            values = await self._aget_many_raw(unique_keys) if unique_keys else []
+            return {"success": True, "data": dict(zip(unique_keys, values)), "error": None}
+        except Exception as e:
+            logger.error(f"Cache get_many failed for {len(keys)} keys: {e}")
+            return {"success": False, "data": {}, "error": str(e)}
+
+    async def set_many(self, items: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        try:
+            if items:
+                await self._aset_many_raw(items)
+            return {"success": True, "data": None, "error": None}
+        except Exception as e:
+            logger.error(f"Cache set_many failed for {len(items)} keys: {e}")
+            return {"success": False, "data": None, "error": str(e)}
+
+    async def delete_many(self, keys: List[str]) -> Dict[str, Any]:
+        try:
+            unique_keys = list(dict.fromkeys(keys))
+            if unique_keys:
+                await self._adelete_many_raw(unique_keys)
+            return {"success": True, "data": None, "error": None}
+        except Exception as e:
+            logger.error(f"Cache delete_many failed for {len(keys)} keys: {e}")
+            return {"success": False, "data": None, "error": str(e)}
+
+    async def keys(self) -> Dict[str, Any]:
+        """列出当前有效的 key（不支持的后端返回 success=False）"""
+        try:
+            return {"success": True, "data": await self._akeys_raw(), "error": None}
+        except NotImplementedError:
+            return {"success": False, "data": [], "error": f"{type(self).__name__} 不支持列出 key"}
+        except Exception as e:
+            logger.error(f"Cache keys failed: {e}")
+            return {"success": False, "data": [], "error": str(e)}
+
     async def clear(self) -> Dict[str, Any]:
         try:
             await self._aclear_raw()
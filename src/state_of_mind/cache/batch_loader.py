@@ -0,0 +1,70 @@
+import asyncio
+from typing import Any, Dict, Iterable, List, Tuple
+from src.state_of_mind.cache.base import BaseCache
+
+
+class CacheBatchLoader:
+    """
+    缓存读取合并器：同一调度轮次内发起的读取合并为一次 get_many（Redis 即一次 MGET 往返）。
+    - prime(keys) 提前发起批量读取，随后的 get(key) 直接复用其结果
+    - 每个 key 的预取结果只消费一次，之后的 get 重新读取
+    - 运行期状态随实例丢弃，每次流水线运行使用一个新实例
+    """
+    CHINESE_NAME = "缓存批量读取合并器"
+
+    def __init__(self, cache: BaseCache):
+        self.cache = cache
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._queued: List[Tuple[str, asyncio.Future]] = []
+        self._flush_scheduled = False
+        self._batches = 0
+
+    def prime(self, keys: Iterable[str]) -> None:
+        loop = asyncio.get_running_loop()
+        for key in keys:
+            if key in self._futures:
+                continue
+            future = loop.create_future()
+            self._futures[key] = future
+            self._queued.append((key, future))
+        if self._queued and not self._flush_scheduled:
+            self._flush_scheduled = True
+            # 等待一轮事件循环，让同时就绪的步骤把各自的 key 加入同一批次
+            loop.call_soon(self._start_flush)
+
+    async def get(self, key: str) -> Dict[str, Any]:
+        if key not in self._futures:
+            self.prime([key])
+        future = self._futures[key]
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+
+    def _start_flush(self) -> None:
+        self._flush_scheduled = False
+        batch, self._queued = self._queued, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._flush(batch))
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        self._batches += 1
+        response: Dict[str, Any] = {"success": False, "data": {}, "error": "批量读取被取消"}
+        try:
+            response = await self.cache.get_many([key for key, _ in batch])
+        except Exception as e:
+            response = {"success": False, "data": {}, "error": str(e)}
+        finally:
+            # 任何情况下都要唤醒等待者，失败时按未命中处理；
+            # future 在入队时记录，同一 key 的等待者被取消并移出 _futures 后，其余等待者仍能被唤醒
+            data = response.get("data") or {}
+            for key, future in batch:
+                if not future.done():
+                    future.set_result({"success": response.get("success"), "data": data.get(key),
+                                       "error": response.get("error")})
+
+    @property
+    def batches(self) -> int:
+        """已发起的批量读取次数"""
+        return self._batches
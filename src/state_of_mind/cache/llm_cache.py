@@ -1,106 +1,290 @@
 import asyncio
+import copy
+import json
+import sys
 import time
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, NamedTuple
 from collections import OrderedDict
 from src.state_of_mind.cache.base import BaseCache
+from src.state_of_mind.cache.serializer import ValueCompressor
 from src.state_of_mind.config import config
 from src.state_of_mind.utils.logger import LoggerManager as logger
 
 
+class _CacheEntry(NamedTuple):
+    payload: Any        # 原对象的副本（codec="object"）或 UTF-8 JSON 字节（可能已压缩）
+    codec: str          # 实际使用的编码："object" / "none" / "zlib" / "zstd"
+    raw_size: int       # 原对象的估算字节数，或压缩前的 JSON 字节数
+    size: int           # 计入预算的字节数（payload + key + 条目开销）
+    timestamp: float
+
+
 class LLMCache(BaseCache):
+    """
+    进程内 LRU 缓存，同时受条目数（max_size）与字节预算（max_bytes）约束：
+    - 未开启压缩时保存值的深拷贝，读取时再返回深拷贝（调用方可原地修改结果而不污染缓存），按对象图估算占用计入预算
+    - 开启 zlib / zstd 压缩时以 UTF-8 JSON 字节存储，读取时反序列化；大值的解压与反序列化放到线程中执行
+    - 超出预算时先清理过期条目，仍超出再按 LRU 淘汰；单条超过预算的值直接拒绝写入
+    """
     CHINESE_NAME = "LLM 内存缓存中枢"
     DEFAULT_MAX_SIZE = int(config.LLM_CACHE_MAX_SIZE)
+    # 小于该字节数的值压缩收益有限，直接原样存储
+    COMPRESS_MIN_BYTES = 1024
+    # 超过该字节数（压缩前）的值在线程中解压与反序列化，避免阻塞事件循环
+    DECODE_IN_THREAD_MIN_BYTES = 262144
+    # OrderedDict 节点 + 条目元组的大致固定开销
+    ENTRY_OVERHEAD = sys.getsizeof(_CacheEntry(b"", "none", 0, 0, 0.0)) + 100
+    # 过期扫描为 O(n)，预算紧张时限制扫描频率
+    EXPIRE_SWEEP_INTERVAL = 1.0
 
     def __init__(
             self,
             max_size: int = DEFAULT_MAX_SIZE,
             ttl_seconds: Optional[int] = None,
+            max_bytes: Optional[int] = None,
+            compression: Optional[str] = None,
+            max_entry_bytes: int = 0,
     ):
-        self.cache: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        """max_entry_bytes: 单条计入预算的字节数上限（0 表示只受整体预算约束），超出的值拒绝写入"""
+        self.cache: OrderedDict[str, _CacheEntry] = OrderedDict()
         self.max_size = max_size
         self.ttl_seconds = ttl_seconds
+        self.max_bytes = int(config.LLM_CACHE_MAX_BYTES if max_bytes is None else max_bytes)
+        self.max_entry_bytes = int(max_entry_bytes or 0)
+        self.compressor = ValueCompressor(compression or config.LLM_CACHE_COMPRESSION)
+        self.compression = self.compressor.codec
         self._lock = asyncio.Lock()
         self._cache_hits = 0
         self._cache_misses = 0
+        self._bytes_used = 0
+        self._raw_bytes = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._rejected = 0
+        self._last_sweep = 0.0
         logger.info(
             f"🔌 首次使用 {config.STORAGE_BACKEND} 缓存，连接信息: "
-            f"local://{config.STORAGE_BACKEND}:{config.LLM_CACHE_MAX_SIZE}/{config.LLM_CACHE_TTL}, "
+            f"local://{config.STORAGE_BACKEND}:{self.max_size}/{self.ttl_seconds}, "
+            f"字节预算={self.max_bytes or '不限'}, 压缩={self.compression}"
         )
 
-    def _is_expired(self, entry: Dict[str, Any]) -> bool:
-        if self.ttl_seconds is None or 'timestamp' not in entry:
+    def _is_expired(self, entry: _CacheEntry, now: Optional[float] = None) -> bool:
+        if self.ttl_seconds is None:
             return False
-        return (time.time() - entry['timestamp']) > self.ttl_seconds
+        return ((now or time.time()) - entry.timestamp) > self.ttl_seconds
 
     @staticmethod
     def _key_summary(key: str) -> str:
         return key[:8] + "..." if len(key) > 8 else key
 
+    # ========== 编码 ==========
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        """估算对象图占用的字节数（共享的子对象只计一次）"""
+        seen = set()
+        stack = [value]
+        total = 0
+        while stack:
+            obj = stack.pop()
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            total += sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                stack.extend(obj)
+        return total
+
+    def _encode(self, key: str, value: Dict[str, Any]) -> _CacheEntry:
+        if self.compression == "none":
+            raw_size = self._estimate_size(value)
+            size = raw_size + sys.getsizeof(key) + self.ENTRY_OVERHEAD
+            return _CacheEntry(copy.deepcopy(value), "object", raw_size, size, time.time())
+        raw = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode("utf-8")
+        payload, codec = raw, "none"
+        if len(raw) >= self.COMPRESS_MIN_BYTES:
+            compressed = self.compressor.compress(raw)
+            # 不可压缩的数据（压缩后更大）保持原样
+            if len(compressed) < len(raw):
+                payload, codec = compressed, self.compression
+        size = sys.getsizeof(payload) + sys.getsizeof(key) + self.ENTRY_OVERHEAD
+        return _CacheEntry(payload, codec, len(raw), size, time.time())
+
+    def _decode(self, entry: _CacheEntry) -> Dict[str, Any]:
+        if entry.codec == "object":
+            return copy.deepcopy(entry.payload)
+        return json.loads(self.compressor.decompress(entry.payload, entry.codec))
+
+    async def _adecode(self, entry: Optional[_CacheEntry]) -> Optional[Dict[str, Any]]:
+        if entry is None:
+            return None
+        if entry.codec != "object" and entry.raw_size >= self.DECODE_IN_THREAD_MIN_BYTES:
+            return await asyncio.to_thread(self._decode, entry)
+        return self._decode(entry)
+
+    # ========== 容量管理（调用方需持有 _lock）==========
+    def _remove(self, key: str) -> Optional[_CacheEntry]:
+        entry = self.cache.pop(key, None)
+        if entry is not None:
+            self._bytes_used -= entry.size
+            self._raw_bytes -= entry.raw_size
+        return entry
+
+    def _over_budget(self) -> bool:
+        return len(self.cache) > self.max_size or (0 < self.max_bytes < self._bytes_used)
+
+    def _sweep_expired(self) -> None:
+        now = time.time()
+        if self.ttl_seconds is None or now - self._last_sweep < self.EXPIRE_SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        for key in [k for k, entry in self.cache.items() if self._is_expired(entry, now)]:
+            self._remove(key)
+            self._expirations += 1
+
+    def _enforce_budget(self) -> None:
+        if not self._over_budget():
+            return
+        self._sweep_expired()
+        while self._over_budget() and self.cache:
+            evicted_key = next(iter(self.cache))
+            self._remove(evicted_key)
+            self._evictions += 1
+            logger.info(f"[LLMCache] EVICT (key={self._key_summary(evicted_key)})")
+
+    def _lookup(self, key: str) -> Optional[_CacheEntry]:
+        """持锁调用：返回未过期条目并刷新 LRU 顺序"""
+        key_sum = self._key_summary(key)
+        entry = self.cache.get(key)
+        if entry is None:
+            self._cache_misses += 1
+            logger.warning(f"[LLMCache] MISS (key={key_sum})")
+            return None
+        if self._is_expired(entry):
+            self._remove(key)
+            self._expirations += 1
+            self._cache_misses += 1
+            logger.warning(f"[LLMCache] EXPIRED & MISS (key={key_sum})")
+            return None
+        self.cache.move_to_end(key)
+        self._cache_hits += 1
+        logger.info(f"[LLMCache] HIT (key={key_sum})")
+        return entry
+
+    def _store(self, key: str, entry: _CacheEntry) -> None:
+        """持锁调用：写入单个条目（不做整体预算检查）"""
+        key_sum = self._key_summary(key)
+        existed = self._remove(key) is not None
+        if 0 < self.max_bytes < entry.size:
+            self._rejected += 1
+            logger.warning(
+                f"[LLMCache] REJECT (key={key_sum}): 单条 {entry.size} 字节超过缓存预算 {self.max_bytes} 字节"
+            )
+            return
+        if 0 < self.max_entry_bytes < entry.size:
+            self._rejected += 1
+            logger.info(
+                f"[LLMCache] REJECT (key={key_sum}): 单条 {entry.size} 字节超过单条上限 {self.max_entry_bytes} 字节"
+            )
+            return
+        logger.info(f"[LLMCache] {'UPDATE' if existed else 'SET'} (key={key_sum})")
+        self.cache[key] = entry
+        self._bytes_used += entry.size
+        self._raw_bytes += entry.raw_size
+
     # ========== 实现异步抽象方法 ==========
     async def _aget_raw(self, key: str) -> Optional[Dict[str, Any]]:
-        key_sum = self._key_summary(key)
         async with self._lock:
-            entry = self.cache.get(key)
-            if entry is None:
-                self._cache_misses += 1
-                logger.warning(f"[LLMCache] MISS (key={key_sum})")
-                return None
-            if self._is_expired(entry):
-                del self.cache[key]
-                self._cache_misses += 1
-                logger.warning(f"[LLMCache] EXPIRED & MISS (key={key_sum})")
-                return None
-            self.cache.move_to_end(key)
-            self._cache_hits += 1
-            logger.info(f"[LLMCache] HIT (key={key_sum})")
-            return entry['value']
+            entry = self._lookup(key)
+        # 解压与反序列化不需要持锁
+        return await self._adecode(entry)
 
     async def _aset_raw(self, key: str, value: Dict[str, Any]) -> None:
-        key_sum = self._key_summary(key)
+        entry = self._encode(key, value)
         async with self._lock:
-            entry = {'value': value, 'timestamp': time.time()}
-            if key in self.cache:
-                logger.info(f"[LLMCache] UPDATE (key={key_sum})")
-                del self.cache[key]
-            else:
-                logger.info(f"[LLMCache] SET (key={key_sum})")
-            self.cache[key] = entry
-            while len(self.cache) > self.max_size:
-                evicted_key, _ = self.cache.popitem(last=False)
-                logger.info(f"[LLMCache] EVICT (key={self._key_summary(evicted_key)})")
+            self._store(key, entry)
+            self._enforce_budget()
 
     async def _adelete_raw(self, key: str) -> None:
         key_sum = self._key_summary(key)
         async with self._lock:
-            if key in self.cache:
-                del self.cache[key]
+            if self._remove(key) is not None:
                 logger.info(f"[LLMCache] DELETED (key={key_sum})")
 
+    async def _aget_many_raw(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        async with self._lock:
+            entries = [self._lookup(key) for key in keys]
+        return [await self._adecode(entry) for entry in entries]
+
+    async def _aset_many_raw(self, items: Dict[str, Dict[str, Any]]) -> None:
+        entries = [(key, self._encode(key, value)) for key, value in items.items()]
+        async with self._lock:
+            for key, entry in entries:
+                self._store(key, entry)
+            self._enforce_budget()
+
+    async def _adelete_many_raw(self, keys: List[str]) -> None:
+        async with self._lock:
+            removed = sum(1 for key in keys if self._remove(key) is not None)
+            logger.info(f"[LLMCache] DELETED {removed} entries")
+
     async def _aclear_raw(self) -> None:
         async with self._lock:
             count = len(self.cache)
             self.cache.clear()
             self._cache_hits = 0
             self._cache_misses = 0
+            self._bytes_used = 0
+            self._raw_bytes = 0
+            self._evictions = 0
+            self._expirations = 0
+            self._rejected = 0
+            self._last_sweep = 0.0
             logger.info(f"[LLMCache] CLEARED {count} entries")
 
     async def _akeys_raw(self) -> List[str]:
         async with self._lock:
             valid_keys = []
+            now = time.time()
             for k, v in list(self.cache.items()):
-                if not self._is_expired(v):
+                if not self._is_expired(v, now):
                     valid_keys.append(k)
                 else:
-                    del self.cache[k]
+                    self._remove(k)
+                    self._expirations += 1
             return valid_keys
 
+    def memory_stats(self) -> Dict[str, Any]:
+        """字节占用与淘汰统计（bytes_used 为计入预算的字节数，raw_bytes 为压缩前的字节数）"""
+        stored = sum(
+            entry.raw_size if entry.codec == "object" else len(entry.payload) for entry in self.cache.values()
+        )
+        return {
+            "entries": len(self.cache),
+            "bytes_used": self._bytes_used,
+            "max_bytes": self.max_bytes,
+            "raw_bytes": self._raw_bytes,
+            "compression": self.compression,
+            "compression_ratio": (self._raw_bytes / stored) if stored else 1.0,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "rejected": self._rejected,
+        }
+
     def stats(self) -> str:
         total = self._cache_hits + self._cache_misses
         if total == 0:
             return "📊 LLM 缓存: 无调用"
         hit_rate = self._cache_hits / total
+        memory = self.memory_stats()
+        budget = f"{memory['max_bytes'] / 1048576:.1f}MB" if memory["max_bytes"] > 0 else "不限"
         return (
             f"📊 LLM 缓存命中率: {hit_rate:.2%} | "
             f"命中={self._cache_hits} | 未命中={self._cache_misses} | "
-            f"当前大小={len(self.cache)} / {self.max_size}"
+            f"当前大小={len(self.cache)} / {self.max_size} | "
+            f"占用={memory['bytes_used'] / 1048576:.1f}MB / {budget} | "
+            f"压缩比={memory['compression_ratio']:.2f}x ({memory['compression']}) | "
+            f"淘汰={memory['evictions']} | 过期={memory['expirations']} | 超限拒绝={memory['rejected']}"
         )
@@ -0,0 +1,274 @@
+import hashlib
+import random
+import re
+import struct
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from src.state_of_mind.utils.logger import LoggerManager as logger
+
+# Mersenne 素数 2^61-1，MinHash 置换函数 (a*x + b) mod P 的模数
+_MERSENNE_PRIME = (1 << 61) - 1
+# 归一化时去除的字符：空白、标点与符号（全角/半角统一由 NFKC 完成）
+_STRIP_RE = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """NFKC（全角→半角、兼容字符统一）→ 小写 → 去除空白与标点"""
+    return _STRIP_RE.sub("", unicodedata.normalize("NFKC", text or "").lower())
+
+
+class MinHasher:
+    """
+    字符 shingle 的 MinHash 签名：
+    - 归一化文本切成长度为 shingle_size 的字符片段，每个片段取 64 位 blake2b 摘要
+    - num_perm 个置换函数各取最小值构成签名，两签名逐位相等的比例即 Jaccard 相似度估计
+    - 置换参数由固定种子生成，不同进程/重启之间签名一致
+    """
+    SEED = 20240601
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = random.Random(self.SEED)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def shingles(self, normalized: str) -> Set[int]:
+        k = self.shingle_size
+        if len(normalized) <= k:
+            pieces = {normalized}
+        else:
+            pieces = {normalized[i:i + k] for i in range(len(normalized) - k + 1)}
+        return {
+            int.from_bytes(hashlib.blake2b(p.encode("utf-8"), digest_size=8).digest(), "little") % _MERSENNE_PRIME
+            for p in pieces
+        }
+
+    def signature(self, normalized: str) -> Tuple[int, ...]:
+        hashes = self.shingles(normalized)
+        p = _MERSENNE_PRIME
+        return tuple(min((a * h + b) % p for h in hashes) for a, b in self._perms)
+
+    @staticmethod
+    def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+        if not sig_a or len(sig_a) != len(sig_b):
+            return 0.0
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class NearDuplicateIndex:
+    """
+    输入文本近重复索引（进程内，MinHash + LSH 分桶）：
+    - 签名按 bands × rows 切段，任一段完全相同即成为候选，再按签名估计的相似度过滤
+    - 命名空间区分模板与模型等 key 参数，不同配置的结果互不复用
+    - 按条目数 LRU 淘汰；索引只保存签名与缓存 key，结果本身仍在 LLM 缓存中
+    """
+    CHINESE_NAME = "近重复输入索引"
+    BANDS = 16
+
+    def __init__(self, threshold: float = 0.9, max_entries: int = 10000, num_perm: int = 64):
+        if num_perm % self.BANDS:
+            raise ValueError(f"num_perm ({num_perm}) 必须是 {self.BANDS} 的整数倍")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hasher = MinHasher(num_perm=num_perm)
+        self.rows = num_perm // self.BANDS
+        self._entries: "OrderedDict[str, Tuple[str, Tuple[int, ...]]]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, Tuple[int, ...]], Set[str]] = {}
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        """归一化后为空的文本（纯标点/空白）不参与近重复匹配"""
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+        return self.hasher.signature(normalized)
+
+    def _bands(self, signature: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+        r = self.rows
+        return [signature[i * r:(i + 1) * r] for i in range(self.BANDS)]
+
+    def _rank(self, signature: Tuple[int, ...], candidates: Dict[str, Tuple[int, ...]]) -> List[Tuple[str, float]]:
+        ranked = []
+        for cache_key, candidate_sig in candidates.items():
+            score = self.hasher.similarity(signature, candidate_sig)
+            if score >= self.threshold:
+                ranked.append((cache_key, score))
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked
+
+    async def query(self, namespace: str, signature: Tuple[int, ...]) -> List[Tuple[str, float]]:
+        """返回相似度不低于阈值的 [(缓存 key, 相似度)]，按相似度降序"""
+        candidates: Dict[str, Tuple[int, ...]] = {}
+        for i, band in enumerate(self._bands(signature)):
+            for cache_key in self._buckets.get((namespace, i, band), ()):
+                if cache_key not in candidates:
+                    candidates[cache_key] = self._entries[cache_key][1]
+        ranked = self._rank(signature, candidates)
+        for cache_key, _ in ranked:
+            self._entries.move_to_end(cache_key)
+        return ranked
+
+    async def add(self, namespace: str, signature: Tuple[int, ...], cache_key: str) -> None:
+        if cache_key in self._entries:
+            self._entries.move_to_end(cache_key)
+            return
+        self._entries[cache_key] = (namespace, signature)
+        for i, band in enumerate(self._bands(signature)):
+            self._buckets.setdefault((namespace, i, band), set()).add(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    async def discard(self, cache_key: str) -> None:
+        """结果已从 LLM 缓存过期/淘汰时移除对应索引条目"""
+        if cache_key in self._entries:
+            self._drop(cache_key)
+
+    def _drop(self, cache_key: str) -> None:
+        namespace, signature = self._entries.pop(cache_key)
+        for i, band in enumerate(self._bands(signature)):
+            bucket_key = (namespace, i, band)
+            bucket = self._buckets.get(bucket_key)
+            if bucket is not None:
+                bucket.discard(cache_key)
+                if not bucket:
+                    del self._buckets[bucket_key]
+
+    async def count(self) -> int:
+        """当前索引的条目数"""
+        return len(self._entries)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisNearDuplicateIndex(NearDuplicateIndex):
+    """
+    跨进程近重复索引（Redis）：
+    - 分桶: {NAMESPACE}:b:{命名空间摘要}:{段号}:{段摘要} → SET(缓存 key)
+    - 签名: {NAMESPACE}:sig:{缓存 key} → 定长二进制签名
+    - 条目与 LLM 缓存同 TTL 过期；分桶中签名已过期的成员在查询时惰性清理
+    - Redis 不可用时降级为不命中，不影响主流程
+    """
+    CHINESE_NAME = "近重复输入索引（Redis）"
+    NAMESPACE = "psytext_analyst:near_dup"
+
+    def __init__(self, config, threshold: float = 0.9, ttl: int = 3600, num_perm: int = 64):
+        super().__init__(threshold=threshold, max_entries=0, num_perm=num_perm)
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            raise RuntimeError(
+                "❌ Redis 近重复索引需要安装 'redis' 包。请在 requirements.txt 中添加 'redis' 并重建镜像。"
+            )
+        self.ttl = ttl
+        self._packer = struct.Struct(f"<{num_perm}Q")
+        self._client = aioredis.Redis(
+            host=config.REDIS_HOST,
+            port=config.REDIS_PORT,
+            db=config.REDIS_DB,
+            password=config.REDIS_PASSWORD or None,
+            socket_timeout=config.REDIS_TIMEOUT,
+            socket_connect_timeout=config.REDIS_TIMEOUT,
+        )
+        logger.info(
+            f"🔌 使用 Redis 近重复索引，连接: redis://{config.REDIS_HOST}:{config.REDIS_PORT}/{config.REDIS_DB}",
+            module_name=self.CHINESE_NAME
+        )
+
+    def _bucket_keys(self, namespace: str, signature: Tuple[int, ...]) -> List[str]:
+        ns = hashlib.blake2b(namespace.encode("utf-8"), digest_size=8).hexdigest()
+        keys = []
+        for i, band in enumerate(self._bands(signature)):
+            digest = hashlib.blake2b(struct.pack(f"<{len(band)}Q", *band), digest_size=8).hexdigest()
+            keys.append(f"{self.NAMESPACE}:b:{ns}:{i}:{digest}")
+        return keys
+
+    def _sig_key(self, cache_key: str) -> str:
+        return f"{self.NAMESPACE}:sig:{cache_key}"
+
+    async def query(self, namespace: str, signature: Tuple[int, ...]) -> List[Tuple[str, float]]:
+        bucket_keys = self._bucket_keys(namespace, signature)
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                for key in bucket_keys:
+                    pipe.smembers(key)
+                members = await pipe.execute()
+            members_by_bucket = {}
+            for key, bucket in zip(bucket_keys, members):
+                for member in bucket:
+                    members_by_bucket.setdefault(member.decode("utf-8"), []).append(key)
+            if not members_by_bucket:
+                return []
+            cache_keys = list(members_by_bucket)
+            raw_sigs = await self._client.mget([self._sig_key(k) for k in cache_keys])
+        except Exception as e:
+            logger.warning(f"⚠️ 近重复索引查询失败，按未命中处理: {e}", module_name=self.CHINESE_NAME)
+            return []
+
+        candidates: Dict[str, Tuple[int, ...]] = {}
+        stale: List[str] = []
+        for cache_key, raw in zip(cache_keys, raw_sigs):
+            if raw is None or len(raw) != self._packer.size:
+                stale.append(cache_key)
+                continue
+            candidates[cache_key] = self._packer.unpack(raw)
+        if stale:
+            try:
+                async with self._client.pipeline(transaction=False) as pipe:
+                    for cache_key in stale:
+                        for key in members_by_bucket[cache_key]:
+                            pipe.srem(key, cache_key)
+                    await pipe.execute()
+            except Exception as e:
+                logger.debug(f"清理过期近重复索引成员失败: {e}", module_name=self.CHINESE_NAME)
+        return self._rank(signature, candidates)
+
+    async def add(self, namespace: str, signature: Tuple[int, ...], cache_key: str) -> None:
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                pipe.set(self._sig_key(cache_key), self._packer.pack(*signature), ex=self.ttl)
+                for key in self._bucket_keys(namespace, signature):
+                    pipe.sadd(key, cache_key)
+                    pipe.expire(key, self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ 近重复索引写入失败: {e}", module_name=self.CHINESE_NAME)
+
+    async def discard(self, cache_key: str) -> None:
+        # 分桶成员随签名缺失在下次查询时清理
+        try:
+            await self._client.delete(self._sig_key(cache_key))
+        except Exception as e:
+            logger.warning(f"⚠️ 近重复索引删除失败: {e}", module_name=self.CHINESE_NAME)
+
+    async def count(self) -> int:
+        """按签名 key 统计（SCAN，不阻塞 Redis）；Redis 不可用时返回 0"""
+        try:
+            total = 0
+            async for _ in self._client.scan_iter(match=self._sig_key("*"), count=1000):
+                total += 1
+            return total
+        except Exception as e:
+            logger.warning(f"⚠️ 近重复索引条目统计失败: {e}", module_name=self.CHINESE_NAME)
+            return 0
+
+    async def close(self) -> None:
+        try:
+            await self._client.aclose()
+        except Exception as e:
+            logger.warning(f"关闭 Redis 近重复索引连接失败: {e}", module_name=self.CHINESE_NAME)
+
+
+def create_near_duplicate_index(c) -> Optional[NearDuplicateIndex]:
+    if not c.NEAR_DUP_ENABLED:
+        return None
+    backend = c.NEAR_DUP_BACKEND
+    if backend == c.STORAGE_LOCAL:
+        return NearDuplicateIndex(threshold=c.NEAR_DUP_THRESHOLD, max_entries=c.NEAR_DUP_MAX_ENTRIES)
+    elif backend == c.STORAGE_REDIS:
+        return RedisNearDuplicateIndex(c, threshold=c.NEAR_DUP_THRESHOLD, ttl=c.LLM_CACHE_TTL)
+    else:
+        raise ValueError(f"Unsupported near duplicate backend: {backend}")
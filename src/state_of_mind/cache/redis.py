@@ -3,7 +3,7 @@ from typing import List, Optional, Dict, Any
 from aiocache import Cache
 # from aiocache.serializers import JsonSerializer
 
-from src.state_of_mind.cache.serializer import UTF8JsonSerializer
+from src.state_of_mind.cache.serializer import create_redis_serializer
 from src.state_of_mind.utils.logger import LoggerManager as logger
 from src.state_of_mind.cache.base import BaseCache
 
@@ -36,15 +36,15 @@ class RedisLLMCache(BaseCache):
             password=config.REDIS_PASSWORD or None,
             timeout=config.REDIS_TIMEOUT,
             # serializer=JsonSerializer(),
-            serializer=UTF8JsonSerializer(),
-            namespace="psytext_analyst",
+            serializer=create_redis_serializer(config),
+            namespace=config.CACHE_NAMESPACE,
         )
 
         self._cache_hits = 0
         self._cache_misses = 0
         logger.info(
             f"🔌 使用 Redis 缓存后端，连接: redis://{config.REDIS_HOST}:{config.REDIS_PORT}/{config.REDIS_DB}, "
-            f"namespace={self._cache.namespace}, serializer={self._cache.serializer.__class__.__name__}"
+            f"namespace={self._cache.namespace}, serializer={self._cache.serializer.name}"
         )
 
     # ========== 实现 BaseCache 的异步抽象方法 ==========
@@ -74,6 +74,32 @@ class RedisLLMCache(BaseCache):
         except Exception as e:
             logger.warning(f"Redis delete 失败 (key={key}): {e}")
 
+    async def _aget_many_raw(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """MGET 单次往返"""
+        try:
+            values = await self._cache.multi_get(keys)
+        except Exception as e:
+            logger.error(f"Redis multi_get 失败 ({len(keys)} keys): {e}")
+            self._cache_misses += len(keys)
+            return [None] * len(keys)
+        hits = sum(1 for value in values if value is not None)
+        self._cache_hits += hits
+        self._cache_misses += len(keys) - hits
+        return values
+
+    async def _aset_many_raw(self, items: Dict[str, Dict[str, Any]]) -> None:
+        """MSET + PEXPIRE 在同一事务管道中执行，单次往返"""
+        try:
+            await self._cache.multi_set(list(items.items()), ttl=self.default_ttl)
+        except Exception as e:
+            logger.error(f"Redis multi_set 失败 ({len(items)} keys): {e}")
+
+    async def _adelete_many_raw(self, keys: List[str]) -> None:
+        try:
+            await self._cache.client.delete(*(self._cache._build_key(key) for key in keys))
+        except Exception as e:
+            logger.warning(f"Redis 批量 delete 失败 ({len(keys)} keys): {e}")
+
     async def _aclear_raw(self) -> None:
         try:
             await self._cache.clear()
@@ -88,7 +114,7 @@ class RedisLLMCache(BaseCache):
             keys = []
             cursor = b'0'
             while cursor:
-                cursor, batch = await redis_client.scan(cursor, match=pattern, count=100)
+                cursor, batch = await redis_client.scan(cursor, match=pattern, count=1000)
                 keys.extend([k.decode('utf-8') for k in batch])
             # 去掉 namespace 前缀
             prefix_len = len(namespace) + 1 if namespace else 0
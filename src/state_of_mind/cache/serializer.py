@@ -1,5 +1,6 @@
 from aiocache.serializers import BaseSerializer
 import json
+import zlib
 
 
 class UTF8JsonSerializer(BaseSerializer):
@@ -14,4 +15,138 @@ class UTF8JsonSerializer(BaseSerializer):
     def loads(self, value):
         if value is None or value == "":
             return None
-        return json.loads(value)
\ No newline at end of file
+        return json.loads(value)
+
+
+class ValueCompressor:
+    """
+    缓存值压缩：none / zlib / zstd（zstd 需安装 zstandard，按需导入）
+    """
+    CODECS = ("none", "zlib", "zstd")
+    ZLIB_LEVEL = 1
+    ZSTD_LEVEL = 3
+
+    def __init__(self, codec: str = "none"):
+        self.codec = (codec or "none").lower()
+        if self.codec not in self.CODECS:
+            raise ValueError(f"不支持的压缩方式: {self.codec}（可选 {', '.join(self.CODECS)}）")
+        self._zstd_compressor = None
+        self._zstd_decompressor = None
+        if self.codec == "zstd":
+            self._zstd_compressor, self._zstd_decompressor = self._load_zstd()
+
+    @staticmethod
+    def _load_zstd():
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError(
+                "❌ zstd 压缩需要安装 'zstandard' 包。请在 requirements.txt 中添加 'zstandard' 并重建镜像，或改用 zlib。"
+            )
+        return zstandard.ZstdCompressor(level=ValueCompressor.ZSTD_LEVEL), zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return self._zstd_compressor.compress(data)
+        if self.codec == "zlib":
+            return zlib.compress(data, self.ZLIB_LEVEL)
+        return data
+
+    def decompress(self, data: bytes, codec: str) -> bytes:
+        """codec 取自存储的元数据，可与当前写入配置不同"""
+        if codec == "zlib":
+            return zlib.decompress(data)
+        if codec == "zstd":
+            if self._zstd_decompressor is None:
+                self._zstd_compressor, self._zstd_decompressor = self._load_zstd()
+            return self._zstd_decompressor.decompress(data)
+        return data
+
+
+class VersionedSerializer(BaseSerializer):
+    """
+    带版本头字节的二进制序列化器（Redis 缓存用），读取时兼容无头的旧 UTF-8 JSON：
+    - 头字节 0x10 | (压缩方式 << 2) | 格式，落在 0x11~0x1B（JSON 不可能以这些控制字符开头）
+    - 格式：json / orjson / msgpack；压缩：none / zlib / zstd
+    - json + none 仍写无头的 UTF-8 JSON，与旧数据、redis-cli 可读性保持一致
+    - 迁移期间不同进程可使用不同格式写入，读取端按头字节解码
+    """
+    DEFAULT_ENCODING = None
+
+    FORMATS = ("json", "orjson", "msgpack")
+    HEADER_V1 = 0x10
+    _FORMAT_IDS = {"json": 1, "orjson": 2, "msgpack": 3}
+    _CODEC_IDS = {"none": 0, "zlib": 1, "zstd": 2}
+    _FORMAT_NAMES = {v: k for k, v in _FORMAT_IDS.items()}
+    _CODEC_NAMES = {v: k for k, v in _CODEC_IDS.items()}
+
+    def __init__(self, fmt: str = "json", compression: str = "none", *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.format = (fmt or "json").lower()
+        if self.format not in self.FORMATS:
+            raise ValueError(f"不支持的序列化格式: {self.format}（可选 {', '.join(self.FORMATS)}）")
+        self.compressor = ValueCompressor(compression)
+        self._orjson = None
+        self._msgpack = None
+        self._load_format(self.format)
+        self._header = bytes([
+            self.HEADER_V1 | (self._CODEC_IDS[self.compressor.codec] << 2) | self._FORMAT_IDS[self.format]
+        ])
+
+    def _load_format(self, fmt: str) -> None:
+        if fmt == "orjson" and self._orjson is None:
+            try:
+                import orjson
+            except ImportError:
+                raise RuntimeError("❌ orjson 序列化需要安装 'orjson' 包。请在 requirements.txt 中添加 'orjson' 并重建镜像。")
+            self._orjson = orjson
+        elif fmt == "msgpack" and self._msgpack is None:
+            try:
+                import msgpack
+            except ImportError:
+                raise RuntimeError("❌ msgpack 序列化需要安装 'msgpack' 包。请在 requirements.txt 中添加 'msgpack' 并重建镜像。")
+            self._msgpack = msgpack
+
+    @property
+    def name(self) -> str:
+        return self.format if self.compressor.codec == "none" else f"{self.format}+{self.compressor.codec}"
+
+    def _encode(self, value, fmt: str) -> bytes:
+        if fmt == "orjson":
+            return self._orjson.dumps(value, option=self._orjson.OPT_NON_STR_KEYS)
+        if fmt == "msgpack":
+            return self._msgpack.packb(value, use_bin_type=True)
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode("utf-8")
+
+    def _decode(self, data: bytes, fmt: str):
+        self._load_format(fmt)
+        if fmt == "orjson":
+            return self._orjson.loads(data)
+        if fmt == "msgpack":
+            return self._msgpack.unpackb(data, raw=False, strict_map_key=False)
+        return json.loads(data)
+
+    def dumps(self, value) -> bytes:
+        payload = self._encode(value, self.format)
+        if self.format == "json" and self.compressor.codec == "none":
+            return payload
+        return self._header + self.compressor.compress(payload)
+
+    def loads(self, value):
+        if value is None or value == b"" or value == "":
+            return None
+        if isinstance(value, str):
+            return json.loads(value)
+        header = value[0]
+        if not (self.HEADER_V1 < header <= self.HEADER_V1 | 0x0F):
+            # 旧版无头 UTF-8 JSON
+            return json.loads(value)
+        fmt = self._FORMAT_NAMES.get(header & 0x03)
+        codec = self._CODEC_NAMES.get((header >> 2) & 0x03)
+        if fmt is None or codec is None:
+            raise ValueError(f"无法识别的缓存值头字节: 0x{header:02x}")
+        return self._decode(self.compressor.decompress(value[1:], codec), fmt)
+
+
+def create_redis_serializer(c) -> VersionedSerializer:
+    return VersionedSerializer(c.REDIS_SERIALIZER, c.REDIS_COMPRESSION)
@@ -0,0 +1,207 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from src.state_of_mind.utils.logger import LoggerManager as logger
+
+# 领跑者被取消时通知跟随者重新竞争（而不是把取消传播给跟随者）
+_RETRY = object()
+
+
+class SingleFlight:
+    """
+    进程内单飞（请求合并）：同一 key 同时只执行一次 fn，并发调用者等待同一个 Future。
+    - 领跑者抛出的异常原样传给跟随者
+    - 领跑者被取消时，跟随者之一接替执行
+    """
+    CHINESE_NAME = "单飞请求合并"
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._leads = 0
+        self._shared = 0
+
+    async def do(
+            self,
+            key: str,
+            fn: Callable[[], Awaitable[Any]],
+            load: Optional[Callable[[], Awaitable[Any]]] = None
+    ) -> Tuple[Any, bool]:
+        """
+        返回 (结果, 是否复用了他人的执行结果)
+        load: 可选的结果读取函数（跨进程变体用于读取其他进程写入的缓存），进程内实现不使用
+        """
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            result = await asyncio.shield(future)
+            if result is not _RETRY:
+                self._shared += 1
+                logger.info(f"🔗 合并进行中的相同请求 (key={key[:8]}...)", module_name=self.CHINESE_NAME)
+                return result, True
+
+        future = asyncio.get_running_loop().create_future()
+        # 无跟随者时避免 "exception was never retrieved" 警告
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        self._leads += 1
+        try:
+            result, shared = await self._lead(key, fn, load)
+        except asyncio.CancelledError:
+            future.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, shared
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _lead(
+            self,
+            key: str,
+            fn: Callable[[], Awaitable[Any]],
+            load: Optional[Callable[[], Awaitable[Any]]]
+    ) -> Tuple[Any, bool]:
+        return await fn(), False
+
+    def stats(self) -> Dict[str, int]:
+        return {"inflight": len(self._inflight), "leads": self._leads, "shared": self._shared}
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisSingleFlight(SingleFlight):
+    """
+    跨进程单飞（复用 XINJING_REDIS_* 配置）：
+    - 进程内先合并，再由领跑者以 SET NX PX 抢占 Redis 锁
+    - 未抢到锁的进程轮询 load()（通常是读取缓存），锁释放后仍无结果则重新抢锁，超时后自行执行
+    - 锁带 TTL，持有进程崩溃不会造成永久阻塞；执行期间每 TTL/3 续期一次（仅当锁仍归本次执行所有）
+    - 跟随进程最多等待一个 TTL，超时后自行执行
+    """
+    CHINESE_NAME = "Redis 单飞请求合并"
+    NAMESPACE = "psytext_analyst:single_flight"
+
+    _RELEASE_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    _EXTEND_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+
+    def __init__(self, config, lock_ttl: float = 300, poll_interval: float = 0.5):
+        super().__init__()
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            raise RuntimeError(
+                "❌ Redis 单飞需要安装 'redis' 包。请在 requirements.txt 中添加 'redis' 并重建镜像。"
+            )
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self._client = aioredis.Redis(
+            host=config.REDIS_HOST,
+            port=config.REDIS_PORT,
+            db=config.REDIS_DB,
+            password=config.REDIS_PASSWORD or None,
+            socket_timeout=config.REDIS_TIMEOUT,
+            socket_connect_timeout=config.REDIS_TIMEOUT,
+        )
+        self._release = self._client.register_script(self._RELEASE_SCRIPT)
+        self._extend = self._client.register_script(self._EXTEND_SCRIPT)
+        logger.info(
+            f"🔌 使用 Redis 单飞，连接: redis://{config.REDIS_HOST}:{config.REDIS_PORT}/{config.REDIS_DB}",
+            module_name=self.CHINESE_NAME
+        )
+
+    async def _lead(
+            self,
+            key: str,
+            fn: Callable[[], Awaitable[Any]],
+            load: Optional[Callable[[], Awaitable[Any]]]
+    ) -> Tuple[Any, bool]:
+        lock_key = f"{self.NAMESPACE}:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_ttl
+        while True:
+            try:
+                acquired = await self._client.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+            except Exception as e:
+                logger.warning(f"⚠️ Redis 单飞锁不可用，直接执行: {e}", module_name=self.CHINESE_NAME)
+                return await fn(), False
+
+            if acquired:
+                heartbeat = asyncio.create_task(self._heartbeat(lock_key, token))
+                try:
+                    return await fn(), False
+                finally:
+                    heartbeat.cancel()
+                    await asyncio.gather(heartbeat, return_exceptions=True)
+                    try:
+                        await self._release(keys=[lock_key], args=[token])
+                    except Exception as e:
+                        logger.warning(f"⚠️ Redis 单飞锁释放失败: {e}", module_name=self.CHINESE_NAME)
+
+            # 其他进程正在执行：等待其结果或锁释放
+            while True:
+                if load is not None:
+                    loaded = await load()
+                    if loaded is not None:
+                        self._shared += 1
+                        logger.info(f"🔗 复用其他进程的执行结果 (key={key[:8]}...)", module_name=self.CHINESE_NAME)
+                        return loaded, True
+                if time.monotonic() >= deadline:
+                    logger.warning(f"⏱️ 等待其他进程执行超时，自行执行 (key={key[:8]}...)",
+                                   module_name=self.CHINESE_NAME)
+                    return await fn(), False
+                try:
+                    if not await self._client.exists(lock_key):
+                        break
+                except Exception:
+                    return await fn(), False
+                await asyncio.sleep(self.poll_interval)
+
+    async def _heartbeat(self, lock_key: str, token: str) -> None:
+        """执行期间续期锁，避免长耗时执行超过 TTL 后被其他进程重复执行"""
+        interval = self.lock_ttl / 3
+        ttl_ms = int(self.lock_ttl * 1000)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                extended = await self._extend(keys=[lock_key], args=[token, ttl_ms])
+            except Exception as e:
+                # 暂时性故障：下个周期重试，锁在 TTL 内仍有效
+                logger.warning(f"⚠️ Redis 单飞锁续期失败: {e}", module_name=self.CHINESE_NAME)
+                continue
+            if not int(extended):
+                logger.warning(f"⚠️ Redis 单飞锁已过期或被其他进程持有，停止续期 ({lock_key[-8:]})",
+                               module_name=self.CHINESE_NAME)
+                return
+
+    async def close(self) -> None:
+        try:
+            await self._client.aclose()
+        except Exception as e:
+            logger.warning(f"关闭 Redis 单飞连接失败: {e}", module_name=self.CHINESE_NAME)
+
+
+def create_single_flight(c) -> SingleFlight:
+    backend = c.SINGLE_FLIGHT_BACKEND
+    if backend == c.STORAGE_LOCAL:
+        return SingleFlight()
+    elif backend == c.STORAGE_REDIS:
+        return RedisSingleFlight(c, lock_ttl=c.SINGLE_FLIGHT_LOCK_TTL, poll_interval=c.SINGLE_FLIGHT_POLL_INTERVAL)
+    else:
+        raise ValueError(f"Unsupported single flight backend: {backend}")
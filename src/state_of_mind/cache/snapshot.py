@@ -0,0 +1,91 @@
+import gzip
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple, Union
+from src.state_of_mind.cache.base import BaseCache
+from src.state_of_mind.utils.file_util import FileUtil
+from src.state_of_mind.utils.logger import LoggerManager as logger
+
+
+class CacheSnapshot:
+    """
+    缓存快照导出 / 导入（任意 BaseCache 后端）：
+    - 文件格式为 gzip 压缩的 JSONL：首行为头部 {"format", "version", "created_at", "count"}，其后每行 {"key", "value"}
+    - 导出与导入均按批次调用 get_many / set_many，Redis 下每批一次往返
+    - 导入的条目按当前后端的 TTL 重新计时
+    """
+    CHINESE_NAME = "缓存快照"
+    FORMAT = "psytext-cache-snapshot"
+    VERSION = 1
+    BATCH_SIZE = 200
+
+    def __init__(self, cache: BaseCache):
+        self.cache = cache
+
+    async def export(self, path: Union[str, Path]) -> int:
+        path = Path(path)
+        response = await self.cache.keys()
+        if not response.get("success"):
+            raise RuntimeError(f"当前缓存后端不支持列出 key: {response.get('error')}")
+        keys: List[str] = response.get("data") or []
+
+        FileUtil.ensure_directory(path.parent)
+        tmp_path = path.with_name(path.name + ".tmp")
+        count = 0
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            header = {"format": self.FORMAT, "version": self.VERSION, "created_at": int(time.time()), "count": len(keys)}
+            f.write(json.dumps(header) + "\n")
+            for start in range(0, len(keys), self.BATCH_SIZE):
+                batch = keys[start:start + self.BATCH_SIZE]
+                values = (await self.cache.get_many(batch)).get("data") or {}
+                for key in batch:
+                    value = values.get(key)
+                    # 列出 key 之后过期或被淘汰的条目直接跳过
+                    if value is None:
+                        continue
+                    f.write(json.dumps({"key": key, "value": value}, ensure_ascii=False, separators=(',', ':')) + "\n")
+                    count += 1
+        # 写完再替换，避免中断时留下残缺快照
+        os.replace(tmp_path, path)
+        logger.info(f"📤 已导出 {count} 条缓存到快照: {path}", module_name=self.CHINESE_NAME)
+        return count
+
+    def _iter_entries(self, path: Path) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("format") != self.FORMAT:
+                raise ValueError(f"不是缓存快照文件: {path}")
+            if header.get("version") != self.VERSION:
+                raise ValueError(f"不支持的快照版本: {header.get('version')}（当前 {self.VERSION}）")
+            for line_no, line in enumerate(f, start=2):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    yield record["key"], record["value"]
+                except (json.JSONDecodeError, KeyError, TypeError) as e:
+                    logger.warning(f"⚠️ 快照第 {line_no} 行无法解析，已跳过: {e}", module_name=self.CHINESE_NAME)
+
+    async def load(self, path: Union[str, Path]) -> int:
+        path = Path(path)
+        count = 0
+        batch: Dict[str, Dict[str, Any]] = {}
+        for key, value in self._iter_entries(path):
+            batch[key] = value
+            if len(batch) >= self.BATCH_SIZE:
+                count += await self._flush(batch)
+                batch = {}
+        if batch:
+            count += await self._flush(batch)
+        logger.info(f"📥 已从快照导入 {count} 条缓存: {path}", module_name=self.CHINESE_NAME)
+        return count
+
+    async def _flush(self, batch: Dict[str, Dict[str, Any]]) -> int:
+        response = await self.cache.set_many(batch)
+        if not response.get("success"):
+            logger.warning(f"⚠️ 快照批量写入失败 ({len(batch)} 条): {response.get('error')}",
+                           module_name=self.CHINESE_NAME)
+            return 0
+        return len(batch)
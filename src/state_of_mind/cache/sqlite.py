@@ -0,0 +1,366 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, Union
+from src.state_of_mind.cache.base import BaseCache
+from src.state_of_mind.cache.serializer import ValueCompressor
+from src.state_of_mind.config import config
+from src.state_of_mind.utils.file_util import FileUtil
+from src.state_of_mind.utils.logger import LoggerManager as logger
+
+T = TypeVar("T")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key         TEXT PRIMARY KEY,
+    payload     BLOB NOT NULL,
+    codec       TEXT NOT NULL,
+    raw_size    INTEGER NOT NULL,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache (created_at);
+"""
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    单机持久化缓存（SQLite WAL）：重启后保留，无需 Redis
+    - 所有 SQLite 调用在线程池中执行，每个线程一个连接；WAL 下读写互不阻塞，写入由进程内锁串行
+    - TTL 按写入时间计算；条目数（max_size）与字节预算（max_bytes）超限时先清理过期条目，再按最近访问时间淘汰
+    - 命中时的访问时间先记在内存，随下一次写入批量落盘，读路径不产生写事务
+    - 值编码与 LLMCache 相同（UTF-8 JSON，可选 zlib / zstd 压缩），统计接口与 LLMCache 一致
+    """
+    CHINESE_NAME = "LLM 磁盘缓存中枢"
+    DEFAULT_FILENAME = "llm_cache.sqlite3"
+    COMPRESS_MIN_BYTES = 1024
+    # 每行除 payload 外的大致存储开销（key、定长列与 B 树节点）
+    ROW_OVERHEAD = 64
+    EXPIRE_SWEEP_INTERVAL = 60.0
+    # SQLite 默认单条语句最多 999 个绑定参数
+    QUERY_CHUNK = 500
+    READ_WORKERS = 4
+
+    def __init__(
+            self,
+            path: Optional[Union[str, Path]] = None,
+            max_size: Optional[int] = None,
+            ttl_seconds: Optional[int] = None,
+            max_bytes: Optional[int] = None,
+            compression: Optional[str] = None,
+    ):
+        self.path = Path(path or config.SQLITE_CACHE_PATH or config.OUTPUT_ROOT / "cache" / self.DEFAULT_FILENAME)
+        self.max_size = int(config.LLM_CACHE_MAX_SIZE if max_size is None else max_size)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = int(config.SQLITE_CACHE_MAX_BYTES if max_bytes is None else max_bytes)
+        self.compressor = ValueCompressor(compression or config.LLM_CACHE_COMPRESSION)
+        self.compression = self.compressor.codec
+        FileUtil.ensure_directory(self.path.parent)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.READ_WORKERS, thread_name_prefix="sqlite-cache")
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._rejected = 0
+        self._last_sweep = 0.0
+
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        self._load_counters(conn)
+        logger.info(
+            f"🔌 首次使用 {config.STORAGE_BACKEND} 缓存，连接信息: "
+            f"sqlite://{self.path} (已有 {self._entries} 条), 上限={self.max_size}/{self.ttl_seconds}, "
+            f"字节预算={self.max_bytes or '不限'}, 压缩={self.compression}",
+            module_name=self.CHINESE_NAME
+        )
+
+    # ========== 连接与线程池 ==========
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit 模式，事务由 _write 显式控制
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _write(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """在写锁与 IMMEDIATE 事务内执行 fn（线程池中调用）"""
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn)
+                conn.execute("COMMIT")
+                return result
+            except BaseException:
+                conn.execute("ROLLBACK")
+                # 事务内已修改的计数随回滚失效，按表内容重新统计
+                self._load_counters(conn)
+                raise
+
+    def _load_counters(self, conn: sqlite3.Connection) -> None:
+        self._entries, self._bytes_used, self._raw_bytes, self._stored_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0), "
+            "COALESCE(SUM(length(payload)), 0) FROM llm_cache"
+        ).fetchone()
+
+    @staticmethod
+    def _key_summary(key: str) -> str:
+        return key[:8] + "..." if len(key) > 8 else key
+
+    # ========== 编码 ==========
+    def _encode(self, key: str, value: Dict[str, Any], now: float) -> Tuple:
+        raw = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode("utf-8")
+        payload, codec = raw, "none"
+        if self.compression != "none" and len(raw) >= self.COMPRESS_MIN_BYTES:
+            compressed = self.compressor.compress(raw)
+            if len(compressed) < len(raw):
+                payload, codec = compressed, self.compression
+        size = len(payload) + len(key) + self.ROW_OVERHEAD
+        return key, payload, codec, len(raw), size, now, now
+
+    def _decode(self, payload: bytes, codec: str) -> Dict[str, Any]:
+        return json.loads(self.compressor.decompress(payload, codec))
+
+    # ========== 线程池中执行的同步实现 ==========
+    def _select_many(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        conn = self._conn()
+        cutoff = time.time() - self.ttl_seconds if self.ttl_seconds is not None else None
+        rows: Dict[str, Tuple[bytes, str, float]] = {}
+        for start in range(0, len(keys), self.QUERY_CHUNK):
+            chunk = keys[start:start + self.QUERY_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            for key, payload, codec, created_at in conn.execute(
+                    f"SELECT key, payload, codec, created_at FROM llm_cache WHERE key IN ({placeholders})", chunk
+            ):
+                rows[key] = (payload, codec, created_at)
+        values: List[Optional[Dict[str, Any]]] = []
+        for key in keys:
+            row = rows.get(key)
+            # 过期条目视为未命中，由写路径的过期清理删除
+            if row is None or (cutoff is not None and row[2] < cutoff):
+                values.append(None)
+            else:
+                values.append(self._decode(row[0], row[1]))
+        return values
+
+    def _upsert_many(self, rows: List[Tuple], touched: Dict[str, float]) -> None:
+        def _tx(conn: sqlite3.Connection) -> None:
+            self._flush_touched(conn, touched)
+            for row in rows:
+                key, size = row[0], row[4]
+                self._delete_keys(conn, [key])
+                if 0 < self.max_bytes < size:
+                    self._rejected += 1
+                    logger.warning(
+                        f"[SQLiteLLMCache] REJECT (key={self._key_summary(key)}): "
+                        f"单条 {size} 字节超过缓存预算 {self.max_bytes} 字节",
+                        module_name=self.CHINESE_NAME
+                    )
+                    continue
+                conn.execute("INSERT INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+                self._entries += 1
+                self._bytes_used += size
+                self._raw_bytes += row[3]
+                self._stored_bytes += len(row[1])
+            self._enforce_budget(conn)
+        self._write(_tx)
+
+    def _delete_many(self, keys: List[str]) -> int:
+        return self._write(lambda conn: self._delete_keys(conn, keys))
+
+    def _delete_keys(self, conn: sqlite3.Connection, keys: List[str]) -> int:
+        """持写锁调用：删除并同步计数，返回删除条数"""
+        removed = 0
+        for start in range(0, len(keys), self.QUERY_CHUNK):
+            chunk = keys[start:start + self.QUERY_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT size, raw_size, length(payload) FROM llm_cache WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            if not rows:
+                continue
+            conn.execute(f"DELETE FROM llm_cache WHERE key IN ({placeholders})", chunk)
+            removed += len(rows)
+            self._entries -= len(rows)
+            self._bytes_used -= sum(row[0] for row in rows)
+            self._raw_bytes -= sum(row[1] for row in rows)
+            self._stored_bytes -= sum(row[2] for row in rows)
+        return removed
+
+    @staticmethod
+    def _flush_touched(conn: sqlite3.Connection, touched: Dict[str, float]) -> None:
+        if touched:
+            conn.executemany(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?",
+                [(ts, key) for key, ts in touched.items()]
+            )
+
+    def _over_budget(self) -> bool:
+        return self._entries > self.max_size or (0 < self.max_bytes < self._bytes_used)
+
+    def _sweep_expired(self, conn: sqlite3.Connection, force: bool = False) -> None:
+        now = time.time()
+        if self.ttl_seconds is None or (not force and now - self._last_sweep < self.EXPIRE_SWEEP_INTERVAL):
+            return
+        self._last_sweep = now
+        expired = [row[0] for row in conn.execute(
+            "SELECT key FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        )]
+        if expired:
+            self._expirations += self._delete_keys(conn, expired)
+
+    def _enforce_budget(self, conn: sqlite3.Connection) -> None:
+        self._sweep_expired(conn, force=self._over_budget())
+        while self._over_budget():
+            # 按最近访问时间从旧到新，取恰好能回到条目数与字节预算以内的一批
+            need_entries = self._entries - self.max_size
+            need_bytes = self._bytes_used - self.max_bytes if self.max_bytes > 0 else 0
+            victims, freed = [], 0
+            for key, size in conn.execute(
+                    "SELECT key, size FROM llm_cache ORDER BY accessed_at LIMIT ?", (self.QUERY_CHUNK,)
+            ).fetchall():
+                if len(victims) >= need_entries and freed >= need_bytes:
+                    break
+                victims.append(key)
+                freed += size
+            if not victims:
+                break
+            self._evictions += self._delete_keys(conn, victims)
+            logger.info(f"[SQLiteLLMCache] EVICT {len(victims)} entries", module_name=self.CHINESE_NAME)
+
+    def _list_keys(self) -> List[str]:
+        query, params = "SELECT key FROM llm_cache", ()
+        if self.ttl_seconds is not None:
+            query, params = query + " WHERE created_at >= ?", (time.time() - self.ttl_seconds,)
+        return [row[0] for row in self._conn().execute(query, params)]
+
+    def _truncate(self) -> int:
+        def _tx(conn: sqlite3.Connection) -> int:
+            count = conn.execute("DELETE FROM llm_cache").rowcount
+            self._entries = self._bytes_used = self._raw_bytes = self._stored_bytes = 0
+            return count
+        return self._write(_tx)
+
+    # ========== 实现异步抽象方法 ==========
+    def _record_lookups(self, keys: List[str], values: List[Optional[Dict[str, Any]]]) -> None:
+        now = time.time()
+        for key, value in zip(keys, values):
+            key_sum = self._key_summary(key)
+            if value is None:
+                self._cache_misses += 1
+                logger.warning(f"[SQLiteLLMCache] MISS (key={key_sum})", module_name=self.CHINESE_NAME)
+            else:
+                self._cache_hits += 1
+                self._touched[key] = now
+                logger.info(f"[SQLiteLLMCache] HIT (key={key_sum})", module_name=self.CHINESE_NAME)
+
+    def _take_touched(self) -> Dict[str, float]:
+        touched, self._touched = self._touched, {}
+        return touched
+
+    async def _aget_raw(self, key: str) -> Optional[Dict[str, Any]]:
+        return (await self._aget_many_raw([key]))[0]
+
+    async def _aset_raw(self, key: str, value: Dict[str, Any]) -> None:
+        await self._aset_many_raw({key: value})
+
+    async def _adelete_raw(self, key: str) -> None:
+        await self._adelete_many_raw([key])
+
+    async def _aget_many_raw(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        values = await self._run(self._select_many, keys)
+        self._record_lookups(keys, values)
+        return values
+
+    async def _aset_many_raw(self, items: Dict[str, Dict[str, Any]]) -> None:
+        now = time.time()
+        rows = [self._encode(key, value, now) for key, value in items.items()]
+        await self._run(self._upsert_many, rows, self._take_touched())
+        for key in items:
+            logger.info(f"[SQLiteLLMCache] SET (key={self._key_summary(key)})", module_name=self.CHINESE_NAME)
+
+    async def _adelete_many_raw(self, keys: List[str]) -> None:
+        removed = await self._run(self._delete_many, keys)
+        logger.info(f"[SQLiteLLMCache] DELETED {removed} entries", module_name=self.CHINESE_NAME)
+
+    async def _aclear_raw(self) -> None:
+        self._touched.clear()
+        count = await self._run(self._truncate)
+        self._cache_hits = 0
+        self._cache_misses = 0
+        logger.info(f"[SQLiteLLMCache] CLEARED {count} entries", module_name=self.CHINESE_NAME)
+
+    async def _akeys_raw(self) -> List[str]:
+        return await self._run(self._list_keys)
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """与 LLMCache.memory_stats 相同的字段，另附数据库文件路径与磁盘占用"""
+        disk_bytes = sum(
+            p.stat().st_size for p in (self.path, Path(f"{self.path}-wal"), Path(f"{self.path}-shm")) if p.exists()
+        )
+        stored = self._stored_bytes
+        return {
+            "entries": self._entries,
+            "bytes_used": self._bytes_used,
+            "max_bytes": self.max_bytes,
+            "raw_bytes": self._raw_bytes,
+            "compression": self.compression,
+            "compression_ratio": (self._raw_bytes / stored) if stored > 0 else 1.0,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "rejected": self._rejected,
+            "path": str(self.path),
+            "disk_bytes": disk_bytes,
+        }
+
+    def stats(self) -> str:
+        total = self._cache_hits + self._cache_misses
+        if total == 0:
+            return "📊 LLM 磁盘缓存: 无调用"
+        hit_rate = self._cache_hits / total
+        memory = self.memory_stats()
+        budget = f"{memory['max_bytes'] / 1048576:.1f}MB" if memory["max_bytes"] > 0 else "不限"
+        return (
+            f"📊 LLM 磁盘缓存命中率: {hit_rate:.2%} | "
+            f"命中={self._cache_hits} | 未命中={self._cache_misses} | "
+            f"当前大小={memory['entries']} / {self.max_size} | "
+            f"占用={memory['bytes_used'] / 1048576:.1f}MB / {budget} | "
+            f"文件={memory['disk_bytes'] / 1048576:.1f}MB | "
+            f"压缩比={memory['compression_ratio']:.2f}x ({memory['compression']}) | "
+            f"淘汰={memory['evictions']} | 过期={memory['expirations']} | 超限拒绝={memory['rejected']}"
+        )
+
+    async def close(self) -> None:
+        """落盘未写入的访问时间并关闭连接"""
+        touched = self._take_touched()
+        if touched:
+            try:
+                await self._run(self._write, lambda conn: self._flush_touched(conn, touched))
+            except Exception as e:
+                logger.warning(f"写回访问时间失败: {e}", module_name=self.CHINESE_NAME)
+        self._executor.shutdown(wait=True)
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
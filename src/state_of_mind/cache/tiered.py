@@ -0,0 +1,334 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from src.state_of_mind.cache.base import BaseCache
+from src.state_of_mind.cache.llm_cache import LLMCache
+from src.state_of_mind.cache.redis import RedisLLMCache
+from src.state_of_mind.utils.logger import LoggerManager as logger
+
+
+class TieredCache(BaseCache):
+    """
+    二级缓存：进程内 LLMCache（L1）+ RedisLLMCache（L2）
+    - 读穿透：L1 命中直接返回；未命中查 L2 并回填 L1（超过单条字节上限的值由 L1 拒绝，只存 L2）
+    - 写穿透：先写 L2 再写 L1，并通过 Redis pub/sub 通知其他进程丢弃其 L1 副本
+    - 负缓存：L2 未命中的 key 在 negative_ttl 秒内直接判定未命中，避免热点 miss 反复打到 Redis
+    - 读 L2 期间该 key 被写入、删除或收到失效通知时，不回填 L1 也不记负缓存，避免旧值覆盖新值
+    """
+    CHINESE_NAME = "二级 LLM 缓存（本地 + Redis）"
+    _CLEAR_ALL = "*"
+
+    def __init__(
+            self,
+            config,
+            l1: Optional[LLMCache] = None,
+            l2: Optional[RedisLLMCache] = None,
+    ):
+        self.config = config
+        self.l1 = l1 or LLMCache(
+            max_size=config.TIERED_L1_MAX_SIZE,
+            ttl_seconds=config.TIERED_L1_TTL,
+            max_entry_bytes=config.TIERED_L1_MAX_ENTRY_BYTES,
+        )
+        self.l2 = l2 or RedisLLMCache(config=config, default_ttl=config.LLM_CACHE_TTL)
+        self.negative_ttl = float(config.TIERED_NEGATIVE_TTL)
+        self.channel = config.TIERED_INVALIDATION_CHANNEL
+        self._origin = uuid.uuid4().hex
+        self._negative: Dict[str, float] = {}
+        # 正在读 L2 的 key -> [在途读取数, 失效代数]；读取期间代数变化则放弃回填
+        self._reads: Dict[str, List[int]] = {}
+        self._publisher = None
+        self._subscriber_task: Optional[asyncio.Task] = None
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._l1_hits = 0
+        self._l2_hits = 0
+        self._negative_hits = 0
+        self._invalidations_received = 0
+        logger.info(
+            f"🔌 使用二级缓存：L1 local:{self.l1.max_size}/{self.l1.ttl_seconds}s，"
+            f"L2 redis://{config.REDIS_HOST}:{config.REDIS_PORT}/{config.REDIS_DB}，失效频道={self.channel}",
+            module_name=self.CHINESE_NAME
+        )
+
+    # ========== 读写 ==========
+    async def _aget_raw(self, key: str) -> Optional[Dict[str, Any]]:
+        self._ensure_subscriber()
+        value = await self.l1._aget_raw(key)
+        if value is not None:
+            self._l1_hits += 1
+            self._cache_hits += 1
+            return value
+
+        expires_at = self._negative.get(key)
+        if expires_at is not None:
+            if expires_at > time.monotonic():
+                self._negative_hits += 1
+                self._cache_misses += 1
+                return None
+            del self._negative[key]
+
+        generation = self._begin_read(key)
+        try:
+            value = await self.l2._aget_raw(key)
+        finally:
+            fresh = self._end_read(key, generation)
+        if value is None:
+            if fresh:
+                self._remember_miss(key)
+            self._cache_misses += 1
+            return None
+
+        self._l2_hits += 1
+        self._cache_hits += 1
+        if fresh:
+            await self.l1._aset_raw(key, value)
+        return value
+
+    async def _aset_raw(self, key: str, value: Dict[str, Any]) -> None:
+        self._ensure_subscriber()
+        self._invalidate_reads([key])
+        await self.l2._aset_raw(key, value)
+        self._negative.pop(key, None)
+        await self.l1._aset_raw(key, value)
+        await self._publish(key)
+
+    async def _adelete_raw(self, key: str) -> None:
+        self._invalidate_reads([key])
+        await self.l2._adelete_raw(key)
+        await self.l1._adelete_raw(key)
+        self._negative.pop(key, None)
+        await self._publish(key)
+
+    async def _aclear_raw(self) -> None:
+        self._invalidate_reads()
+        await self.l2._aclear_raw()
+        await self.l1._aclear_raw()
+        self._negative.clear()
+        await self._publish(self._CLEAR_ALL)
+
+    async def _akeys_raw(self) -> List[str]:
+        return await self.l2._akeys_raw()
+
+    async def _aget_many_raw(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """L1 逐个命中后，剩余 key 以一次 L2 批量读取补齐并回填 L1"""
+        self._ensure_subscriber()
+        results = await self.l1._aget_many_raw(keys)
+        now = time.monotonic()
+        pending = []
+        for idx, (key, value) in enumerate(zip(keys, results)):
+            if value is not None:
+                self._l1_hits += 1
+                self._cache_hits += 1
+                continue
+            expires_at = self._negative.get(key)
+            if expires_at is not None:
+                if expires_at > now:
+                    self._negative_hits += 1
+                    self._cache_misses += 1
+                    continue
+                del self._negative[key]
+            pending.append(idx)
+
+        if pending:
+            pending_keys = [keys[idx] for idx in pending]
+            generations = [self._begin_read(key) for key in pending_keys]
+            try:
+                values = await self.l2._aget_many_raw(pending_keys)
+            finally:
+                fresh = [self._end_read(key, generation) for key, generation in zip(pending_keys, generations)]
+            backfill = {}
+            for idx, value, is_fresh in zip(pending, values, fresh):
+                if value is None:
+                    if is_fresh:
+                        self._remember_miss(keys[idx])
+                    self._cache_misses += 1
+                    continue
+                self._l2_hits += 1
+                self._cache_hits += 1
+                results[idx] = value
+                if is_fresh:
+                    backfill[keys[idx]] = value
+            if backfill:
+                await self.l1._aset_many_raw(backfill)
+        return results
+
+    async def _aset_many_raw(self, items: Dict[str, Dict[str, Any]]) -> None:
+        self._ensure_subscriber()
+        self._invalidate_reads(items)
+        await self.l2._aset_many_raw(items)
+        for key in items:
+            self._negative.pop(key, None)
+        await self.l1._aset_many_raw(items)
+        await self._publish_many(list(items))
+
+    async def _adelete_many_raw(self, keys: List[str]) -> None:
+        self._invalidate_reads(keys)
+        await self.l2._adelete_many_raw(keys)
+        await self.l1._adelete_many_raw(keys)
+        for key in keys:
+            self._negative.pop(key, None)
+        await self._publish_many(keys)
+
+    def _remember_miss(self, key: str) -> None:
+        if self.negative_ttl <= 0:
+            return
+        now = time.monotonic()
+        if len(self._negative) >= self.l1.max_size:
+            # 先清理过期项，仍超限则按插入顺序淘汰最旧的一半
+            self._negative = {k: t for k, t in self._negative.items() if t > now}
+            if len(self._negative) >= self.l1.max_size:
+                for stale in list(self._negative)[:len(self._negative) // 2 + 1]:
+                    del self._negative[stale]
+        self._negative[key] = now + self.negative_ttl
+
+    # ========== 回填竞争保护（均在事件循环线程内调用，无需加锁）==========
+    def _begin_read(self, key: str) -> int:
+        state = self._reads.setdefault(key, [0, 0])
+        state[0] += 1
+        return state[1]
+
+    def _end_read(self, key: str, generation: int) -> bool:
+        """结束一次 L2 读取，返回读取期间该 key 是否未失效（可回填）"""
+        state = self._reads[key]
+        state[0] -= 1
+        if state[0] == 0:
+            del self._reads[key]
+        return state[1] == generation
+
+    def _invalidate_reads(self, keys=None) -> None:
+        """keys 为 None 时使所有在途读取失效"""
+        if keys is None:
+            states = self._reads.values()
+        else:
+            states = [self._reads[key] for key in keys if key in self._reads]
+        for state in states:
+            state[1] += 1
+
+    # ========== L1 失效广播 ==========
+    def _new_redis_client(self, socket_timeout: Optional[float]):
+        import redis.asyncio as aioredis
+        return aioredis.Redis(
+            host=self.config.REDIS_HOST,
+            port=self.config.REDIS_PORT,
+            db=self.config.REDIS_DB,
+            password=self.config.REDIS_PASSWORD or None,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=self.config.REDIS_TIMEOUT,
+        )
+
+    def _get_redis(self):
+        if self._publisher is None:
+            self._publisher = self._new_redis_client(self.config.REDIS_TIMEOUT)
+        return self._publisher
+
+    async def _publish(self, key: str) -> None:
+        message = json.dumps({"origin": self._origin, "key": key})
+        try:
+            await self._get_redis().publish(self.channel, message)
+        except Exception as e:
+            logger.warning(f"⚠️ 缓存失效广播失败 (key={key[:8]}...): {e}", module_name=self.CHINESE_NAME)
+
+    async def _publish_many(self, keys: List[str]) -> None:
+        """批量失效合并为一条消息"""
+        message = json.dumps({"origin": self._origin, "keys": keys})
+        try:
+            await self._get_redis().publish(self.channel, message)
+        except Exception as e:
+            logger.warning(f"⚠️ 批量缓存失效广播失败 ({len(keys)} keys): {e}", module_name=self.CHINESE_NAME)
+
+    def _ensure_subscriber(self) -> None:
+        """首次读写时在当前事件循环中启动订阅任务（构造时可能尚无事件循环）"""
+        if self._subscriber_task is not None and not self._subscriber_task.done():
+            return
+        try:
+            self._subscriber_task = asyncio.get_running_loop().create_task(self._subscribe_loop())
+        except RuntimeError:
+            pass
+
+    async def _subscribe_loop(self) -> None:
+        backoff = 1.0
+        while True:
+            pubsub = None
+            # 订阅连接长期空闲，不设读超时
+            client = self._new_redis_client(None)
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel)
+                logger.info(f"📡 已订阅缓存失效频道: {self.channel}", module_name=self.CHINESE_NAME)
+                backoff = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await self._on_invalidation(message.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 订阅中断期间其他进程的写入无法通知到本进程，直接清空 L1 以免读到旧值
+                self._invalidate_reads()
+                await self.l1._aclear_raw()
+                self._negative.clear()
+                logger.warning(
+                    f"⚠️ 缓存失效订阅中断，已清空本地 L1，{backoff:.0f}s 后重连: {e}",
+                    module_name=self.CHINESE_NAME
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                try:
+                    if pubsub is not None:
+                        await pubsub.aclose()
+                    await client.aclose()
+                except Exception:
+                    pass
+
+    async def _on_invalidation(self, data: Any) -> None:
+        try:
+            payload = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if payload.get("origin") == self._origin:
+            return
+        key = payload.get("key")
+        keys = payload.get("keys")
+        self._invalidations_received += 1
+        if key == self._CLEAR_ALL:
+            self._invalidate_reads()
+            await self.l1._aclear_raw()
+            self._negative.clear()
+        elif key:
+            self._invalidate_reads([key])
+            await self.l1._adelete_raw(key)
+            self._negative.pop(key, None)
+        elif keys:
+            self._invalidate_reads(keys)
+            await self.l1._adelete_many_raw(keys)
+            for stale in keys:
+                self._negative.pop(stale, None)
+
+    async def close(self) -> None:
+        if self._subscriber_task is not None:
+            self._subscriber_task.cancel()
+            try:
+                await self._subscriber_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._subscriber_task = None
+        if self._publisher is not None:
+            try:
+                await self._publisher.aclose()
+            except Exception as e:
+                logger.warning(f"关闭缓存失效广播连接失败: {e}", module_name=self.CHINESE_NAME)
+            self._publisher = None
+
+    def stats(self) -> str:
+        total = self._cache_hits + self._cache_misses
+        if total == 0:
+            return "📊 二级 LLM 缓存: 无调用"
+        return (
+            f"📊 二级 LLM 缓存命中率: {self._cache_hits / total:.2%} | "
+            f"L1 命中={self._l1_hits} | L2 命中={self._l2_hits} | 负缓存命中={self._negative_hits} | "
+            f"未命中={self._cache_misses} | L1 大小={len(self.l1.cache)} / {self.l1.max_size} | "
+            f"收到失效通知={self._invalidations_received}"
+        )
@@ -0,0 +1,294 @@
+"""
+🌊 心海离线命令行入口
+
+用法：
+    python -m src.state_of_mind.cli batch --input corpus.jsonl --output results.jsonl
+    python -m src.state_of_mind.cli batch --input corpus.csv --text-field content --no-html --concurrency 4
+    python -m src.state_of_mind.cli cache export --output cache.snapshot.jsonl.gz
+    python -m src.state_of_mind.cli cache import --input cache.snapshot.jsonl.gz
+    python -m src.state_of_mind.cli cache rebuild --include-results
+"""
+import argparse
+import asyncio
+import csv
+import json
+import math
+import sys
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+from src.state_of_mind.config import config
+from src.state_of_mind.stages.perception.constants import CATEGORY_RAW, EVENT_STEP_RESULT
+from src.state_of_mind.utils.file_util import FileUtil
+from src.state_of_mind.utils.logger import LoggerManager as logger
+from src.state_of_mind.utils.registry import GlobalSingletonRegistry
+from src.state_of_mind.utils.retry_util import get_circuit_breaker_status
+
+CHINESE_NAME = "心海离线命令行"
+
+
+# ======================
+# 输入读取（逐行流式，不整体加载）
+# ======================
+def _iter_jsonl(path: Path, text_field: str, id_field: Optional[str], ids: Dict[int, Any]):
+    with path.open("r", encoding="utf-8-sig") as f:
+        index = 0
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"⚠️ 第 {line_no} 行不是合法 JSON，已跳过: {e}", module_name=CHINESE_NAME)
+                continue
+            text = record.get(text_field) if isinstance(record, dict) else record
+            if not isinstance(text, str) or not text.strip():
+                logger.warning(f"⚠️ 第 {line_no} 行缺少文本字段 '{text_field}'，已跳过", module_name=CHINESE_NAME)
+                continue
+            if id_field and isinstance(record, dict):
+                ids[index] = record.get(id_field)
+            index += 1
+            yield text
+
+
+def _iter_csv(path: Path, text_field: str, id_field: Optional[str], ids: Dict[int, Any]):
+    with path.open("r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames is None or text_field not in reader.fieldnames:
+            raise ValueError(f"CSV 缺少文本列 '{text_field}'，实际列: {reader.fieldnames}")
+        index = 0
+        for row_no, row in enumerate(reader, start=2):
+            text = row.get(text_field)
+            if not text or not text.strip():
+                logger.warning(f"⚠️ 第 {row_no} 行文本为空，已跳过", module_name=CHINESE_NAME)
+                continue
+            if id_field:
+                ids[index] = row.get(id_field)
+            index += 1
+            yield text
+
+
+async def _aiter_inputs(path: Path, fmt: str, text_field: str, id_field: Optional[str],
+                        ids: Dict[int, Any]) -> AsyncIterator[str]:
+    reader = _iter_csv if fmt == "csv" else _iter_jsonl
+    for text in reader(path, text_field, id_field, ids):
+        yield text
+        # 让出事件循环，避免大文件读取阻塞在途任务
+        await asyncio.sleep(0)
+
+
+# ======================
+# 指标统计
+# ======================
+class BatchMetrics:
+    def __init__(self):
+        self.step_latencies: Dict[str, List[float]] = {}
+        self.started = time.perf_counter()
+        self.total = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.resumed = 0
+
+    async def on_event(self, message: Dict[str, Any]) -> None:
+        if message.get("event") == EVENT_STEP_RESULT and message.get("duration_ms") is not None:
+            self.step_latencies.setdefault(message["step_id"], []).append(message["duration_ms"])
+
+    @staticmethod
+    def percentile(values: List[float], pct: float) -> float:
+        """最近秩法分位数"""
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def render(
+            self,
+            cache_counts: Dict[str, int],
+            step_cache_counts: Dict[str, int],
+            hedge_counts: Optional[Dict[str, int]] = None,
+            breaker_status: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> str:
+        elapsed = time.perf_counter() - self.started
+        processed = self.total - self.resumed
+        lines = [
+            "",
+            "========== 批处理统计 ==========",
+            f"文档总数: {self.total} | 成功: {self.succeeded} | 失败: {self.failed} | 断点跳过: {self.resumed}",
+            f"总耗时: {elapsed:.2f}s | 吞吐: {processed / elapsed if elapsed > 0 else 0:.3f} 文档/秒"
+            f" ({processed / elapsed * 60 if elapsed > 0 else 0:.1f} 文档/分钟)",
+        ]
+        for label, counts in (("缓存命中率（全部）", cache_counts), ("步骤缓存命中率", step_cache_counts)):
+            lookups = counts.get("hits", 0) + counts.get("misses", 0)
+            rate = counts.get("hits", 0) / lookups if lookups else 0.0
+            lines.append(f"{label}: {rate:.2%} (命中={counts.get('hits', 0)}, 查询={lookups})")
+        if hedge_counts and any(hedge_counts.values()):
+            lines.append(
+                f"对冲请求: {hedge_counts.get('fired', 0)} (副本先返回={hedge_counts.get('won', 0)}) | "
+                f"超出截止时间: {hedge_counts.get('deadline_exceeded', 0)}"
+            )
+        for key, status in (breaker_status or {}).items():
+            if status["trips"] or status["rejected"]:
+                lines.append(
+                    f"熔断器 {key}: 状态={status['state']} | 打开次数={status['trips']} | 快速失败={status['rejected']}"
+                )
+        if self.step_latencies:
+            lines.append("步骤延迟（ms）:")
+            width = max(len(name) for name in self.step_latencies)
+            lines.append(f"  {'step'.ljust(width)}  {'count':>6}  {'p50':>10}  {'p95':>10}")
+            for name in sorted(self.step_latencies):
+                values = self.step_latencies[name]
+                lines.append(
+                    f"  {name.ljust(width)}  {len(values):>6}  "
+                    f"{self.percentile(values, 50):>10.1f}  {self.percentile(values, 95):>10.1f}"
+                )
+        return "\n".join(lines)
+
+
+# ======================
+# batch 子命令
+# ======================
+async def run_batch_command(args: argparse.Namespace) -> int:
+    from src.state_of_mind.stages.perception.prompt_builder import PromptBuilder
+    from src.state_of_mind.stages.perception.stage_pipeline import PerceptionPipeline
+
+    input_path = Path(args.input)
+    if not input_path.exists():
+        print(f"❌ 输入文件不存在: {input_path}", file=sys.stderr)
+        return 2
+    fmt = args.format or ("csv" if input_path.suffix.lower() == ".csv" else "jsonl")
+    output_path = Path(args.output) if args.output else input_path.with_suffix(".results.jsonl")
+    FileUtil.ensure_directory(output_path.parent)
+
+    PromptBuilder().pre_basic_data()
+    pipeline = PerceptionPipeline()
+    await GlobalSingletonRegistry.async_prewarm(
+        pipeline.step_executor.backend_name, min(config.LLM_HTTP_PREWARM, config.LLM_HTTP_MAX_KEEPALIVE)
+    )
+    metrics = BatchMetrics()
+    ids: Dict[int, Any] = {}
+
+    # 输出文件每次完整重写，断点回放的结果同样写入（与上次运行的输出路径无关）
+    with output_path.open("w", encoding="utf-8") as out:
+        async for item in pipeline.iter_batch(
+                _aiter_inputs(input_path, fmt, args.text_field, args.id_field, ids),
+                category=args.category,
+                max_in_flight=args.concurrency,
+                checkpoint_path=args.checkpoint,
+                on_event=metrics.on_event,
+                render_report=not args.no_html,
+                return_result=True,
+        ):
+            metrics.total += 1
+            result = item.result or {}
+            record = {
+                "index": item.index,
+                "id": ids.pop(item.index, None),
+                "input_hash": item.input_hash,
+                "success": item.success,
+                "resumed": item.resumed,
+                "elapsed_ms": item.elapsed_ms,
+                "report_url": result.get("report_url") or None,
+                "result": result.get("result"),
+                "error": item.error,
+            }
+            if item.resumed:
+                metrics.resumed += 1
+            elif item.success:
+                metrics.succeeded += 1
+            else:
+                metrics.failed += 1
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+
+    await GlobalSingletonRegistry.async_close_all()
+    print(metrics.render(
+        pipeline.llm_cache.hit_counts(), pipeline.step_executor.cache_counts(), pipeline.step_executor.hedge_counts(),
+        get_circuit_breaker_status()
+    ))
+    print(f"结果已写入: {output_path}")
+    return 0 if metrics.failed == 0 else 1
+
+
+# ======================
+# cache 子命令
+# ======================
+async def run_cache_command(args: argparse.Namespace) -> int:
+    from src.state_of_mind.cache.snapshot import CacheSnapshot
+    from src.state_of_mind.stages.perception.prompt_builder import PromptBuilder
+    from src.state_of_mind.stages.perception.stage_pipeline import PerceptionPipeline
+
+    if args.action == "import" and not Path(args.input).is_file():
+        print(f"❌ 快照文件不存在: {args.input}", file=sys.stderr)
+        return 2
+
+    # 步骤缓存 key 依赖 pre_basic_data 加载的模板
+    PromptBuilder().pre_basic_data()
+    pipeline = PerceptionPipeline()
+    try:
+        if args.action == "export":
+            count = await CacheSnapshot(pipeline.llm_cache).export(args.output)
+            print(f"已导出 {count} 条缓存: {args.output}")
+        elif args.action == "import":
+            count = await CacheSnapshot(pipeline.llm_cache).load(args.input)
+            print(f"已导入 {count} 条缓存: {args.input}")
+        else:
+            from src.state_of_mind.stages.perception.cache_rebuilder import ArtifactCacheRebuilder
+            stats = await ArtifactCacheRebuilder(pipeline).rebuild(
+                dye_vat_dir=Path(args.dye_vat_dir) if args.dye_vat_dir else None,
+                raw_dir=Path(args.raw_dir) if args.raw_dir else None,
+                include_results=args.include_results,
+            )
+            print(f"重建完成: 文件 {stats['files']} | 步骤缓存 {stats['steps']} | "
+                  f"整体缓存 {stats['results']} | 跳过 {stats['skipped']}")
+    except (RuntimeError, ValueError, OSError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.state_of_mind.cli", description="心海离线命令行")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    batch = sub.add_parser("batch", help="批量处理 JSONL/CSV 文本语料")
+    batch.add_argument("--input", "-i", required=True, help="输入文件（.jsonl 或 .csv）")
+    batch.add_argument("--output", "-o", help="输出 JSONL 文件，默认 <input>.results.jsonl")
+    batch.add_argument("--format", choices=["jsonl", "csv"], help="输入格式，默认按扩展名推断")
+    batch.add_argument("--text-field", default="text", help="文本字段/列名，默认 text")
+    batch.add_argument("--id-field", default="id", help="透传到输出的 ID 字段/列名，默认 id")
+    batch.add_argument("--category", default=CATEGORY_RAW, help=f"模板类别，默认 {CATEGORY_RAW}")
+    batch.add_argument("--concurrency", "-c", type=int, default=config.BATCH_MAX_IN_FLIGHT,
+                       help=f"同时在途文档数，默认 {config.BATCH_MAX_IN_FLIGHT}")
+    batch.add_argument("--checkpoint", help="断点文件（JSONL），重跑时跳过已完成文本，其结果从断点回放写入输出")
+    batch.add_argument("--no-html", action="store_true", help="跳过 HTML 报告渲染")
+
+    cache = sub.add_parser("cache", help="缓存快照导出/导入与按历史产物重建")
+    cache_sub = cache.add_subparsers(dest="action", required=True)
+    export = cache_sub.add_parser("export", help="导出当前缓存后端的全部条目")
+    export.add_argument("--output", "-o", required=True, help="快照文件（gzip JSONL）")
+    load = cache_sub.add_parser("import", help="导入快照到当前缓存后端")
+    load.add_argument("--input", "-i", required=True, help="快照文件（gzip JSONL）")
+    rebuild = cache_sub.add_parser("rebuild", help="从 dye_vat/（及 raw/）历史产物重建缓存")
+    rebuild.add_argument("--dye-vat-dir", help="染缸目录，默认数据目录下的 dye_vat")
+    rebuild.add_argument("--raw-dir", help="原始结果目录，默认数据目录下的 raw")
+    rebuild.add_argument("--include-results", action="store_true",
+                         help="同时重建整体结果缓存（重建条目不含报告链接）")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "batch":
+        if args.concurrency <= 0:
+            print("❌ --concurrency 必须是正整数", file=sys.stderr)
+            return 2
+        return asyncio.run(run_batch_command(args))
+    if args.command == "cache":
+        return asyncio.run(run_cache_command(args))
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
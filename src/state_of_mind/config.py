@@ -12,7 +12,8 @@ from src.state_of_mind.utils.constants import (
     LOG_KEEP_DAYS, LOG_MAX_BYTES, LOG_BACKUP_COUNT,
     PATH_FILE_PYPROJECT,
     PATH_FILE_CHAINA_IP_LIST, PATH_FILE_PROMPTS,
-    PATH_FILE_DEFAULT_TEMPLATE, STORAGE_REDIS, PATH_FILE_APP_JSON, LLMBackendConst, LLMModelConst,
+    PATH_FILE_DEFAULT_TEMPLATE, STORAGE_REDIS, STORAGE_TIERED, STORAGE_SQLITE, PATH_FILE_APP_JSON,
+    LLMBackendConst, LLMModelConst,
 )
 from src.state_of_mind.utils.file_util import FileUtil
 from src.state_of_mind.utils.logger import FallbackLogger
@@ -32,14 +33,27 @@ class Config:
         'LOGS_DIR', 'LOGS_FALLBACK_DIR', 'PATH_FILE_APP_JSON', 'REPORT_TITLE',
         'STATIC_PROMPTS_DIR', 'STATIC_REPORTS_DIR', 'SUGGESTION_TYPE',
         'FILE_PROMPTS_PATH', 'FILE_CHAINA_IP_LIST_PATH', 'FILE_DEFAULT_TEMPLATE_PATH',
-        'STORAGE_BACKEND', 'STORAGE_LOCAL', 'STORAGE_REDIS', 'MEDIUM_PARALLEL_CONCURRENCY',
+        'STORAGE_BACKEND', 'STORAGE_LOCAL', 'STORAGE_REDIS', 'STORAGE_TIERED', 'STORAGE_SQLITE', 'MEDIUM_PARALLEL_CONCURRENCY',
+        'TIERED_L1_MAX_SIZE', 'TIERED_L1_TTL', 'TIERED_L1_MAX_ENTRY_BYTES', 'TIERED_NEGATIVE_TTL',
+        'TIERED_INVALIDATION_CHANNEL', 'SINGLE_FLIGHT_BACKEND', 'SINGLE_FLIGHT_LOCK_TTL', 'SINGLE_FLIGHT_POLL_INTERVAL',
         'REDIS_HOST', 'REDIS_PORT', 'REDIS_DB', 'REDIS_PASSWORD', 'REDIS_TIMEOUT',
+        'REDIS_SERIALIZER', 'REDIS_COMPRESSION', 'CACHE_NAMESPACE', 'CACHE_SNAPSHOT_PATH', 'CACHE_SNAPSHOT_EXPORT_ON_SHUTDOWN',
+        'NEAR_DUP_ENABLED', 'NEAR_DUP_BACKEND', 'NEAR_DUP_THRESHOLD', 'NEAR_DUP_MAX_ENTRIES',
+        'SQLITE_CACHE_PATH', 'SQLITE_CACHE_MAX_BYTES',
         'LLM_BACKEND', 'LLM_MODEL', 'LLM_API_URL', 'LLM_API_KEY', 'CURRENT_PARALLEL_CONCURRENCY',
         'LOG_KEEP_DAYS', 'LOG_MAX_BYTES', 'LOG_BACKUP_COUNT', 'LOG_ENABLE_INSPECT',
-        'MAX_PARALLEL_CONCURRENCY', 'LLM_CACHE_MAX_SIZE', 'LLM_CACHE_TTL', 'LLM_API_TIMEOUT',
+        'MAX_PARALLEL_CONCURRENCY', 'LLM_CACHE_MAX_SIZE', 'LLM_CACHE_TTL', 'LLM_CACHE_MAX_BYTES', 'LLM_CACHE_COMPRESSION', 'LLM_API_TIMEOUT',
         'WATERMARK_ENABLED', 'WATERMARK_TEXT', 'WATERMARK_COLOR', 'WATERMARK_OPACITY',
         'WATERMARK_FONT_SIZE', 'WATERMARK_ANGLE', 'WATERMARK_SPACING_COLS', 'WATERMARK_SPACING_ROWS',
         'WATERMARK_PADDING', 'AUTOGEN_ENABLED', 'AUTOGEN_STEP_SELECTION',
+        'BATCH_MAX_IN_FLIGHT', 'JOB_QUEUE_BACKEND', 'JOB_WORKERS', 'JOB_QUEUE_MAX_SIZE', 'JOB_RESULT_TTL',
+        'LLM_RATE_LIMIT_BACKEND', 'LLM_RATE_LIMIT_RPS', 'LLM_RATE_LIMIT_CONCURRENCY', 'LLM_RATE_LIMIT_TPM',
+        'LLM_HTTP_MAX_CONNECTIONS', 'LLM_HTTP_MAX_KEEPALIVE', 'LLM_HTTP_KEEPALIVE_EXPIRY', 'LLM_HTTP2',
+        'LLM_CONNECT_TIMEOUT', 'LLM_WRITE_TIMEOUT', 'LLM_POOL_TIMEOUT', 'LLM_HTTP_PREWARM', 'LLM_STREAM',
+        'LLM_REQUEST_SLO', 'LLM_HEDGE_QUANTILES', 'LLM_HEDGE_MIN_SAMPLES', 'LLM_ROUTES', 'LLM_ROUTE_PINS',
+        'LLM_BREAKER_FAILURE_RATE', 'LLM_BREAKER_MIN_CALLS', 'LLM_BREAKER_WINDOW_SECONDS', 'LLM_BREAKER_OPEN_SECONDS',
+        'MOCK_SEED', 'MOCK_LATENCY_DISTRIBUTION', 'MOCK_LATENCY_MS', 'MOCK_LATENCY_SIGMA',
+        'MOCK_ERROR_RATE', 'MOCK_RATE_LIMIT_RATE', 'MOCK_MALFORMED_RATE',
         'logger', 'metadata', '_registry',
     ]
 
@@ -73,7 +87,7 @@ class Config:
                         return float(val)
                     elif cast == bool:
                         return val.strip().lower() in ("true", "1", "yes", "on", "ok")
-                    elif cast == dict:
+                    elif cast in (dict, list):
                         import json
                         return json.loads(val)
                     elif cast == str:
@@ -94,14 +108,47 @@ class Config:
         # === 存储配置 ===
         self.STORAGE_LOCAL = STORAGE_LOCAL
         self.STORAGE_REDIS = STORAGE_REDIS
+        self.STORAGE_TIERED = STORAGE_TIERED
+        self.STORAGE_SQLITE = STORAGE_SQLITE
         self.STORAGE_BACKEND = get_config("XINJING_STORAGE_BACKEND", STORAGE_LOCAL, cast=str)
         self.LLM_CACHE_MAX_SIZE = get_config("XINJING_LLM_CACHE_MAX_SIZE", 4096, cast=int)
         self.LLM_CACHE_TTL = get_config("XINJING_LLM_CACHE_TTL", 3600, cast=int)
+        # 本地缓存字节预算（0 表示只按条目数限制）与值压缩方式：none / zlib / zstd（需安装 zstandard）
+        self.LLM_CACHE_MAX_BYTES = get_config("XINJING_LLM_CACHE_MAX_BYTES", 268435456, cast=int)
+        self.LLM_CACHE_COMPRESSION = get_config("XINJING_LLM_CACHE_COMPRESSION", "none", cast=str)
+        # 单机持久化缓存（XINJING_STORAGE_BACKEND=sqlite）：路径为空时使用数据目录下 cache/llm_cache.sqlite3，字节预算 0 表示不限
+        self.SQLITE_CACHE_PATH = get_config("XINJING_SQLITE_CACHE_PATH", "", cast=str)
+        self.SQLITE_CACHE_MAX_BYTES = get_config("XINJING_SQLITE_CACHE_MAX_BYTES", 1073741824, cast=int)
         self.REDIS_HOST = get_config("XINJING_REDIS_HOST", "redis", cast=str)
         self.REDIS_PORT = get_config("XINJING_REDIS_PORT", 6379, cast=int)
         self.REDIS_DB = get_config("XINJING_REDIS_DB", 0, cast=int)
         self.REDIS_PASSWORD = get_config("XINJING_REDIS_PASSWORD", None, cast=str)  # 注意：环境变量中 null 要传空字符串
         self.REDIS_TIMEOUT = get_config("XINJING_REDIS_TIMEOUT", 5, cast=int)
+        # Redis 缓存值格式：json（可读，默认）/ orjson / msgpack，可叠加 zlib / zstd 压缩；读取端兼容所有格式
+        self.REDIS_SERIALIZER = get_config("XINJING_REDIS_SERIALIZER", "json", cast=str)
+        self.REDIS_COMPRESSION = get_config("XINJING_REDIS_COMPRESSION", "none", cast=str)
+        # Redis key 前缀：缓存直接使用，任务队列使用 {前缀}:jobs；多个部署共用同一 Redis 时需各自配置
+        self.CACHE_NAMESPACE = get_config("XINJING_CACHE_NAMESPACE", "psytext_analyst", cast=str)
+        # 二级缓存（XINJING_STORAGE_BACKEND=tiered）：进程内 L1 + Redis L2，L1 通过 pub/sub 跨进程失效
+        self.TIERED_L1_MAX_SIZE = get_config("XINJING_TIERED_L1_MAX_SIZE", 512, cast=int)
+        self.TIERED_L1_TTL = get_config("XINJING_TIERED_L1_TTL", 600, cast=int)
+        self.TIERED_L1_MAX_ENTRY_BYTES = get_config("XINJING_TIERED_L1_MAX_ENTRY_BYTES", 2097152, cast=int)
+        self.TIERED_NEGATIVE_TTL = get_config("XINJING_TIERED_NEGATIVE_TTL", 2, cast=float)
+        self.TIERED_INVALIDATION_CHANNEL = get_config(
+            "XINJING_TIERED_INVALIDATION_CHANNEL", "psytext_analyst:cache_invalidation", cast=str
+        )
+        # 单飞（请求合并）：相同的在途分析/步骤只执行一次；redis 时以 SET NX 锁跨进程去重
+        self.SINGLE_FLIGHT_BACKEND = get_config("XINJING_SINGLE_FLIGHT_BACKEND", STORAGE_LOCAL, cast=str)
+        self.SINGLE_FLIGHT_LOCK_TTL = get_config("XINJING_SINGLE_FLIGHT_LOCK_TTL", 300, cast=float)
+        self.SINGLE_FLIGHT_POLL_INTERVAL = get_config("XINJING_SINGLE_FLIGHT_POLL_INTERVAL", 0.5, cast=float)
+        # 缓存快照：启动时若文件存在则导入（服务以热缓存启动），可选在关闭时导出；为空表示不启用
+        self.CACHE_SNAPSHOT_PATH = get_config("XINJING_CACHE_SNAPSHOT_PATH", "", cast=str)
+        self.CACHE_SNAPSHOT_EXPORT_ON_SHUTDOWN = get_config("XINJING_CACHE_SNAPSHOT_EXPORT_ON_SHUTDOWN", False, cast=bool)
+        # 近重复输入复用：精确 key 未命中时按归一化文本的 MinHash 相似度（0~1）查找已缓存结果；local 索引按条目数 LRU
+        self.NEAR_DUP_ENABLED = get_config("XINJING_NEAR_DUP_ENABLED", False, cast=bool)
+        self.NEAR_DUP_BACKEND = get_config("XINJING_NEAR_DUP_BACKEND", STORAGE_LOCAL, cast=str)
+        self.NEAR_DUP_THRESHOLD = get_config("XINJING_NEAR_DUP_THRESHOLD", 0.9, cast=float)
+        self.NEAR_DUP_MAX_ENTRIES = get_config("XINJING_NEAR_DUP_MAX_ENTRIES", 10000, cast=int)
         self.REPORT_TITLE = get_config("XINJING_REPORT_TITLE", "全息感知基底分析报告", cast=str)
 
         # === LLM 配置（支持 env + 智能默认值 + 大小写归一）===
@@ -133,6 +180,17 @@ class Config:
                 self.LLM_MODEL = LLMModelConst.DEEPSEEK_CHAT
             if not self.LLM_API_URL:
                 self.LLM_API_URL = "https://api.deepseek.com"
+        elif self.LLM_BACKEND == LLMBackendConst.MOCK:
+            if not raw_model:
+                self.LLM_MODEL = LLMModelConst.MOCK_CHAT
+            if not self.LLM_API_URL:
+                self.LLM_API_URL = "http://mock.local"
+        elif self.LLM_BACKEND == LLMBackendConst.ROUTER:
+            # 各路由自带提供方、模型与 API 地址，全局模型仅作为缓存键标签
+            if not raw_model:
+                self.LLM_MODEL = LLMModelConst.ROUTER
+            if not self.LLM_API_URL:
+                self.LLM_API_URL = ""
         else:
             FallbackLogger.warning(
                 f"未知 LLM 后端: {self.LLM_BACKEND}，请确保 LLM_API_URL 和 LLM_MODEL 已手动配置"
@@ -156,6 +214,68 @@ class Config:
         self.MAX_PARALLEL_CONCURRENCY = get_config("XINJING_MAX_PARALLEL_CONCURRENCY", 10, cast=int)
         self.CURRENT_PARALLEL_CONCURRENCY = get_config("XINJING_CURRENT_PARALLEL_CONCURRENCY", 3, cast=int)
         self.MEDIUM_PARALLEL_CONCURRENCY = get_config("XINJING_MEDIUM_PARALLEL_CONCURRENCY", 5, cast=int)
+        # 批量执行时同时在途的文档数（每个文档内部仍按步骤并发）
+        self.BATCH_MAX_IN_FLIGHT = get_config("XINJING_BATCH_MAX_IN_FLIGHT", 2, cast=int)
+
+        # === 异步分析任务队列（worker 数量与队列类型在启动时生效）===
+        self.JOB_QUEUE_BACKEND = get_config("XINJING_JOB_QUEUE_BACKEND", STORAGE_LOCAL, cast=str)
+        self.JOB_WORKERS = get_config("XINJING_JOB_WORKERS", 2, cast=int)
+        self.JOB_QUEUE_MAX_SIZE = get_config("XINJING_JOB_QUEUE_MAX_SIZE", 100, cast=int)
+        self.JOB_RESULT_TTL = get_config("XINJING_JOB_RESULT_TTL", 86400, cast=int)
+
+        # === LLM 全局限流（进程级，redis 时跨进程共享；<= 0 表示不限制该维度）===
+        self.LLM_RATE_LIMIT_BACKEND = get_config("XINJING_LLM_RATE_LIMIT_BACKEND", STORAGE_LOCAL, cast=str)
+        self.LLM_RATE_LIMIT_RPS = get_config("XINJING_LLM_RATE_LIMIT_RPS", 0, cast=float)
+        self.LLM_RATE_LIMIT_CONCURRENCY = get_config("XINJING_LLM_RATE_LIMIT_CONCURRENCY", 5, cast=int)
+        self.LLM_RATE_LIMIT_TPM = get_config("XINJING_LLM_RATE_LIMIT_TPM", 0, cast=int)
+
+        # === LLM HTTP 连接池（变更后新建连接池，旧连接池在在途请求结束后关闭）===
+        self.LLM_HTTP_MAX_CONNECTIONS = get_config("XINJING_LLM_HTTP_MAX_CONNECTIONS", 100, cast=int)
+        self.LLM_HTTP_MAX_KEEPALIVE = get_config("XINJING_LLM_HTTP_MAX_KEEPALIVE", 20, cast=int)
+        self.LLM_HTTP_KEEPALIVE_EXPIRY = get_config("XINJING_LLM_HTTP_KEEPALIVE_EXPIRY", 30, cast=float)
+        # HTTP/2 多路复用：同一连接承载全部并发步骤，需安装 h2
+        self.LLM_HTTP2 = get_config("XINJING_LLM_HTTP2", False, cast=bool)
+        # 读超时即 XINJING_LLM_API_TIMEOUT；建连/写入/等待空闲连接单独设置，网络故障可尽快失败重试
+        self.LLM_CONNECT_TIMEOUT = get_config("XINJING_LLM_CONNECT_TIMEOUT", 10, cast=float)
+        self.LLM_WRITE_TIMEOUT = get_config("XINJING_LLM_WRITE_TIMEOUT", 30, cast=float)
+        self.LLM_POOL_TIMEOUT = get_config("XINJING_LLM_POOL_TIMEOUT", 30, cast=float)
+        # 服务启动时预先建立的连接数（0 关闭）
+        self.LLM_HTTP_PREWARM = get_config("XINJING_LLM_HTTP_PREWARM", 2, cast=int)
+        # JSON 步骤使用流式输出：边接收边增量解析与校验，语法错误或重复生成时提前断开
+        self.LLM_STREAM = get_config("XINJING_LLM_STREAM", False, cast=bool)
+        # 多后端路由（XINJING_LLM_BACKEND=router）：路由列表，每项含 name、backend（deepseek/qwen/mock）、
+        # 可选 model、api_key、api_url、weight 及独立限流 rate_limit_rps / rate_limit_concurrency / rate_limit_tpm
+        self.LLM_ROUTES = get_config("XINJING_LLM_ROUTES", [], cast=list)
+        # 步骤固定：{"step_name": "route_name"}，该步骤只使用与该路由相同提供方和模型的路由
+        self.LLM_ROUTE_PINS = get_config("XINJING_LLM_ROUTE_PINS", {}, cast=dict)
+
+        # === 尾延迟控制（即时生效，无需重建后端）===
+        # 单篇分析的 SLO（秒，0 关闭）：各步骤按剩余时间与下游依赖链长度分得 LLM 调用预算，超出即放弃
+        self.LLM_REQUEST_SLO = get_config("XINJING_LLM_REQUEST_SLO", 0, cast=float)
+        # 按步骤分组配置对冲分位数，如 {"parallel_perception": 0.95}：步骤耗时超过其历史该分位数仍未返回时
+        # 再发一个相同请求，取先成功者；未配置的分组不对冲
+        self.LLM_HEDGE_QUANTILES = get_config("XINJING_LLM_HEDGE_QUANTILES", {}, cast=dict)
+        # 步骤成功样本数达到该值后才开始对冲
+        self.LLM_HEDGE_MIN_SAMPLES = get_config("XINJING_LLM_HEDGE_MIN_SAMPLES", 20, cast=int)
+
+        # === 熔断（按后端类型 + API 地址，即时生效）===
+        # 滚动窗口（秒）内调用数达到 MIN_CALLS 且 5xx/网络错误比例达到 FAILURE_RATE 时打开（0 关闭熔断）；
+        # 打开期间调用立即返回系统错误，OPEN_SECONDS 后放行探测请求，成功即恢复
+        self.LLM_BREAKER_FAILURE_RATE = get_config("XINJING_LLM_BREAKER_FAILURE_RATE", 0.5, cast=float)
+        self.LLM_BREAKER_MIN_CALLS = get_config("XINJING_LLM_BREAKER_MIN_CALLS", 20, cast=int)
+        self.LLM_BREAKER_WINDOW_SECONDS = get_config("XINJING_LLM_BREAKER_WINDOW_SECONDS", 30, cast=float)
+        self.LLM_BREAKER_OPEN_SECONDS = get_config("XINJING_LLM_BREAKER_OPEN_SECONDS", 15, cast=float)
+
+        # === 本地模拟 LLM 后端（XINJING_LLM_BACKEND=mock 时生效，用于压测与基准）===
+        # 延迟分布：fixed=恒定 MS；uniform=MS×(1±SIGMA)；lognormal=中位数 MS、形状参数 SIGMA
+        self.MOCK_SEED = get_config("XINJING_MOCK_SEED", 0, cast=int)
+        self.MOCK_LATENCY_DISTRIBUTION = get_config("XINJING_MOCK_LATENCY_DISTRIBUTION", "fixed", cast=str)
+        self.MOCK_LATENCY_MS = get_config("XINJING_MOCK_LATENCY_MS", 0, cast=float)
+        self.MOCK_LATENCY_SIGMA = get_config("XINJING_MOCK_LATENCY_SIGMA", 0.5, cast=float)
+        # 故障注入概率（0~1）：5xx 错误、429 限流、非法 JSON
+        self.MOCK_ERROR_RATE = get_config("XINJING_MOCK_ERROR_RATE", 0, cast=float)
+        self.MOCK_RATE_LIMIT_RATE = get_config("XINJING_MOCK_RATE_LIMIT_RATE", 0, cast=float)
+        self.MOCK_MALFORMED_RATE = get_config("XINJING_MOCK_MALFORMED_RATE", 0, cast=float)
 
         # === 水印相关 ===
         self.WATERMARK_ENABLED = get_config("XINJING_WATERMARK_ENABLED", True, cast=bool)
@@ -310,13 +430,38 @@ class Config:
         if diff_keys:
             FallbackLogger.info(f"配置变更项: {sorted(diff_keys)}")
 
+        # 预编译 prompt 骨架随配置重载失效，下次 build_raw 时重建
+        from src.state_of_mind.stages.perception.prompt_builder import PromptBuilder
+        PromptBuilder.invalidate_compiled_prompts()
+
         LLM_SENSITIVE_KEYS = {
             "LLM_BACKEND",
             "LLM_MODEL",
             "LLM_API_KEY",
             "LLM_API_URL",
             "LLM_API_TIMEOUT",
-            "LLM_RECOMMENDED_PARAMS"
+            "LLM_RECOMMENDED_PARAMS",
+            "LLM_RATE_LIMIT_BACKEND",
+            "LLM_RATE_LIMIT_RPS",
+            "LLM_RATE_LIMIT_CONCURRENCY",
+            "LLM_RATE_LIMIT_TPM",
+            "LLM_HTTP_MAX_CONNECTIONS",
+            "LLM_HTTP_MAX_KEEPALIVE",
+            "LLM_HTTP_KEEPALIVE_EXPIRY",
+            "LLM_HTTP2",
+            "LLM_CONNECT_TIMEOUT",
+            "LLM_WRITE_TIMEOUT",
+            "LLM_POOL_TIMEOUT",
+            "LLM_STREAM",
+            "LLM_ROUTES",
+            "LLM_ROUTE_PINS",
+            "MOCK_SEED",
+            "MOCK_LATENCY_DISTRIBUTION",
+            "MOCK_LATENCY_MS",
+            "MOCK_LATENCY_SIGMA",
+            "MOCK_ERROR_RATE",
+            "MOCK_RATE_LIMIT_RATE",
+            "MOCK_MALFORMED_RATE"
         }
 
         if diff_keys & LLM_SENSITIVE_KEYS:
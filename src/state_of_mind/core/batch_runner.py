@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Optional, Set, Tuple, Union
+from src.state_of_mind.core.types import BatchItemResult
+from src.state_of_mind.utils.logger import LoggerManager as logger
+
+
+class BatchCheckpoint:
+    """
+    批量断点文件（JSONL）：每完成一个文档追加一行 {"input_hash", "index", "result"}。
+    重新运行同一批次时，已完成的输入按哈希跳过并直接回放结果。
+    """
+    CHINESE_NAME = "批量执行断点"
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._completed: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        broken = 0
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    self._completed[record["input_hash"]] = record.get("result") or {}
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    # 进程中断可能留下半行，忽略即可
+                    broken += 1
+        logger.info(
+            f"📌 已加载断点: {len(self._completed)} 条已完成" + (f"，忽略损坏行 {broken} 条" if broken else ""),
+            module_name=self.CHINESE_NAME
+        )
+
+    def get(self, input_hash: str) -> Optional[Dict[str, Any]]:
+        return self._completed.get(input_hash)
+
+    @property
+    def completed_hashes(self) -> Set[str]:
+        return set(self._completed)
+
+    def mark_done(self, input_hash: str, index: int, result: Dict[str, Any]) -> None:
+        self._completed[input_hash] = result
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(
+                {"input_hash": input_hash, "index": index, "result": result},
+                ensure_ascii=False, default=str
+            ) + "\n")
+            f.flush()
+
+
+class BatchRunner:
+    """
+    有界并发批量执行引擎：
+    - 同时在途文档数不超过 max_in_flight，输入按需拉取（支持同步/异步可迭代对象，不一次性展开）
+    - iter_results 以异步迭代器形式按完成顺序产出 BatchItemResult（携带输入序号 index）
+    - 单文档异常或未成功的结果（success=False，或需要渲染报告但 report_url 为空）记为失败，不中断整批
+    - 可选断点文件：按输入哈希（含影响结果的参数）跳过已成功完成的文档，失败文档重跑时重新执行
+    """
+    CHINESE_NAME = "批量执行引擎"
+
+    def __init__(self, stage, max_in_flight: int = 2, checkpoint_path: Optional[Union[str, Path]] = None):
+        if max_in_flight <= 0:
+            raise ValueError("max_in_flight 必须是正整数")
+        self.stage = stage
+        self.max_in_flight = max_in_flight
+        self.checkpoint = BatchCheckpoint(checkpoint_path) if checkpoint_path else None
+
+    @staticmethod
+    def hash_input(user_input: str, category: str = "", options: Optional[Dict[str, Any]] = None) -> str:
+        """options: 影响结果的执行参数（如 suggestion_type / title / render_report），参数不同的运行不互相跳过"""
+        options_text = json.dumps(options or {}, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.blake2b(
+            f"{category}\x00{options_text}\x00{user_input}".encode("utf-8", errors="replace"),
+            digest_size=16
+        ).hexdigest()
+
+    @staticmethod
+    def is_successful(result: Any, render_report: bool = True) -> bool:
+        """阶段返回值是否表示成功：显式 success=False，或需要渲染报告却没有 report_url 时视为失败"""
+        if not isinstance(result, dict) or result.get("success") is False:
+            return False
+        return bool(result.get("report_url")) or not render_report
+
+    async def iter_results(
+            self,
+            user_inputs: Union[Iterable[str], AsyncIterable[str]],
+            category: str,
+            **kwargs
+    ) -> AsyncIterator[BatchItemResult]:
+        pending: Set[asyncio.Task] = set()
+        source = self._enumerate(user_inputs)
+        exhausted = False
+        total = succeeded = failed = resumed = 0
+        started = time.perf_counter()
+        # 回调（如进度事件）不影响结果，不参与哈希
+        options = {k: v for k, v in kwargs.items() if not callable(v)}
+
+        try:
+            while True:
+                while not exhausted and len(pending) < self.max_in_flight:
+                    try:
+                        index, user_input = await source.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    total += 1
+                    input_hash = self.hash_input(user_input, category, options)
+                    cached = self.checkpoint.get(input_hash) if self.checkpoint else None
+                    if cached is not None:
+                        resumed += 1
+                        yield BatchItemResult(index=index, input_hash=input_hash, success=True,
+                                              result=cached, resumed=True)
+                        continue
+                    pending.add(asyncio.create_task(
+                        self._run_one(index, input_hash, user_input, category, **kwargs)
+                    ))
+
+                if not pending:
+                    break
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    item = task.result()
+                    if item.success:
+                        succeeded += 1
+                        if self.checkpoint:
+                            self.checkpoint.mark_done(item.input_hash, item.index, item.result)
+                    else:
+                        failed += 1
+                    yield item
+        finally:
+            # 消费方提前退出（break / 取消）时，取消仍在执行的文档
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            logger.info(
+                f"📦 批量执行结束: 共 {total} 条, 成功 {succeeded}, 失败 {failed}, 断点跳过 {resumed}, "
+                f"耗时 {time.perf_counter() - started:.2f}s",
+                module_name=self.CHINESE_NAME
+            )
+
+    async def _run_one(self, index: int, input_hash: str, user_input: str, category: str, **kwargs) -> BatchItemResult:
+        start = time.perf_counter()
+        try:
+            result = await self.stage.run(user_input, category, **kwargs)
+            success = self.is_successful(result, kwargs.get("render_report", True))
+            if not success:
+                logger.warning(f"🟡 批量文档未成功完成 [index={index}]", module_name=self.CHINESE_NAME)
+            return BatchItemResult(
+                index=index, input_hash=input_hash, success=success, result=result,
+                error=None if success else "分析未成功完成（结果校验未通过或报告未生成）",
+                elapsed_ms=round((time.perf_counter() - start) * 1000, 2)
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"💥 批量文档执行失败 [index={index}]: {e}", module_name=self.CHINESE_NAME)
+            return BatchItemResult(
+                index=index, input_hash=input_hash, success=False, error=f"{type(e).__name__}: {e}",
+                elapsed_ms=round((time.perf_counter() - start) * 1000, 2)
+            )
+
+    @staticmethod
+    async def _enumerate(user_inputs: Union[Iterable[str], AsyncIterable[str]]) -> AsyncIterator[Tuple[int, str]]:
+        index = 0
+        if hasattr(user_inputs, "__aiter__"):
+            async for user_input in user_inputs:
+                yield index, user_input
+                index += 1
+        else:
+            for user_input in user_inputs:
+                yield index, user_input
+                index += 1
@@ -0,0 +1,532 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from src.state_of_mind.stages.perception.constants import (
+    EVENT_PIPELINE_START, EVENT_PHASE_START, EVENT_STEP_RESULT, EVENT_STEP_SKIPPED, EVENT_REPORT
+)
+from src.state_of_mind.utils.logger import LoggerManager as logger
+
+
+class JobStatusConst:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    @classmethod
+    def finished(cls) -> set:
+        return {cls.SUCCEEDED, cls.FAILED}
+
+
+class StepStatusConst:
+    PENDING = "pending"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+
+class JobQueueFullError(RuntimeError):
+    """队列已满（背压），由接口层转换为 HTTP 429"""
+    pass
+
+
+class BaseJobQueue(ABC):
+    """
+    分析任务队列抽象：
+    - submit / next_job 负责排队与出队（仅传递 job_id）
+    - save / get 负责任务记录（状态、进度、报告地址）的持久化
+    """
+    CHINESE_NAME = "分析任务队列"
+    # 出队后未确认的任务在进程崩溃/重启后能否重新投递
+    durable = False
+
+    def __init__(self, max_size: int, result_ttl: int):
+        if max_size <= 0:
+            raise ValueError("max_size 必须是正整数")
+        self.max_size = max_size
+        self.result_ttl = result_ttl
+
+    @abstractmethod
+    async def submit(self, job: Dict[str, Any]) -> None:
+        """保存任务记录并入队；队列满时抛出 JobQueueFullError"""
+        pass
+
+    @abstractmethod
+    async def next_job(self, timeout: float, worker: int = 0) -> Optional[str]:
+        """阻塞获取下一个 job_id，超时返回 None；worker 为调用方 worker 编号"""
+        pass
+
+    async def ack(self, job_id: str, worker: int = 0) -> None:
+        """任务处理结束（无论成败），不再需要重新投递"""
+        pass
+
+    async def start(self) -> None:
+        """worker 启动前调用：恢复异常退出的消费者遗留的任务"""
+        pass
+
+    async def migrate_to(self, other: "BaseJobQueue") -> int:
+        """配置重载切换队列时，把尚未开始的任务与任务记录迁移到新队列，返回重新入队的任务数"""
+        return 0
+
+    @abstractmethod
+    async def save(self, job: Dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def depth(self) -> int:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalJobQueue(BaseJobQueue):
+    """进程内任务队列（asyncio.Queue），仅适用于单实例部署"""
+    CHINESE_NAME = "本地分析任务队列"
+
+    def __init__(self, max_size: int, result_ttl: int):
+        super().__init__(max_size, result_ttl)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    async def submit(self, job: Dict[str, Any]) -> None:
+        self._purge_expired()
+        try:
+            self._queue.put_nowait(job["job_id"])
+        except asyncio.QueueFull:
+            raise JobQueueFullError(f"任务队列已满（{self.max_size}）")
+        self._jobs[job["job_id"]] = job
+
+    async def next_job(self, timeout: float, worker: int = 0) -> Optional[str]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def migrate_to(self, other: BaseJobQueue) -> int:
+        queued = set()
+        while not self._queue.empty():
+            queued.add(self._queue.get_nowait())
+        migrated = 0
+        for job_id, job in list(self._jobs.items()):
+            if job_id in queued:
+                try:
+                    await other.submit(job)
+                    migrated += 1
+                except JobQueueFullError:
+                    job["status"] = JobStatusConst.FAILED
+                    job["error"] = "配置重载后新队列已满，任务未能迁移"
+                    job["finished_at"] = time.time()
+                    await other.save(job)
+            else:
+                await other.save(job)
+        self._jobs.clear()
+        return migrated
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        self._jobs[job["job_id"]] = job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
+    async def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _purge_expired(self) -> None:
+        """清理超过保留期的已结束任务，避免记录无限增长"""
+        if self.result_ttl <= 0:
+            return
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.get("status") in JobStatusConst.finished()
+            and now - (job.get("finished_at") or now) > self.result_ttl
+        ]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+
+
+class RedisJobQueue(BaseJobQueue):
+    """
+    Redis 任务队列（复用 XINJING_REDIS_* 配置与缓存命名空间），多容器共享同一队列：
+    - 队列：LIST（LPUSH 入队 / BLMOVE 出队到该 worker 的处理中列表，任务结束后 LREM 确认）
+    - 每个队列实例定期刷新心跳 key；心跳过期的消费者遗留在处理中列表的任务，在任一实例启动或心跳时重新入队
+    - 任务记录：JSON 字符串，结束后按 result_ttl 过期
+    """
+    CHINESE_NAME = "Redis 分析任务队列"
+    durable = True
+    HEARTBEAT_SECONDS = 10
+    HEARTBEAT_TTL_SECONDS = 30
+
+    def __init__(self, config, max_size: int, result_ttl: int):
+        super().__init__(max_size, result_ttl)
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            raise RuntimeError(
+                "❌ Redis 任务队列需要安装 'redis' 包。请在 requirements.txt 中添加 'redis' 并重建镜像。"
+            )
+        self._client = aioredis.Redis(
+            host=config.REDIS_HOST,
+            port=config.REDIS_PORT,
+            db=config.REDIS_DB,
+            password=config.REDIS_PASSWORD or None,
+            socket_timeout=None,  # BLMOVE 自带超时，避免与 socket 超时冲突
+            socket_connect_timeout=config.REDIS_TIMEOUT,
+        )
+        self._location = (config.REDIS_HOST, config.REDIS_PORT, config.REDIS_DB)
+        self.namespace = f"{config.CACHE_NAMESPACE}:jobs"
+        self.consumer_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._queue_key = f"{self.namespace}:queue"
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        logger.info(
+            f"🔌 使用 Redis 任务队列，连接: redis://{config.REDIS_HOST}:{config.REDIS_PORT}/{config.REDIS_DB}, "
+            f"namespace={self.namespace}",
+            module_name=self.CHINESE_NAME
+        )
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.namespace}:{job_id}"
+
+    def _processing_key(self, worker: int, consumer_id: Optional[str] = None) -> str:
+        return f"{self.namespace}:processing:{consumer_id or self.consumer_id}:{worker}"
+
+    def _heartbeat_key(self, consumer_id: str) -> str:
+        return f"{self.namespace}:consumer:{consumer_id}"
+
+    async def submit(self, job: Dict[str, Any]) -> None:
+        # 粗粒度背压：LLEN 与 LPUSH 之间的竞争最多使队列短暂超出 max_size 几个任务
+        if await self._client.llen(self._queue_key) >= self.max_size:
+            raise JobQueueFullError(f"任务队列已满（{self.max_size}）")
+        await self.save(job)
+        await self._client.lpush(self._queue_key, job["job_id"])
+
+    async def next_job(self, timeout: float, worker: int = 0) -> Optional[str]:
+        job_id = await self._client.blmove(
+            self._queue_key, self._processing_key(worker), max(1, int(timeout)), src="RIGHT", dest="LEFT"
+        )
+        if not job_id:
+            return None
+        return job_id.decode("utf-8") if isinstance(job_id, bytes) else job_id
+
+    async def ack(self, job_id: str, worker: int = 0) -> None:
+        await self._client.lrem(self._processing_key(worker), 1, job_id)
+
+    async def migrate_to(self, other: BaseJobQueue) -> int:
+        """
+        切换到其他队列（改回本地队列或更换 Redis 实例/命名空间）时，按出队顺序取出尚未开始的任务提交到新队列，
+        避免任务滞留在不再被消费的 Redis 列表中；新队列已满的任务标记为失败。已结束任务的记录留在 Redis 中按 TTL 过期。
+        新旧队列是同一个 Redis 列表时无需迁移
+        """
+        if isinstance(other, RedisJobQueue) and (other._location, other._queue_key) == (self._location, self._queue_key):
+            return 0
+        migrated = 0
+        # 以当前长度为上限：迁移期间其他实例新入队的任务留给它们处理
+        for _ in range(await self.depth()):
+            raw = await self._client.rpop(self._queue_key)
+            if raw is None:
+                break
+            job_id = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+            job = await self.get(job_id)
+            if job is None:
+                continue
+            try:
+                await other.submit(job)
+                migrated += 1
+            except JobQueueFullError:
+                job["status"] = JobStatusConst.FAILED
+                job["error"] = "配置重载后新队列已满，任务未能迁移"
+                job["finished_at"] = time.time()
+                await other.save(job)
+            await self._client.delete(self._job_key(job_id))
+        return migrated
+
+    async def start(self) -> None:
+        await self._beat()
+        await self.requeue_stale()
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop(), name="job-queue-heartbeat")
+
+    async def requeue_stale(self) -> int:
+        """把心跳已过期的消费者处理中列表里的任务放回队首，返回重新入队的任务数"""
+        prefix = f"{self.namespace}:processing:"
+        requeued = 0
+        async for raw_key in self._client.scan_iter(match=f"{prefix}*"):
+            key = raw_key.decode("utf-8") if isinstance(raw_key, bytes) else raw_key
+            consumer_id = key[len(prefix):].rsplit(":", 1)[0]
+            if consumer_id == self.consumer_id or await self._client.exists(self._heartbeat_key(consumer_id)):
+                continue
+            while await self._client.lmove(key, self._queue_key, src="RIGHT", dest="RIGHT"):
+                requeued += 1
+        if requeued:
+            logger.warning(f"♻️ 已重新入队 {requeued} 个异常退出的 worker 遗留任务", module_name=self.CHINESE_NAME)
+        return requeued
+
+    async def _beat(self) -> None:
+        await self._client.set(self._heartbeat_key(self.consumer_id), str(time.time()), ex=self.HEARTBEAT_TTL_SECONDS)
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.HEARTBEAT_SECONDS)
+            try:
+                await self._beat()
+                await self.requeue_stale()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ 任务队列心跳失败: {e}", module_name=self.CHINESE_NAME)
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        payload = json.dumps(job, ensure_ascii=False, default=str)
+        ttl = self.result_ttl if job.get("status") in JobStatusConst.finished() and self.result_ttl > 0 else None
+        await self._client.set(self._job_key(job["job_id"]), payload, ex=ttl)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self._client.get(self._job_key(job_id))
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    async def depth(self) -> int:
+        return int(await self._client.llen(self._queue_key))
+
+    async def close(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+        try:
+            # 删除心跳：本实例处理中列表里未确认的任务（如关闭时被取消）由下一个启动的实例重新入队
+            await self._client.delete(self._heartbeat_key(self.consumer_id))
+            await self._client.aclose()
+        except Exception as e:
+            logger.warning(f"关闭 Redis 任务队列连接失败: {e}", module_name=self.CHINESE_NAME)
+
+
+def create_job_queue(c) -> BaseJobQueue:
+    backend = c.JOB_QUEUE_BACKEND
+    if backend == c.STORAGE_LOCAL:
+        return LocalJobQueue(max_size=c.JOB_QUEUE_MAX_SIZE, result_ttl=c.JOB_RESULT_TTL)
+    elif backend == c.STORAGE_REDIS:
+        return RedisJobQueue(c, max_size=c.JOB_QUEUE_MAX_SIZE, result_ttl=c.JOB_RESULT_TTL)
+    else:
+        raise ValueError(f"Unsupported job queue backend: {backend}")
+
+
+class JobManager:
+    """
+    分析任务管理器：
+    - submit 立即返回 job_id，由固定数量的 worker 协程通过 MetaCognitiveOrchestrator.run 消费队列
+    - 通过流水线进度事件（on_event）维护每个步骤的执行状态
+    """
+    CHINESE_NAME = "分析任务管理器"
+    POLL_TIMEOUT_SECONDS = 1.0
+
+    def __init__(self, orchestrator, job_queue: BaseJobQueue, workers: int = 2, stage_name: str = "perception"):
+        if workers <= 0:
+            raise ValueError("workers 必须是正整数")
+        self.orchestrator = orchestrator
+        self.job_queue = job_queue
+        self.workers = workers
+        self.stage_name = stage_name
+        self._worker_tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self._reconfigure_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        if self._worker_tasks:
+            return
+        self._stopping = False
+        await self.job_queue.start()
+        self._worker_tasks = [
+            asyncio.create_task(self._worker_loop(idx), name=f"job-worker-{idx}")
+            for idx in range(self.workers)
+        ]
+        logger.info(
+            f"🚀 分析任务 worker 已启动: {self.workers} 个, 队列: {self.job_queue.CHINESE_NAME}",
+            module_name=self.CHINESE_NAME
+        )
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        await self.job_queue.close()
+        logger.info("🛑 分析任务 worker 已停止", module_name=self.CHINESE_NAME)
+
+    async def reconfigure(self, job_queue: BaseJobQueue, workers: int) -> None:
+        """
+        配置重载：等待各 worker 完成手头任务后退出，切换到新队列与 worker 数再重新启动。
+        旧队列中尚未开始的任务与任务记录迁移到新队列（Redis 队列本身持久，任务留在 Redis 中）。
+        """
+        if workers <= 0:
+            raise ValueError("workers 必须是正整数")
+        async with self._reconfigure_lock:
+            self._stopping = True
+            await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+            self._worker_tasks = []
+            old_queue, self.job_queue, self.workers = self.job_queue, job_queue, workers
+            if old_queue is not job_queue:
+                migrated = await old_queue.migrate_to(job_queue)
+                await old_queue.close()
+                if migrated:
+                    logger.info(f"📦 已迁移 {migrated} 个排队任务到新队列", module_name=self.CHINESE_NAME)
+            await self.start()
+
+    async def submit(self, user_input: str, **kwargs) -> Dict[str, Any]:
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": JobStatusConst.QUEUED,
+            "stage_name": self.stage_name,
+            "user_input": user_input,
+            "kwargs": kwargs,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "current_phase": None,
+            "steps": {},
+            "report_url": None,
+            "error": None,
+        }
+        await self.job_queue.submit(job)
+        logger.info(f"📥 分析任务已入队: {job['job_id']}", module_name=self.CHINESE_NAME)
+        return self.public_view(job)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = await self.job_queue.get(job_id)
+        return self.public_view(job) if job else None
+
+    async def depth(self) -> int:
+        return await self.job_queue.depth()
+
+    @staticmethod
+    def public_view(job: Dict[str, Any]) -> Dict[str, Any]:
+        """对外视图：不回传原始输入文本，附加步骤进度汇总"""
+        steps = job.get("steps") or {}
+        done = sum(1 for status in steps.values() if status != StepStatusConst.PENDING)
+        return {
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "current_phase": job.get("current_phase"),
+            "progress": {"completed": done, "total": len(steps)},
+            "steps": steps,
+            "report_url": job.get("report_url"),
+            "error": job.get("error"),
+            "created_at": job.get("created_at"),
+            "started_at": job.get("started_at"),
+            "finished_at": job.get("finished_at"),
+        }
+
+    async def _worker_loop(self, idx: int) -> None:
+        while not self._stopping:
+            try:
+                job_id = await self.job_queue.next_job(self.POLL_TIMEOUT_SECONDS, idx)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ worker-{idx} 获取任务失败: {e}", module_name=self.CHINESE_NAME)
+                await asyncio.sleep(self.POLL_TIMEOUT_SECONDS)
+                continue
+            if job_id is None:
+                continue
+            # 服务关闭时被取消的任务不确认：持久队列中的任务由下次启动的 worker 重新执行
+            try:
+                await self._execute(idx, job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 读取任务记录失败（如 Redis 暂时不可用）：不确认，持久队列中的任务在实例重启后重新入队
+                logger.exception(f"💥 worker-{idx} 处理任务异常: {job_id}", module_name=self.CHINESE_NAME)
+                await asyncio.sleep(self.POLL_TIMEOUT_SECONDS)
+                continue
+            try:
+                await self.job_queue.ack(job_id, idx)
+            except Exception as e:
+                logger.error(f"❌ worker-{idx} 任务确认失败 [{job_id}]: {e}", module_name=self.CHINESE_NAME)
+
+    async def _execute(self, idx: int, job_id: str) -> None:
+        job: Optional[Dict[str, Any]] = None
+
+        async def _on_event(message: Dict[str, Any]) -> None:
+            self._apply_event(job, message)
+            await self.job_queue.save(job)
+
+        try:
+            job = await self.job_queue.get(job_id)
+            if job is None:
+                logger.warning(f"⚠️ worker-{idx} 任务记录不存在或已过期: {job_id}", module_name=self.CHINESE_NAME)
+                return
+            if job["status"] in JobStatusConst.finished():
+                # 重新投递的任务此前已执行完毕（确认前进程退出）
+                return
+
+            job["status"] = JobStatusConst.RUNNING
+            job["started_at"] = time.time()
+            await self.job_queue.save(job)
+            logger.info(f"⚡ worker-{idx} 开始执行任务: {job_id}", module_name=self.CHINESE_NAME)
+
+            result = await self.orchestrator.run(
+                stage_name=job["stage_name"],
+                user_input=job["user_input"],
+                on_event=_on_event,
+                **(job.get("kwargs") or {})
+            )
+            job["report_url"] = result.get("report_url") or job.get("report_url")
+            job["status"] = JobStatusConst.SUCCEEDED
+            logger.info(f"✅ worker-{idx} 任务完成: {job_id}", module_name=self.CHINESE_NAME)
+        except asyncio.CancelledError:
+            if job is None:
+                raise
+            if self.job_queue.durable:
+                job["status"] = JobStatusConst.QUEUED
+                job["steps"] = {}
+                job["error"] = "任务在服务关闭时被中断，将由下次启动的 worker 重新执行"
+            else:
+                job["status"] = JobStatusConst.FAILED
+                job["error"] = "任务在服务关闭时被取消"
+            raise
+        except Exception as e:
+            if job is None:
+                # 任务记录读取失败，无法记录失败状态，交给 worker 循环处理
+                raise
+            job["status"] = JobStatusConst.FAILED
+            job["error"] = f"{type(e).__name__}: {e}"
+            logger.exception(f"💥 worker-{idx} 任务执行失败: {job_id}", module_name=self.CHINESE_NAME)
+        finally:
+            if job is not None:
+                if job.get("status") in JobStatusConst.finished():
+                    job["finished_at"] = time.time()
+                job["current_phase"] = None
+                try:
+                    await self.job_queue.save(job)
+                except Exception as e:
+                    logger.error(f"❌ 任务状态保存失败 [{job_id}]: {e}", module_name=self.CHINESE_NAME)
+
+    @staticmethod
+    def _apply_event(job: Dict[str, Any], message: Dict[str, Any]) -> None:
+        event = message.get("event")
+        if event == EVENT_PIPELINE_START:
+            job["steps"] = {step["id"]: StepStatusConst.PENDING for step in message.get("steps", [])}
+        elif event == EVENT_PHASE_START:
+            job["current_phase"] = message.get("phase")
+        elif event == EVENT_STEP_RESULT:
+            response = message.get("response") or {}
+            job["steps"][message["step_id"]] = (
+                StepStatusConst.SUCCEEDED if response.get("__success") else StepStatusConst.FAILED
+            )
+        elif event == EVENT_STEP_SKIPPED:
+            job["steps"][message["step_id"]] = StepStatusConst.SKIPPED
+        elif event == EVENT_REPORT:
+            job["report_url"] = message.get("report_url")
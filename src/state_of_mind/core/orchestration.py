@@ -1,4 +1,5 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator
+from src.state_of_mind.core.types import BatchItemResult
 from src.state_of_mind.stages.perception.stage_pipeline import PerceptionPipeline
 
 
@@ -23,3 +24,8 @@ class MetaCognitiveOrchestrator:
         if stage_name not in self.stages:
             raise ValueError(f"未知阶段: {stage_name}")
         return await self.stages[stage_name].run_batch(user_inputs, **kwargs)
+
+    def iter_batch(self, stage_name: str, user_inputs, **kwargs) -> AsyncIterator[BatchItemResult]:
+        if stage_name not in self.stages:
+            raise ValueError(f"未知阶段: {stage_name}")
+        return self.stages[stage_name].iter_batch(user_inputs, **kwargs)
@@ -1,4 +1,4 @@
-from typing import Protocol, Dict, Any, List
+from typing import Protocol, Dict, Any, List, NamedTuple, Optional
 
 
 class StageProtocol(Protocol):
@@ -14,6 +14,17 @@ class StageProtocol(Protocol):
 
     async def run_batch(self, inputs: List[str], category: str, **kwargs) -> List[Dict[str, Any]]:
         """
-        批量执行。保持输入输出顺序一致。
+        批量执行。保持输入输出顺序一致；单条失败不中断整批。
         """
         pass
+
+
+class BatchItemResult(NamedTuple):
+    """批量执行中单个文档的结果（按输入顺序标记 index，完成即产出）"""
+    index: int
+    input_hash: str
+    success: bool
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    resumed: bool = False
+    elapsed_ms: float = 0.0
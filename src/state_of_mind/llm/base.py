@@ -1,51 +1,219 @@
+import asyncio
+import hashlib
 import json
 import time
 from typing import Dict, Any, Optional
 from abc import ABC, abstractmethod
 from src.state_of_mind.common.llm_response import LLMResponse
+from src.state_of_mind.llm.rate_limiter import LLMRateLimiter, parse_retry_after
+from src.state_of_mind.llm.streaming import StreamingJSONConsumer
 from src.state_of_mind.stages.perception.data_validator import DataValidator
 from src.state_of_mind.utils.async_decorators import async_timed
 from src.state_of_mind.utils.llm_helpers import remove_check, extract_json_safely
 from src.state_of_mind.utils.logger import LoggerManager as logger
 import httpx
-from src.state_of_mind.utils.retry_util import retry_decorator
+from src.state_of_mind.utils.retry_util import CircuitBreaker, CircuitOpenError, get_circuit_breaker, retry_decorator
 
+# LLM 调用统一的重试与熔断策略：熔断器打开时不发请求，直接返回系统错误；
+# 熔断器的成功/失败由 _post_with_limits 按 HTTP 结果反馈（各调用方法内部会把异常转换为错误结果）
+llm_retry = retry_decorator(
+    max_retries=3,
+    enable_exp_backoff=True,
+    circuit_breaker=lambda self, *args, **kwargs: self.circuit_breaker(),
+    on_circuit_open=lambda exc, call: call["self"]._circuit_open_response(exc, call),
+    record_outcomes=False
+)
 
-class LLMBackend(ABC):
+
+class BaseLLMBackend(ABC):
+    """
+    与协议无关的 LLM 后端契约：所有注册到 GlobalSingletonRegistry 的后端必须继承
+    - 四个调用入口返回标准化 LLMResponse 字典
+    - 生命周期：init → (prewarm) → retire / drain_and_close → close
+    直接发送 HTTP 请求的后端继承 LLMBackend；只做分发的后端（如多后端路由）直接继承本类
+    """
+    CHINESE_NAME = "LLM 后端协议基类"
+
+    def __init__(self):
+        self._initialized = False
+        self._retired = False
+        # 进程级限流器，由 GlobalSingletonRegistry 在创建实例时注入
+        self.rate_limiter: Optional[LLMRateLimiter] = None
+
+    @abstractmethod
+    async def init(self, configs: Dict[str, Any]) -> 'BaseLLMBackend':
+        pass
+
+    async def prewarm(self, connections: int) -> int:
+        """预先建立连接，返回成功建立的连接数；无连接池的后端无需预热"""
+        return 0
+
+    async def drain_and_close(self, timeout: Optional[float] = None) -> None:
+        """退役并关闭：子类可在关闭前等待在途请求结束"""
+        self.retire()
+        await self.close()
+
+    @abstractmethod
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def async_call(self, prompt: str, model: str, params: dict, template_name: str, step_name: str,
+                         prompt_type: str) -> Dict[str, Any]:
+        """JSON 结构化步骤"""
+
+    @abstractmethod
+    async def generate_text(self, prompt: str, model: str, params: dict, step_name: str,
+                            prompt_type: str) -> Dict[str, Any]:
+        """自由文本（如建议）"""
+
+    @abstractmethod
+    async def guided_global_semantic_signature(self, prompt: str, model: str, params: dict, step_name: str,
+                                               prompt_type: str) -> Dict[str, Any]:
+        """全局语义标识"""
+
+    @abstractmethod
+    async def bottom_dissolving_pronouns(self, prompt: str, model: str, params: dict, step_name: str,
+                                         prompt_type: str) -> Dict[str, Any]:
+        """指代消解（JSON）"""
+
+
+class LLMBackend(BaseLLMBackend):
     """
-    抽象基类：所有 LLM 后端必须继承
+    抽象基类：直接调用 LLM HTTP API 的后端必须继承，子类只需实现请求体构建与响应解析
     """
     CHINESE_NAME = "抽象基类LLM后端"
+    # 是否必须配置 api_key（本地模拟后端无需密钥）
+    _requires_api_key = True
 
     def __init__(self):
+        super().__init__()
         self.client: Optional[httpx.AsyncClient] = None
         self.api_url: Optional[str] = None
-        self._initialized = False
         self.data_validator = DataValidator()
+        # 熔断器作用域：路由后端为每个路由设置 "route:<名称>"；API 密钥只以指纹参与熔断器 key
+        self.breaker_scope: Optional[str] = None
+        self._key_fingerprint = ""
+        # 在途 HTTP 请求计数：配置重载后实例退役，待在途请求结束再关闭连接池
+        self._inflight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._custom_transport = False
+        self._read_timeout = 60.0
+        self._connect_timeout = 10.0
+        # JSON 步骤是否使用流式输出（async_call）
+        self._stream = False
 
     async def init(self, configs: Dict[str, Any]) -> 'LLMBackend':
         if self._initialized:
             return self
 
         api_key = configs.get("api_key")
-        if not api_key:
+        if not api_key and self._requires_api_key:
             raise ValueError(f"{self.CHINESE_NAME} 缺少 api_key 配置")
 
-        timeout = int(configs.get("timeout", 60.0))
         self.api_url = self._build_api_url(configs)
+        self._key_fingerprint = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:8] if api_key else ""
+        self._stream = bool(configs.get("stream"))
+        transport = self._build_transport(configs)
+        self._custom_transport = transport is not None
         self.client = httpx.AsyncClient(
-            headers=self._build_headers(api_key),
-            timeout=timeout
+            headers=self._build_headers(api_key or ""),
+            timeout=self._build_timeout(configs),
+            limits=self._build_limits(configs),
+            http2=self._use_http2(configs),
+            transport=transport
         )
         self._initialized = True
         logger.info(f"✅ {self.CHINESE_NAME} 初始化完成" + (f"，API URL: {self.api_url}" if self.api_url else ""))
         return self
 
+    def _build_timeout(self, configs: Dict[str, Any]) -> httpx.Timeout:
+        """读超时为模型生成耗时上限；建连/写入/等待连接池单独设置，网络故障可尽快失败并重试"""
+        self._read_timeout = float(configs.get("timeout", 60.0))
+        self._connect_timeout = float(configs.get("connect_timeout") or 10.0)
+        return httpx.Timeout(
+            connect=self._connect_timeout,
+            read=self._read_timeout,
+            write=float(configs.get("write_timeout") or 30.0),
+            pool=float(configs.get("pool_timeout") or 30.0)
+        )
+
+    @staticmethod
+    def _build_limits(configs: Dict[str, Any]) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=configs.get("max_connections") or 100,
+            max_keepalive_connections=configs.get("max_keepalive") or 20,
+            keepalive_expiry=configs.get("keepalive_expiry", 30.0)
+        )
+
+    def _use_http2(self, configs: Dict[str, Any]) -> bool:
+        # 自定义传输（如本地模拟后端）不经过连接池，HTTP/2 无意义
+        if not configs.get("http2") or self._custom_transport:
+            return False
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            raise RuntimeError(
+                "❌ LLM HTTP/2 需要安装 'h2' 包。请在 requirements.txt 中添加 'httpx[http2]' 并重建镜像。"
+            )
+        return True
+
+    @property
+    def retired(self) -> bool:
+        """已因配置变更退役：调用方应重新向注册中心获取实例"""
+        return self._retired
+
+    def retire(self) -> None:
+        self._retired = True
+
+    async def prewarm(self, connections: int) -> int:
+        """
+        预先建立连接放入连接池（含 TLS 握手），首批请求无需再建连：
+        对 API 地址并发发送 HEAD，收到任何 HTTP 响应（多数 API 对 HEAD 返回 404/405）即视为连接已建立，
+        只有传输层错误（建连失败、超时等）计为失败；返回成功建立的连接数
+        """
+        if self.client is None or connections <= 0 or self._custom_transport:
+            return 0
+
+        async def _touch() -> bool:
+            try:
+                await self.client.head(self.api_url, timeout=self._connect_timeout)
+                return True
+            except httpx.TransportError as e:
+                logger.warning(f"⚠️ 预热连接失败: {type(e).__name__}: {e}", module_name=self.CHINESE_NAME)
+                return False
+
+        results = await asyncio.gather(*(_touch() for _ in range(connections)))
+        warmed = sum(results)
+        logger.info(f"🔥 LLM 连接预热完成: {warmed}/{connections}", module_name=self.CHINESE_NAME)
+        return warmed
+
+    async def drain_and_close(self, timeout: Optional[float] = None) -> None:
+        """
+        退役并关闭：不再分配给新请求，等待在途请求结束（默认最多一个读超时）后关闭连接池；
+        超时仍未结束的请求会因连接关闭而失败
+        """
+        self.retire()
+        if self._inflight:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout if timeout is not None else self._read_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"⚠️ 等待在途请求结束超时，强制关闭连接池（剩余 {self._inflight} 个）",
+                    module_name=self.CHINESE_NAME
+                )
+        await self.close()
+
     @abstractmethod
     def _build_api_url(self, configs: Dict[str, Any]) -> str:
         """子类提供 API 地址构建逻辑"""
         pass
 
+    def _build_transport(self, configs: Dict[str, Any]) -> Optional[httpx.AsyncBaseTransport]:
+        """默认使用 httpx 自带网络传输，子类可 override（如本地模拟后端）"""
+        return None
+
     def _build_headers(self, api_key: str) -> dict:
         """默认 header，子类可 override"""
         return {
@@ -85,11 +253,27 @@ class LLMBackend(ABC):
     def _extract_content_from_response(self, data: Dict) -> Optional[str]:
         pass
 
+    # ========================
+    # 流式输出（默认 OpenAI 兼容协议，子类可 override）
+    # ========================
+    def _build_stream_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {**payload, "stream": True, "stream_options": {"include_usage": True}}
+
+    def _stream_headers(self) -> Dict[str, str]:
+        return {"Accept": "text/event-stream"}
+
+    def _extract_stream_delta(self, event: Dict) -> Optional[str]:
+        """单个 SSE 事件中的增量文本"""
+        try:
+            return event["choices"][0]["delta"].get("content")
+        except (KeyError, IndexError, TypeError, AttributeError):
+            return None
+
     # ========================
     # 统一调用入口（模板方法）
     # ========================
     @async_timed
-    @retry_decorator(max_retries=3, enable_exp_backoff=True)
+    @llm_retry
     async def async_call(
             self,
             prompt: str,
@@ -123,14 +307,21 @@ class LLMBackend(ABC):
             })
 
             assert self.client is not None and self.api_url is not None, "未初始化 client 或 api_url"
-            response = await self.client.post(self.api_url, json=payload)
+            consumer = None
+            if self._stream:
+                payload = self._build_stream_payload(payload)
+                consumer = StreamingJSONConsumer(self, self.data_validator, template_name, step_name)
+            response = await self._post_with_limits(payload, prompt, params, consumer)
             latency_ms = (time.time() - start_time) * 1000
 
             # 记录原始响应（用于调试）
-            try:
-                resp_debug = response.json()
-            except Exception:
-                resp_debug = response.text[:200]
+            if consumer is not None and response.status_code == 200:
+                resp_debug = consumer.content
+            else:
+                try:
+                    resp_debug = response.json()
+                except Exception:
+                    resp_debug = response.text[:200]
             logger.info(f"[{self.CHINESE_NAME} - 原始数据处理] 原始响应: {resp_debug}")
 
             # --- 处理非 200 响应 ---
@@ -167,6 +358,8 @@ class LLMBackend(ABC):
                     ).to_dict()
 
             # --- 处理 200 响应 ---
+            if consumer is not None:
+                return self._build_stream_result(consumer, model, template_name, step_name, prompt_type, latency_ms)
             content = self._extract_content_from_response(response.json())
             if not content or not content.strip():
                 api_error = "模型返回内容为空"
@@ -219,8 +412,59 @@ class LLMBackend(ABC):
                 include_traceback=True
             ).to_dict()
 
+    def _build_stream_result(
+            self,
+            consumer: StreamingJSONConsumer,
+            model: str,
+            template_name: str,
+            step_name: str,
+            prompt_type: str,
+            latency_ms: float
+    ) -> Dict[str, Any]:
+        """流式响应的标准化结果：根对象已增量解析完成时直接校验，省去代码块剥离与正则抽取"""
+        content = consumer.content.strip()
+        if consumer.abort_reason:
+            # 中途断开的输出不完整：不视为成功调用，避免被写入步骤缓存
+            result = LLMResponse.from_system_error(
+                system_error=f"流式输出已中止: {consumer.abort_reason}",
+                model=model,
+                template_name=template_name,
+                step_name=step_name,
+                prompt_type=prompt_type,
+                include_traceback=False
+            ).to_dict()
+            result["__raw_response"] = content
+            result["latency_ms"] = latency_ms
+            return result
+
+        if not content:
+            logger.warning("模型返回空内容", extra={"template_name": template_name, "step_name": step_name})
+            validation_result = {"is_valid": False, "cleaned_data": {}, "errors": ["模型返回内容为空"]}
+        else:
+            parsed = consumer.parser.value()
+            if parsed is None:
+                # 根对象未闭合（如输出被截断）：回退到整段抽取
+                parsed = extract_json_safely(remove_check(content))
+            validation_result = self.data_validator.validate(
+                data=parsed,
+                template_name=template_name,
+                step_name=step_name
+            )
+        return LLMResponse.from_successful_call(
+            valid_structure=validation_result["is_valid"],
+            data=validation_result["cleaned_data"] or {},
+            raw_response=content or None,
+            validation_errors=validation_result["errors"],
+            api_error="模型返回内容为空" if not content else None,
+            model=model,
+            template_name=template_name,
+            step_name=step_name,
+            prompt_type=prompt_type,
+            latency_ms=latency_ms
+        ).to_dict()
+
     @async_timed
-    @retry_decorator(max_retries=3, enable_exp_backoff=True)
+    @llm_retry
     async def generate_text(
             self,
             prompt: str,
@@ -239,7 +483,7 @@ class LLMBackend(ABC):
         )
 
     @async_timed
-    @retry_decorator(max_retries=3, enable_exp_backoff=True)
+    @llm_retry
     async def guided_global_semantic_signature(
             self,
             prompt: str,
@@ -258,7 +502,7 @@ class LLMBackend(ABC):
         )
 
     @async_timed
-    @retry_decorator(max_retries=3, enable_exp_backoff=True)
+    @llm_retry
     async def bottom_dissolving_pronouns(
             self,
             prompt: str,
@@ -276,6 +520,124 @@ class LLMBackend(ABC):
             payload_fn=self._build_json_payload
         )
 
+    # ========================
+    # 熔断
+    # ========================
+    def circuit_breaker(self) -> Optional[CircuitBreaker]:
+        """
+        按 (后端类型, API 地址, 路由, API 密钥指纹) 共享的熔断器：同一地址下不同路由/密钥的故障
+        （如某个密钥被封禁或配额耗尽）互不影响；XINJING_LLM_BREAKER_FAILURE_RATE=0 时关闭
+        """
+        from src.state_of_mind.config import config
+        if config.LLM_BREAKER_FAILURE_RATE <= 0 or not self.api_url:
+            return None
+        key_parts = [type(self).__name__, self.api_url, self.breaker_scope,
+                     f"key:{self._key_fingerprint}" if self._key_fingerprint else None]
+        return get_circuit_breaker(
+            "|".join(part for part in key_parts if part),
+            failure_rate=config.LLM_BREAKER_FAILURE_RATE,
+            min_calls=config.LLM_BREAKER_MIN_CALLS,
+            window_seconds=config.LLM_BREAKER_WINDOW_SECONDS,
+            open_seconds=config.LLM_BREAKER_OPEN_SECONDS
+        )
+
+    def _circuit_open_response(self, error: CircuitOpenError, call: Dict[str, Any]) -> Dict[str, Any]:
+        logger.debug(f"⚡ [{call.get('step_name')}] {error}", module_name=self.CHINESE_NAME)
+        return LLMResponse.from_system_error(
+            system_error=str(error),
+            model=call.get("model") or "unknown",
+            template_name=call.get("template_name", ""),
+            step_name=call.get("step_name", ""),
+            prompt_type=call.get("prompt_type", ""),
+            include_traceback=False
+        ).to_dict()
+
+    # ========================
+    # 限流准入
+    # ========================
+    async def _post_with_limits(
+            self,
+            payload: Dict[str, Any],
+            prompt: str,
+            params: dict,
+            consumer: Optional[StreamingJSONConsumer] = None
+    ) -> httpx.Response:
+        """
+        所有 LLM HTTP 请求的唯一出口：先经全局限流器准入，再根据响应反馈自适应调整；
+        5xx 与网络错误/超时计入熔断器失败，429 只交给限流器退避
+        """
+        breaker = self.circuit_breaker()
+        self._inflight += 1
+        self._idle.clear()
+        try:
+            if self.rate_limiter is None:
+                response = await self._send(payload, consumer)
+            else:
+                async with self.rate_limiter.limit(self._estimate_tokens(prompt, params)) as lease:
+                    response = await self._send(payload, consumer)
+                    if response.status_code == 429:
+                        await self.rate_limiter.on_rate_limited(parse_retry_after(response.headers.get("Retry-After")))
+                    elif response.status_code == 200:
+                        await self.rate_limiter.on_success()
+                        lease.actual_tokens = (
+                            consumer.total_tokens if consumer is not None else self._extract_total_tokens(response)
+                        )
+        except httpx.PoolTimeout:
+            # 本地连接池排队超时，与服务端健康无关
+            raise
+        except httpx.TransportError:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        finally:
+            self._inflight -= 1
+            if not self._inflight:
+                self._idle.set()
+
+        if breaker is not None:
+            if response.status_code >= 500:
+                breaker.record_failure()
+            elif response.status_code != 429:
+                breaker.record_success()
+        return response
+
+    async def _send(self, payload: Dict[str, Any], consumer: Optional[StreamingJSONConsumer]) -> httpx.Response:
+        if consumer is None:
+            return await self.client.post(self.api_url, json=payload)
+        # 流式：200 时边读边解析（中止时退出上下文即断开连接）；其他状态码读完整个响应体，按非流式处理
+        async with self.client.stream("POST", self.api_url, json=payload, headers=self._stream_headers()) as response:
+            if response.status_code == 200:
+                await consumer.consume(response)
+            else:
+                await response.aread()
+        return response
+
+    @staticmethod
+    def _estimate_tokens(prompt: str, params: dict) -> int:
+        """粗略预估：中文约 1 字符 ≈ 1 token（偏保守），再加上最大输出 token"""
+        params = params or {}
+        max_output = params.get("max_output_tokens") or params.get("max_tokens") or 0
+        return len(prompt or "") + int(max_output)
+
+    @staticmethod
+    def _extract_total_tokens(response) -> Optional[int]:
+        try:
+            return LLMBackend.usage_tokens(response.json())
+        except Exception:
+            return None
+
+    @staticmethod
+    def usage_tokens(data: Dict) -> Optional[int]:
+        """响应体或流式事件中的 usage 总 token 数，缺失时返回 None"""
+        try:
+            usage = data.get("usage") or {}
+            total = usage.get("total_tokens")
+            if total is None and ("input_tokens" in usage or "output_tokens" in usage):
+                total = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+            return int(total) if total is not None else None
+        except Exception:
+            return None
+
     @staticmethod
     def _parse_api_error(response) -> str:
         """可被子类 override 以定制错误解析"""
@@ -302,7 +664,7 @@ class LLMBackend(ABC):
         start_time = time.time()
         try:
             payload = payload_fn(prompt=prompt, model=model, params=params)
-            response = await self.client.post(self.api_url, json=payload)
+            response = await self._post_with_limits(payload, prompt, params)
             latency_ms = (time.time() - start_time) * 1000
 
             logger.info(
@@ -384,7 +746,7 @@ class LLMBackend(ABC):
                 params=params,
                 system_prompt=system_prompt
             )
-            response = await self.client.post(self.api_url, json=payload)
+            response = await self._post_with_limits(payload, prompt, params)
             latency_ms = (time.time() - start_time) * 1000
 
             logger.info(
@@ -0,0 +1,308 @@
+"""
+本地模拟 LLM 后端（压测 / 基准专用）
+
+- 协议与 DeepSeek 一致（OpenAI chat/completions），请求经 httpx.MockTransport 在进程内应答，
+  因此限流、重试、JSON 抽取与结构校验等链路与真实后端完全相同
+- 按 prompt 开头的角色设定识别步骤，依据 REQUIRED_FIELDS_BY_CATEGORY 生成结构合法的 JSON
+- 内容由 (seed, prompt) 决定：同一输入多次运行结果一致；参与者名由用户输入决定，
+  保证参与者提取、感知事件与指代消解彼此对得上
+- 延迟分布与故障（5xx / 429 / 非法 JSON）注入由 XINJING_MOCK_* 配置控制
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from .deepseek import AsyncDeepSeekBackend
+from src.state_of_mind.prompt_templates.prompt_templates import LLM_PROMPTS_SCHEMA
+from src.state_of_mind.stages.perception.constants import REQUIRED_FIELDS_BY_CATEGORY, CATEGORY_RAW, \
+    COREFERENCE_RESOLUTION_BATCH, GLOBAL_SEMANTIC_SIGNATURE
+from src.state_of_mind.utils.logger import LoggerManager as logger
+
+MOCK_LATENCY_DISTRIBUTIONS = {"fixed", "uniform", "lognormal"}
+
+# 模拟参与者名池（按用户输入哈希稳定抽取）
+_MOCK_NAMES = ["林晓", "陈默", "王芳", "赵磊", "周宁", "吴昊", "孙悦", "李然", "郑伟", "许静"]
+# 交给 ParticipantFilter 的代词：前者触发 LLM 指代消解，后者被直接丢弃
+_MOCK_RESOLVABLE_PRONOUNS = ["他", "她"]
+_MOCK_EXCLUDED_PRONOUNS = ["别人", "有人"]
+
+_USER_INPUT_PATTERN = re.compile(r"### USER_INPUT BEGIN（用户原始输入开始）\n(.*?)\n### USER_INPUT END", re.S)
+_COREF_PRONOUN_PATTERN = re.compile(r"^(\d+) -> “(.+?)”$", re.M)
+_COREF_PARTICIPANT_PATTERN = re.compile(r"^- (.+)$", re.M)
+_FRAGMENT_SPLIT_PATTERN = re.compile(r"[，。！？；、,.!?;\n]+")
+
+
+class AsyncMockLLMBackend(AsyncDeepSeekBackend):
+    """
+    本地模拟后端：不访问网络、无需 api_key。
+    内容随机数以 (seed, prompt) 为种子；延迟与故障注入使用独立的全局序列随机数（以 seed 初始化）。
+    """
+
+    CHINESE_NAME = "本地模拟 LLM 后端"
+    _requires_api_key = False
+    _uses_api_url = False
+    # 注入 429 时返回的 Retry-After（秒）
+    RETRY_AFTER_SECONDS = 1
+    # 流式应答：首个分片前消耗的延迟占比（其余均摊到各分片），每个分片的字符数
+    STREAM_FIRST_TOKEN_SHARE = 0.2
+    STREAM_CHUNK_CHARS = 16
+
+    def __init__(self):
+        super().__init__()
+        from src.state_of_mind.config import config
+        self.seed = config.MOCK_SEED
+        self.latency_distribution = config.MOCK_LATENCY_DISTRIBUTION
+        if self.latency_distribution not in MOCK_LATENCY_DISTRIBUTIONS:
+            logger.warning(f"⚠️ 未知的模拟延迟分布 '{self.latency_distribution}'，回退为 fixed",
+                           module_name=self.CHINESE_NAME)
+            self.latency_distribution = "fixed"
+        self.latency_ms = max(0.0, float(config.MOCK_LATENCY_MS))
+        self.latency_sigma = max(0.0, float(config.MOCK_LATENCY_SIGMA))
+        self.error_rate = config.MOCK_ERROR_RATE
+        self.rate_limit_rate = config.MOCK_RATE_LIMIT_RATE
+        self.malformed_rate = config.MOCK_MALFORMED_RATE
+        self._fault_rng = random.Random(self.seed)
+        self._role_index = self._build_role_index()
+        self._coref_head = LLM_PROMPTS_SCHEMA[COREFERENCE_RESOLUTION_BATCH].split("{", 1)[0].strip()
+        self._signature_head = LLM_PROMPTS_SCHEMA[GLOBAL_SEMANTIC_SIGNATURE].split("{", 1)[0].strip()
+        self.calls = 0
+
+    def _build_api_url(self, configs: dict) -> str:
+        base_url = configs.get("api_url") or "http://mock.local"
+        return f"{base_url.rstrip('/')}/chat/completions"
+
+    def _build_headers(self, api_key: str) -> dict:
+        # 不携带任何密钥（配置中可能残留真实后端的 api_key 或占位文本）
+        return {"Content-Type": "application/json"}
+
+    def _build_transport(self, configs: Dict[str, Any]) -> Optional[httpx.AsyncBaseTransport]:
+        return httpx.MockTransport(self._handle_request)
+
+    @staticmethod
+    def _build_role_index() -> List[Tuple[str, str]]:
+        """(角色设定, 步骤名) 列表；按长度倒序，避免短前缀误匹配"""
+        pipeline = LLM_PROMPTS_SCHEMA.get(CATEGORY_RAW, {}).get("pipeline", [])
+        index = [(step["role"].strip(), step["step_name"]) for step in pipeline if step.get("role")]
+        return sorted(index, key=lambda item: len(item[0]), reverse=True)
+
+    # ========================
+    # 传输层：模拟 HTTP 应答
+    # ========================
+    async def _handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        payload = json.loads(request.content or b"{}")
+        messages = payload.get("messages") or []
+        prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        json_mode = any(m.get("role") == "system" for m in messages)
+
+        delay = self._sample_latency()
+        streaming = bool(payload.get("stream"))
+        head_delay = delay * self.STREAM_FIRST_TOKEN_SHARE if streaming else delay
+        if head_delay > 0:
+            await asyncio.sleep(head_delay)
+
+        roll = self._fault_rng.random()
+        if roll < self.rate_limit_rate:
+            return httpx.Response(
+                429,
+                headers={"Retry-After": str(self.RETRY_AFTER_SECONDS)},
+                json={"error": {"type": "rate_limit_exceeded", "message": "模拟限流"}}
+            )
+        roll -= self.rate_limit_rate
+        if roll < self.error_rate:
+            return httpx.Response(503, json={"error": {"type": "server_error", "message": "模拟服务端错误"}})
+
+        content = self.render_content(prompt, json_mode)
+        if json_mode and self._fault_rng.random() < self.malformed_rate:
+            # 截断到一半：模拟输出被截断的非法 JSON
+            content = content[:max(1, len(content) // 2)]
+
+        prompt_tokens = len(prompt)
+        completion_tokens = len(content)
+        if streaming:
+            return self._stream_response(payload, content, prompt_tokens, delay - head_delay)
+        return httpx.Response(200, json={
+            "id": f"mock-{self.calls}",
+            "object": "chat.completion",
+            "model": payload.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+    def _stream_response(self, payload: Dict[str, Any], content: str, prompt_tokens: int,
+                         tail_delay: float) -> httpx.Response:
+        """OpenAI 兼容的 SSE 应答：内容按固定长度分片，剩余延迟均摊到各分片之间"""
+        pieces = [content[i:i + self.STREAM_CHUNK_CHARS] for i in range(0, len(content), self.STREAM_CHUNK_CHARS)]
+        chunk_id = f"mock-{self.calls}"
+        model = payload.get("model")
+
+        def _event(body: Dict[str, Any]) -> bytes:
+            return f"data: {json.dumps(body, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        async def _body():
+            per_chunk = tail_delay / len(pieces) if pieces else 0.0
+            for piece in pieces:
+                if per_chunk > 0:
+                    await asyncio.sleep(per_chunk)
+                yield _event({
+                    "id": chunk_id, "object": "chat.completion.chunk", "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+                })
+            yield _event({
+                "id": chunk_id, "object": "chat.completion.chunk", "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+            })
+            yield _event({
+                "id": chunk_id, "object": "chat.completion.chunk", "model": model, "choices": [],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(content),
+                    "total_tokens": prompt_tokens + len(content)
+                }
+            })
+            yield b"data: [DONE]\n\n"
+
+        return httpx.Response(200, headers={"Content-Type": "text/event-stream"}, content=_body())
+
+    def _sample_latency(self) -> float:
+        """返回秒"""
+        if self.latency_ms <= 0:
+            return 0.0
+        if self.latency_distribution == "uniform":
+            low = self.latency_ms * max(0.0, 1 - self.latency_sigma)
+            high = self.latency_ms * (1 + self.latency_sigma)
+            ms = self._fault_rng.uniform(low, high)
+        elif self.latency_distribution == "lognormal":
+            ms = self._fault_rng.lognormvariate(0.0, self.latency_sigma) * self.latency_ms
+        else:
+            ms = self.latency_ms
+        return ms / 1000
+
+    # ========================
+    # 内容生成
+    # ========================
+    def render_content(self, prompt: str, json_mode: bool) -> str:
+        rng = random.Random(f"{self.seed}:{hashlib.md5(prompt.encode('utf-8')).hexdigest()}")
+        if not json_mode:
+            if prompt.strip().startswith(self._signature_head):
+                return f"raw_{rng.choice(['anxious', 'calm', 'conflicted', 'angry'])}_mock_{rng.getrandbits(32):08x}"
+            fragments = self._fragments(self._extract_user_input(prompt))
+            return "模拟建议：" + "；".join(rng.sample(fragments, min(3, len(fragments)))) + "。"
+
+        if prompt.startswith(self._coref_head):
+            return json.dumps(self._render_coref(prompt, rng), ensure_ascii=False)
+
+        step_name = self._match_step(prompt)
+        if step_name is None:
+            logger.warning("⚠️ 模拟后端无法识别步骤，返回空对象", module_name=self.CHINESE_NAME)
+            return "{}"
+        user_input = self._extract_user_input(prompt)
+        return json.dumps(self.render_step(step_name, user_input, rng), ensure_ascii=False)
+
+    def _match_step(self, prompt: str) -> Optional[str]:
+        for role, step_name in self._role_index:
+            if prompt.startswith(role):
+                return step_name
+        return None
+
+    @staticmethod
+    def _extract_user_input(prompt: str) -> str:
+        match = _USER_INPUT_PATTERN.search(prompt)
+        return match.group(1).strip() if match else prompt[-200:]
+
+    @staticmethod
+    def _fragments(user_input: str) -> List[str]:
+        fragments = [f.strip() for f in _FRAGMENT_SPLIT_PATTERN.split(user_input) if f.strip()]
+        return fragments or [user_input.strip() or "无内容"]
+
+    @staticmethod
+    def participant_names(user_input: str) -> List[str]:
+        """由用户输入稳定决定的参与者名（参与者提取与感知步骤共用）"""
+        rng = random.Random(hashlib.md5(user_input.encode("utf-8")).hexdigest())
+        return rng.sample(_MOCK_NAMES, rng.randint(2, 3))
+
+    def _render_coref(self, prompt: str, rng: random.Random) -> Dict[str, str]:
+        participants = _COREF_PARTICIPANT_PATTERN.findall(prompt.split("待消解项", 1)[0])
+        if not participants:
+            return {}
+        return {
+            idx: rng.choice(participants)
+            for idx, _ in _COREF_PRONOUN_PATTERN.findall(prompt)
+            # 约 20% 保持不确定，模拟模型放弃作答
+            if rng.random() < 0.8
+        }
+
+    def render_step(self, step_name: str, user_input: str, rng: random.Random) -> Dict[str, Any]:
+        rules = REQUIRED_FIELDS_BY_CATEGORY[CATEGORY_RAW].get(step_name, [])
+        validators = {rule[0]: getattr(rule[2], "__name__", "") for rule in rules}
+        ctx = {
+            "rng": rng,
+            "fragments": self._fragments(user_input),
+            "names": self.participant_names(user_input),
+            "validators": validators,
+        }
+        data = {}
+        for path in validators:
+            if "." not in path:
+                data[path] = self._render_node(path, ctx)
+        return data
+
+    def _render_node(self, path: str, ctx: Dict[str, Any]) -> Any:
+        rng: random.Random = ctx["rng"]
+        validators: Dict[str, str] = ctx["validators"]
+        kind = validators.get(path, "")
+        leaf = path.rsplit(".", 1)[-1]
+
+        if kind == "is_dict":
+            return self._render_children(path, ctx)
+        if kind == "is_list":
+            if f"{path}.*" in validators or any(p.startswith(f"{path}.*.") for p in validators):
+                if leaf == "participants":
+                    return [self._render_children(f"{path}.*", ctx, entity=name) for name in ctx["names"]]
+                return [self._render_children(f"{path}.*", ctx) for _ in range(rng.randint(1, 3))]
+            return rng.sample(ctx["fragments"], min(len(ctx["fragments"]), rng.randint(1, 2)))
+        if kind == "is_bool":
+            # 门控字段偏向放行，保证整条流水线被完整压测
+            return rng.random() < (1.0 if leaf == "eligible" else 0.85)
+        if kind == "is_int":
+            return rng.randint(0, 10)
+        if kind == "is_float":
+            return round(rng.random(), 3)
+        return self._render_text(leaf, ctx)
+
+    def _render_children(self, prefix: str, ctx: Dict[str, Any], entity: Optional[str] = None) -> Dict[str, Any]:
+        node = {}
+        depth = prefix.count(".") + 1
+        for path in ctx["validators"]:
+            if path.startswith(f"{prefix}.") and path.count(".") == depth:
+                node[path.rsplit(".", 1)[-1]] = self._render_node(path, ctx)
+        if entity is not None and "entity" in node:
+            node["entity"] = entity
+        return node
+
+    @staticmethod
+    def _render_text(leaf: str, ctx: Dict[str, Any]) -> str:
+        rng: random.Random = ctx["rng"]
+        if leaf in ("experiencer", "agent"):
+            roll = rng.random()
+            if roll < 0.2:
+                return rng.choice(_MOCK_RESOLVABLE_PRONOUNS)
+            if roll < 0.25:
+                return rng.choice(_MOCK_EXCLUDED_PRONOUNS)
+            return rng.choice(ctx["names"])
+        if leaf in ("entity", "target"):
+            return rng.choice(ctx["names"])
+        if leaf == "semantic_notation":
+            return f"mock_{leaf}_{rng.getrandbits(16):04x}"
+        return f"{leaf}：{rng.choice(ctx['fragments'])}"
@@ -44,6 +44,16 @@ class AsyncQwenLLMBackend(LLMBackend):
             **adjusted
         }
 
+    def _build_stream_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # DashScope SSE：incremental_output 使每个事件只携带新增文本
+        return {**payload, "parameters": {**(payload.get("parameters") or {}), "incremental_output": True}}
+
+    def _stream_headers(self) -> Dict[str, str]:
+        return {"Accept": "text/event-stream", "X-DashScope-SSE": "enable"}
+
+    def _extract_stream_delta(self, event: Dict) -> Optional[str]:
+        return self._extract_content_from_response(event)
+
     def _extract_content_from_response(self, data: Dict) -> Optional[str]:
         try:
             if 'output' in data and 'choices' in data['output']:
@@ -0,0 +1,449 @@
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, Optional
+from src.state_of_mind.utils.logger import LoggerManager as logger
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或 HTTP-date），无法解析时返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class LLMRateLimiter:
+    """
+    进程级 LLM 限流器（所有流水线、所有请求共享）：
+    - 并发上限：同时在途的 LLM HTTP 请求数
+    - 请求速率：令牌桶（requests/sec）
+    - token 速率：令牌桶（tokens/min），按 prompt 长度 + 最大输出预估，响应后按 usage 校正
+    - 自适应退避：收到 429 时按 Retry-After（或指数退避）全局暂停准入，并乘性降低速率；
+      成功响应逐步加性恢复
+    任一阈值 <= 0 表示不限制该维度。
+    """
+    CHINESE_NAME = "LLM 全局限流器"
+    MIN_RATE_FACTOR = 0.1
+    RATE_DECREASE = 0.5
+    RATE_INCREASE = 0.05
+    BASE_BACKOFF_SECONDS = 1.0
+    MAX_BACKOFF_SECONDS = 60.0
+    MAX_WAIT_SLICE_SECONDS = 1.0
+
+    def __init__(self, requests_per_second: float = 0, max_concurrency: int = 0, tokens_per_minute: int = 0):
+        self.requests_per_second = float(requests_per_second or 0)
+        self.max_concurrency = int(max_concurrency or 0)
+        self.tokens_per_minute = int(tokens_per_minute or 0)
+
+        self._rate_factor = 1.0
+        self._backoff_seconds = self.BASE_BACKOFF_SECONDS
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency > 0 else None
+
+        now = time.monotonic()
+        self._request_tokens = self._request_capacity()
+        self._request_ts = now
+        self._llm_tokens = float(self.tokens_per_minute)
+        self._llm_ts = now
+
+        self._in_flight = 0
+        self._admitted = 0
+        self._rate_limited = 0
+        self._total_wait_seconds = 0.0
+
+    # ======================
+    # 对外接口
+    # ======================
+    @asynccontextmanager
+    async def limit(self, estimated_tokens: int = 0) -> AsyncIterator["RateLimitLease"]:
+        lease = await self.acquire(estimated_tokens)
+        try:
+            yield lease
+        finally:
+            await self.release(lease)
+
+    async def acquire(self, estimated_tokens: int = 0) -> "RateLimitLease":
+        estimated_tokens = max(0, int(estimated_tokens))
+        if self.tokens_per_minute > 0:
+            # 单次请求超过整桶容量时按整桶计，避免永远无法准入
+            estimated_tokens = min(estimated_tokens, self.tokens_per_minute)
+        lease = RateLimitLease(uuid.uuid4().hex, estimated_tokens)
+        start = time.monotonic()
+
+        await self._acquire_slot(lease)
+        try:
+            while True:
+                wait = await self._try_take(estimated_tokens)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(min(wait, self.MAX_WAIT_SLICE_SECONDS))
+        except BaseException:
+            await self._release_slot(lease)
+            raise
+
+        waited = time.monotonic() - start
+        self._in_flight += 1
+        self._admitted += 1
+        self._total_wait_seconds += waited
+        if waited > self.MAX_WAIT_SLICE_SECONDS:
+            logger.debug(f"⏳ LLM 请求限流等待 {waited:.2f}s", module_name=self.CHINESE_NAME)
+        return lease
+
+    async def release(self, lease: "RateLimitLease", actual_tokens: Optional[int] = None) -> None:
+        if lease.released:
+            return
+        lease.released = True
+        self._in_flight = max(0, self._in_flight - 1)
+        tokens = actual_tokens if actual_tokens is not None else lease.actual_tokens
+        if tokens is not None and self.tokens_per_minute > 0:
+            await self._reconcile_tokens(tokens - lease.estimated_tokens)
+        await self._release_slot(lease)
+
+    async def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """上游返回 429：全局暂停准入并降低速率"""
+        async with self._lock:
+            pause = retry_after if retry_after is not None else self._backoff_seconds
+            self._backoff_seconds = min(self._backoff_seconds * 2, self.MAX_BACKOFF_SECONDS)
+            self._rate_factor = max(self.MIN_RATE_FACTOR, self._rate_factor * self.RATE_DECREASE)
+            self._rate_limited += 1
+        await self._pause(pause)
+        logger.warning(
+            f"🚦 LLM 上游限流（429），暂停准入 {pause:.2f}s，速率系数降至 {self._rate_factor:.2f}",
+            module_name=self.CHINESE_NAME
+        )
+
+    async def on_success(self) -> None:
+        async with self._lock:
+            self._backoff_seconds = self.BASE_BACKOFF_SECONDS
+            self._rate_factor = min(1.0, self._rate_factor + self.RATE_INCREASE)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.__class__.__name__,
+            "requests_per_second": self.requests_per_second,
+            "effective_requests_per_second": round(self._effective_rps(), 3),
+            "max_concurrency": self.max_concurrency,
+            "tokens_per_minute": self.tokens_per_minute,
+            "rate_factor": round(self._rate_factor, 3),
+            "in_flight": self._in_flight,
+            "admitted": self._admitted,
+            "rate_limited": self._rate_limited,
+            "avg_wait_ms": round(self._total_wait_seconds / self._admitted * 1000, 2) if self._admitted else 0.0,
+        }
+
+    async def close(self) -> None:
+        pass
+
+    # ======================
+    # 可覆盖的存储层（本地实现）
+    # ======================
+    async def _acquire_slot(self, lease: "RateLimitLease") -> None:
+        if self._semaphore is not None:
+            await self._semaphore.acquire()
+
+    async def _release_slot(self, lease: "RateLimitLease") -> None:
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    async def _try_take(self, tokens: int) -> float:
+        """尝试扣减令牌，成功返回 0，否则返回建议等待秒数"""
+        async with self._lock:
+            now = time.monotonic()
+            wall_now = time.time()
+            if self._paused_until > wall_now:
+                return self._paused_until - wall_now
+
+            rps = self._effective_rps()
+            if rps > 0:
+                capacity = self._request_capacity()
+                self._request_tokens = min(capacity, self._request_tokens + (now - self._request_ts) * rps)
+                self._request_ts = now
+                if self._request_tokens < 1:
+                    return (1 - self._request_tokens) / rps
+
+            if self.tokens_per_minute > 0 and tokens > 0:
+                per_second = self.tokens_per_minute / 60.0
+                self._llm_tokens = min(
+                    float(self.tokens_per_minute), self._llm_tokens + (now - self._llm_ts) * per_second
+                )
+                self._llm_ts = now
+                if self._llm_tokens < tokens:
+                    return (tokens - self._llm_tokens) / per_second
+                self._llm_tokens -= tokens
+
+            if rps > 0:
+                self._request_tokens -= 1
+            return 0.0
+
+    async def _reconcile_tokens(self, delta: int) -> None:
+        """按实际 usage 校正 token 桶（delta > 0 表示少扣了）"""
+        async with self._lock:
+            self._llm_tokens = min(float(self.tokens_per_minute), self._llm_tokens - delta)
+
+    async def _pause(self, seconds: float) -> None:
+        async with self._lock:
+            self._paused_until = max(self._paused_until, time.time() + seconds)
+
+    # ======================
+    # 内部工具
+    # ======================
+    def _effective_rps(self) -> float:
+        return self.requests_per_second * self._rate_factor
+
+    def _request_capacity(self) -> float:
+        # 突发容量：至少 1 个请求，最多 1 秒的请求量
+        return max(1.0, self.requests_per_second)
+
+
+class RedisLLMRateLimiter(LLMRateLimiter):
+    """
+    Redis 跨进程限流器（复用 XINJING_REDIS_* 配置）：
+    - 令牌桶与全局暂停标记存放在 Redis，通过 Lua 脚本原子扣减
+    - 并发上限使用带租约过期的 ZSET 信号量，进程崩溃后租约自动回收
+    - 速率系数的自适应调整仍在进程内进行，各进程独立收敛
+    - Redis 不可用时在 FALLBACK_SECONDS 内降级为进程内限流（同一套阈值），之后再尝试 Redis
+    """
+    CHINESE_NAME = "Redis LLM 全局限流器"
+    NAMESPACE = "psytext_analyst:ratelimit"
+    LEASE_TTL_SECONDS = 300
+    SLOT_POLL_SECONDS = 0.05
+    FALLBACK_SECONDS = 5.0
+
+    _TAKE_SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local rps = tonumber(ARGV[2])
+    local rps_cap = tonumber(ARGV[3])
+    local tpm = tonumber(ARGV[4])
+    local need = tonumber(ARGV[5])
+    local pause = tonumber(redis.call('GET', KEYS[3]) or '0')
+    if pause > now then return tostring(pause - now) end
+
+    local req_tokens = 0
+    if rps > 0 then
+        local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+        req_tokens = tonumber(b[1]) or rps_cap
+        local ts = tonumber(b[2]) or now
+        req_tokens = math.min(rps_cap, req_tokens + math.max(0, now - ts) * rps)
+        if req_tokens < 1 then return tostring((1 - req_tokens) / rps) end
+    end
+
+    local llm_tokens = 0
+    if tpm > 0 and need > 0 then
+        local per_second = tpm / 60
+        local b = redis.call('HMGET', KEYS[2], 'tokens', 'ts')
+        llm_tokens = tonumber(b[1]) or tpm
+        local ts = tonumber(b[2]) or now
+        llm_tokens = math.min(tpm, llm_tokens + math.max(0, now - ts) * per_second)
+        if llm_tokens < need then return tostring((need - llm_tokens) / per_second) end
+        redis.call('HSET', KEYS[2], 'tokens', tostring(llm_tokens - need), 'ts', tostring(now))
+        redis.call('EXPIRE', KEYS[2], 120)
+    end
+
+    if rps > 0 then
+        redis.call('HSET', KEYS[1], 'tokens', tostring(req_tokens - 1), 'ts', tostring(now))
+        redis.call('EXPIRE', KEYS[1], 60)
+    end
+    return '0'
+    """
+
+    _SLOT_SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local limit = tonumber(ARGV[2])
+    local ttl = tonumber(ARGV[3])
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - ttl)
+    if redis.call('ZCARD', KEYS[1]) >= limit then return 0 end
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ttl)
+    return 1
+    """
+
+    _RECONCILE_SCRIPT = """
+    local tpm = tonumber(ARGV[1])
+    local delta = tonumber(ARGV[2])
+    local current = tonumber(redis.call('HGET', KEYS[1], 'tokens') or tostring(tpm))
+    redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(tpm, current - delta)))
+    return 1
+    """
+
+    _PAUSE_SCRIPT = """
+    local until_ts = tonumber(ARGV[1])
+    local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+    if until_ts > current then
+        redis.call('SET', KEYS[1], tostring(until_ts), 'EX', math.max(1, math.ceil(tonumber(ARGV[2]))))
+    end
+    return 1
+    """
+
+    def __init__(self, config, requests_per_second: float = 0, max_concurrency: int = 0, tokens_per_minute: int = 0,
+                 scope: Optional[str] = None):
+        """scope: 可选的限流作用域（如路由名），不同作用域的令牌桶与并发槽互不影响"""
+        super().__init__(requests_per_second, max_concurrency, tokens_per_minute)
+        try:
+            import redis.asyncio as aioredis
+            from redis.exceptions import NoScriptError
+        except ImportError:
+            raise RuntimeError(
+                "❌ Redis 限流需要安装 'redis' 包。请在 requirements.txt 中添加 'redis' 并重建镜像。"
+            )
+        self._no_script_error = NoScriptError
+        # 父类的进程内信号量与令牌桶仅在 Redis 不可用时使用
+        self._fallback_until = 0.0
+        self._client = aioredis.Redis(
+            host=config.REDIS_HOST,
+            port=config.REDIS_PORT,
+            db=config.REDIS_DB,
+            password=config.REDIS_PASSWORD or None,
+            socket_timeout=config.REDIS_TIMEOUT,
+            socket_connect_timeout=config.REDIS_TIMEOUT,
+        )
+        self._take = self._client.register_script(self._TAKE_SCRIPT)
+        self._slot = self._client.register_script(self._SLOT_SCRIPT)
+        self._reconcile = self._client.register_script(self._RECONCILE_SCRIPT)
+        self._pause_script = self._client.register_script(self._PAUSE_SCRIPT)
+        namespace = f"{self.NAMESPACE}:{scope}" if scope else self.NAMESPACE
+        self._keys = {
+            "requests": f"{namespace}:requests",
+            "tokens": f"{namespace}:tokens",
+            "pause": f"{namespace}:pause",
+            "slots": f"{namespace}:slots",
+        }
+        logger.info(
+            f"🔌 使用 Redis LLM 限流，连接: redis://{config.REDIS_HOST}:{config.REDIS_PORT}/{config.REDIS_DB}",
+            module_name=self.CHINESE_NAME
+        )
+
+    # ======================
+    # Redis 故障降级
+    # ======================
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._fallback_until
+
+    def _fall_back(self, action: str, error: Exception) -> None:
+        if self._redis_available():
+            logger.warning(
+                f"⚠️ Redis 限流{action}失败，{self.FALLBACK_SECONDS:g}s 内降级为进程内限流: {error}",
+                module_name=self.CHINESE_NAME
+            )
+        self._fallback_until = time.monotonic() + self.FALLBACK_SECONDS
+
+    async def _run_script(self, script, keys, args):
+        try:
+            return await script(keys=keys, args=args)
+        except self._no_script_error:
+            # Redis 重启 / SCRIPT FLUSH 后脚本缓存丢失：重新加载后重试一次
+            script.sha = await self._client.script_load(script.script)
+            return await script(keys=keys, args=args)
+
+    async def _acquire_slot(self, lease: "RateLimitLease") -> None:
+        if self.max_concurrency <= 0:
+            return
+        while True:
+            if not self._redis_available():
+                lease.local_slot = True
+                await super()._acquire_slot(lease)
+                return
+            try:
+                acquired = await self._run_script(
+                    self._slot,
+                    keys=[self._keys["slots"]],
+                    args=[time.time(), self.max_concurrency, self.LEASE_TTL_SECONDS, lease.lease_id]
+                )
+            except Exception as e:
+                self._fall_back("并发准入", e)
+                continue
+            if int(acquired) == 1:
+                return
+            await asyncio.sleep(self.SLOT_POLL_SECONDS)
+
+    async def _release_slot(self, lease: "RateLimitLease") -> None:
+        if self.max_concurrency <= 0:
+            return
+        if lease.local_slot:
+            await super()._release_slot(lease)
+            return
+        try:
+            await self._client.zrem(self._keys["slots"], lease.lease_id)
+        except Exception as e:
+            # 释放失败时依赖租约过期回收
+            logger.warning(f"⚠️ Redis 并发租约释放失败: {e}", module_name=self.CHINESE_NAME)
+
+    async def _try_take(self, tokens: int) -> float:
+        if self._redis_available():
+            try:
+                wait = await self._run_script(
+                    self._take,
+                    keys=[self._keys["requests"], self._keys["tokens"], self._keys["pause"]],
+                    args=[time.time(), self._effective_rps(), self._request_capacity(), self.tokens_per_minute, tokens]
+                )
+                return float(wait.decode("utf-8") if isinstance(wait, bytes) else wait)
+            except Exception as e:
+                self._fall_back("令牌扣减", e)
+        return await super()._try_take(tokens)
+
+    async def _reconcile_tokens(self, delta: int) -> None:
+        if not self._redis_available():
+            await super()._reconcile_tokens(delta)
+            return
+        try:
+            await self._run_script(self._reconcile, keys=[self._keys["tokens"]], args=[self.tokens_per_minute, delta])
+        except Exception as e:
+            logger.warning(f"⚠️ Redis token 桶校正失败: {e}", module_name=self.CHINESE_NAME)
+
+    async def _pause(self, seconds: float) -> None:
+        # 本进程同时记录暂停，降级期间同样生效
+        await super()._pause(seconds)
+        if not self._redis_available():
+            return
+        try:
+            await self._run_script(self._pause_script, keys=[self._keys["pause"]], args=[time.time() + seconds, seconds])
+        except Exception as e:
+            self._fall_back("全局暂停", e)
+
+    async def close(self) -> None:
+        try:
+            await self._client.aclose()
+        except Exception as e:
+            logger.warning(f"关闭 Redis 限流连接失败: {e}", module_name=self.CHINESE_NAME)
+
+
+class RateLimitLease:
+    __slots__ = ("lease_id", "estimated_tokens", "actual_tokens", "released", "local_slot")
+
+    def __init__(self, lease_id: str, estimated_tokens: int):
+        self.lease_id = lease_id
+        self.estimated_tokens = estimated_tokens
+        self.actual_tokens: Optional[int] = None
+        self.released = False
+        # 并发槽来自进程内信号量（Redis 降级期间获取）
+        self.local_slot = False
+
+
+def create_rate_limiter(c, scope: Optional[str] = None, **overrides) -> LLMRateLimiter:
+    """
+    scope: 可选的限流作用域（多后端路由时每个路由一个，各自拥有独立配额）
+    overrides: 可选的 requests_per_second / max_concurrency / tokens_per_minute，为 None 时取全局配置
+    """
+    kwargs = dict(
+        requests_per_second=c.LLM_RATE_LIMIT_RPS,
+        max_concurrency=c.LLM_RATE_LIMIT_CONCURRENCY,
+        tokens_per_minute=c.LLM_RATE_LIMIT_TPM,
+    )
+    kwargs.update({k: v for k, v in overrides.items() if v is not None})
+    backend = c.LLM_RATE_LIMIT_BACKEND
+    if backend == c.STORAGE_LOCAL:
+        return LLMRateLimiter(**kwargs)
+    elif backend == c.STORAGE_REDIS:
+        return RedisLLMRateLimiter(c, scope=scope, **kwargs)
+    else:
+        raise ValueError(f"Unsupported rate limit backend: {backend}")
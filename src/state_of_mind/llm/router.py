@@ -0,0 +1,257 @@
+"""
+多后端路由 LLM 后端（XINJING_LLM_BACKEND=router）
+
+- XINJING_LLM_ROUTES 中每个路由是一个独立的后端实例（提供方 + 模型 + API 密钥），拥有各自的连接池与限流配额
+- 按加权最少在途请求选择路由：(在途数 + 1) / (权重 × 健康度) 最小者优先；
+  健康度由最近调用的错误率（EWMA）与相对最快路由的延迟（EWMA）决定
+- 调用失败（5xx、429、网络/超时、流式中止、鉴权失败等）时自动切换到下一个路由，每个路由最多尝试一次；
+  400/413/422 请求错误换路由也不会成功，直接返回
+- XINJING_LLM_ROUTE_PINS 将步骤固定到某个路由所用的模型：该步骤只在同一提供方、同一模型的路由间分配与切换
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Set
+from src.state_of_mind.common.llm_response import LLMResponse
+from src.state_of_mind.llm.base import BaseLLMBackend, LLMBackend
+from src.state_of_mind.llm.rate_limiter import create_rate_limiter
+from src.state_of_mind.utils.constants import LLMModelConst
+from src.state_of_mind.utils.logger import LoggerManager as logger
+
+
+class _Route:
+    """单个路由的后端实例与运行期健康统计"""
+    __slots__ = ("name", "backend_name", "model", "weight", "backend",
+                 "outstanding", "calls", "failures", "error_ewma", "latency_ewma")
+
+    def __init__(self, name: str, backend_name: str, model: str, weight: float, backend: LLMBackend):
+        self.name = name
+        self.backend_name = backend_name
+        self.model = model
+        self.weight = weight
+        self.backend = backend
+        self.outstanding = 0
+        self.calls = 0
+        self.failures = 0
+        self.error_ewma = 0.0
+        self.latency_ewma: Optional[float] = None
+
+    def record(self, success: bool, latency: float, alpha: float) -> None:
+        self.calls += 1
+        if not success:
+            self.failures += 1
+        self.error_ewma += alpha * ((0.0 if success else 1.0) - self.error_ewma)
+        if success:
+            self.latency_ewma = latency if self.latency_ewma is None else \
+                self.latency_ewma + alpha * (latency - self.latency_ewma)
+
+    def health(self, fastest_latency: Optional[float], min_health: float) -> float:
+        score = (1.0 - self.error_ewma) ** 2
+        if fastest_latency and self.latency_ewma:
+            score *= fastest_latency / self.latency_ewma
+        return max(min_health, score)
+
+
+class RoutingLLMBackend(BaseLLMBackend):
+    """只做分发，不直接构造 HTTP 请求：请求体构建、限流、熔断与连接池都由各路由的 LLMBackend 实例负责"""
+    CHINESE_NAME = "多后端路由 LLM 后端"
+    _uses_api_url = False
+    _uses_routes = True
+    # 健康统计的 EWMA 系数；健康度下限（持续失败的路由仍会偶尔被选中，恢复后可重新分流）
+    HEALTH_ALPHA = 0.3
+    MIN_HEALTH = 0.05
+    # 不切换路由的 API 错误（__api_error 以 "[状态码]" 开头）
+    REQUEST_ERROR_PREFIXES = ("[400]", "[413]", "[422]")
+
+    def __init__(self):
+        super().__init__()
+        self.routes: List[_Route] = []
+        self.pins: Dict[str, str] = {}
+
+    async def init(self, configs: Dict[str, Any]) -> 'RoutingLLMBackend':
+        if self._initialized:
+            return self
+        from src.state_of_mind.config import config
+        from src.state_of_mind.utils.registry import GlobalSingletonRegistry
+
+        route_configs = configs.get("routes") or []
+        if not route_configs:
+            raise ValueError(f"{self.CHINESE_NAME} 缺少路由配置（XINJING_LLM_ROUTES）")
+        try:
+            for route_config in route_configs:
+                name = route_config["name"]
+                backend_name = route_config["backend"]
+                backend_class = GlobalSingletonRegistry.get_backend_class(backend_name)
+                if not issubclass(backend_class, LLMBackend):
+                    raise ValueError(f"路由 {name} 必须使用直接调用 API 的后端，不能嵌套使用 {backend_name}")
+                backend = backend_class()
+                await backend.init({
+                    **configs,
+                    "api_key": route_config.get("api_key"),
+                    "api_url": route_config.get("api_url"),
+                })
+                # 每个路由（通常对应一个 API 密钥）独立限流，整体配额为各路由之和
+                backend.rate_limiter = create_rate_limiter(
+                    config,
+                    scope=f"route:{name}",
+                    requests_per_second=route_config.get("rate_limit_rps"),
+                    max_concurrency=route_config.get("rate_limit_concurrency"),
+                    tokens_per_minute=route_config.get("rate_limit_tpm"),
+                )
+                backend.breaker_scope = f"route:{name}"
+                self.routes.append(_Route(
+                    name=name,
+                    backend_name=backend_name,
+                    model=route_config.get("model") or LLMModelConst.by_backend()[backend_name][0],
+                    weight=float(route_config.get("weight", 1) or 1),
+                    backend=backend,
+                ))
+        except Exception:
+            await self.close()
+            raise
+
+        names = {route.name for route in self.routes}
+        self.pins = {}
+        for step_name, route_name in (configs.get("route_pins") or {}).items():
+            if route_name in names:
+                self.pins[step_name] = route_name
+            else:
+                logger.warning(f"⚠️ 步骤 {step_name} 固定的路由 {route_name} 不存在，已忽略", module_name=self.CHINESE_NAME)
+        self._initialized = True
+        logger.info(
+            f"✅ {self.CHINESE_NAME} 初始化完成，路由: "
+            + ", ".join(f"{r.name}({r.backend_name}/{r.model}, 权重 {r.weight:g})" for r in self.routes),
+            module_name=self.CHINESE_NAME
+        )
+        return self
+
+    # ========================
+    # 路由选择与故障切换
+    # ========================
+    def _candidates(self, step_name: str) -> List[_Route]:
+        pinned = self.pins.get(step_name)
+        if pinned is None:
+            return self.routes
+        target = next(route for route in self.routes if route.name == pinned)
+        return [r for r in self.routes if (r.backend_name, r.model) == (target.backend_name, target.model)]
+
+    def _pick(self, candidates: List[_Route], tried: Set[str]) -> Optional[_Route]:
+        eligible = [route for route in candidates if route.name not in tried]
+        if not eligible:
+            return None
+        latencies = [route.latency_ewma for route in eligible if route.latency_ewma]
+        fastest = min(latencies) if latencies else None
+        return min(
+            eligible,
+            key=lambda r: (r.outstanding + 1) / (r.weight * r.health(fastest, self.MIN_HEALTH))
+        )
+
+    @classmethod
+    def _should_failover(cls, result: Dict[str, Any]) -> bool:
+        # 请求本身不合法（参数错误、请求体过大、无法处理），换路由也不会成功；
+        # 401/403/404/429 与路由的密钥、模型或配额有关，切换到下一个路由
+        return not (result.get("__api_error") or "").startswith(cls.REQUEST_ERROR_PREFIXES)
+
+    async def _dispatch(self, method: str, step_name: str, prompt_type: str, **kwargs) -> Dict[str, Any]:
+        candidates = self._candidates(step_name)
+        tried: Set[str] = set()
+        result: Optional[Dict[str, Any]] = None
+        while True:
+            route = self._pick(candidates, tried)
+            if route is None:
+                break
+            tried.add(route.name)
+            route.outstanding += 1
+            start = time.monotonic()
+            try:
+                result = await getattr(route.backend, method)(
+                    model=route.model, step_name=step_name, prompt_type=prompt_type, **kwargs
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result = LLMResponse.from_system_error(
+                    system_error=f"{type(e).__name__}: {e}",
+                    model=route.model,
+                    template_name=kwargs.get("template_name", ""),
+                    step_name=step_name,
+                    prompt_type=prompt_type,
+                    include_traceback=False
+                ).to_dict()
+            finally:
+                route.outstanding -= 1
+
+            success = result.get("__success") is True
+            route.record(success, time.monotonic() - start, self.HEALTH_ALPHA)
+            if success or not self._should_failover(result):
+                return result
+            error = result.get("__system_error") or result.get("__api_error") or "未知错误"
+            if len(tried) < len(candidates):
+                logger.warning(f"↪️ [{step_name}] 路由 {route.name} 调用失败，切换下一个路由: {error}",
+                               module_name=self.CHINESE_NAME)
+        return result
+
+    # ========================
+    # 统一调用入口：按路由分发（model 参数由路由配置决定，调用方传入的值被忽略）
+    # ========================
+    async def async_call(self, prompt: str, model: str, params: dict, template_name: str, step_name: str,
+                         prompt_type: str) -> Dict[str, Any]:
+        return await self._dispatch("async_call", step_name, prompt_type,
+                                    prompt=prompt, params=params, template_name=template_name)
+
+    async def generate_text(self, prompt: str, model: str, params: dict, step_name: str,
+                            prompt_type: str) -> Dict[str, Any]:
+        return await self._dispatch("generate_text", step_name, prompt_type, prompt=prompt, params=params)
+
+    async def guided_global_semantic_signature(self, prompt: str, model: str, params: dict, step_name: str,
+                                               prompt_type: str) -> Dict[str, Any]:
+        return await self._dispatch("guided_global_semantic_signature", step_name, prompt_type,
+                                    prompt=prompt, params=params)
+
+    async def bottom_dissolving_pronouns(self, prompt: str, model: str, params: dict, step_name: str,
+                                         prompt_type: str) -> Dict[str, Any]:
+        return await self._dispatch("bottom_dissolving_pronouns", step_name, prompt_type,
+                                    prompt=prompt, params=params)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """各路由的调用统计与当前健康度"""
+        latencies = [route.latency_ewma for route in self.routes if route.latency_ewma]
+        fastest = min(latencies) if latencies else None
+        return [
+            {
+                "name": route.name,
+                "backend": route.backend_name,
+                "model": route.model,
+                "weight": route.weight,
+                "outstanding": route.outstanding,
+                "calls": route.calls,
+                "failures": route.failures,
+                "latency_ms": round(route.latency_ewma * 1000, 1) if route.latency_ewma else None,
+                "health": round(route.health(fastest, self.MIN_HEALTH), 3),
+            }
+            for route in self.routes
+        ]
+
+    # ========================
+    # 生命周期：委托给各路由实例
+    # ========================
+    async def prewarm(self, connections: int) -> int:
+        results = await asyncio.gather(*(route.backend.prewarm(connections) for route in self.routes))
+        return sum(results)
+
+    async def drain_and_close(self, timeout: Optional[float] = None) -> None:
+        self.retire()
+        await asyncio.gather(
+            *(route.backend.drain_and_close(timeout) for route in self.routes),
+            return_exceptions=True
+        )
+        await self._close_rate_limiters()
+
+    async def close(self):
+        await asyncio.gather(*(route.backend.close() for route in self.routes), return_exceptions=True)
+        await self._close_rate_limiters()
+
+    async def _close_rate_limiters(self) -> None:
+        for route in self.routes:
+            if route.backend.rate_limiter is not None:
+                await route.backend.rate_limiter.close()
+                route.backend.rate_limiter = None
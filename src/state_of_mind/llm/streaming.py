@@ -0,0 +1,97 @@
+import json
+from typing import TYPE_CHECKING, List, Optional
+import httpx
+from src.state_of_mind.stages.perception.data_validator import DataValidator
+from src.state_of_mind.utils.json_stream import IncrementalJSONParser, StreamEvent
+from src.state_of_mind.utils.logger import LoggerManager as logger
+
+if TYPE_CHECKING:
+    from src.state_of_mind.llm.base import LLMBackend
+
+
+class StreamingJSONConsumer:
+    """
+    SSE 流式响应读取 + JSON 增量解析（每次 LLM 调用一个实例）：
+    - 逐个 data: 事件取出增量文本（协议差异由 backend 的 _extract_stream_delta 处理），送入 IncrementalJSONParser
+    - events 数组中的元素一闭合即按该步骤的通配规则校验，校验问题在流结束前即可看到
+    - 出现 JSON 语法错误，或模型连续重复输出相同事件时立即停止读取并断开连接，不再等待剩余 token
+    - 根对象闭合后解析结果直接可用，调用方无需再做代码块剥离与正则抽取
+    """
+    CHINESE_NAME = "LLM 流式响应解析"
+    # 连续出现完全相同的事件达到此次数，视为模型陷入重复生成
+    MAX_REPEATED_EVENTS = 3
+
+    def __init__(self, backend: "LLMBackend", validator: DataValidator, template_name: str, step_name: str):
+        self.backend = backend
+        self.validator = validator
+        self.template_name = template_name
+        self.step_name = step_name
+        self.parser = IncrementalJSONParser()
+        self.total_tokens: Optional[int] = None
+        self.event_count = 0
+        self.event_errors: List[str] = []
+        self.abort_reason: Optional[str] = None
+        self._chunks: List[str] = []
+        self._last_event: Optional[str] = None
+        self._repeats = 0
+
+    @property
+    def content(self) -> str:
+        return "".join(self._chunks)
+
+    async def consume(self, response: httpx.Response) -> None:
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if not data:
+                continue
+            if data == "[DONE]":
+                break
+            try:
+                event = json.loads(data)
+            except ValueError:
+                logger.debug(f"[{self.step_name}] 忽略无法解析的 SSE 事件: {data[:80]}", module_name=self.CHINESE_NAME)
+                continue
+
+            tokens = self.backend.usage_tokens(event)
+            if tokens is not None:
+                self.total_tokens = tokens
+            delta = self.backend._extract_stream_delta(event)
+            if delta:
+                self._chunks.append(delta)
+                if not self._on_delta(delta):
+                    logger.warning(
+                        f"⛔ [{self.step_name}] 流式输出已中止: {self.abort_reason}",
+                        extra={"received_chars": len(self.content), "events": self.event_count},
+                        module_name=self.CHINESE_NAME
+                    )
+                    break
+
+    def _on_delta(self, delta: str) -> bool:
+        """返回 False 表示应中止读取"""
+        for event in self.parser.feed(delta):
+            self.event_count += 1
+            self._check_event(event)
+            fingerprint = json.dumps(event.value, sort_keys=True, ensure_ascii=False)
+            if fingerprint == self._last_event:
+                self._repeats += 1
+            else:
+                self._last_event = fingerprint
+                self._repeats = 1
+            if self._repeats >= self.MAX_REPEATED_EVENTS:
+                self.abort_reason = f"{event.path} 与前 {self._repeats - 1} 个事件完全相同，模型陷入重复输出"
+                return False
+        if self.parser.error:
+            self.abort_reason = f"JSON 语法错误: {self.parser.error}"
+            return False
+        return True
+
+    def _check_event(self, event: StreamEvent) -> None:
+        errors = self.validator.validate_partial(
+            event.value, self.template_name, self.step_name, event.rule_path, event.path
+        )
+        if errors:
+            if not self.event_errors:
+                logger.info(f"[{self.step_name}] 流式事件校验未通过: {errors[0]}", module_name=self.CHINESE_NAME)
+            self.event_errors.extend(errors)
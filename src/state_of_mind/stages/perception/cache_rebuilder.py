@@ -0,0 +1,127 @@
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+from src.state_of_mind.common.llm_response import LLMResponse
+from src.state_of_mind.utils.file_util import FileUtil
+from src.state_of_mind.utils.llm_helpers import extract_json_safely, remove_check
+from src.state_of_mind.utils.logger import LoggerManager as logger
+from .constants import PARALLEL_PREPROCESSING, PARALLEL_PERCEPTION, PARALLEL_HIGH_ORDER, SERIAL_SUGGESTION
+from .data_validator import DataValidator
+
+
+class ArtifactCacheRebuilder:
+    """
+    从 _persist_extraction_artifacts 写出的产物重建缓存：
+    - dye_vat/：每个步骤的渲染后 prompt 与原始响应 → 重新解析校验后写入步骤缓存（仅结构有效的结果）
+    - raw/（可选）：最终结构化结果 → 写入整体缓存。raw 写出时尚未生成报告，重建的条目不含 report_url
+    步骤缓存 key 按当前后端、模型与参数计算，模型与产物记录不一致的条目跳过
+    """
+    CHINESE_NAME = "全息感知基底：缓存产物重建"
+    STEP_TYPES = (PARALLEL_PREPROCESSING, PARALLEL_PERCEPTION, PARALLEL_HIGH_ORDER, SERIAL_SUGGESTION)
+    BATCH_SIZE = 200
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.cache = pipeline.llm_cache
+        self.step_executor = pipeline.step_executor
+        self.file_util = FileUtil()
+        self.validator = DataValidator()
+
+    async def rebuild(
+            self,
+            dye_vat_dir: Optional[Path] = None,
+            raw_dir: Optional[Path] = None,
+            include_results: bool = False
+    ) -> Dict[str, int]:
+        stats = {"files": 0, "steps": 0, "results": 0, "skipped": 0}
+        batch: Dict[str, Dict[str, Any]] = {}
+
+        sources = [(dye_vat_dir or self.pipeline.DYE_VAT_DIR, self._step_entries)]
+        if include_results:
+            sources.append((raw_dir or self.pipeline.RAW_DATA_DIR, self._result_entries))
+
+        for directory, extract in sources:
+            # 按修改时间从旧到新处理，同一 key 以最新产物为准
+            for path in sorted(Path(directory).glob("*.json"), key=lambda p: p.stat().st_mtime):
+                data = self.file_util.read_json_file(path)
+                if not data or not isinstance(data, dict):
+                    stats["skipped"] += 1
+                    continue
+                stats["files"] += 1
+                for kind, key, value in extract(path, data):
+                    if key is None:
+                        stats["skipped"] += 1
+                        continue
+                    stats[kind] += 1
+                    batch[key] = value
+                    if len(batch) >= self.BATCH_SIZE:
+                        await self.cache.set_many(batch)
+                        batch = {}
+        if batch:
+            await self.cache.set_many(batch)
+
+        logger.info(f"♻️ 缓存重建完成: {stats}", module_name=self.CHINESE_NAME)
+        return stats
+
+    def _step_entries(self, path: Path, dye: Dict[str, Any]) -> Iterator[Tuple[str, Optional[str], Any]]:
+        category = dye.get("category")
+        model = dye.get("model")
+        if not category or model != self.step_executor.llm_model:
+            yield "steps", None, None
+            return
+
+        prompt_records = dye.get("prompt_records") or {}
+        response_records = dye.get("raw_response_records") or {}
+        for step_type in self.STEP_TYPES:
+            prompts: Dict[str, str] = {}
+            for record in prompt_records.get(step_type, []):
+                prompts.setdefault(record.get("step_name"), record.get("prompt"))
+            for record in response_records.get(step_type, []):
+                step_name = record.get("step_name")
+                prompt = prompts.get(step_name)
+                raw_response = record.get("raw_response")
+                if not prompt or not raw_response or not raw_response.strip():
+                    yield "steps", None, None
+                    continue
+                result = self._replay_step(raw_response, category, step_name, step_type, model)
+                if result is None:
+                    yield "steps", None, None
+                    continue
+                yield "steps", self.step_executor.make_step_cache_key(prompt, category, step_name), result
+
+    def _replay_step(
+            self,
+            raw_response: str,
+            category: str,
+            step_name: str,
+            step_type: str,
+            model: str
+    ) -> Optional[Dict[str, Any]]:
+        """与后端 async_call 相同的解析与校验流程，结构无效的结果不入缓存"""
+        content = remove_check(raw_response.strip())
+        validation_result = self.validator.validate(
+            data=extract_json_safely(content),
+            template_name=category,
+            step_name=step_name
+        )
+        if not validation_result["is_valid"]:
+            return None
+        return LLMResponse.from_successful_call(
+            valid_structure=True,
+            data=validation_result["cleaned_data"] or {},
+            raw_response=content,
+            validation_errors=validation_result["errors"],
+            model=model,
+            template_name=category,
+            step_name=step_name,
+            prompt_type=step_type
+        ).to_dict()
+
+    def _result_entries(self, path: Path, result: Dict[str, Any]) -> Iterator[Tuple[str, Optional[str], Any]]:
+        # 文件名格式: {category}_{uuid8}_{timestamp}.json
+        category = path.stem.rsplit("_", 2)[0]
+        user_input = (result.get("source") or {}).get("content")
+        model = (result.get("meta") or {}).get("llm_model")
+        if not user_input or model != self.pipeline.llm_model:
+            yield "results", None, None
+            return
+        yield "results", self.cache.make_key(category, user_input=user_input, llm_model=model), result
@@ -62,6 +62,35 @@ LLM_CONTRADICTION_MAP = "LLM_CONTRADICTION_MAP"
 LLM_MANIPULATION_DECODE = "LLM_MANIPULATION_DECODE"
 LLM_MINIMAL_VIABLE_ADVICE = "LLM_MINIMAL_VIABLE_ADVICE"
 
+# 上下文 marker
+MARKER_USER_INPUT = "### USER_INPUT BEGIN"
+MARKER_PARTICIPANTS_VALID_INFORMATION = "### PARTICIPANTS_VALID_INFORMATION BEGIN"
+MARKER_PERCEPTUAL_CONTEXT_BATCH = "### PERCEPTUAL_CONTEXT_BATCH BEGIN"
+MARKER_LEGITIMATE_PARTICIPANTS = "### LEGITIMATE_PARTICIPANTS BEGIN"
+MARKER_STRATEGY_ANCHOR_CONTEXT = "### STRATEGY_ANCHOR_CONTEXT BEGIN"
+MARKER_CONTRADICTION_MAP_CONTEXT = "### CONTRADICTION_MAP_CONTEXT BEGIN"
+MARKER_MANIPULATION_DECODE_CONTEXT = "### MANIPULATION_DECODE_CONTEXT BEGIN"
+MARKER_MINIMAL_VIABLE_ADVICE_CONTEXT = "### MINIMAL_VIABLE_ADVICE_CONTEXT BEGIN"
+
+# 上下文块在 prompt 中的拼接顺序（与上游步骤的产出顺序一致，保证同一输入渲染出的 prompt 稳定）
+CONTEXT_MARKER_ORDER = (
+    MARKER_USER_INPUT,
+    MARKER_PARTICIPANTS_VALID_INFORMATION,
+    MARKER_PERCEPTUAL_CONTEXT_BATCH,
+    MARKER_LEGITIMATE_PARTICIPANTS,
+    MARKER_STRATEGY_ANCHOR_CONTEXT,
+    MARKER_CONTRADICTION_MAP_CONTEXT,
+    MARKER_MANIPULATION_DECODE_CONTEXT,
+    MARKER_MINIMAL_VIABLE_ADVICE_CONTEXT,
+)
+
+# 定义各阶段并行预处理任务允许使用的上下文 marker
+ALLOWED_PARALLEL_PREPROCESSING_MARKERS = {
+    0: {"### USER_INPUT BEGIN"},
+    1: {"### USER_INPUT BEGIN"},
+    2: {"### USER_INPUT BEGIN"}
+}
+
 # 定义各阶段并行感知任务允许使用的上下文 marker
 ALLOWED_PARALLEL_PERCEPTION_MARKERS = {
     0: {"### USER_INPUT BEGIN"},
@@ -104,10 +133,42 @@ ALLOWED_SERIAL_SUGGESTION_MARKERS = {
     },
 }
 
+# 各步骤类型对应的 marker 映射
+ALLOWED_MARKERS_BY_TYPE = {
+    PARALLEL_PREPROCESSING: ALLOWED_PARALLEL_PREPROCESSING_MARKERS,
+    PARALLEL_PERCEPTION: ALLOWED_PARALLEL_PERCEPTION_MARKERS,
+    PARALLEL_HIGH_ORDER: ALLOWED_PARALLEL_HIGH_ORDER_MARKERS,
+    SERIAL_SUGGESTION: ALLOWED_SERIAL_SUGGESTION_MARKERS,
+}
+
+# 上下文 marker 的生产者：值为 driven_by 顶级键，或步骤类型（表示该类型的全部步骤）
+# DAG 调度器据此与 ALLOWED_*_MARKERS 推导每个步骤的真实依赖
+CONTEXT_MARKER_PRODUCERS = {
+    MARKER_USER_INPUT: set(),
+    MARKER_PARTICIPANTS_VALID_INFORMATION: {"participants"},
+    MARKER_LEGITIMATE_PARTICIPANTS: {"participants"},
+    MARKER_PERCEPTUAL_CONTEXT_BATCH: {PARALLEL_PERCEPTION},
+    MARKER_STRATEGY_ANCHOR_CONTEXT: {"strategy_anchor"},
+    MARKER_CONTRADICTION_MAP_CONTEXT: {"contradiction_map"},
+    MARKER_MANIPULATION_DECODE_CONTEXT: {"manipulation_decode"},
+    MARKER_MINIMAL_VIABLE_ADVICE_CONTEXT: {"minimal_viable_advice"},
+}
+
+# 各步骤类型的执行门控：值为承载门控结果的预处理 driven_by 键
+STEP_TYPE_GATE_KEYS = {
+    PARALLEL_PERCEPTION: "pre_screening",
+    PARALLEL_HIGH_ORDER: "eligibility",
+    SERIAL_SUGGESTION: "eligibility",
+}
+
+# 感知结果后处理（合法参与者过滤）所依赖的 driven_by 键
+PERCEPTION_FILTER_KEY = "participants"
+
 # 默认 API URL 映射
 DEFAULT_API_URLS = {
     "deepseek": "https://api.deepseek.com",
-    "qwen": "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation"
+    "qwen": "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation",
+    "mock": "http://mock.local"
 }
 
 # 语义上等同于“无信息”的字符串，视为应清除的占位符
@@ -197,6 +258,9 @@ EXCLUDED_PRONOUNS = {
     "某个", "某些", "某种", "某类", "某位", "某方", "某群体", "某组织"
 }
 
+# 步骤缓存 schema 版本：输出结构或后处理语义发生不兼容变更时递增，使历史步骤缓存整体失效
+STEP_CACHE_SCHEMA_VERSION = 1
+
 REQUIRED_FIELDS_BY_CATEGORY: Dict[str, Dict[str, List[ValidationRule]]] = {
     CATEGORY_RAW: {
         # ────────────────────────────────────────
@@ -690,3 +754,15 @@ MENTION_TYPES_CONFIG = {
         "exit", "support"
     }
 }
+
+# === 流式进度事件 ===
+EVENT_PIPELINE_START = "pipeline_start"
+EVENT_PHASE_START = "phase_start"
+EVENT_PHASE_END = "phase_end"
+EVENT_STEP_RESULT = "step_result"
+EVENT_STEP_SKIPPED = "step_skipped"
+EVENT_REPORT = "report"
+EVENT_ERROR = "error"
+# 非 LLM 步骤阶段（组装校验 / 报告渲染）
+PHASE_ASSEMBLY = "assembly"
+PHASE_REPORT = "report"
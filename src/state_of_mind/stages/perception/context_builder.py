@@ -1,9 +1,11 @@
 from typing import Dict, List, Set, Tuple, Optional, Any
 from src.state_of_mind.stages.perception.prompt_builder import PromptBuilder
+from src.state_of_mind.types.perception import ContextSnapshot
 from .constants import (
     LLM_PARTICIPANTS_EXTRACTION, LLM_STRATEGY_ANCHOR, LLM_CONTRADICTION_MAP, LLM_MANIPULATION_DECODE,
-    LLM_MINIMAL_VIABLE_ADVICE,
+    LLM_MINIMAL_VIABLE_ADVICE, MARKER_USER_INPUT,
 )
+from .context_store import ContextStore
 from src.state_of_mind.utils.logger import LoggerManager as logger
 from .participant_filter import ParticipantFilter
 
@@ -24,17 +26,16 @@ class ContextBuilder:
         self._top_field_to_step_types = top_field_to_step_types
 
     @staticmethod
-    def build_user_input_context(prompt_template: str, user_input: str, context_desc_info: List[str]) -> str:
+    def build_user_input_context(prompt_template: str, user_input: str, context_store: ContextStore) -> str:
         build_context_desc = f"\n### USER_INPUT BEGIN（用户原始输入开始）\n{user_input}\n### USER_INPUT END（用户原始输入结束）\n"
-        context_desc_info.append(build_context_desc)
-        rendered_prompt = f"{prompt_template}{build_context_desc}"
-        return rendered_prompt
+        context_store.put(MARKER_USER_INPUT, build_context_desc)
+        return PromptBuilder.compose(prompt_template, (build_context_desc,))
 
     def build_common_context(
             self,
             step_name: str,
             context: Dict[str, Any],
-            context_desc_info: List[str]
+            context_store: ContextStore
     ) -> None:
         field_config = self._step_type_to_config.get(step_name)
         if not field_config:
@@ -54,8 +55,9 @@ class ContextBuilder:
                 start_marker, end_marker, readable = "### MANIPULATION_DECODE_CONTEXT BEGIN", "### MANIPULATION_DECODE_CONTEXT END", "操控机制解码有效信息上下文"
             elif step_name == LLM_MINIMAL_VIABLE_ADVICE:
                 start_marker, end_marker, readable = "### MINIMAL_VIABLE_ADVICE_CONTEXT BEGIN", "### MINIMAL_VIABLE_ADVICE_CONTEXT END", "最小可行性建议有效信息上下文"
-            wrapped = self.wrap_with_context_markers(raw_desc, start_marker, end_marker, readable)
-            context_desc_info.append(wrapped)
+            if not start_marker:
+                return
+            context_store.put(start_marker, self.wrap_with_context_markers(raw_desc, start_marker, end_marker, readable))
         except Exception as e:
             logger.error(f"[{step_name}] 动态描述生成失败: {e}")
 
@@ -108,28 +110,13 @@ class ContextBuilder:
         return f"\n{start}（{readable}开始）\n{content}\n{end}（{readable}结束）\n"
 
     @staticmethod
-    def inject_allowed_context(prompt: str, context_desc_info: List[str], allowed_markers: Set[str]) -> str:
-        # 为每个 marker 记录是否已注入
-        injected_markers = set()
-        for ctx_str in context_desc_info:
-            if not ctx_str or not isinstance(ctx_str, str):
-                continue
-            stripped = ctx_str.lstrip()
-            for marker in allowed_markers:
-                if marker in injected_markers:
-                    continue  # 已注入，跳过
-                if stripped.startswith(marker):
-                    prompt += ctx_str
-                    injected_markers.add(marker)
-                    break  # 一个 ctx_str 只匹配一个 marker 即可
-        return prompt
-
-    # 更好，后期可迭代完整替换
-    # def inject_allowed_context(prompt: str, context_desc_map: Dict[str, str], allowed_markers: Set[str]) -> str:
-    #     for marker in allowed_markers:
-    #         if marker in context_desc_map:
-    #             prompt += context_desc_map[marker]
-    #     return prompt
+    def inject_allowed_context(
+            prompt: str,
+            context_store: ContextStore,
+            allowed_markers: Set[str],
+            snapshot: Optional[ContextSnapshot] = None
+    ) -> str:
+        return context_store.render(prompt, allowed_markers, snapshot)
 
     @staticmethod
     def update_context_from_result(
@@ -0,0 +1,65 @@
+from types import MappingProxyType
+from typing import Dict, Iterable, Optional, Tuple
+from src.state_of_mind.types.perception import ContextSnapshot
+from src.state_of_mind.utils.logger import LoggerManager as logger
+from .constants import CONTEXT_MARKER_ORDER
+
+
+class ContextStore:
+    """
+    按 marker 索引的上下文块存储（单次 async_extract 内共享）：
+    - 每个 marker 只保留首次写入的块，与原线性扫描"首个匹配生效"的语义一致
+    - 写入采用写时复制，snapshot() 为 O(1)，并发步骤各自持有一致的只读视图
+    - 渲染按 CONTEXT_MARKER_ORDER 排序后单次拼接，不再随上下文增长线性扫描
+    """
+    CHINESE_NAME = "全息感知基底：上下文存储"
+
+    _MARKER_RANK: Dict[str, int] = {marker: rank for rank, marker in enumerate(CONTEXT_MARKER_ORDER)}
+
+    def __init__(self):
+        self._blocks: Dict[str, str] = {}
+        self._version = 0
+        self._order_cache: Dict[frozenset, Tuple[str, ...]] = {}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def __contains__(self, marker: str) -> bool:
+        return marker in self._blocks
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def put(self, marker: str, block: str) -> bool:
+        """写入 marker 对应的上下文块；已存在时保留原值并返回 False"""
+        if not marker or not block:
+            return False
+        if marker in self._blocks:
+            logger.debug(f"上下文 marker 已存在，忽略重复写入: {marker}", module_name=self.CHINESE_NAME)
+            return False
+        blocks = dict(self._blocks)
+        blocks[marker] = block
+        self._blocks = blocks
+        self._version += 1
+        return True
+
+    def get(self, marker: str) -> Optional[str]:
+        return self._blocks.get(marker)
+
+    def snapshot(self) -> ContextSnapshot:
+        return ContextSnapshot(self._version, MappingProxyType(self._blocks))
+
+    def ordered_markers(self, markers: Iterable[str]) -> Tuple[str, ...]:
+        """按固定顺序排列 marker（未登记的 marker 排在末尾并按字面排序）"""
+        key = markers if isinstance(markers, frozenset) else frozenset(markers)
+        ordered = self._order_cache.get(key)
+        if ordered is None:
+            last = len(self._MARKER_RANK)
+            ordered = tuple(sorted(key, key=lambda m: (self._MARKER_RANK.get(m, last), m)))
+            self._order_cache[key] = ordered
+        return ordered
+
+    def render(self, template: str, markers: Iterable[str], snapshot: Optional[ContextSnapshot] = None) -> str:
+        blocks = (snapshot or self.snapshot()).blocks
+        return "".join([template, *(blocks[m] for m in self.ordered_markers(markers) if m in blocks)])
@@ -578,3 +578,34 @@ class DataValidator:
         errors = self._collect_errors(cleaned_data, rules, step_name)
         is_valid = len(errors) == 0
         return self._build_result(is_valid, errors, cleaned_data, template_name, step_name)
+
+    def validate_partial(
+            self,
+            item: Any,
+            template_name: str,
+            step_name: str,
+            rule_path: str,
+            path: str
+    ) -> List[str]:
+        """
+        流式输出中单个已闭合元素（如 temporal.events.* 的一项）的即时校验：
+        只应用以 rule_path 开头的规则，尝试修复后仍不通过的才算错误；不修改 item，最终结果仍走 validate
+        """
+        rules = REQUIRED_FIELDS_BY_CATEGORY.get(template_name, {}).get(step_name) or []
+        prefix = rule_path + "."
+        cleaned = self.remove_nulls(item)
+        if cleaned is None:
+            return []
+        errors = []
+        for field_path, required, validator, _ in rules:
+            if not field_path.startswith(prefix):
+                continue
+            relative = field_path[len(prefix):]
+            if '*' in relative:
+                matches = self.expand_wildcard_paths(cleaned, relative)
+            else:
+                matches = [(relative, self.deep_get(cleaned, relative))]
+            for concrete_path, value in matches:
+                value = self._maybe_repair_value(value, concrete_path, validator)
+                errors.extend(self._validate_field(value, f"{path}.{concrete_path}", required, validator))
+        return errors
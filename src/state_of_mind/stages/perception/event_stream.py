@@ -0,0 +1,36 @@
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from src.state_of_mind.utils.logger import LoggerManager as logger
+
+EventSink = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class PipelineEventEmitter:
+    """
+    流水线进度事件发射器：
+    - 将步骤结果、阶段起止、最终报告等事件推送给外部 sink（如 HTTP 流式响应队列）
+    - 未提供 sink 时所有调用均为空操作，不影响原有同步流程
+    - sink 自身异常只记录日志，绝不中断分析流程
+    """
+    CHINESE_NAME = "全息感知基底：进度事件发射器"
+
+    def __init__(self, sink: Optional[EventSink] = None):
+        self._sink = sink
+        self._started_at = time.perf_counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self._sink is not None
+
+    async def emit(self, event: str, **payload: Any) -> None:
+        if self._sink is None:
+            return
+        message = {
+            "event": event,
+            "elapsed_ms": round((time.perf_counter() - self._started_at) * 1000, 2),
+            **payload
+        }
+        try:
+            await self._sink(message)
+        except Exception as e:
+            logger.warning(f"⚠️ 进度事件推送失败 [{event}]: {type(e).__name__}: {e}", module_name=self.CHINESE_NAME)
@@ -1,15 +1,31 @@
 import asyncio
-from typing import Dict, Any, Set, List
+import copy
+import hashlib
+import json
+import time
+from typing import Dict, Any, Set, List, Tuple, Optional
 from src.state_of_mind.cache.base import BaseCache
+from src.state_of_mind.cache.batch_loader import CacheBatchLoader
+from src.state_of_mind.cache.single_flight import SingleFlight
 from src.state_of_mind.common.llm_response import LLMResponse
-from src.state_of_mind.stages.perception.constants import OTHER
+from src.state_of_mind.config import config
+from src.state_of_mind.stages.perception.constants import OTHER, REQUIRED_FIELDS_BY_CATEGORY, \
+    STEP_CACHE_SCHEMA_VERSION
+from src.state_of_mind.utils.data_validator import get_validator_name
 from src.state_of_mind.utils.registry import GlobalSingletonRegistry
 from src.state_of_mind.utils.logger import LoggerManager as logger
 from src.state_of_mind.stages.perception.prompt_builder import PromptBuilder
+from src.state_of_mind.stages.perception.latency_tracker import StepLatencyTracker
 
 
 class StepExecutor:
     CHINESE_NAME = "全息感知基底：通用LLM执行器"
+    STEP_CACHE_PREFIX = "step:"
+    # 感知步骤经参与者过滤（含指代消解）后的结果，与原始步骤结果分开缓存
+    FILTERED_CACHE_PREFIX = "step_filtered:"
+
+    # (template_name, step_name) -> 输出 schema 指纹
+    _schema_fingerprints: Dict[Tuple[str, str], str] = {}
 
     def __init__(
             self,
@@ -17,57 +33,161 @@ class StepExecutor:
             llm_model: str,
             recommended_params: Dict[str, Any],
             llm_cache: BaseCache,
-            prompt_builder: PromptBuilder
+            prompt_builder: PromptBuilder,
+            single_flight: Optional[SingleFlight] = None
     ):
         self.backend_name = backend_name
         self.llm_model = llm_model
         self.recommended_params = recommended_params
         self.llm_cache = llm_cache
         self.prompt_builder = prompt_builder
+        self.single_flight = single_flight or SingleFlight()
         self._backend = None
         self._init_lock = asyncio.Lock()
+        self._step_cache_hits = 0
+        self._step_cache_misses = 0
+        # 各步骤调用的耗时分布（成功与超时，对冲阈值），跨文档累积
+        self.latency_tracker = StepLatencyTracker()
+        self._hedges_fired = 0
+        self._hedges_won = 0
+        self._deadline_exceeded = 0
 
     async def get_backend(self):
-        if self._backend is None:
+        # 配置重载后旧实例退役（连接池待在途请求结束后关闭），需重新获取
+        if self._backend is None or self._backend.retired:
             async with self._init_lock:
-                if self._backend is None:
-                    logger.info("🔄 首次获取LLM后端，正在异步初始化...")
+                if self._backend is None or self._backend.retired:
+                    logger.info("🔄 获取LLM后端（首次或配置变更后），正在异步初始化...")
                     self._backend = await GlobalSingletonRegistry.get_backend_async(self.backend_name)
                     if self._backend is None:
                         raise RuntimeError(f"无法获取 backend: {self.backend_name}")
         return self._backend
 
+    @classmethod
+    def schema_fingerprint(cls, template_name: str, step_name: str) -> str:
+        key = (template_name, step_name)
+        fingerprint = cls._schema_fingerprints.get(key)
+        if fingerprint is None:
+            rules = REQUIRED_FIELDS_BY_CATEGORY.get(template_name, {}).get(step_name, [])
+            spec = [(rule[0], rule[1], get_validator_name(rule[2]), rule[3]) for rule in rules]
+            raw = f"{STEP_CACHE_SCHEMA_VERSION}|{spec!r}"
+            fingerprint = hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+            cls._schema_fingerprints[key] = fingerprint
+        return fingerprint
+
+    def make_step_cache_key(self, prompt: str, template_name: str, step_name: str) -> str:
+        """
+        内容寻址的步骤缓存 key：由 (后端, 模型, 规范化参数, 渲染后 prompt, 输出 schema 版本) 决定，
+        与整体 context、步骤在过滤后列表中的位置无关，相同的 LLM 请求可跨文档、跨流水线版本复用
+        """
+        payload = json.dumps(
+            {
+                "backend": self.backend_name,
+                "model": self.llm_model,
+                "params": self.recommended_params or {},
+                "schema": self.schema_fingerprint(template_name, step_name),
+                "step": step_name,
+                "prompt": prompt,
+            },
+            sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+        )
+        return self.STEP_CACHE_PREFIX + hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+    def make_filtered_cache_key(self, step_cache_key: str, legitimate_participants: Set[str]) -> str:
+        """过滤结果只取决于步骤结果（由步骤 key 确定）与合法参与者集合"""
+        payload = json.dumps([step_cache_key, sorted(legitimate_participants)], ensure_ascii=False)
+        return self.FILTERED_CACHE_PREFIX + hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
     """异步执行单个 LLM 调用，支持缓存"""
     async def execute_step(
             self,
             prompt_template: str,
             template_name: str,
             step_name: str,
-            cache_key: str,
-            prompt_type: str
+            prompt_type: str,
+            cache_loader: Optional[CacheBatchLoader] = None,
+            cache_hits: Optional[Set[str]] = None,
+            deadline: Optional[float] = None
     ) -> Dict[str, Any]:
-        cache_response = await self.llm_cache.get(cache_key)
+        """
+        cache_loader: 可选的批量读取合并器（调度器传入），同时就绪的步骤共用一次缓存往返
+        cache_hits: 可选，命中缓存时登记步骤 key（调度器据此判断整篇文档是否全部命中）
+        deadline: 可选，LLM 调用的截止时间（time.monotonic() 绝对值），缓存命中不受限制
+        """
+        cache_key = self.make_step_cache_key(prompt_template, template_name, step_name)
+        if cache_loader is not None:
+            cache_response = await cache_loader.get(cache_key)
+        else:
+            cache_response = await self.llm_cache.get(cache_key)
         if cache_response.get("success"):
             cached_data = cache_response.get("data")
             if cached_data is not None:
+                self._step_cache_hits += 1
+                if cache_hits is not None:
+                    cache_hits.add(cache_key)
                 logger.info("🔁 使用缓存结果", extra={
                     "template": template_name,
                     "step": step_name,
                     "cache_key": cache_key
                 })
-                return cached_data
+                # 同一结果可能被多个文档复用，后续参与者过滤会原地修改，需返回副本
+                return copy.deepcopy(cached_data)
+        self._step_cache_misses += 1
 
+        async def _call() -> Dict[str, Any]:
+            return await self._call_step(cache_key, prompt_template, template_name, step_name, prompt_type, deadline)
+
+        async def _load():
+            response = await self.llm_cache.get(cache_key)
+            return response.get("data") if response.get("success") else None
+
+        # 相同的步骤请求（跨并发文档）在途时只调用一次 LLM，其余调用者等待并复用结果；
+        # 共享的结果对象保持不变，每个调用者（含领跑者）各拿一份副本
+        result, _ = await self.single_flight.do(cache_key, _call, _load)
+        return copy.deepcopy(result)
+
+    async def _call_step(
+            self,
+            cache_key: str,
+            prompt_template: str,
+            template_name: str,
+            step_name: str,
+            prompt_type: str,
+            deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
         try:
             backend = await self.get_backend()
-            result = await backend.async_call(
-                prompt=prompt_template,
-                model=self.llm_model,
-                params=self.recommended_params,
-                template_name=template_name,
-                step_name=step_name,
-                prompt_type=prompt_type
-            )
-            return result
+
+            async def _attempt() -> Dict[str, Any]:
+                start = time.perf_counter()
+                response = await backend.async_call(
+                    prompt=prompt_template,
+                    model=self.llm_model,
+                    params=self.recommended_params,
+                    template_name=template_name,
+                    step_name=step_name,
+                    prompt_type=prompt_type
+                )
+                if response.get("__success") is True:
+                    self.latency_tracker.record(step_name, time.perf_counter() - start)
+                return response
+
+            budget = None if deadline is None else deadline - time.monotonic()
+            if budget is not None and budget <= 0:
+                return self._deadline_exceeded_result(budget, template_name, step_name, prompt_type)
+            hedge_after = self._hedge_delay(step_name, prompt_type)
+            call_start = time.perf_counter()
+            try:
+                if hedge_after is None or (budget is not None and hedge_after >= budget):
+                    result = await asyncio.wait_for(_attempt(), budget)
+                else:
+                    result = await asyncio.wait_for(self._hedged(_attempt, hedge_after, step_name), budget)
+            except asyncio.TimeoutError:
+                # 超时的调用同样计入耗时样本（实际耗时只会更长）；只记成功调用时分位数偏低，对冲会发得过早
+                self.latency_tracker.record(step_name, time.perf_counter() - call_start)
+                if budget is None:
+                    raise
+                return self._deadline_exceeded_result(budget, template_name, step_name, prompt_type)
         except Exception as e:
             # 系统级异常：网络、超时、JSON 解析崩溃等
             system_error = str(e)
@@ -81,6 +201,81 @@ class StepExecutor:
                 include_traceback=True
             ).to_dict()
 
+        if result.get("__success") is True:
+            try:
+                await self.llm_cache.set(cache_key, copy.deepcopy(result))
+            except Exception as cache_err:
+                logger.warning(
+                    f"⚠️ 步骤缓存写入失败 [{step_name}]: {type(cache_err).__name__}: {cache_err}",
+                    extra={"step": step_name}
+                )
+        return result
+
+    def _deadline_exceeded_result(self, budget: float, template_name: str, step_name: str,
+                                  prompt_type: str) -> Dict[str, Any]:
+        self._deadline_exceeded += 1
+        logger.warning(f"⏰ [{step_name}] 超出截止时间预算（{max(budget, 0):.1f}s），放弃调用",
+                       module_name=self.CHINESE_NAME)
+        return LLMResponse.from_system_error(
+            system_error=f"步骤超出截止时间预算（{max(budget, 0):.1f}s）",
+            model=self.llm_model,
+            template_name=template_name,
+            step_name=step_name,
+            prompt_type=prompt_type,
+            include_traceback=False
+        ).to_dict()
+
+    def _hedge_delay(self, step_name: str, prompt_type: str) -> Optional[float]:
+        """步骤所属分组配置了对冲分位数且样本充足时，返回发出副本请求前的等待秒数"""
+        quantile = (config.LLM_HEDGE_QUANTILES or {}).get(prompt_type)
+        if not quantile or not 0 < quantile <= 1:
+            return None
+        return self.latency_tracker.quantile(step_name, quantile, config.LLM_HEDGE_MIN_SAMPLES)
+
+    async def _hedged(self, attempt, hedge_after: float, step_name: str) -> Dict[str, Any]:
+        """
+        对冲调用：主请求 hedge_after 秒内未返回则再发一个相同请求，取先成功的结果并取消另一个；
+        两者都失败时返回后失败的结果
+        """
+        primary = asyncio.create_task(attempt())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                self._hedges_fired += 1
+                logger.info(f"🪁 [{step_name}] {hedge_after:.2f}s 未返回，发出对冲请求", module_name=self.CHINESE_NAME)
+                tasks.add(asyncio.create_task(attempt()))
+
+            pending = set(tasks)
+            result: Optional[Dict[str, Any]] = None
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    result = task.result()
+                    if result.get("__success") is True:
+                        if task is not primary:
+                            self._hedges_won += 1
+                        return result
+            if result is None and error is not None:
+                raise error
+            return result
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def cache_counts(self) -> Dict[str, int]:
+        """步骤级缓存命中统计（不含整体结果缓存）"""
+        return {"hits": self._step_cache_hits, "misses": self._step_cache_misses}
+
+    def hedge_counts(self) -> Dict[str, int]:
+        """对冲与截止时间统计：发出的副本请求数、副本先返回的次数、超出截止时间的调用数"""
+        return {"fired": self._hedges_fired, "won": self._hedges_won, "deadline_exceeded": self._deadline_exceeded}
+
     """异步执行生成原始文本解读"""
     async def execute_suggestion(self, prompt: str, step_name: str, prompt_type: str, all_step_results: List[Dict]) -> str:
         logger.info("🧠 开始生成 LLM 建议内容", module_name=self.CHINESE_NAME)
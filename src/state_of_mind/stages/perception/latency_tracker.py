@@ -0,0 +1,36 @@
+import math
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class StepLatencyTracker:
+    """
+    按 step_name 记录最近若干次成功或超时的 LLM 调用耗时（进程内，随 StepExecutor 存活）：
+    - 用于对冲请求：步骤耗时超过其历史分位数时再发一个副本请求
+    - 每个步骤只保留最近 WINDOW 个样本，分布随模型/负载变化自动更新
+    - 样本数不足 min_samples 时 quantile 返回 None（冷启动阶段不对冲）
+    """
+    CHINESE_NAME = "全息感知基底：步骤耗时统计"
+    WINDOW = 200
+
+    def __init__(self, window: int = WINDOW):
+        self._window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, step_name: str, seconds: float) -> None:
+        samples = self._samples.get(step_name)
+        if samples is None:
+            samples = self._samples[step_name] = deque(maxlen=self._window)
+        samples.append(seconds)
+
+    def quantile(self, step_name: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """最近样本的 q 分位数（最近秩法，0 < q <= 1）"""
+        samples = self._samples.get(step_name)
+        if not samples or len(samples) < max(1, min_samples):
+            return None
+        ordered = sorted(samples)
+        rank = min(len(ordered), max(1, math.ceil(q * len(ordered))))
+        return ordered[rank - 1]
+
+    def sample_count(self, step_name: str) -> int:
+        return len(self._samples.get(step_name, ()))
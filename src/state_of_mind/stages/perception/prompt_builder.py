@@ -1,6 +1,6 @@
 """负责动态渲染"""
 import json
-from typing import Any, Dict, List, Tuple, Optional, Set
+from typing import Any, ClassVar, Dict, Iterable, List, Tuple, Optional, Set
 from src.state_of_mind.prompt_templates.prompt_templates import LLM_PROMPTS_SCHEMA
 from src.state_of_mind.stages.perception.constants import get_effective_policy, \
     render_iron_law_from_policy, COREFERENCE_RESOLUTION_BATCH, CATEGORY_SUGGESTION, \
@@ -11,6 +11,7 @@ from src.state_of_mind.stages.perception.constants import get_effective_policy,
     PARALLEL_PREPROCESSING_KEYS
 # from src.state_of_mind.utils.ip_timezone import IPBasedTimezoneResolver
 from src.state_of_mind.utils.logger import LoggerManager as logger
+from src.state_of_mind.types.perception import PromptSkeleton
 # from src.state_of_mind.utils.network import get_public_ip
 
 
@@ -20,21 +21,47 @@ class PromptBuilder:
     """
     CHINESE_NAME = "Prompt构造器"
 
+    # 预编译的步骤骨架：仅依赖 LLM_PROMPTS_SCHEMA 与策略常量，进程内共享；
+    # pre_basic_data 重新拆分 pipeline 或 config.reload 时失效
+    _compiled: ClassVar[Optional[Dict[str, Tuple[PromptSkeleton, ...]]]] = None
+
     def build_raw(self) -> Dict[str, Any]:
-        return {
-            "preprocessing_prompts": self._build_step_prompts(
+        compiled = PromptBuilder._compiled
+        if compiled is None:
+            compiled = self.compile_prompts()
+        return {key: list(skeletons) for key, skeletons in compiled.items()}
+
+    @classmethod
+    def compile_prompts(cls) -> Dict[str, Tuple[PromptSkeleton, ...]]:
+        compiled = {
+            "preprocessing_prompts": tuple(cls._build_step_prompts(
                 list(PARALLEL_PREPROCESSING_STEPS.values()), PARALLEL_PREPROCESSING
-            ),
-            "perception_prompts": self._build_step_prompts(
+            )),
+            "perception_prompts": tuple(cls._build_step_prompts(
                 list(PARALLEL_PERCEPTION_STEPS.values()), PARALLEL_PERCEPTION
-            ),
-            "high_order_prompts": self._build_step_prompts(
+            )),
+            "high_order_prompts": tuple(cls._build_step_prompts(
                 list(PARALLEL_HIGH_ORDER_STEPS.values()), PARALLEL_HIGH_ORDER
-            ),
-            "suggestion_prompts": self._build_step_prompts(
+            )),
+            "suggestion_prompts": tuple(cls._build_step_prompts(
                 list(SERIAL_SUGGESTION_STEPS.values()), SERIAL_SUGGESTION
-            ),
+            )),
         }
+        cls._compiled = compiled
+        logger.info(
+            f"📦 Prompt 骨架预编译完成，共 {sum(len(v) for v in compiled.values())} 个步骤",
+            module_name=cls.CHINESE_NAME
+        )
+        return compiled
+
+    @classmethod
+    def invalidate_compiled_prompts(cls) -> None:
+        cls._compiled = None
+
+    @staticmethod
+    def compose(template: str, blocks: Iterable[str]) -> str:
+        """骨架 + 用户输入/上下文块，单次拼接"""
+        return "".join((template, *blocks))
 
     def build_suggestion(self, template_name: str, user_input: str, suggestion_type: str) -> str:
         logger.info("🔄 开始构建 build_suggestion Prompt", module_name=self.CHINESE_NAME)
@@ -133,6 +160,7 @@ class PromptBuilder:
 
         pipeline = raw_schema.get("pipeline")
         self._split_pipeline(pipeline)
+        self.compile_prompts()
 
     @staticmethod
     def _split_pipeline(pipeline: List[Dict]) -> None:
@@ -210,7 +238,7 @@ class PromptBuilder:
     def _build_step_prompts(
             steps: List[Dict],
             step_type: str
-    ) -> List[Tuple[str, str, str]]:
+    ) -> List[PromptSkeleton]:
         """
         构建指定类型（并行/串行）的 prompt 列表，返回 (step_name, driven_by, full_prompt) 元组列表。
         每个 prompt 严格按以下顺序组织：
@@ -277,7 +305,7 @@ class PromptBuilder:
 
             # 拼接完整 prompt
             full_prompt = "\n\n".join(parts).strip()
-            prompts_with_fields.append((step_name, driven_by, full_prompt))
+            prompts_with_fields.append(PromptSkeleton(step_name, driven_by, full_prompt))
 
             # logger.info(
             #     f"📌 步骤 {step_name} 使用约束配置: {constraint_profile}",
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from jinja2 import Template
 from src.state_of_mind.config import config
 from src.state_of_mind.utils.file_util import FileUtil
@@ -9,9 +9,45 @@ from src.state_of_mind.utils.logger import LoggerManager as logger
 class ReportGenerator:
     CHINESE_NAME = "全息感知基底：生成报告"
 
+    # (模板路径, mtime_ns) -> 编译后的模板；模板编译远比渲染耗时，文件未变化时复用
+    _compiled: Dict[Tuple[str, int], Template] = {}
+
     def __init__(self, file_util: FileUtil):
         self.file_util = file_util
 
+    def _get_template(self) -> Optional[Template]:
+        template_path = str(config.FILE_DEFAULT_TEMPLATE_PATH)
+        try:
+            cache_key = (template_path, Path(template_path).stat().st_mtime_ns)
+        except OSError:
+            cache_key = None
+        template = self._compiled.get(cache_key) if cache_key else None
+        if template is not None:
+            return template
+
+        template_content = self.file_util.read_file(template_path, encoding="utf-8", auto_decode=False)
+        if not template_content:
+            logger.error(
+                "❌ 模板文件为空或读取失败",
+                extra={
+                    "template_path": template_path,
+                    "module_name": self.CHINESE_NAME
+                }
+            )
+            return None
+        template = Template(template_content)
+        if cache_key:
+            # 模板文件被修改后旧的编译结果不再使用
+            type(self)._compiled = {cache_key: template}
+        return template
+
+    @staticmethod
+    def report_exists(report_url: str) -> bool:
+        """report_url（/reports/<文件名>）对应的 HTML 文件是否仍在报告目录中"""
+        if not report_url:
+            return False
+        return (config.REPORTS_DIR / Path(report_url).name).is_file()
+
     def render_report_to_html(self, data: Dict[str, Any]) -> Optional[Path]:
         """
         将 result 数据注入 HTML 模板，生成报告。
@@ -19,7 +55,7 @@ class ReportGenerator:
         - 文件名：通过 self.file_util.generate_filename 生成
         - 前缀："全息感知基底分析报告"
         - 后缀：".html"
-        - 模板读取：复用 self.file_util.read_file
+        - 模板读取：复用 self.file_util.read_file，编译结果按文件修改时间缓存
         - 文件写入：复用 self.file_util.write_file
         - 上下文变量名：data
         """
@@ -34,22 +70,11 @@ class ReportGenerator:
             )
 
             output_path = config.REPORTS_DIR / filename
-            template_content = self.file_util.read_file(
-                str(config.FILE_DEFAULT_TEMPLATE_PATH),
-                encoding="utf-8",
-                auto_decode=False
-            )
-            if not template_content:
-                logger.error(
-                    "❌ 模板文件为空或读取失败",
-                    extra={
-                        "template_path": str(config.FILE_DEFAULT_TEMPLATE_PATH),
-                        "module_name": self.CHINESE_NAME
-                    }
-                )
+            template = self._get_template()
+            if template is None:
                 return None
 
-            html_output = Template(template_content).render(data=data)
+            html_output = template.render(data=data)
 
             success = self.file_util.write_file(
                 file_path=str(output_path),
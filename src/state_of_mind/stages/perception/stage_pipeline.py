@@ -1,33 +1,42 @@
 import asyncio
+import copy
 import time
 import uuid
-from typing import List, Any, Tuple, Dict, Optional
+from pathlib import Path
+from typing import List, Any, Tuple, Dict, Optional, Union, Iterable, AsyncIterable, AsyncIterator
 from src.state_of_mind.cache.base import BaseCache
+from src.state_of_mind.cache.near_duplicate import create_near_duplicate_index
 from src.state_of_mind.cache.redis import RedisLLMCache
+from src.state_of_mind.cache.sqlite import SQLiteLLMCache
+from src.state_of_mind.cache.single_flight import create_single_flight
 from src.state_of_mind.stages.perception.prompt_builder import PromptBuilder
 from src.state_of_mind.cache.llm_cache import LLMCache
+from src.state_of_mind.cache.tiered import TieredCache
 from src.state_of_mind.config import config
 from src.state_of_mind.utils.async_decorators import async_timed
-from .constants import REQUIRED_FIELDS_BY_CATEGORY, LLM_PARTICIPANTS_EXTRACTION, \
-    CATEGORY_RAW, PARALLEL_PREPROCESSING, PARALLEL_PERCEPTION, PARALLEL_HIGH_ORDER, \
-    SERIAL_SUGGESTION, OTHER, ALLOWED_PARALLEL_PERCEPTION_MARKERS, ALLOWED_SERIAL_SUGGESTION_MARKERS, \
-    ALLOWED_PARALLEL_HIGH_ORDER_MARKERS, PARALLEL_PERCEPTION_KEYS
+from .constants import REQUIRED_FIELDS_BY_CATEGORY, CATEGORY_RAW, PARALLEL_PREPROCESSING, \
+    PARALLEL_PERCEPTION, PARALLEL_HIGH_ORDER, SERIAL_SUGGESTION, OTHER, ALL_STEPS_FOR_FRONTEND, \
+    EVENT_PIPELINE_START, EVENT_PHASE_START, EVENT_PHASE_END, EVENT_REPORT, PHASE_ASSEMBLY, PHASE_REPORT
 from src.state_of_mind.utils.file_util import FileUtil
 from src.state_of_mind.utils.logger import LoggerManager as logger
 from .context_builder import ContextBuilder
+from .context_store import ContextStore
+from .event_stream import EventSink, PipelineEventEmitter
 from .executor import StepExecutor
 from .participant_filter import ParticipantFilter
 from .report_generator import ReportGenerator
 from .result_assembler import ResultAssembler
-from ...common.llm_response import LLMResponse
+from .step_scheduler import StepScheduler
 from ...common.raw_data_factory import create_raw_basic_data
 from ...utils.concurrency_manager import ConcurrencyManager
-from src.state_of_mind.core.types import StageProtocol
+from src.state_of_mind.core.batch_runner import BatchRunner
+from src.state_of_mind.core.types import StageProtocol, BatchItemResult
 
 
 class PerceptionPipeline(StageProtocol):
     CHINESE_NAME = "第一阶段：全息感知基底"
     REPORT_URL_PREFIX = "/reports/"
+    DOCUMENT_CACHE_PREFIX = "doc:"
     RAW_DATA_DIR = config.DATA_YUAN_RAW_DIR
     DYE_VAT_DIR = config.DATA_YUAN_DYE_VAT_DIR
 
@@ -45,10 +54,12 @@ class PerceptionPipeline(StageProtocol):
         self.prompt_builder = PromptBuilder()
         self.prompt_result = None
         self.llm_cache = self._create_cache_backend(config)
+        self.single_flight = create_single_flight(config)
+        self.near_dup_index = create_near_duplicate_index(config)
         self.file_util = FileUtil()
         self.report_generator = ReportGenerator(self.file_util)
         self.step_executor = StepExecutor(self.backend_name, self.llm_model, self.recommended_params, self.llm_cache,
-                                          self.prompt_builder)
+                                          self.prompt_builder, self.single_flight)
         self.result_assembler = ResultAssembler(self.llm_model, self.prompt_builder, self.step_executor)
         self._top_field_to_step_types = self._build_top_field_to_step_types()
         self._step_type_to_config = self._build_step_type_to_config()
@@ -64,10 +75,22 @@ class PerceptionPipeline(StageProtocol):
         if storage == c.STORAGE_LOCAL:
             return LLMCache(
                 max_size=c.LLM_CACHE_MAX_SIZE,
-                ttl_seconds=c.LLM_CACHE_TTL
+                ttl_seconds=c.LLM_CACHE_TTL,
+                max_bytes=c.LLM_CACHE_MAX_BYTES,
+                compression=c.LLM_CACHE_COMPRESSION
             )
         elif storage == c.STORAGE_REDIS:
             return RedisLLMCache(config=c, default_ttl=c.LLM_CACHE_TTL)
+        elif storage == c.STORAGE_TIERED:
+            return TieredCache(config=c)
+        elif storage == c.STORAGE_SQLITE:
+            return SQLiteLLMCache(
+                path=c.SQLITE_CACHE_PATH or None,
+                max_size=c.LLM_CACHE_MAX_SIZE,
+                ttl_seconds=c.LLM_CACHE_TTL,
+                max_bytes=c.SQLITE_CACHE_MAX_BYTES,
+                compression=c.LLM_CACHE_COMPRESSION
+            )
         else:
             raise ValueError(f"Unsupported storage backend: {storage}")
 
@@ -75,8 +98,9 @@ class PerceptionPipeline(StageProtocol):
         if self._participant_filter is None:
             async with self._participant_filter_lock:
                 if self._participant_filter is None:
-                    backend = await self.step_executor.get_backend()
-                    self._participant_filter = ParticipantFilter(self.prompt_builder, backend)
+                    # 指代消解需经执行器构建 prompt 并记录调用结果，而非直接调用 LLM 后端
+                    await self.step_executor.get_backend()
+                    self._participant_filter = ParticipantFilter(self.prompt_builder, self.step_executor)
         return self._participant_filter
 
     async def _get_context_builder(self):
@@ -93,29 +117,55 @@ class PerceptionPipeline(StageProtocol):
         return self._context_builder
 
     async def run(self, user_input: str, category: str = CATEGORY_RAW, **kwargs) -> Dict[str, Any]:
-        return await self.async_extract(
-            user_input=user_input,
-            template_name=category,
-            suggestion_type=config.SUGGESTION_TYPE,
-            title=config.REPORT_TITLE,
-            **kwargs
-        )
+        kwargs.setdefault("suggestion_type", config.SUGGESTION_TYPE)
+        kwargs.setdefault("title", config.REPORT_TITLE)
+        return await self.async_extract(user_input=user_input, template_name=category, **kwargs)
 
     async def run_batch(self, user_inputs: List[str], category: str = CATEGORY_RAW, **kwargs) -> List[Dict[str, Any]]:
         if not user_inputs:
             return []
-        # 并发执行，保持顺序，任一失败则抛出
-        results = await asyncio.gather(
-            *(self.run(inp, category, **kwargs) for inp in user_inputs)
+        # 有界并发执行，保持顺序；单条失败不影响整批，抛出异常的失败项以 {"report_url": None, "error": ...} 占位
+        results: List[Optional[Dict[str, Any]]] = [None] * len(user_inputs)
+        async for item in self.iter_batch(user_inputs, category, **kwargs):
+            results[item.index] = item.result if item.result is not None else {"report_url": None, "error": item.error}
+        return results
+
+    def iter_batch(
+            self,
+            user_inputs: Union[Iterable[str], AsyncIterable[str]],
+            category: str = CATEGORY_RAW,
+            max_in_flight: Optional[int] = None,
+            checkpoint_path: Optional[Union[str, Path]] = None,
+            **kwargs
+    ) -> AsyncIterator[BatchItemResult]:
+        """按完成顺序流式产出批量结果（携带输入序号），支持断点续跑"""
+        # 显式带上当前配置的建议类型与标题，使其参与断点哈希
+        kwargs.setdefault("suggestion_type", config.SUGGESTION_TYPE)
+        kwargs.setdefault("title", config.REPORT_TITLE)
+        runner = BatchRunner(
+            self,
+            max_in_flight=max_in_flight or config.BATCH_MAX_IN_FLIGHT,
+            checkpoint_path=checkpoint_path
         )
-        return list(results)
+        return runner.iter_results(user_inputs, category, **kwargs)
 
     @async_timed
     async def async_extract(self, template_name: str, user_input: str, suggestion_type: str,
-                            title: str = "全息感知基底", **template_vars) -> Dict[str, Any]:
-        """异步核心流程"""
+                            title: str = "全息感知基底", on_event: Optional[EventSink] = None,
+                            render_report: bool = True, return_result: bool = False,
+                            **template_vars) -> Dict[str, Any]:
+        """
+        异步核心流程
+        on_event: 可选的进度事件回调（流式接口使用），不参与缓存 key 计算
+        render_report: 是否渲染 HTML 报告（离线批处理可关闭，仅保存 raw / dye_vat）
+        return_result: 返回值中是否附带结构化结果（"result" 字段）
+        返回 {"report_url", "success"}（success=False 表示结果校验未通过，未写入缓存）
+        """
         trace_id = str(uuid.uuid4())
         logger.set_trace_id(trace_id)
+        # 请求级 SLO：从进入流水线开始计时，调度器据此为各步骤分配 LLM 调用预算
+        deadline = time.monotonic() + config.LLM_REQUEST_SLO if config.LLM_REQUEST_SLO > 0 else None
+        emitter = PipelineEventEmitter(on_event)
         context = template_vars.copy()
         context["user_input"] = user_input
         context["llm_model"] = self.llm_model
@@ -131,11 +181,93 @@ class PerceptionPipeline(StageProtocol):
         if cache_response.get("success"):
             cached_data = cache_response.get("data")
             if cached_data is not None:
-                report_url = cached_data.get("meta", {}).get("report_url", "")
-                res = {"report_url": report_url}
+                if render_report:
+                    report_url = await self._ensure_report(cache_key, cached_data)
+                else:
+                    report_url = cached_data.get("meta", {}).get("report_url", "")
+                res = {"report_url": report_url, "success": True}
+                if return_result:
+                    res["result"] = cached_data
                 logger.info("🔁 使用缓存结果", extra={"template": template_name, "report_url": report_url})
+                await emitter.emit(EVENT_REPORT, trace_id=trace_id, report_url=report_url, cached=True)
                 return res
 
+        near_dup = None
+        if self.near_dup_index is not None and user_input:
+            # 命名空间取除原文外的全部 key 参数，模板/模型不同的结果不互相复用
+            namespace = self.llm_cache.make_key(
+                template_name, **{k: v for k, v in context.items() if k != "user_input"}
+            )
+            signature = await asyncio.to_thread(self.near_dup_index.signature, user_input)
+            if signature is not None:
+                near_dup = (namespace, signature)
+                hit = await self._lookup_near_duplicate(namespace, signature)
+                if hit is not None:
+                    matched_key, similarity, cached_data = hit
+                    if render_report:
+                        report_url = await self._ensure_report(matched_key, cached_data)
+                    else:
+                        report_url = cached_data.get("meta", {}).get("report_url", "")
+                    marker = {"matched_key": matched_key, "similarity": round(similarity, 4)}
+                    res = {"report_url": report_url, "success": True, "near_duplicate": marker}
+                    if return_result:
+                        # 标记只属于本次返回，不写回被复用的缓存结果
+                        result = copy.deepcopy(cached_data)
+                        result["meta"]["near_duplicate"] = marker
+                        res["result"] = result
+                    logger.info("🔁 使用近重复输入的缓存结果", extra={
+                        "template": template_name, "report_url": report_url, **marker
+                    })
+                    await emitter.emit(EVENT_REPORT, trace_id=trace_id, report_url=report_url, cached=True,
+                                       near_duplicate=marker)
+                    return res
+
+        async def _extract() -> Dict[str, Any]:
+            return await self._run_extraction(
+                cache_key, context, template_name, user_input, suggestion_type, title,
+                trace_id, emitter, render_report, near_dup, deadline
+            )
+
+        async def _load() -> Optional[Dict[str, Any]]:
+            response = await self.llm_cache.get(cache_key)
+            data = response.get("data") if response.get("success") else None
+            if data is None:
+                return None
+            return {"report_url": data.get("meta", {}).get("report_url", ""), "success": True, "result": data}
+
+        # 相同输入的分析正在进行时不重复执行，等待其完成并复用结果（HTML 是否渲染不同则分开执行）
+        flight_key = f"{cache_key}:{'html' if render_report else 'nohtml'}"
+        outcome, shared = await self.single_flight.do(flight_key, _extract, _load)
+        if shared:
+            logger.info("🔗 复用进行中的相同分析结果", extra={"template": template_name,
+                                                         "report_url": outcome["report_url"]})
+            await emitter.emit(EVENT_REPORT, trace_id=trace_id, report_url=outcome["report_url"],
+                               cached=False, coalesced=True)
+        res = {"report_url": outcome["report_url"], "success": outcome.get("success", True)}
+        if return_result:
+            # 结果对象可能被多个等待者共享，各自返回副本
+            res["result"] = copy.deepcopy(outcome["result"]) if shared else outcome["result"]
+        return res
+
+    async def _run_extraction(
+            self,
+            cache_key: str,
+            context: Dict[str, Any],
+            template_name: str,
+            user_input: str,
+            suggestion_type: str,
+            title: str,
+            trace_id: str,
+            emitter: PipelineEventEmitter,
+            render_report: bool,
+            near_dup: Optional[Tuple[str, Tuple[int, ...]]] = None,
+            deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        整体缓存未命中时的完整流程，返回 {"report_url", "success", "result"}
+        near_dup: (命名空间, MinHash 签名)，成功缓存后登记到近重复索引
+        deadline: 请求截止时间（time.monotonic() 绝对值），None 表示不限制
+        """
         self.prompt_result = self.prompt_builder.build_raw()
         preprocessing_prompts = self.prompt_result["preprocessing_prompts"]
         perception_prompts = self.prompt_result["perception_prompts"]
@@ -146,62 +278,63 @@ class PerceptionPipeline(StageProtocol):
         all_step_results = []
         prompt_records = {PARALLEL_PREPROCESSING: [], PARALLEL_PERCEPTION: [], PARALLEL_HIGH_ORDER: [], SERIAL_SUGGESTION: [], OTHER: []}
         raw_response_records = {PARALLEL_PREPROCESSING: [], PARALLEL_PERCEPTION: [], PARALLEL_HIGH_ORDER: [], SERIAL_SUGGESTION: [], OTHER: []}
-        context_desc_info = []
-
-        await self._run_preprocessing_parallel_async(
-            preprocessing_prompts, context, template_name, cache_key, all_step_results, prompt_records,
-            context_desc_info
+        context_store = ContextStore()
+        await emitter.emit(EVENT_PIPELINE_START, trace_id=trace_id, steps=list(ALL_STEPS_FOR_FRONTEND))
+
+        graph = StepScheduler.build_graph({
+            PARALLEL_PREPROCESSING: preprocessing_prompts,
+            PARALLEL_PERCEPTION: perception_prompts,
+            PARALLEL_HIGH_ORDER: high_order_prompts,
+            SERIAL_SUGGESTION: suggestion_prompts,
+        })
+        scheduler = StepScheduler(
+            self.step_executor,
+            await self._get_context_builder(),
+            await self._get_participant_filter(),
+            self.concurrency_manager,
+            self.llm_model,
+            emitter,
+            deadline
         )
-
-        # === 动态过滤：仅使用 context ===
-        filtered_parallel_prompts = [
-            (step_name, driven_by, prompt)
-            for (step_name, driven_by, prompt) in perception_prompts
-            if context.get("pre_screening", {}).get(driven_by, False)
-        ]
-
-        await self._run_perception_parallel_async(
-            filtered_parallel_prompts, context, template_name, cache_key, all_step_results, prompt_records,
-            context_desc_info
+        # 组装前记录调用方传入的模板变量（步骤结果随后写入 context），参与整篇结果缓存 key
+        template_vars = {k: v for k, v in context.items() if k not in ("user_input", "llm_model")}
+        await scheduler.run(
+            graph, context, template_name, all_step_results, prompt_records, context_store
         )
 
-        # 判断是否启用高阶推理
-        eligible = context.get("eligibility", {}).get("eligible", False)
-        if eligible:
-            has_valid_perception = any(
-                key in context and bool(context[key])
-                for key in PARALLEL_PERCEPTION_KEYS
-            )
-            if has_valid_perception:
-                await self._run_high_order_parallel_async(
-                    high_order_prompts, context, template_name, cache_key,
-                    all_step_results, prompt_records, context_desc_info
-                )
-                await self._run_suggestion_serial_async(
-                    suggestion_prompts, context, template_name, cache_key,
-                    all_step_results, prompt_records, context_desc_info
-                )
-            else:
-                logger.info("⏭️ eligible=true 但无有效并行感知数据，跳过高阶策略、矛盾、操控、建议四步链")
+        await emitter.emit(EVENT_PHASE_START, phase=PHASE_ASSEMBLY)
+        document_key = self._make_document_cache_key(
+            template_name, scheduler.step_cache_keys, suggestion_type, title, template_vars
+        )
+        result = await self._load_cached_document(document_key, basic_data) if scheduler.fully_cached else None
+        if result is not None:
+            # 全部步骤命中：组装、校验与建议/语义标识注入的结果与上次相同，直接复用
+            is_success = True
+            validity_level = result["meta"].get("validity_level")
+            final_validation_errors = []
         else:
-            logger.info("⏭️ eligible=false，跳过高阶策略、矛盾、操控、建议四步链")
-
-        result = self.result_assembler.assemble_final_data(context, basic_data)
-        valid_result = self.result_assembler.validate_final_result(result)
-        is_success = bool(valid_result.get("__success"))
-        if is_success:
-            # 注入原始文本解读内容
-            await self.result_assembler.inject_suggestion_into_result(result, user_input, suggestion_type, all_step_results, prompt_records, title)
-            # 注入全局语义标识
-            await self.result_assembler.inject_global_semantic_signature(result, user_input, all_step_results, prompt_records)
+            result = self.result_assembler.assemble_final_data(context, basic_data)
+            valid_result = self.result_assembler.validate_final_result(result)
+            is_success = bool(valid_result.get("__success"))
+            validity_level = valid_result["__validity_level"]
+            final_validation_errors = valid_result["__final_validation_errors"]
+            result["meta"]["validity_level"] = validity_level
+            if is_success:
+                # 注入原始文本解读内容
+                await self.result_assembler.inject_suggestion_into_result(result, user_input, suggestion_type, all_step_results, prompt_records, title)
+                # 注入全局语义标识
+                await self.result_assembler.inject_global_semantic_signature(result, user_input, all_step_results, prompt_records)
+                # 报告渲染前的结果（不含水印与 HTML 预处理字段）
+                await self.llm_cache.set(document_key, copy.deepcopy(result))
 
         aggregation = self.result_assembler.aggregate_step_results(all_step_results, raw_response_records)
         aggregation["__errors_summary"]["final_validation_errors"] = [
-            {"step": "final_validation", "errors": valid_result["__final_validation_errors"]}
-        ] if valid_result["__final_validation_errors"] else []
-        result["meta"]["validity_level"] = valid_result["__validity_level"]
+            {"step": "final_validation", "errors": final_validation_errors}
+        ] if final_validation_errors else []
+        await emitter.emit(EVENT_PHASE_END, phase=PHASE_ASSEMBLY, validity_level=validity_level)
 
         # 注意：即使失败，也要持久化 dye_vat 诊断数据
+        await emitter.emit(EVENT_PHASE_START, phase=PHASE_REPORT)
         report_url = await self._persist_extraction_artifacts(
             result=result,
             aggregation=aggregation,
@@ -209,374 +342,82 @@ class PerceptionPipeline(StageProtocol):
             user_input=user_input,
             prompt_records=prompt_records,
             raw_response_records=raw_response_records,
-            is_success=is_success
+            is_success=is_success,
+            render_report=render_report
         )
+        await emitter.emit(EVENT_PHASE_END, phase=PHASE_REPORT)
 
         if is_success:
             await self.llm_cache.set(cache_key, result)
+            if near_dup is not None:
+                await self.near_dup_index.add(near_dup[0], near_dup[1], cache_key)
             logger.info("✅ 最终结果已缓存", extra={"cache_key": cache_key})
         else:
             logger.warning("🟡 提取流程未完全成功，跳过缓存", extra={
                 "cache_key": cache_key,
-                "validity_level": valid_result.get("__validity_level"),
-                "final_errors": valid_result.get("__final_validation_errors")
+                "validity_level": validity_level,
+                "final_errors": final_validation_errors
             })
-        return {"report_url": report_url}
-
-    @async_timed
-    async def _run_preprocessing_parallel_async(
-            self,
-            prompts: List[Tuple[str, str, str]],
-            context: Dict[str, Any],
-            template_name: str,
-            cache_key_base: str,
-            all_step_results: List[Dict],
-            prompt_records: Dict,
-            context_desc_info: List
-    ):
-        if not prompts:
-            logger.info("⏭️ 无预处理任务")
-            return
-
-        logger.info("⚡ 并发执行预处理任务", extra={"count": len(prompts)})
-        context_builder = await self._get_context_builder()
-
-        async def _task(idx: int, step_name: str, driven_by: str, prompt_template: str) -> Dict[str, Any]:
-            try:
-                async with self.concurrency_manager.semaphore:
-                    cache_key = f"{cache_key_base}:{step_name}:{idx}"
-                    logger.info(f"⚡ [{step_name}] 缓存 key: ...{cache_key[-10:]}")
-                    rendered_prompt = context_builder.build_user_input_context(
-                        prompt_template, context["user_input"], context_desc_info
-                    )
-
-                    prompt_records[PARALLEL_PREPROCESSING].append({
-                        "step_name": step_name,
-                        "prompt": rendered_prompt
-                    })
-
-                    result = await self.step_executor.execute_step(
-                        prompt_template=rendered_prompt,
-                        template_name=template_name,
-                        step_name=step_name,
-                        cache_key=cache_key,
-                        prompt_type=PARALLEL_PREPROCESSING
-                    )
-
-                    if result.get("__success") is True:
-                        try:
-                            await self.llm_cache.set(cache_key, result)
-                        except Exception as cache_err:
-                            logger.warning(
-                                f"⚠️ 预处理任务缓存写入失败 [{step_name}]: {type(cache_err).__name__}: {cache_err}",
-                                extra={"step": step_name}
-                            )
-
-                    logger.info(f"✅ 预处理任务 [{step_name}] 执行完成")
-                    return result
-            except Exception as e:
-                error_msg = str(e)
-                logger.error(f"[{step_name}] 预处理任务异常: {error_msg}")
-                failure_resp = LLMResponse.from_system_error(
-                    system_error=error_msg,
-                    model=self.llm_model,
-                    template_name=template_name,
-                    step_name=step_name,
-                    prompt_type=PARALLEL_PREPROCESSING,
-                    include_traceback=True
-                )
-                return failure_resp.to_dict()
-
-        tasks = [
-            _task(idx, step_name, driven_by, prompt)
-            for idx, (step_name, driven_by, prompt) in enumerate(prompts)
-        ]
-        results = await asyncio.gather(*tasks, return_exceptions=False)
-
-        for idx, result in enumerate(results):
-            try:
-                step_name = result.get("step_name", f"unknown_preprocessing_{idx}")
-                all_step_results.append(result)
-                context_builder.update_context_from_result(result, context, step_name)
-                if step_name == LLM_PARTICIPANTS_EXTRACTION:
-                    context_builder.build_common_context(
-                        step_name=step_name,
-                        context=context,
-                        context_desc_info=context_desc_info
-                    )
-
-            except Exception as e:
-                system_error = str(e)
-                logger.error(
-                    f"⚠️ 预处理后处理失败 [idx={idx}, step={result.get('step_name', 'unknown')}]: {system_error}"
-                )
-                fallback_result = LLMResponse.from_system_error(
-                    system_error=system_error,
-                    model=self.llm_model,
-                    template_name=template_name,
-                    step_name=result.get("step_name", f"unknown_{idx}"),
-                    prompt_type=PARALLEL_PREPROCESSING,
-                    include_traceback=True
-                )
-                all_step_results.append(fallback_result.to_dict())
-
-        success_count = sum(1 for r in results if r.get("__success", False))
-        logger.info(
-            f"并行预处理任务完成: {len(results)} 个任务, 成功 {success_count} 个",
-            extra={"total": len(results), "success": success_count}
+        await emitter.emit(
+            EVENT_REPORT,
+            trace_id=trace_id,
+            report_url=report_url,
+            cached=False,
+            success=is_success,
+            validity_level=validity_level
         )
+        return {"report_url": report_url, "success": is_success, "result": result}
 
-    @async_timed
-    async def _run_perception_parallel_async(
+    def _make_document_cache_key(
             self,
-            prompts: List[Tuple[str, str, str]],
-            context: Dict[str, Any],
             template_name: str,
-            cache_key_base: str,
-            all_step_results: List[Dict],
-            prompt_records: Dict,
-            context_desc_info: List,
-    ):
-        """并发执行感知任务"""
-        if not prompts:
-            logger.info("⏭️ 无并行感知任务")
-            return
-
-        logger.info("⚡ 执行并行感知任务", extra={"count": len(prompts)})
-        context_builder = await self._get_context_builder()
-        participant_filter = await self._get_participant_filter()
-        legitimate_participants = participant_filter.build_legitimate_participants_set(context)
-
-        async def _task(idx: int, step_name: str, prompt_template: str) -> Dict[str, Any]:
-            try:
-                async with self.concurrency_manager.semaphore:
-                    cache_key = f"{cache_key_base}:{step_name}:{idx}"
-                    logger.info(f"⚡ [{step_name}] 缓存 key: ...{cache_key[-10:]}")
-
-                    allowed_markers = ALLOWED_PARALLEL_PERCEPTION_MARKERS.get(idx, set())
-                    rendered_prompt = context_builder.inject_allowed_context(
-                        prompt_template, context_desc_info, allowed_markers
-                    )
-
-                    prompt_records.setdefault(PARALLEL_PERCEPTION, []).append({
-                        "step_name": step_name,
-                        "prompt": rendered_prompt
-                    })
-
-                    data = await self.step_executor.execute_step(
-                        prompt_template=rendered_prompt,
-                        template_name=template_name,
-                        step_name=step_name,
-                        cache_key=cache_key,
-                        prompt_type=PARALLEL_PERCEPTION
-                    )
-
-                    if data.get("__success") is True:
-                        try:
-                            await self.llm_cache.set(cache_key, data)
-                        except Exception as cache_err:
-                            logger.warning(
-                                f"⚠️ 并行感知任务缓存写入失败 [{step_name}]: {type(cache_err).__name__}: {cache_err}",
-                                extra={"step": step_name}
-                            )
-                    logger.debug(f"✅ 并行感知任务 [{step_name}] 执行完成")
-                    return data
-
-            except Exception as e:
-                error_msg = str(e)
-                logger.error(f"[{step_name}] 并行感知任务兜底异常: {error_msg}")
-                failure_resp = LLMResponse.from_system_error(
-                    system_error=error_msg,
-                    model=self.llm_model,
-                    template_name=template_name,
-                    step_name=step_name,
-                    prompt_type=PARALLEL_PERCEPTION,
-                    include_traceback=True
-                )
-                return failure_resp.to_dict()
-
-        tasks = [
-            _task(idx, step_name, prompt)
-            for idx, (step_name, driven_by, prompt) in enumerate(prompts)
-        ]
-
-        results = await asyncio.gather(*tasks, return_exceptions=False)
-        for idx, result in enumerate(results):
-            try:
-                await participant_filter.filter_perception_results(
-                    context["user_input"], result, legitimate_participants, prompt_records, all_step_results
-                )
-                all_step_results.append(result)
-                context_builder.update_context_from_result(
-                    result, context, result.get("step_name")
-                )
-            except Exception as e:
-                system_error = str(e)
-                logger.error(
-                    f"⚠️ 并行感知任务后处理失败 [idx={idx}, step={result.get('step_name', 'unknown')}]: {system_error}"
-                )
-                fallback_result = LLMResponse.from_system_error(
-                    system_error=system_error,
-                    model=self.llm_model,
-                    template_name=template_name,
-                    step_name=result.get("step_name", f"unknown_{idx}"),
-                    prompt_type=PARALLEL_PERCEPTION,
-                    include_traceback=True
-                )
-                all_step_results.append(fallback_result.to_dict())
-
-        dynamic_desc = context_builder.build_perception_context_batch(context)
-        if dynamic_desc:
-            context_desc_info.append(dynamic_desc)
-
-        legit_participants_ctx = context_builder.build_legitimate_participants_context(context)
-        if legit_participants_ctx:
-            context_desc_info.append(legit_participants_ctx)
-
-        success_count = sum(1 for r in results if r.get("__success", False))
-        logger.info(
-            f"并行感知任务完成: {len(results)} 个任务, 成功 {success_count} 个",
-            extra={"total": len(results), "success": success_count}
+            step_cache_keys: Dict[str, str],
+            suggestion_type: str,
+            title: str,
+            template_vars: Dict[str, Any]
+    ) -> str:
+        """整篇结果缓存 key：由本次执行的全部步骤 key 决定（步骤 key 已包含原文、模型与参数）"""
+        return self.DOCUMENT_CACHE_PREFIX + self.llm_cache.make_key(
+            template_name,
+            steps=sorted(step_cache_keys.values()),
+            suggestion_type=suggestion_type,
+            title=title,
+            **template_vars
         )
 
-    @async_timed
-    async def _run_high_order_parallel_async(
-        self,
-        prompts: List[Tuple[str, str, str]],
-        context: Dict[str, Any],
-        template_name: str,
-        cache_key_base: str,
-        all_step_results: List[Dict],
-        prompt_records: Dict,
-        context_desc_info: List[str],
-    ):
-        """
-        并发执行高阶推理三步链（策略锚定 / 矛盾暴露 / 操控机制解码）
-        前提：context 已包含完整的并行感知结果，且 eligible=True
-        """
-        if not prompts:
-            logger.info("⏭️ 无并行高阶任务")
-            return
-
-        if len(prompts) != 3:
-            logger.warning(f"⚠️ 并行高阶任务数量异常，期望 3 个，实际 {len(prompts)} 个")
-
-        logger.info("⚡ 执行并行高阶任务", extra={"count": len(prompts)})
-        context_builder = await self._get_context_builder()
-
-        async def _task(idx: int, step_name: str, driven_by: str, prompt_template: str) -> Dict[str, Any]:
-            try:
-                async with self.concurrency_manager.semaphore:
-                    cache_key = f"{cache_key_base}:{step_name}:{idx}"
-                    logger.info(f"⚡ [{step_name}] 缓存 key: ...{cache_key[-10:]}")
-
-                    allowed_markers = ALLOWED_PARALLEL_HIGH_ORDER_MARKERS.get(idx, set())
-                    rendered_prompt = context_builder.inject_allowed_context(
-                        prompt_template, context_desc_info, allowed_markers
-                    )
-
-                    prompt_records.setdefault(PARALLEL_HIGH_ORDER, []).append({
-                        "step_name": step_name,
-                        "prompt": rendered_prompt
-                    })
-
-                    result = await self.step_executor.execute_step(
-                        prompt_template=rendered_prompt,
-                        template_name=template_name,
-                        step_name=step_name,
-                        cache_key=cache_key,
-                        prompt_type=PARALLEL_HIGH_ORDER
-                    )
-
-                    if result.get("__success") is True:
-                        try:
-                            await self.llm_cache.set(cache_key, result)
-                        except Exception as cache_err:
-                            logger.warning(
-                                f"⚠️ 并行高阶任务缓存写入失败 [{step_name}]: {type(cache_err).__name__}: {cache_err}",
-                                extra={"step": step_name}
-                            )
-
-                    logger.debug(f"✅ 并行高阶任务 [{step_name}] 执行完成")
-                    return result
-
-            except Exception as e:
-                error_msg = str(e)
-                logger.error(f"[{step_name}] 并行高阶任务异常: {error_msg}")
-                failure_resp = LLMResponse.from_system_error(
-                    system_error=error_msg,
-                    model=self.llm_model,
-                    template_name=template_name,
-                    step_name=step_name,
-                    prompt_type=PARALLEL_HIGH_ORDER,
-                    include_traceback=True
-                )
-                return failure_resp.to_dict()
-
-        tasks = [
-            _task(idx, step_name, driven_by, prompt)
-            for idx, (step_name, driven_by, prompt) in enumerate(prompts)
-        ]
-
-        results = await asyncio.gather(*tasks, return_exceptions=False)
-        for idx, result in enumerate(results):
-            step_name = result.get("step_name", f"unknown_high_order_{idx}")
-            all_step_results.append(result)
-            context_builder.update_context_from_result(result, context, step_name)
-            context_builder.build_common_context(step_name, context, context_desc_info)
-
-        success_count = sum(1 for r in results if r.get("__success", False))
-        logger.info(
-            f"并行高阶任务完成: {len(results)} 个任务, 成功 {success_count} 个",
-            extra={"total": len(results), "success": success_count}
-        )
-
-    @async_timed
-    async def _run_suggestion_serial_async(
+    async def _load_cached_document(self, document_key: str, basic_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        response = await self.llm_cache.get(document_key)
+        result = response.get("data") if response.get("success") else None
+        if result is None:
+            return None
+        # 缓存后端可能返回共享对象：本次运行写入 ID/时间戳并渲染报告前先复制，避免改动缓存中的结果
+        result = copy.deepcopy(result)
+        # 记录 ID 与时间戳属于本次运行
+        for field in ("id", "timestamp", "formatter_time"):
+            result[field] = basic_data[field]
+        logger.info("⚡ 全部步骤命中缓存，复用已组装的结果", extra={"document_key": document_key})
+        return result
+
+    async def _lookup_near_duplicate(
             self,
-            prompts: List[Tuple[str, str, str]],
-            context: Dict[str, Any],
-            template_name: str,
-            cache_key_base: str,
-            all_step_results: List[Dict],
-            prompt_records: Dict,
-            context_desc_info: List
-    ):
-        """串行执行任务，后续步骤可使用前面步骤注入的字段"""
-        if not prompts:
-            logger.info("⏭️ 无串行最小可行性建议任务")
-            return
-
-        logger.info("🔁 执行串行最小可行性建议任务", extra={"count": len(prompts)})
-        context_builder = await self._get_context_builder()
-        total_steps = len(prompts)
-
-        for idx, (step_name, driven_by, prompt_template) in enumerate(prompts):
-            cache_key = f"{cache_key_base}:{step_name}:{idx}"
-            logger.info(f"⚡ [{step_name}] 缓存 key: ...{cache_key[-10:]}")
-            rendered_prompt = prompt_template
-
-            # === 关键：按 marker 动态筛选要注入的上下文 ===
-            allowed = ALLOWED_SERIAL_SUGGESTION_MARKERS.get(idx, set())
-            rendered_prompt = context_builder.inject_allowed_context(rendered_prompt, context_desc_info, allowed)
-
-            prompt_records[SERIAL_SUGGESTION].append({"step_name": step_name, "prompt": rendered_prompt})
-            result = await self.step_executor.execute_step(rendered_prompt, template_name, step_name,
-                                                           cache_key, SERIAL_SUGGESTION)
-            all_step_results.append(result)
-            context_builder.update_context_from_result(result, context, step_name)
-            if idx < total_steps - 1:
-                context_builder.build_common_context(step_name, context, context_desc_info)
-
-            if result.get("__success") is True:
-                try:
-                    await self.llm_cache.set(cache_key, result)
-                except Exception as cache_err:
-                    logger.warning(
-                        f"⚠️ 串行最小可行性建议任务缓存写入失败 [{step_name}]: {type(cache_err).__name__}: {cache_err}",
-                        extra={"step": step_name}
-                    )
-            logger.debug(f"✅ 串行最小可行性建议任务 [{step_name}] 执行完成")
+            namespace: str,
+            signature: Tuple[int, ...],
+            max_candidates: int = 3
+    ) -> Optional[Tuple[str, float, Dict[str, Any]]]:
+        """按相似度从高到低取候选的缓存结果，返回 (缓存 key, 相似度, 结果)；结果已失效的候选移出索引"""
+        ranked = (await self.near_dup_index.query(namespace, signature))[:max_candidates]
+        if not ranked:
+            return None
+        response = await self.llm_cache.get_many([cache_key for cache_key, _ in ranked])
+        if not response.get("success"):
+            return None
+        values = response.get("data") or {}
+        for cache_key, similarity in ranked:
+            cached_data = values.get(cache_key)
+            if cached_data is not None:
+                return cache_key, similarity, cached_data
+            await self.near_dup_index.discard(cache_key)
+        return None
 
     @staticmethod
     def _build_top_field_to_step_types() -> Dict[str, List[str]]:
@@ -615,12 +456,13 @@ class PerceptionPipeline(StageProtocol):
             user_input: str,
             prompt_records: Dict[str, List[Dict]],
             raw_response_records: Dict[str, List[Dict]],
-            is_success: bool = True
+            is_success: bool = True,
+            render_report: bool = True
     ) -> Optional[str]:
         """
         通用结果持久化函数，无论成功与否都保存诊断数据（dye vat），
-        成功时额外保存结构化 raw 数据和生成报告。
-        返回 report_url（仅成功时非空）。
+        成功时额外保存结构化 raw 数据和生成报告（render_report=False 时跳过报告）。
+        返回 report_url（仅成功且渲染报告时非空）。
         """
         filename = self.file_util.generate_filename(prefix=template_name, suffix=".json")
         report_url = ""
@@ -649,20 +491,11 @@ class PerceptionPipeline(StageProtocol):
                 if self.file_util.write_json(result, raw_file_path):
                     logger.info("💾 已保存结构化数据", extra={"path": str(raw_file_path)})
 
-                # 注入水印相关配置
-                await self.result_assembler.inject_watermark_into_result(result)
+                if not render_report:
+                    logger.info("⏭️ 已跳过 HTML 报告渲染", extra={"category": template_name})
+                    return report_url
 
-                # 预处理相关步骤的数据
-                await self.result_assembler.preprocess_for_html_rendering(result)
-
-                outpath = self.report_generator.render_report_to_html(result)
-                if outpath is None:
-                    logger.error("❌ 报告生成失败，跳过 URL 构造")
-                    report_url = ""
-                else:
-                    report_url = f"{self.REPORT_URL_PREFIX}{outpath.name}"
-                    result["meta"]["report_url"] = report_url
-                    logger.info("✅ 构造HTML报告成功", extra={"report_url": report_url})
+                report_url = await self._render_report(result)
         except Exception as e:
             logger.exception("持久化 extract 结果失败", extra={
                 "category": template_name,
@@ -672,6 +505,54 @@ class PerceptionPipeline(StageProtocol):
 
         return report_url
 
+    async def _render_report(self, result: Dict[str, Any]) -> str:
+        """渲染 HTML 报告并写入 result["meta"]["report_url"]，失败返回空字符串"""
+        # 注入水印相关配置
+        await self.result_assembler.inject_watermark_into_result(result)
+
+        # 预处理相关步骤的数据
+        await self.result_assembler.preprocess_for_html_rendering(result)
+
+        outpath = self.report_generator.render_report_to_html(result)
+        if outpath is None:
+            logger.error("❌ 报告生成失败，跳过 URL 构造")
+            return ""
+        report_url = f"{self.REPORT_URL_PREFIX}{outpath.name}"
+        result["meta"]["report_url"] = report_url
+        logger.info("✅ 构造HTML报告成功", extra={"report_url": report_url})
+        return report_url
+
+    async def _ensure_report(self, cache_key: str, cached_data: Dict[str, Any]) -> str:
+        """
+        缓存结果的报告文件缺失（被清理，或来自未渲染报告的批处理/缓存重建）时重新渲染，
+        并把新的 report_url 写回缓存；同一条目的并发请求只渲染一次
+        """
+        report_url = cached_data.get("meta", {}).get("report_url", "")
+        if self.report_generator.report_exists(report_url):
+            return report_url
+
+        async def _load_existing() -> Optional[str]:
+            # 其他请求/进程已重新生成并回写缓存
+            response = await self.llm_cache.get(cache_key)
+            data = response.get("data") if response.get("success") else None
+            url = (data or {}).get("meta", {}).get("report_url", "")
+            return url if url != report_url and self.report_generator.report_exists(url) else None
+
+        async def _regenerate() -> str:
+            existing = await _load_existing()
+            if existing:
+                return existing
+            logger.info("🖨️ 缓存结果的报告文件不存在，重新生成", extra={"cache_key": cache_key,
+                                                                "report_url": report_url})
+            new_url = await self._render_report(cached_data)
+            if new_url:
+                await self.llm_cache.set(cache_key, cached_data)
+            return new_url
+
+        new_url, _ = await self.single_flight.do(f"{cache_key}:report", _regenerate, _load_existing)
+        cached_data.setdefault("meta", {})["report_url"] = new_url
+        return new_url
+
     # @staticmethod
     # def _open_report_in_browser(outpath: Path) -> None:
     #     try:
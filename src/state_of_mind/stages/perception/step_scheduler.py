@@ -0,0 +1,495 @@
+import asyncio
+import copy
+import time
+from typing import Dict, Any, List, Tuple, Set, Optional
+from src.state_of_mind.cache.batch_loader import CacheBatchLoader
+from src.state_of_mind.common.llm_response import LLMResponse
+from src.state_of_mind.types.perception import StepNode
+from src.state_of_mind.utils.logger import LoggerManager as logger
+from .constants import (
+    PARALLEL_PREPROCESSING, PARALLEL_PERCEPTION, PARALLEL_HIGH_ORDER, SERIAL_SUGGESTION,
+    ALLOWED_MARKERS_BY_TYPE, CONTEXT_MARKER_PRODUCERS, STEP_TYPE_GATE_KEYS, PERCEPTION_FILTER_KEY,
+    PARALLEL_PERCEPTION_KEYS, MARKER_USER_INPUT, MARKER_LEGITIMATE_PARTICIPANTS, MARKER_PERCEPTUAL_CONTEXT_BATCH,
+    EVENT_PHASE_START, EVENT_PHASE_END, EVENT_STEP_RESULT, EVENT_STEP_SKIPPED
+)
+from .context_store import ContextStore
+from .event_stream import PipelineEventEmitter
+
+
+class StepScheduler:
+    """
+    基于依赖图的步骤调度器：
+    - 依据 driven_by、ALLOWED_*_MARKERS 与 CONTEXT_MARKER_PRODUCERS 推导每个步骤的真实依赖
+    - 每个步骤在其依赖全部完成后立即启动，不再等待整个阶段屏障
+    - 感知步骤的过滤结果按 (步骤 key, 合法参与者) 缓存，步骤命中时直接复用，不再重复指代消解
+    - 运行结束后 step_cache_keys / fully_cached 供流水线判断能否复用已组装的整篇结果
+    - 给定请求截止时间时，每个步骤启动时按其下游最长依赖链均分剩余时间作为 LLM 调用预算
+    - 步骤结果与 prompt 记录先按步骤收集，运行结束后按依赖图（拓扑）顺序写出，与完成先后无关
+    - 每次 async_extract 使用一个新实例（运行期状态不跨请求共享）
+    """
+    CHINESE_NAME = "全息感知基底：步骤依赖图调度器"
+    STEP_TYPE_ORDER = (PARALLEL_PREPROCESSING, PARALLEL_PERCEPTION, PARALLEL_HIGH_ORDER, SERIAL_SUGGESTION)
+    STEP_TYPE_LABELS = {
+        PARALLEL_PREPROCESSING: "并行预处理",
+        PARALLEL_PERCEPTION: "并行感知",
+        PARALLEL_HIGH_ORDER: "并行高阶",
+        SERIAL_SUGGESTION: "串行最小可行性建议",
+    }
+
+    def __init__(
+            self,
+            step_executor,
+            context_builder,
+            participant_filter,
+            concurrency_manager,
+            llm_model: str,
+            event_emitter: Optional[PipelineEventEmitter] = None,
+            deadline: Optional[float] = None
+    ):
+        """deadline: 可选，整篇请求的截止时间（time.monotonic() 绝对值）"""
+        self.step_executor = step_executor
+        self.context_builder = context_builder
+        self.participant_filter = participant_filter
+        self.concurrency_manager = concurrency_manager
+        self.llm_model = llm_model
+        self.event_emitter = event_emitter or PipelineEventEmitter()
+        self.deadline = deadline
+        self._downstream_depths: Dict[str, int] = {}
+        self._step_futures: Dict[str, asyncio.Future] = {}
+        self._marker_tasks: Dict[str, asyncio.Task] = {}
+        self._phase_started: Set[str] = set()
+        self._phase_pending: Dict[str, int] = {}
+        self._cache_loader: Optional[CacheBatchLoader] = None
+        self._cache_hits: Set[str] = set()
+        self._filter_misses = 0
+        # 步骤名 -> (prompt 记录, 步骤结果)，含参与者过滤产生的指代消解记录
+        self._node_outputs: Dict[str, Tuple[Dict[str, List], List[Dict]]] = {}
+        self.step_cache_keys: Dict[str, str] = {}
+
+    @property
+    def fully_cached(self) -> bool:
+        """本次运行执行的每个步骤（及其过滤结果）是否都来自缓存"""
+        return (
+            bool(self.step_cache_keys)
+            and self._filter_misses == 0
+            and all(key in self._cache_hits for key in self.step_cache_keys.values())
+        )
+
+    # ======================
+    # 依赖图构建
+    # ======================
+    @classmethod
+    def build_graph(cls, prompts_by_type: Dict[str, List[Tuple[str, str, str]]]) -> Dict[str, StepNode]:
+        """
+        根据各类型的 (step_name, driven_by, prompt) 列表构建依赖图，返回按拓扑顺序排列的节点表。
+        """
+        driven_by_to_step: Dict[str, str] = {}
+        steps_by_type: Dict[str, List[str]] = {t: [] for t in cls.STEP_TYPE_ORDER}
+        for step_type in cls.STEP_TYPE_ORDER:
+            for step_name, driven_by, _ in prompts_by_type.get(step_type, []):
+                driven_by_to_step[driven_by] = step_name
+                steps_by_type[step_type].append(step_name)
+
+        def _resolve_producers(producers: Set[str]) -> Set[str]:
+            resolved = set()
+            for producer in producers:
+                if producer in steps_by_type:
+                    resolved.update(steps_by_type[producer])
+                elif producer in driven_by_to_step:
+                    resolved.add(driven_by_to_step[producer])
+            return resolved
+
+        graph: Dict[str, StepNode] = {}
+        for step_type in cls.STEP_TYPE_ORDER:
+            allowed_map = ALLOWED_MARKERS_BY_TYPE.get(step_type, {})
+            previous_serial = None
+            for idx, (step_name, driven_by, prompt) in enumerate(prompts_by_type.get(step_type, [])):
+                markers = frozenset(allowed_map.get(idx, set()))
+                deps = set()
+                for marker in markers:
+                    deps |= _resolve_producers(CONTEXT_MARKER_PRODUCERS.get(marker, set()))
+
+                gate_key = STEP_TYPE_GATE_KEYS.get(step_type)
+                gate_step = driven_by_to_step.get(gate_key) if gate_key else None
+                if gate_step:
+                    deps.add(gate_step)
+
+                # 串行类型：后一步骤必须等待前一步骤
+                if step_type == SERIAL_SUGGESTION and previous_serial:
+                    deps.add(previous_serial)
+                previous_serial = step_name
+
+                post_deps = set()
+                if step_type == PARALLEL_PERCEPTION and PERCEPTION_FILTER_KEY in driven_by_to_step:
+                    post_deps.add(driven_by_to_step[PERCEPTION_FILTER_KEY])
+
+                deps.discard(step_name)
+                graph[step_name] = StepNode(
+                    step_name=step_name,
+                    driven_by=driven_by,
+                    prompt_type=step_type,
+                    index=idx,
+                    prompt_template=prompt,
+                    markers=markers,
+                    deps=frozenset(deps),
+                    gate_step=gate_step,
+                    post_deps=frozenset(post_deps - {step_name}),
+                )
+
+        cls._check_acyclic(graph)
+        return graph
+
+    @staticmethod
+    def downstream_depths(graph: Dict[str, StepNode]) -> Dict[str, int]:
+        """每个步骤之后最长依赖链上还有几个步骤（图已保证无环）"""
+        downstream: Dict[str, List[str]] = {name: [] for name in graph}
+        for name, node in graph.items():
+            for dep in node.deps | node.post_deps:
+                if dep in graph:
+                    downstream[dep].append(name)
+
+        depths: Dict[str, int] = {}
+
+        def _depth(name: str) -> int:
+            if name not in depths:
+                depths[name] = max((_depth(nxt) + 1 for nxt in downstream[name]), default=0)
+            return depths[name]
+
+        for name in graph:
+            _depth(name)
+        return depths
+
+    @staticmethod
+    def _check_acyclic(graph: Dict[str, StepNode]) -> None:
+        """Kahn 拓扑排序检测环依赖，避免调度时永久等待"""
+        in_degree = {name: 0 for name in graph}
+        downstream: Dict[str, List[str]] = {name: [] for name in graph}
+        for name, node in graph.items():
+            for dep in node.deps | node.post_deps:
+                if dep in graph:
+                    in_degree[name] += 1
+                    downstream[dep].append(name)
+
+        ready = [name for name, degree in in_degree.items() if degree == 0]
+        visited = 0
+        while ready:
+            current = ready.pop()
+            visited += 1
+            for nxt in downstream[current]:
+                in_degree[nxt] -= 1
+                if in_degree[nxt] == 0:
+                    ready.append(nxt)
+
+        if visited != len(graph):
+            cyclic = sorted(name for name, degree in in_degree.items() if degree > 0)
+            raise ValueError(f"步骤依赖图存在环: {cyclic}")
+
+    # ======================
+    # 调度执行
+    # ======================
+    async def run(
+            self,
+            graph: Dict[str, StepNode],
+            context: Dict[str, Any],
+            template_name: str,
+            all_step_results: List[Dict],
+            prompt_records: Dict,
+            context_store: ContextStore
+    ) -> None:
+        if not graph:
+            logger.info("⏭️ 无可调度步骤", module_name=self.CHINESE_NAME)
+            return
+
+        loop = asyncio.get_running_loop()
+        self._step_futures = {name: loop.create_future() for name in graph}
+        self._marker_tasks = {}
+        self._phase_started = set()
+        self._phase_pending = {}
+        self._cache_hits = set()
+        self._filter_misses = 0
+        self._node_outputs = {name: ({}, []) for name in graph}
+        self.step_cache_keys = {}
+        self._downstream_depths = self.downstream_depths(graph) if self.deadline is not None else {}
+        for node in graph.values():
+            self._phase_pending[node.prompt_type] = self._phase_pending.get(node.prompt_type, 0) + 1
+
+        # 用户原始输入无生产者，调度开始前一次性注入
+        self.context_builder.build_user_input_context("", context["user_input"], context_store)
+
+        # 步骤缓存 key 由渲染后的 prompt 决定：无依赖步骤的 prompt 此时已可确定，一次批量预取；
+        # 其余步骤在依赖完成后就绪，同时就绪的步骤由合并器并入同一次批量读取
+        self._cache_loader = CacheBatchLoader(self.step_executor.llm_cache)
+        self._prefetch_step_cache(graph, template_name, context_store)
+
+        consumed_markers = set()
+        for node in graph.values():
+            consumed_markers |= node.markers
+        for marker in consumed_markers:
+            if marker == MARKER_USER_INPUT:
+                continue
+            producers = self._marker_producers(graph, marker)
+            self._marker_tasks[marker] = asyncio.create_task(
+                self._publish_marker(marker, producers, context, context_store)
+            )
+
+        logger.info(
+            "⚡ 启动依赖图调度",
+            module_name=self.CHINESE_NAME,
+            extra={"steps": len(graph), "edges": sum(len(n.deps) + len(n.post_deps) for n in graph.values())}
+        )
+        try:
+            await asyncio.gather(*(
+                self._run_node(node, context, template_name, context_store)
+                for node in graph.values()
+            ))
+            await asyncio.gather(*self._marker_tasks.values())
+        finally:
+            for task in self._marker_tasks.values():
+                if not task.done():
+                    task.cancel()
+            # 图按 STEP_TYPE_ORDER 与类型内序号构建，即一个拓扑顺序
+            for name in graph:
+                node_prompts, node_results = self._node_outputs[name]
+                self._merge_filter_records(node_prompts, node_results, prompt_records, all_step_results)
+
+        self._log_type_summary(graph)
+
+    def _prefetch_step_cache(self, graph: Dict[str, StepNode], template_name: str, context_store: ContextStore) -> None:
+        snapshot = context_store.snapshot()
+        keys = []
+        for node in graph.values():
+            if node.deps or not node.markers <= {MARKER_USER_INPUT}:
+                continue
+            prompt = self.context_builder.inject_allowed_context(
+                node.prompt_template, context_store, node.markers, snapshot
+            )
+            keys.append(self.step_executor.make_step_cache_key(prompt, template_name, node.step_name))
+        if keys:
+            self._cache_loader.prime(keys)
+            logger.debug(f"📦 预取 {len(keys)} 个无依赖步骤的缓存", module_name=self.CHINESE_NAME)
+
+    @staticmethod
+    def _marker_producers(graph: Dict[str, StepNode], marker: str) -> Set[str]:
+        producers = CONTEXT_MARKER_PRODUCERS.get(marker, set())
+        return {
+            name for name, node in graph.items()
+            if node.driven_by in producers or node.prompt_type in producers
+        }
+
+    async def _publish_marker(
+            self,
+            marker: str,
+            producers: Set[str],
+            context: Dict[str, Any],
+            context_store: ContextStore
+    ) -> None:
+        """等待 marker 的全部生产者完成后，构造聚合型上下文（单步骤 marker 由步骤自身注入）"""
+        if producers:
+            await asyncio.gather(*(self._step_futures[p] for p in producers))
+        try:
+            if marker == MARKER_PERCEPTUAL_CONTEXT_BATCH:
+                dynamic_desc = self.context_builder.build_perception_context_batch(context)
+                if dynamic_desc:
+                    context_store.put(marker, dynamic_desc)
+            elif marker == MARKER_LEGITIMATE_PARTICIPANTS:
+                legit_participants_ctx = self.context_builder.build_legitimate_participants_context(context)
+                if legit_participants_ctx:
+                    context_store.put(marker, legit_participants_ctx)
+        except Exception as e:
+            logger.error(f"⚠️ 上下文 marker 构造失败 [{marker}]: {e}", module_name=self.CHINESE_NAME)
+
+    async def _run_node(
+            self,
+            node: StepNode,
+            context: Dict[str, Any],
+            template_name: str,
+            context_store: ContextStore
+    ) -> None:
+        step_name = node.step_name
+        future = self._step_futures[step_name]
+        node_prompts, node_results = self._node_outputs[step_name]
+        result: Optional[Dict[str, Any]] = None
+        try:
+            await self._wait_steps(node.deps)
+            await asyncio.gather(*(self._marker_tasks[m] for m in node.markers if m in self._marker_tasks))
+            await self._mark_phase_started(node.prompt_type)
+
+            if not self._is_gate_open(node, context):
+                logger.info(f"⏭️ [{step_name}] 门控未通过，跳过", module_name=self.CHINESE_NAME)
+                await self.event_emitter.emit(EVENT_STEP_SKIPPED, step_id=step_name, phase=node.prompt_type)
+                return
+
+            # 依赖与 marker 均已就绪：基于同一版本的快照渲染，不受并发写入影响
+            snapshot = context_store.snapshot()
+            rendered_prompt = self.context_builder.inject_allowed_context(
+                node.prompt_template, context_store, node.markers, snapshot
+            )
+            node_prompts.setdefault(node.prompt_type, []).append({
+                "step_name": step_name,
+                "prompt": rendered_prompt,
+                "context_version": snapshot.version
+            })
+
+            # 在并发信号量之外登记缓存 key，使同时就绪的步骤并入同一次批量读取
+            step_key = self.step_executor.make_step_cache_key(rendered_prompt, template_name, step_name)
+            self.step_cache_keys[step_name] = step_key
+            self._cache_loader.prime([step_key])
+            async with self.concurrency_manager.semaphore:
+                step_start = time.perf_counter()
+                result = await self.step_executor.execute_step(
+                    prompt_template=rendered_prompt,
+                    template_name=template_name,
+                    step_name=step_name,
+                    prompt_type=node.prompt_type,
+                    cache_loader=self._cache_loader,
+                    cache_hits=self._cache_hits,
+                    deadline=self._step_deadline(step_name)
+                )
+                duration_ms = round((time.perf_counter() - step_start) * 1000, 2)
+            await self.event_emitter.emit(
+                EVENT_STEP_RESULT, step_id=step_name, phase=node.prompt_type, response=result, duration_ms=duration_ms
+            )
+
+            await self._wait_steps(node.post_deps)
+            if node.prompt_type == PARALLEL_PERCEPTION:
+                result = await self._filter_perception(step_key, result, context, node_prompts, node_results)
+
+            node_results.append(result)
+            self.context_builder.update_context_from_result(result, context, step_name)
+            # 未被内置 ALLOWED_* 表引用的块（如参与者有效信息）同样构造，供自定义 prompt 模板使用
+            if self._produces_context_marker(node):
+                self.context_builder.build_common_context(step_name, context, context_store)
+            logger.debug(f"✅ 步骤 [{step_name}] 执行完成")
+
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"[{step_name}] 步骤调度异常: {error_msg}", module_name=self.CHINESE_NAME)
+            result = LLMResponse.from_system_error(
+                system_error=error_msg,
+                model=self.llm_model,
+                template_name=template_name,
+                step_name=step_name,
+                prompt_type=node.prompt_type,
+                include_traceback=True
+            ).to_dict()
+            node_results.append(result)
+            await self.event_emitter.emit(EVENT_STEP_RESULT, step_id=step_name, phase=node.prompt_type, response=result)
+        finally:
+            if not future.done():
+                future.set_result(result)
+            await self._mark_phase_step_done(node.prompt_type)
+
+    def _step_deadline(self, step_name: str) -> Optional[float]:
+        """剩余时间在本步骤与其下游最长链上的步骤间均分，为后续步骤保留预算"""
+        if self.deadline is None:
+            return None
+        now = time.monotonic()
+        remaining = max(0.0, self.deadline - now)
+        return now + remaining / (1 + self._downstream_depths.get(step_name, 0))
+
+    async def _filter_perception(
+            self,
+            step_key: str,
+            result: Dict[str, Any],
+            context: Dict[str, Any],
+            prompt_records: Dict,
+            all_step_results: List[Dict]
+    ) -> Dict[str, Any]:
+        """
+        参与者过滤：步骤命中缓存且过滤结果已缓存时直接复用，否则过滤后写入缓存；
+        过滤期间产生的指代消解 prompt 与调用结果随之缓存，复用时照常写入审计记录
+        """
+        legitimate_participants = self.participant_filter.build_legitimate_participants_set(context)
+        filtered_key = self.step_executor.make_filtered_cache_key(step_key, legitimate_participants)
+        cache = self.step_executor.llm_cache
+        # 步骤结果重新调用过 LLM 时，旧的过滤结果不一定与之对应，不复用
+        if step_key in self._cache_hits:
+            response = await cache.get(filtered_key)
+            cached = response.get("data") if response.get("success") else None
+            if isinstance(cached, dict) and "result" in cached:
+                logger.debug(f"🔁 [{result.get('step_name')}] 复用缓存的过滤结果", module_name=self.CHINESE_NAME)
+                self._merge_filter_records(cached["prompt_records"], cached["step_results"],
+                                           prompt_records, all_step_results)
+                return cached["result"]
+
+        self._filter_misses += 1
+        # 过滤期间的记录单独收集，便于与过滤结果一起按步骤缓存
+        local_prompts: Dict[str, List] = {}
+        local_results: List[Dict] = []
+        await self.participant_filter.filter_perception_results(
+            context["user_input"], result, legitimate_participants, local_prompts, local_results
+        )
+        self._merge_filter_records(local_prompts, local_results, prompt_records, all_step_results)
+        if result.get("__success") is True:
+            await cache.set(filtered_key, copy.deepcopy({
+                "result": result,
+                "prompt_records": local_prompts,
+                "step_results": local_results,
+            }))
+        return result
+
+    @staticmethod
+    def _merge_filter_records(
+            local_prompts: Dict[str, List],
+            local_results: List[Dict],
+            prompt_records: Dict,
+            all_step_results: List[Dict]
+    ) -> None:
+        for prompt_type, records in local_prompts.items():
+            prompt_records.setdefault(prompt_type, []).extend(records)
+        all_step_results.extend(local_results)
+
+    async def _mark_phase_started(self, step_type: str) -> None:
+        """阶段内首个步骤解除依赖等待时发出阶段开始事件（阶段之间允许重叠）"""
+        if step_type in self._phase_started:
+            return
+        self._phase_started.add(step_type)
+        await self.event_emitter.emit(EVENT_PHASE_START, phase=step_type)
+
+    async def _mark_phase_step_done(self, step_type: str) -> None:
+        self._phase_pending[step_type] = self._phase_pending.get(step_type, 1) - 1
+        if self._phase_pending[step_type] > 0:
+            return
+        # 依赖异常导致未曾开始的阶段，也补发开始事件以保证事件成对
+        await self._mark_phase_started(step_type)
+        await self.event_emitter.emit(EVENT_PHASE_END, phase=step_type)
+
+    async def _wait_steps(self, step_names) -> None:
+        futures = [self._step_futures[name] for name in step_names if name in self._step_futures]
+        if futures:
+            await asyncio.gather(*futures)
+
+    @staticmethod
+    def _produces_context_marker(node: StepNode) -> bool:
+        """本步骤是否产出单步骤上下文 marker（聚合型 marker 由 _publish_marker 构造）"""
+        for marker, producers in CONTEXT_MARKER_PRODUCERS.items():
+            if marker in (MARKER_LEGITIMATE_PARTICIPANTS, MARKER_PERCEPTUAL_CONTEXT_BATCH):
+                continue
+            if node.driven_by in producers:
+                return True
+        return False
+
+    @staticmethod
+    def _is_gate_open(node: StepNode, context: Dict[str, Any]) -> bool:
+        if node.prompt_type == PARALLEL_PERCEPTION:
+            return bool(context.get("pre_screening", {}).get(node.driven_by, False))
+        if node.prompt_type in (PARALLEL_HIGH_ORDER, SERIAL_SUGGESTION):
+            if not context.get("eligibility", {}).get("eligible", False):
+                return False
+            # eligible=true 但无有效并行感知数据时，同样跳过高阶四步链
+            return any(key in context and bool(context[key]) for key in PARALLEL_PERCEPTION_KEYS)
+        return True
+
+    def _log_type_summary(self, graph: Dict[str, StepNode]) -> None:
+        for step_type in self.STEP_TYPE_ORDER:
+            names = [name for name, node in graph.items() if node.prompt_type == step_type]
+            if not names:
+                continue
+            results = [self._step_futures[name].result() for name in names]
+            executed = [r for r in results if r is not None]
+            success_count = sum(1 for r in executed if r.get("__success", False))
+            logger.info(
+                f"{self.STEP_TYPE_LABELS.get(step_type, step_type)}任务完成: "
+                f"{len(executed)} 个任务, 成功 {success_count} 个, 跳过 {len(results) - len(executed)} 个",
+                extra={"total": len(executed), "success": success_count}
+            )
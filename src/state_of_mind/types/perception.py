@@ -1,4 +1,4 @@
-from typing import NamedTuple, Any, Optional, Callable
+from typing import NamedTuple, Any, Optional, Callable, FrozenSet, Mapping
 
 
 class ValidationRule(NamedTuple):
@@ -7,3 +7,29 @@ class ValidationRule(NamedTuple):
     validator: Any
     description: str
     value_checker: Optional[Callable[[Any], bool]] = None
+
+
+class PromptSkeleton(NamedTuple):
+    """预编译的步骤 prompt 骨架（不含用户输入与上下文块，进程内只读共享）"""
+    step_name: str
+    driven_by: str
+    template: str
+
+
+class StepNode(NamedTuple):
+    """DAG 调度中的单个 LLM 步骤节点"""
+    step_name: str
+    driven_by: str
+    prompt_type: str
+    index: int
+    prompt_template: str
+    markers: FrozenSet[str]
+    deps: FrozenSet[str]
+    gate_step: Optional[str] = None
+    post_deps: FrozenSet[str] = frozenset()
+
+
+class ContextSnapshot(NamedTuple):
+    """上下文存储在某一版本的只读视图（marker -> 上下文块）"""
+    version: int
+    blocks: Mapping[str, str]
@@ -34,6 +34,14 @@ class AsyncTimer:
                 module_name=self.module,
                 duration=self.duration
             )
+        elif issubclass(exc_type, asyncio.CancelledError):
+            # 被调用方主动取消（如对冲请求的落后者、超出截止时间），不属于失败
+            log_function_event(
+                action="cancelled",
+                func_name=self.name,
+                module_name=self.module,
+                duration=self.duration
+            )
         else:
             log_function_event(
                 action="failure",
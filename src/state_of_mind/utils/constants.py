@@ -81,15 +81,20 @@ PATH_ROOT_LOGS_FALLBACK = PATH_DATA / "logs_fallback"
 # 💾 存储后端
 STORAGE_LOCAL = "local"
 STORAGE_REDIS = "redis"
+STORAGE_TIERED = "tiered"
+STORAGE_SQLITE = "sqlite"
 
 
 class LLMBackendConst:
     QWEN = "qwen"
     DEEPSEEK = "deepseek"
+    MOCK = "mock"
+    # 多后端路由（按 XINJING_LLM_ROUTES 分发到上述后端）
+    ROUTER = "router"
 
     @classmethod
     def all(cls) -> Set[str]:
-        return {cls.QWEN, cls.DEEPSEEK}
+        return {cls.QWEN, cls.DEEPSEEK, cls.MOCK, cls.ROUTER}
 
 
 class LLMModelConst:
@@ -102,6 +107,12 @@ class LLMModelConst:
     # DeepSeek 系列
     DEEPSEEK_CHAT = "deepseek-chat"
 
+    # 本地模拟（压测/基准）
+    MOCK_CHAT = "mock-chat"
+
+    # 多后端路由：实际模型由各路由配置决定
+    ROUTER = "router"
+
     @classmethod
     def all(cls) -> Set[str]:
         return {
@@ -110,6 +121,8 @@ class LLMModelConst:
             cls.QWEN_PLUS,
             cls.QWEN_FLASH,
             cls.DEEPSEEK_CHAT,
+            cls.MOCK_CHAT,
+            cls.ROUTER,
         }
 
     @classmethod
@@ -124,4 +137,10 @@ class LLMModelConst:
             LLMBackendConst.DEEPSEEK: [
                 cls.DEEPSEEK_CHAT,
             ],
+            LLMBackendConst.MOCK: [
+                cls.MOCK_CHAT,
+            ],
+            LLMBackendConst.ROUTER: [
+                cls.ROUTER,
+            ],
         }
@@ -11,7 +11,7 @@ def log_function_event(
     统一日志记录接口，用于函数执行监控。
 
     Args:
-        action: 动作类型，如 'start', 'success', 'timeout', 'exception', 'failure'
+        action: 动作类型，如 'start', 'success', 'timeout', 'exception', 'failure', 'cancelled'
         func_name: 函数名
         module_name: 模块名（用于日志分类）
         **kwargs: 其他上下文字段
@@ -30,6 +30,8 @@ def log_function_event(
         logger.info(f"{message}，耗时 {kwargs.get('duration', 0):.4f} 秒", **log_data)
     elif action == "timeout":
         logger.error(message, **log_data)
+    elif action == "cancelled":
+        logger.info(f"{message}，耗时 {kwargs.get('duration', 0):.4f} 秒", **log_data)
     elif action == "exception":
         logger.exception(f"{message}: {kwargs.get('exception')}", **log_data)
     elif action == "failure":
@@ -0,0 +1,232 @@
+import json
+import re
+from typing import Any, List, NamedTuple, Optional
+
+_WHITESPACE = " \t\r\n"
+# 数字与 true/false/null 字面量可能出现的字符
+_SCALAR_CHARS = set("-+.0123456789eEtruefalsn")
+# 字符串内只有引号与反斜杠影响状态，其余字符整段跳过
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class StreamEvent(NamedTuple):
+    """events 数组中已闭合的一个元素"""
+    path: str        # 具体路径，如 temporal.events[2]
+    rule_path: str   # 对应校验规则的通配路径，如 temporal.events.*
+    value: Any
+
+
+class _Frame:
+    __slots__ = ("kind", "path", "rule_path", "key", "index", "expect", "emit_start")
+
+    def __init__(self, kind: str, path: str, rule_path: str, emit_start: Optional[int] = None):
+        self.kind = kind              # "{" 或 "["
+        self.path = path
+        self.rule_path = rule_path
+        self.key: Optional[str] = None
+        self.index = 0
+        # 对象: key / colon / value / comma；数组: value / comma
+        self.expect = "key" if kind == "{" else "value"
+        self.emit_start = emit_start
+
+
+class IncrementalJSONParser:
+    """
+    流式 JSON 增量解析（LLM 流式输出专用）：
+    - feed(chunk) 逐字符推进词法状态（字符串/转义/嵌套栈）；根对象 "{" 之前的 Markdown 代码块标记、空白与说明文字被跳过
+    - 键名为 events 的数组中每个元素闭合时即产出 StreamEvent，调用方可逐条校验，无需等待整段输出
+    - 括号不匹配、缺少逗号/冒号、非法字面量等语法错误写入 error，调用方据此立即中止读取
+    - 根对象闭合后 done=True，其后的内容被忽略；value() 返回解析好的根对象
+    """
+    EVENTS_KEY = "events"
+
+    def __init__(self):
+        self._buf = ""              # 根对象 "{" 起的全部文本
+        self._pos = 0               # 当前字符在 _buf 中的下标
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._scalar_start: Optional[int] = None
+        self._started = False
+        self._value: Any = None
+        self.done = False
+        self.error: Optional[str] = None
+        self.skipped = 0            # 根对象之前被跳过的字符数
+
+    def feed(self, chunk: str) -> List[StreamEvent]:
+        events: List[StreamEvent] = []
+        if self.done or self.error or not chunk:
+            return events
+        if not self._started:
+            start = chunk.find("{")
+            if start < 0:
+                self.skipped += len(chunk)
+                return events
+            self.skipped += start
+            chunk = chunk[start:]
+            self._started = True
+
+        i = len(self._buf)
+        self._buf += chunk
+        end = len(self._buf)
+        while i < end:
+            if self._in_string and not self._escape:
+                match = _STRING_SPECIAL.search(self._buf, i)
+                if match is None:
+                    break
+                i = match.start()
+            self._pos = i
+            self._step(self._buf[i], events)
+            i += 1
+            if self.done or self.error:
+                break
+        if self.done:
+            self._buf = self._buf[:i]
+        return events
+
+    def value(self) -> Any:
+        """根对象闭合且无语法错误时返回解析结果，否则为 None"""
+        if not self.done or self.error:
+            return None
+        if self._value is None:
+            try:
+                self._value = json.loads(self._buf)
+            except ValueError as e:
+                self.error = f"根对象解析失败: {e}"
+                return None
+        return self._value
+
+    @property
+    def text(self) -> str:
+        return self._buf
+
+    # ======================
+    # 词法/语法推进
+    # ======================
+    def _fail(self, message: str) -> None:
+        self.error = f"{message}（位置 {self._pos}）"
+
+    def _step(self, ch: str, events: List[StreamEvent]) -> None:
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                self._end_string()
+            return
+
+        if self._scalar_start is not None:
+            if ch in _SCALAR_CHARS:
+                return
+            if not self._end_scalar():
+                return
+
+        if ch in _WHITESPACE:
+            return
+
+        frame = self._stack[-1] if self._stack else None
+        if frame is None:
+            # 根对象之前已由 feed 跳过，此处只会是 "{"
+            self._open("{", "", "", None)
+            return
+
+        expect = frame.expect
+        if expect == "key":
+            if ch == '"':
+                self._begin_string()
+            elif ch == "}" and frame.key is None:
+                self._close(frame, events)
+            else:
+                self._fail(f"对象中期望键名，实际为 {ch!r}")
+        elif expect == "colon":
+            if ch == ":":
+                frame.expect = "value"
+            else:
+                self._fail(f"键名后期望 ':'，实际为 {ch!r}")
+        elif expect == "value":
+            if ch in "{[":
+                self._open_child(frame, ch)
+            elif ch == '"':
+                self._begin_string()
+            elif ch in _SCALAR_CHARS:
+                self._scalar_start = self._pos
+            elif ch == "]" and frame.kind == "[" and frame.index == 0:
+                self._close(frame, events)
+            else:
+                self._fail(f"期望值，实际为 {ch!r}")
+        elif expect == "comma":
+            if ch == ",":
+                if frame.kind == "{":
+                    frame.expect = "key"
+                else:
+                    frame.index += 1
+                    frame.expect = "value"
+            elif (ch == "}" and frame.kind == "{") or (ch == "]" and frame.kind == "["):
+                self._close(frame, events)
+            else:
+                self._fail(f"期望 ',' 或 {'}' if frame.kind == '{' else ']'}，实际为 {ch!r}")
+
+    def _begin_string(self) -> None:
+        self._in_string = True
+        self._string_start = self._pos
+
+    def _end_string(self) -> None:
+        frame = self._stack[-1]
+        if frame.expect == "key":
+            raw_key = self._buf[self._string_start + 1:self._pos]
+            if "\\" in raw_key:
+                try:
+                    raw_key = json.loads(f'"{raw_key}"')
+                except ValueError:
+                    self._fail("键名含非法转义")
+                    return
+            frame.key = raw_key
+            frame.expect = "colon"
+        else:
+            frame.expect = "comma"
+
+    def _end_scalar(self) -> bool:
+        literal = self._buf[self._scalar_start:self._pos]
+        self._scalar_start = None
+        try:
+            json.loads(literal)
+        except ValueError:
+            self._fail(f"非法字面量 {literal!r}")
+            return False
+        self._stack[-1].expect = "comma"
+        return True
+
+    def _child_paths(self, frame: _Frame):
+        if frame.kind == "{":
+            prefix = f"{frame.path}." if frame.path else ""
+            rule_prefix = f"{frame.rule_path}." if frame.rule_path else ""
+            return prefix + frame.key, rule_prefix + frame.key
+        return f"{frame.path}[{frame.index}]", f"{frame.rule_path}.*"
+
+    def _open_child(self, frame: _Frame, ch: str) -> None:
+        path, rule_path = self._child_paths(frame)
+        # events 数组的直接元素：闭合时整体产出
+        emit_start = None
+        if frame.kind == "[" and frame.path.rsplit(".", 1)[-1] == self.EVENTS_KEY:
+            emit_start = self._pos
+        self._open(ch, path, rule_path, emit_start)
+
+    def _open(self, ch: str, path: str, rule_path: str, emit_start: Optional[int]) -> None:
+        self._stack.append(_Frame(ch, path, rule_path, emit_start))
+
+    def _close(self, frame: _Frame, events: List[StreamEvent]) -> None:
+        self._stack.pop()
+        if frame.emit_start is not None:
+            try:
+                value = json.loads(self._buf[frame.emit_start:self._pos + 1])
+            except ValueError:
+                self._fail(f"{frame.path} 含非法转义")
+                return
+            events.append(StreamEvent(frame.path, frame.rule_path, value))
+        if self._stack:
+            self._stack[-1].expect = "comma"
+        else:
+            self.done = True
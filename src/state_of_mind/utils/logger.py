@@ -3,7 +3,6 @@
 """
 import contextvars
 import atexit
-import inspect
 import logging
 import sys
 import threading
@@ -326,11 +325,8 @@ class LoggerManager:
 
         # === 安全获取调用上下文 ===
         try:
-            stack = inspect.stack(context=0)
-            if len(stack) < 3:
-                raise ValueError("Stack too shallow")
-
-            frame = stack[2].frame
+            # 直接取调用方栈帧；inspect.stack() 会为整条调用链解析源码文件，热路径上开销极大
+            frame = sys._getframe(2)
             f_locals = frame.f_locals
             func_name = frame.f_code.co_name or "<module>"
             class_name = None
@@ -1,9 +1,10 @@
 from __future__ import annotations
-from typing import Type, Dict, ClassVar
+from typing import Type, Dict, ClassVar, Set
 import hashlib
 import json
 import asyncio
-from src.state_of_mind.llm.base import LLMBackend
+from src.state_of_mind.llm.base import BaseLLMBackend
+from src.state_of_mind.llm.rate_limiter import LLMRateLimiter, create_rate_limiter
 from src.state_of_mind.utils.logger import LoggerManager as logger
 
 
@@ -12,12 +13,15 @@ class GlobalSingletonRegistry:
     全局注册中心
     - 注册 LLM 后端类（如 qwen、deepseek）
     - 按连接参数缓存 LLMBackend 实例（线程安全 + 异步初始化）
-    - 支持运行时清除缓存以实现配置热重载
+    - 持有进程级 LLM 限流器，注入到所有 backend 实例
+    - 支持运行时清除缓存以实现配置热重载：旧实例退役，在途请求结束后再关闭其连接池
     """
     CHINESE_NAME = "全局注册中心"
 
-    _backends: Dict[str, Type[LLMBackend]] = {}
-    _backend_instances: Dict[str, LLMBackend] = {}  # backend 实例缓存
+    _backends: Dict[str, Type[BaseLLMBackend]] = {}
+    _backend_instances: Dict[str, BaseLLMBackend] = {}  # backend 实例缓存
+    _rate_limiter: ClassVar[LLMRateLimiter] = None  # 进程级限流器（所有 backend 实例共享）
+    _draining: ClassVar[Set[asyncio.Task]] = set()  # 退役中（等待在途请求结束）的实例关闭任务
     # 使用 asyncio.Lock，但注意：不能在类定义时直接实例化（需延迟）
     _lock: ClassVar[asyncio.Lock] = None
 
@@ -28,13 +32,23 @@ class GlobalSingletonRegistry:
         return cls._lock
 
     @classmethod
-    def register_backend(cls, name: str, backend_class: Type[LLMBackend]):
+    def register_backend(cls, name: str, backend_class: Type[BaseLLMBackend]):
         """注册 LLM 后端类"""
-        if not issubclass(backend_class, LLMBackend):
-            raise TypeError(f"Backend must inherit from LLMBackend, got {backend_class}")
+        if not issubclass(backend_class, BaseLLMBackend):
+            raise TypeError(f"Backend must inherit from BaseLLMBackend, got {backend_class}")
         cls._backends[name] = backend_class
         logger.info("✅ 注册 LLM 后端: %s", name)
 
+    @classmethod
+    def get_backend_class(cls, name: str) -> Type[BaseLLMBackend]:
+        if name not in cls._backends:
+            raise ValueError(f"未知的 LLM 后端: {name}")
+        return cls._backends[name]
+
+    # 连接池/HTTP 相关配置（含流式开关）：变化时创建新实例（新连接池）
+    _HTTP_KEYS = ("connect_timeout", "write_timeout", "pool_timeout",
+                  "max_connections", "max_keepalive", "keepalive_expiry", "http2", "stream")
+
     @classmethod
     def _make_backend_key(cls, name: str, llm_config: dict) -> str:
         """
@@ -42,18 +56,23 @@ class GlobalSingletonRegistry:
         """
         key_data = {
             "backend": name,
-            "api_key_hash": hashlib.md5(llm_config["api_key"].encode()).hexdigest()[:8],
-            "timeout": llm_config["timeout"]
+            "api_key_hash": hashlib.md5((llm_config.get("api_key") or "").encode()).hexdigest()[:8],
+            "timeout": llm_config["timeout"],
+            "http": {k: llm_config.get(k) for k in cls._HTTP_KEYS}
         }
         # 可选字段：只有当 backend 实际使用时才加入
         backend_class = cls._backends[name]
         if getattr(backend_class, '_uses_api_url', True):  # 默认 True
             key_data["api_url"] = llm_config.get("api_url", "")
+        if getattr(backend_class, '_uses_routes', False):
+            # 路由表（含各路由密钥）或步骤固定变化时创建新实例
+            key_data["routes"] = llm_config.get("routes")
+            key_data["route_pins"] = llm_config.get("route_pins")
         config_str = json.dumps(key_data, sort_keys=True, default=str, ensure_ascii=False)
         return hashlib.md5(config_str.encode("utf-8")).hexdigest()
 
     @classmethod
-    async def get_backend_async(cls, name: str) -> LLMBackend:
+    async def get_backend_async(cls, name: str) -> BaseLLMBackend:
         if name not in cls._backends:
             raise ValueError(f"未知的 LLM 后端: {name}")
 
@@ -68,19 +87,38 @@ class GlobalSingletonRegistry:
                 try:
                     instance = cls._backends[name]()
                     await instance.init(llm_config)
+                    instance.rate_limiter = cls.get_rate_limiter()
                     cls._backend_instances[key] = instance
                 except Exception as e:
                     logger.error(f"❌ 初始化 {name} backend 失败: {e}")
                     raise
             return cls._backend_instances[key]
 
+    @classmethod
+    def get_rate_limiter(cls) -> LLMRateLimiter:
+        if cls._rate_limiter is None:
+            from src.state_of_mind.config import config
+            cls._rate_limiter = create_rate_limiter(config)
+            logger.info(f"🚦 LLM 全局限流器已创建: {cls._rate_limiter.stats()}")
+        return cls._rate_limiter
+
     @classmethod
     def _resolve_backend_configs(cls) -> dict:
         from src.state_of_mind.config import config
         llm_config = {
             "api_key": config.LLM_API_KEY,
             "timeout": config.get("LLM_API_TIMEOUT", 120),
-            "api_url": config.LLM_API_URL
+            "api_url": config.LLM_API_URL,
+            "connect_timeout": config.LLM_CONNECT_TIMEOUT,
+            "write_timeout": config.LLM_WRITE_TIMEOUT,
+            "pool_timeout": config.LLM_POOL_TIMEOUT,
+            "max_connections": config.LLM_HTTP_MAX_CONNECTIONS,
+            "max_keepalive": config.LLM_HTTP_MAX_KEEPALIVE,
+            "keepalive_expiry": config.LLM_HTTP_KEEPALIVE_EXPIRY,
+            "http2": config.LLM_HTTP2,
+            "stream": config.LLM_STREAM,
+            "routes": config.LLM_ROUTES,
+            "route_pins": config.LLM_ROUTE_PINS
         }
         return llm_config
 
@@ -88,10 +126,49 @@ class GlobalSingletonRegistry:
     async def async_clear_llm_caches(cls):
         async with cls._get_lock():
             for instance in cls._backend_instances.values():
-                if hasattr(instance, 'close') and callable(instance.close):
-                    try:
-                        instance.close()
-                    except Exception as e:
-                        logger.warning(f"⚠️ 关闭 backend 实例时出错: {e}")
+                cls._retire(instance)
             cls._backend_instances.clear()
+            if cls._rate_limiter is not None:
+                await cls._rate_limiter.close()
+                cls._rate_limiter = None
             logger.info("🧹 已清除所有 LLM backend 缓存实例")
+
+    @classmethod
+    def _retire(cls, instance: BaseLLMBackend) -> None:
+        """立即退役（执行器下次调用即换用新实例），后台等待在途请求结束后关闭，不阻塞配置重载"""
+        instance.retire()
+        task = asyncio.create_task(instance.drain_and_close())
+        cls._draining.add(task)
+        task.add_done_callback(cls._on_drained)
+
+    @classmethod
+    def _on_drained(cls, task: asyncio.Task) -> None:
+        cls._draining.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"⚠️ 关闭 backend 实例时出错: {task.exception()}")
+
+    @classmethod
+    async def async_prewarm(cls, name: str, connections: int) -> int:
+        """启动时创建 backend 实例并预先建立连接；失败只记录日志，首个请求时再建连"""
+        if connections <= 0:
+            return 0
+        try:
+            backend = await cls.get_backend_async(name)
+            return await backend.prewarm(connections)
+        except Exception as e:
+            logger.warning(f"⚠️ LLM 连接预热失败: {e}")
+            return 0
+
+    @classmethod
+    async def async_close_all(cls):
+        """进程退出：关闭全部 backend 实例的连接池，并等待退役中的实例关闭完成"""
+        async with cls._get_lock():
+            instances = list(cls._backend_instances.values())
+            cls._backend_instances.clear()
+        draining = list(cls._draining)
+        await asyncio.gather(
+            *(instance.drain_and_close() for instance in instances),
+            *draining,
+            return_exceptions=True
+        )
+        logger.info(f"🔌 已关闭 {len(instances)} 个 LLM backend 连接池")
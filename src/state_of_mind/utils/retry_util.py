@@ -1,9 +1,11 @@
 import asyncio
 import functools
+import inspect
 import threading
 import time
 import uuid
-from typing import Any, Dict, Callable, Optional
+from collections import deque
+from typing import Any, Deque, Dict, Callable, Optional, Tuple
 import contextvars
 import aiohttp
 import requests
@@ -18,27 +20,185 @@ from tenacity import (
 from src.state_of_mind.utils.logger import LoggerManager as logger
 
 # ==================== 配置项 ====================
-GLOBAL_MAX_RETRIES = 1000000  # 全局最大重试次数（防止雪崩）
-GLOBAL_RETRY_TIMEOUT = 600  # 10分钟内超过阈值触发临时熔断（可选）
 ENABLE_METRICS = True  # 是否启用内部指标统计
 
 # 线程安全锁
 _GLOBAL_LOCK = threading.Lock()
 
 # 全局状态
-RETRY_COUNTER: Dict[str, int] = {}  # 按函数名计数
-RETRY_ABORT_FLAG = {"abort": False}  # 全局中止标志
-LAST_RESET_TIME = [time.time()]  # 用于周期性清零或限流
 METRICS: Dict[str, int] = {
     "success_after_retry": 0,
     "failed_after_retry": 0,
     "total_retries": 0,
+    "circuit_rejected": 0,
 }
 
 # 创建一个 contextvar 来保存当前 trace_id
 current_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_trace_id", default=None)
 
 
+# ==================== 熔断器 ====================
+class CircuitOpenError(RuntimeError):
+    """熔断器打开期间的快速失败（不重试）"""
+
+
+class CircuitBreaker:
+    """
+    按依赖方（如 LLM 后端 + API 地址）统计的熔断器：
+    - closed：正常放行；滚动时间窗口内调用数达到 min_calls 且失败率达到 failure_rate 时打开
+    - open：直接拒绝，open_seconds 后进入 half_open
+    - half_open：每 open_seconds 放行一个探测请求，成功则关闭、失败则重新打开
+    """
+    CHINESE_NAME = "熔断器"
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+            self,
+            key: str,
+            failure_rate: float = 0.5,
+            min_calls: int = 20,
+            window_seconds: float = 30.0,
+            open_seconds: float = 15.0
+    ):
+        self.key = key
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()  # (时间, 是否失败)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._next_probe_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+
+    def configure(self, failure_rate: float, min_calls: int, window_seconds: float, open_seconds: float) -> None:
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def allow(self) -> bool:
+        """是否放行本次调用（half_open 时放行的即为探测请求）"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and now >= self._next_probe_at:
+                self._next_probe_at = now + self.open_seconds
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._outcomes.clear()
+                self._failures = 0
+                logger.info(f"✅ 熔断器已关闭（探测成功）: {self.key}", module_name=self.CHINESE_NAME)
+            elif state == self.CLOSED:
+                self._append(now, False)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == self.HALF_OPEN:
+                self._open(now, "探测失败")
+            elif state == self.CLOSED:
+                self._append(now, True)
+                calls = len(self._outcomes)
+                if calls >= self.min_calls and self._failures / calls >= self.failure_rate:
+                    self._open(now, f"{self.window_seconds:g}s 内失败 {self._failures}/{calls}")
+
+    def retry_after(self) -> float:
+        """距下次探测的秒数（closed 时为 0）"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == self.OPEN:
+                return max(0.0, self._opened_at + self.open_seconds - now)
+            if state == self.HALF_OPEN:
+                return max(0.0, self._next_probe_at - now)
+            return 0.0
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            self._prune(now)
+            calls = len(self._outcomes)
+            return {
+                "state": state,
+                "window_calls": calls,
+                "window_failure_rate": round(self._failures / calls, 3) if calls else 0.0,
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
+
+    def _current_state(self, now: float) -> str:
+        if self._state == self.OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._next_probe_at = now
+            logger.info(f"🔎 熔断器进入半开状态，放行探测请求: {self.key}", module_name=self.CHINESE_NAME)
+        return self._state
+
+    def _append(self, now: float, failed: bool) -> None:
+        self._outcomes.append((now, failed))
+        self._failures += failed
+        self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        horizon = now - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < horizon:
+            _, failed = self._outcomes.popleft()
+            self._failures -= failed
+
+    def _open(self, now: float, reason: str) -> None:
+        self._state = self.OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self._failures = 0
+        self.trips += 1
+        logger.warning(
+            f"🛑 熔断器已打开（{reason}），{self.open_seconds:g}s 内快速失败: {self.key}",
+            module_name=self.CHINESE_NAME
+        )
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(key: str, **settings) -> CircuitBreaker:
+    """按 key 获取（不存在则创建）熔断器；传入的阈值设置会覆盖已有实例的设置，配置修改即时生效"""
+    with _GLOBAL_LOCK:
+        breaker = _BREAKERS.get(key)
+        if breaker is None:
+            breaker = _BREAKERS[key] = CircuitBreaker(key, **settings)
+        elif settings:
+            breaker.configure(**settings)
+        return breaker
+
+
+def get_circuit_breaker_status() -> Dict[str, Dict[str, Any]]:
+    with _GLOBAL_LOCK:
+        breakers = list(_BREAKERS.values())
+    return {breaker.key: breaker.status() for breaker in breakers}
+
+
 # ==================== 可重试异常判断 ====================
 def is_retryable_exception(exc: BaseException) -> bool:
     """
@@ -75,23 +235,8 @@ def before_retry_callback(retry_state: RetryCallState, func_name: str = "", modu
     current_trace_id.set(trace_id)  # 绑定到当前 context
 
     with _GLOBAL_LOCK:
-        # 更新该函数的重试计数
-        current = RETRY_COUNTER.get(func_name, 0) + 1
-        RETRY_COUNTER[func_name] = current
-
-        # 检查全局总次数
-        total_retry_count = sum(RETRY_COUNTER.values())
-        METRICS["total_retries"] = total_retry_count
-
-        if total_retry_count >= GLOBAL_MAX_RETRIES:
-            RETRY_ABORT_FLAG["abort"] = True
-            logger.error(f"🛑 全局重试已达上限 {GLOBAL_MAX_RETRIES}，已中止所有重试 | trace_id={trace_id}", module_name=module_name or "重试机制（前置）",
-                         # 可传入业务模块名
-                         location=location or f"Retry.{func_name}")
-            raise RuntimeError("全局重试已达上限，终止所有重试")
-
-        if RETRY_ABORT_FLAG["abort"]:
-            raise RuntimeError("全局重试已被手动中止")
+        METRICS["total_retries"] += 1
+        total_retry_count = METRICS["total_retries"]
 
     # 日志输出
     attempt = retry_state.attempt_number
@@ -99,7 +244,6 @@ def before_retry_callback(retry_state: RetryCallState, func_name: str = "", modu
     logger.info(
         f"🔁 [{func_name}] 第 {attempt} 次重试 | "
         f"trace_id={trace_id} | "
-        f"累计重试: {current} | "
         f"全局总计: {total_retry_count} | "
         f"错误类型: {type(exc).__name__} | "
         f"错误详情: {str(exc)}",
@@ -141,10 +285,13 @@ def retry_decorator(
         min_wait: float = 0.1,
         reraise: bool = True,
         module_name: Optional[str] = None,
-        location: Optional[str] = None
+        location: Optional[str] = None,
+        circuit_breaker: Optional[Callable[..., Optional[CircuitBreaker]]] = None,
+        on_circuit_open: Optional[Callable[[CircuitOpenError, Dict[str, Any]], Any]] = None,
+        record_outcomes: bool = True
 ):
     """
-    生产级可配置重试装饰器（支持 async/sync）
+    生产级可配置重试装饰器（支持 async/sync），可选按调用方熔断
 
     参数:
         max_retries: 最大尝试次数
@@ -155,6 +302,11 @@ def retry_decorator(
         reraise: 是否最终抛出异常
         module_name: 中文模块名（用于日志）
         location: 自定义位置，如 "Downloader.fetch_data"
+        circuit_breaker: 以被装饰函数的参数调用，返回本次调用使用的熔断器（None 表示不熔断）；
+            每次尝试前检查，熔断器打开时不调用函数、不重试
+        on_circuit_open: 熔断器拒绝调用时的降级结果，参数为异常与绑定后的调用参数字典；未提供则抛出 CircuitOpenError
+        record_outcomes: 是否由装饰器反馈调用结果（正常返回计成功、可重试异常计失败）；
+            被装饰函数内部已按协议层结果反馈时（如 LLM 后端按 HTTP 状态码）设为 False
     """
 
     def decorator(func: Callable) -> Callable:
@@ -173,6 +325,32 @@ def retry_decorator(
             location=location or f"{func.__qualname__}"  # 自动带类名
         )
 
+        signature = inspect.signature(func)
+
+        def _admit(args, kwargs) -> Tuple[Optional[CircuitBreaker], Optional[CircuitOpenError]]:
+            """返回 (熔断器, 拒绝异常)；未配置熔断或放行时异常为 None"""
+            breaker = circuit_breaker(*args, **kwargs) if circuit_breaker is not None else None
+            if breaker is None or breaker.allow():
+                return breaker, None
+            with _GLOBAL_LOCK:
+                METRICS["circuit_rejected"] += 1
+            return breaker, CircuitOpenError(
+                f"熔断器已打开（{breaker.key}），快速失败，约 {breaker.retry_after():.1f}s 后探测恢复"
+            )
+
+        def _reject(exc: CircuitOpenError, args, kwargs) -> Any:
+            if on_circuit_open is None:
+                raise exc
+            return on_circuit_open(exc, signature.bind(*args, **kwargs).arguments)
+
+        def _record(breaker: Optional[CircuitBreaker], exc: Optional[BaseException] = None) -> None:
+            if breaker is None or not record_outcomes:
+                return
+            if exc is None:
+                breaker.record_success()
+            elif is_retryable_exception(exc):
+                breaker.record_failure()
+
         # 异步处理
         if asyncio.iscoroutinefunction(func):
             @retry(
@@ -184,11 +362,15 @@ def retry_decorator(
             )
             @functools.wraps(func)
             async def async_wrapper(*args, **kwargs):
+                breaker, rejected = _admit(args, kwargs)
+                if rejected is not None:
+                    return _reject(rejected, args, kwargs)
                 # 入口生成 trace_id 绑定到当前上下文
                 trace_id = f"{uuid.uuid4().hex[:8]}"
                 token = current_trace_id.set(trace_id)
                 try:
                     result = await func(*args, **kwargs)
+                    _record(breaker)
                     after_call_callback(
                         func.__name__,
                         success=True,
@@ -197,6 +379,7 @@ def retry_decorator(
                     )
                     return result
                 except Exception as e:
+                    _record(breaker, e)
                     after_call_callback(
                         func.__name__,
                         success=False,
@@ -221,11 +404,15 @@ def retry_decorator(
             )
             @functools.wraps(func)
             def sync_wrapper(*args, **kwargs):
+                breaker, rejected = _admit(args, kwargs)
+                if rejected is not None:
+                    return _reject(rejected, args, kwargs)
                 # ✅ 同步函数也生成 trace_id 并绑定
                 trace_id = f"{uuid.uuid4().hex[:8]}"
                 token = current_trace_id.set(trace_id)
                 try:
                     result = func(*args, **kwargs)
+                    _record(breaker)
                     after_call_callback(
                         func.__name__,
                         success=True,
@@ -234,6 +421,7 @@ def retry_decorator(
                     )
                     return result
                 except Exception as e:
+                    _record(breaker, e)
                     after_call_callback(
                         func.__name__,
                         success=False,
@@ -251,64 +439,46 @@ def retry_decorator(
 
 # ==================== 辅助工具：查看当前状态 ====================
 def get_retry_status() -> Dict[str, Any]:
-    """获取当前重试系统的运行状态（可用于健康检查或监控接口）"""
+    """获取当前重试与熔断系统的运行状态（可用于健康检查或监控接口）"""
     with _GLOBAL_LOCK:
-        return {
-            "global_abort_flag": RETRY_ABORT_FLAG["abort"],
-            "total_retry_count": sum(RETRY_COUNTER.values()),
-            "per_function_retries": dict(RETRY_COUNTER),
-            "metrics": dict(METRICS),
-            "timestamp": time.time(),
-        }
+        metrics = dict(METRICS)
+    return {
+        "metrics": metrics,
+        "circuit_breakers": get_circuit_breaker_status(),
+        "timestamp": time.time(),
+    }
 
 
-def reset_retry_counters(
+def reset_circuit_breakers(
+    key: Optional[str] = None,
     module_name: Optional[str] = None,
-    location: Optional[str] = None,
-    func_name: Optional[str] = None
+    location: Optional[str] = None
 ):
     """
-    重置重试计数器（可用于每日清零、手动恢复等场景）
+    移除熔断器（可用于手动恢复等场景），下次调用时以关闭状态重新创建
 
     Args:
+        key: 如果指定，则只重置该熔断器；否则重置全部
         module_name: 日志模块名
         location: 日志位置
-        func_name: 如果指定，则只重置该函数的计数；否则重置全部
     """
     with _GLOBAL_LOCK:
-        if func_name is None:
-            # 全局重置
-            RETRY_COUNTER.clear()
-            RETRY_ABORT_FLAG["abort"] = False
-            LAST_RESET_TIME[0] = time.time()
+        if key is None:
+            _BREAKERS.clear()
             logger.info(
-                "✅ 全局重试系统已重置 | 熔断标志已恢复",
+                "✅ 全部熔断器已重置",
                 module_name=module_name,
-                location=location or "Retry.reset_counters"
+                location=location or "Retry.reset_circuit_breakers"
+            )
+        elif _BREAKERS.pop(key, None) is not None:
+            logger.info(
+                f"✅ 已重置熔断器 [{key}]",
+                module_name=module_name,
+                location=location or f"Retry.reset_circuit_breaker:{key}"
             )
         else:
-            # 局部重置某个函数
-            if func_name in RETRY_COUNTER:
-                count = RETRY_COUNTER.pop(func_name)
-                logger.info(
-                    f"✅ 已清除函数 [{func_name}] 的重试计数（原值: {count}）",
-                    module_name=module_name,
-                    location=location or f"Retry.reset_counter:{func_name}"
-                )
-            else:
-                logger.debug(
-                    f"🔍 函数 [{func_name}] 无重试记录，无需重置",
-                    module_name=module_name,
-                    location=location or f"Retry.reset_counter:{func_name}"
-                )
-
-            # 检查是否需要恢复全局中止标志（如果其他函数也没超限）
-            if RETRY_ABORT_FLAG["abort"]:
-                total = sum(RETRY_COUNTER.values())
-                if total < GLOBAL_MAX_RETRIES:
-                    RETRY_ABORT_FLAG["abort"] = False
-                    logger.warning(
-                        f"⚠️ 全局重试已恢复：当前总计 {total} < {GLOBAL_MAX_RETRIES}",
-                        module_name=module_name,
-                        location=location
-                    )
+            logger.debug(
+                f"🔍 熔断器 [{key}] 不存在，无需重置",
+                module_name=module_name,
+                location=location or f"Retry.reset_circuit_breaker:{key}"
+            )
@@ -0,0 +1,87 @@
+import asyncio
+from typing import Any, Dict, List
+
+from src.state_of_mind.cache.batch_loader import CacheBatchLoader
+from src.state_of_mind.cache.llm_cache import LLMCache
+
+
+class RecordingCache(LLMCache):
+    """记录每次 get_many 的 key 列表；error 不为空时批量读取抛出异常"""
+
+    def __init__(self, error: Exception = None):
+        super().__init__(max_size=100, compression="none", max_bytes=0)
+        self.error = error
+        self.batches: List[List[str]] = []
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        self.batches.append(list(keys))
+        if self.error is not None:
+            raise self.error
+        return await super().get_many(keys)
+
+
+def test_concurrent_gets_are_coalesced_into_one_batch_with_partial_misses():
+    cache = RecordingCache()
+
+    async def main():
+        await cache.set_many({"a": {"v": 1}, "c": {"v": 3}})
+        loader = CacheBatchLoader(cache)
+        results = await asyncio.gather(*(loader.get(key) for key in ("a", "b", "c")))
+        return loader, results
+
+    loader, results = asyncio.run(main())
+
+    assert cache.batches == [["a", "b", "c"]]
+    assert loader.batches == 1
+    assert [r["data"] for r in results] == [{"v": 1}, None, {"v": 3}]
+    assert all(r["success"] for r in results)
+
+
+def test_primed_keys_are_consumed_once_then_reloaded():
+    cache = RecordingCache()
+
+    async def main():
+        await cache.set("a", {"v": 1})
+        loader = CacheBatchLoader(cache)
+        loader.prime(["a", "b"])
+        loader.prime(["a"])   # 已在批次中，不重复加入
+        first = await loader.get("a")
+        await cache.set("a", {"v": 2})
+        second = await loader.get("a")
+        return first, second, loader
+
+    first, second, loader = asyncio.run(main())
+
+    assert cache.batches == [["a", "b"], ["a"]]
+    assert (first["data"], second["data"]) == ({"v": 1}, {"v": 2})
+    # 未被消费的预取结果保留到下一次 get
+    assert list(loader._futures) == ["b"]
+
+
+def test_batch_failure_wakes_waiters_as_misses():
+    cache = RecordingCache(error=ConnectionError("redis down"))
+
+    async def main():
+        loader = CacheBatchLoader(cache)
+        return await asyncio.gather(loader.get("a"), loader.get("b"))
+
+    results = asyncio.run(main())
+
+    assert len(cache.batches) == 1
+    assert [(r["success"], r["data"]) for r in results] == [(False, None), (False, None)]
+    assert "redis down" in results[0]["error"]
+
+
+def test_cancelled_waiter_does_not_cancel_shared_batch():
+    cache = RecordingCache()
+
+    async def main():
+        await cache.set("a", {"v": 1})
+        loader = CacheBatchLoader(cache)
+        cancelled = asyncio.create_task(loader.get("a"))
+        survivor = asyncio.create_task(loader.get("a"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return await survivor
+
+    assert asyncio.run(main())["data"] == {"v": 1}
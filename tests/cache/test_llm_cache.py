@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+from src.state_of_mind.cache import llm_cache as llm_cache_module
+from src.state_of_mind.cache.llm_cache import LLMCache
+
+
+def _value(n: int = 3):
+    return {"step": "visual", "events": [{"content": "光" * 20, "idx": i} for i in range(n)]}
+
+
+def test_uncompressed_cache_stores_objects_without_json_roundtrip(monkeypatch):
+    cache = LLMCache(max_size=10, compression="none", max_bytes=0)
+    value = _value()
+    json_size = len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("compression=none 时不应序列化")
+
+    monkeypatch.setattr(llm_cache_module.json, "dumps", _fail)
+    monkeypatch.setattr(llm_cache_module.json, "loads", _fail)
+
+    async def main():
+        await cache._aset_raw("k", value)
+        return await cache._aget_raw("k")
+
+    assert asyncio.run(main()) == value
+    memory = cache.memory_stats()
+    assert memory["raw_bytes"] >= json_size
+    assert memory["compression_ratio"] == 1.0
+
+
+def test_uncompressed_cache_isolates_entries_from_caller_mutation():
+    cache = LLMCache(max_size=10, compression="none", max_bytes=0)
+    value = _value()
+
+    async def main():
+        await cache._aset_raw("k", value)
+        value["events"].clear()
+        first = await cache._aget_raw("k")
+        first["meta"] = {"id": "mutated"}
+        first["events"][0]["content"] = "改写"
+        return first, await cache._aget_raw("k")
+
+    first, second = asyncio.run(main())
+
+    assert second == _value()
+    assert second is not first
+
+
+def test_uncompressed_size_estimate_drives_byte_budget():
+    value = _value(50)
+    per_entry = LLMCache._estimate_size(value) + LLMCache.ENTRY_OVERHEAD + 100
+    cache = LLMCache(max_size=100, compression="none", max_bytes=per_entry * 2)
+
+    async def main():
+        for i in range(4):
+            await cache._aset_raw(f"key-{i}", _value(50))
+        return await cache._akeys_raw()
+
+    keys = asyncio.run(main())
+
+    assert keys == ["key-2", "key-3"]
+    assert cache.memory_stats()["evictions"] == 2
+
+
+def test_compressed_cache_roundtrips_and_decodes_large_values_in_thread(monkeypatch):
+    cache = LLMCache(max_size=10, compression="zlib", max_bytes=0)
+    monkeypatch.setattr(LLMCache, "DECODE_IN_THREAD_MIN_BYTES", 1024)
+    offloaded = []
+    real_to_thread = asyncio.to_thread
+
+    async def to_thread(func, *args):
+        offloaded.append(func)
+        return await real_to_thread(func, *args)
+
+    monkeypatch.setattr(llm_cache_module.asyncio, "to_thread", to_thread)
+    small, large = {"a": 1}, _value(200)
+
+    async def main():
+        await cache._aset_many_raw({"small": small, "large": large})
+        return await cache._aget_many_raw(["small", "large"])
+
+    got_small, got_large = asyncio.run(main())
+
+    assert got_small == small and got_large == large
+    assert got_large is not large
+    assert len(offloaded) == 1
+    assert cache.memory_stats()["compression_ratio"] > 1.0
+
+
+def test_clear_resets_memory_counters():
+    cache = LLMCache(max_size=1, ttl_seconds=None, compression="none", max_bytes=200)
+
+    async def main():
+        await cache._aset_raw("a", {"x": 1})
+        await cache._aset_raw("b", {"x": 2})           # 条目数超限淘汰 a
+        await cache._aset_raw("huge", _value(100))     # 单条超过字节预算被拒绝
+        await cache._aclear_raw()
+
+    asyncio.run(main())
+
+    memory = cache.memory_stats()
+    assert (memory["entries"], memory["bytes_used"], memory["raw_bytes"]) == (0, 0, 0)
+    assert (memory["evictions"], memory["expirations"], memory["rejected"]) == (0, 0, 0)
+
+
+def test_estimate_size_counts_shared_objects_once():
+    child = {"content": "x" * 1000}
+    shared = {"a": child, "b": child}
+    distinct = {"a": child, "b": {"content": "y" * 1000}}
+
+    assert LLMCache._estimate_size(shared) + 1000 < LLMCache._estimate_size(distinct)
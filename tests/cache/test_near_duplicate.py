@@ -0,0 +1,252 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from src.state_of_mind.cache.llm_cache import LLMCache
+from src.state_of_mind.cache.near_duplicate import (
+    MinHasher, NearDuplicateIndex, RedisNearDuplicateIndex, create_near_duplicate_index, normalize_text
+)
+from src.state_of_mind.cache.single_flight import SingleFlight
+from src.state_of_mind.stages.perception.stage_pipeline import PerceptionPipeline
+
+TEXT = "今天和同事吵了一架，心里很不舒服。晚上回家后一直在想这件事，觉得自己当时说话太冲了，明天想去道个歉。"
+# 仅标点、全/半角与空白不同
+TEXT_REPUNCTUATED = "今天和同事吵了一架,心里很不舒服 晚上回家后一直在想这件事;觉得自己当时说话太冲了!!明天想去道个歉"
+# 末尾多了署名（仍在 0.9 阈值内）
+TEXT_SIGNED = TEXT + "——小林"
+# 多了一句话（相似度约 0.75）
+TEXT_EXTENDED = TEXT + "后来我给他发了消息，他说没关系。"
+TEXT_OTHER = "周末带孩子去公园放风筝，天气很好，大家都玩得很开心，回家路上还买了冰淇淋。"
+
+
+# ======================
+# 归一化与 MinHash
+# ======================
+def test_normalize_strips_punctuation_whitespace_and_width():
+    assert normalize_text("Ｈｅｌｌｏ，  World！") == normalize_text("hello,world!") == "helloworld"
+    assert normalize_text("！！  ，") == ""
+
+
+def test_minhash_estimates_jaccard_similarity():
+    hasher = MinHasher(num_perm=128)
+    a, b = normalize_text(TEXT), normalize_text(TEXT_EXTENDED)
+    shingles_a, shingles_b = hasher.shingles(a), hasher.shingles(b)
+    jaccard = len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+
+    estimate = MinHasher.similarity(hasher.signature(a), hasher.signature(b))
+
+    assert estimate == pytest.approx(jaccard, abs=0.15)
+    # 固定种子：不同实例（进程）签名一致
+    assert MinHasher(num_perm=128).signature(a) == hasher.signature(a)
+
+
+# ======================
+# 进程内索引
+# ======================
+def test_query_respects_similarity_threshold():
+    index = NearDuplicateIndex(threshold=0.9)
+    loose = NearDuplicateIndex(threshold=0.5)
+
+    async def main():
+        for idx in (index, loose):
+            await idx.add("ns", idx.signature(TEXT), "k-original")
+        return (
+            await index.query("ns", index.signature(TEXT_REPUNCTUATED)),
+            await index.query("ns", index.signature(TEXT_SIGNED)),
+            await index.query("ns", index.signature(TEXT_EXTENDED)),
+            await loose.query("ns", loose.signature(TEXT_EXTENDED)),
+            await index.query("ns", index.signature(TEXT_OTHER)),
+        )
+
+    repunctuated, signed, extended_strict, extended_loose, other = asyncio.run(main())
+
+    assert repunctuated == [("k-original", 1.0)]
+    assert [key for key, _ in signed] == ["k-original"]
+    # 多出的一句使相似度低于 0.9，但高于 0.5
+    assert extended_strict == []
+    assert [key for key, _ in extended_loose] == ["k-original"]
+    assert 0.5 <= extended_loose[0][1] < 0.9
+    assert other == []
+
+
+def test_namespaces_are_isolated_and_discard_removes_entries():
+    index = NearDuplicateIndex(threshold=0.9)
+    signature = index.signature(TEXT)
+
+    async def main():
+        await index.add("template-a", signature, "k-a")
+        other_namespace = await index.query("template-b", signature)
+        await index.discard("k-a")
+        after_discard = await index.query("template-a", signature)
+        return other_namespace, after_discard, await index.count()
+
+    other_namespace, after_discard, count = asyncio.run(main())
+
+    assert other_namespace == []
+    assert after_discard == []
+    assert count == 0
+    assert index._buckets == {}
+
+
+def test_lru_eviction_keeps_recently_matched_entries():
+    index = NearDuplicateIndex(threshold=0.9, max_entries=2)
+    texts = {"k1": TEXT, "k2": TEXT_OTHER, "k3": "完全不同的第三段文字，用来触发淘汰最久未使用的条目。"}
+
+    async def main():
+        await index.add("ns", index.signature(texts["k1"]), "k1")
+        await index.add("ns", index.signature(texts["k2"]), "k2")
+        await index.query("ns", index.signature(texts["k1"]))   # k1 变为最近使用
+        await index.add("ns", index.signature(texts["k3"]), "k3")
+        return list(index._entries), await index.count()
+
+    keys, count = asyncio.run(main())
+
+    assert keys == ["k1", "k3"]
+    assert count == 2
+
+
+def test_empty_normalized_text_has_no_signature():
+    assert NearDuplicateIndex().signature("……  ！") is None
+
+
+# ======================
+# Redis 索引
+# ======================
+class FakeScanRedis:
+    def __init__(self, keys: List[bytes] = None, error: Exception = None):
+        self.keys = keys or []
+        self.error = error
+        self.matches = []
+
+    async def scan_iter(self, match=None, count=None):
+        self.matches.append(match)
+        if self.error is not None:
+            raise self.error
+        for key in self.keys:
+            yield key
+
+
+def _redis_index(client) -> RedisNearDuplicateIndex:
+    config = SimpleNamespace(REDIS_HOST="localhost", REDIS_PORT=6379, REDIS_DB=0, REDIS_PASSWORD=None,
+                             REDIS_TIMEOUT=1)
+    index = RedisNearDuplicateIndex(config)
+    index._client = client
+    return index
+
+
+def test_redis_count_scans_signature_keys():
+    client = FakeScanRedis(keys=[b"sig-1", b"sig-2", b"sig-3"])
+    index = _redis_index(client)
+
+    assert asyncio.run(index.count()) == 3
+    assert client.matches == [f"{RedisNearDuplicateIndex.NAMESPACE}:sig:*"]
+
+
+def test_redis_count_degrades_to_zero_on_error():
+    index = _redis_index(FakeScanRedis(error=ConnectionError("down")))
+
+    assert asyncio.run(index.count()) == 0
+
+
+# ======================
+# 流水线接入（默认关闭）
+# ======================
+def test_factory_returns_none_unless_enabled():
+    assert create_near_duplicate_index(SimpleNamespace(NEAR_DUP_ENABLED=False)) is None
+
+
+def _pipeline(near_dup_index) -> PerceptionPipeline:
+    """跳过重量级初始化，只保留整体缓存、单飞与近重复索引；完整流程由 fake 代替"""
+    pipeline = PerceptionPipeline.__new__(PerceptionPipeline)
+    pipeline.llm_model = "test-model"
+    pipeline.llm_cache = LLMCache(max_size=100, compression="none", max_bytes=0)
+    pipeline.single_flight = SingleFlight()
+    pipeline.near_dup_index = near_dup_index
+    pipeline.extractions: List[str] = []
+
+    async def run_extraction(cache_key, context, template_name, user_input, *args):
+        near_dup = args[-2]
+        pipeline.extractions.append(user_input)
+        result: Dict[str, Any] = {"meta": {"report_url": f"/reports/{len(pipeline.extractions)}.html"},
+                                  "input": user_input}
+        await pipeline.llm_cache.set(cache_key, result)
+        if near_dup is not None:
+            await pipeline.near_dup_index.add(near_dup[0], near_dup[1], cache_key)
+        return {"report_url": result["meta"]["report_url"], "result": result}
+
+    pipeline._run_extraction = run_extraction
+    return pipeline
+
+
+def _extract(pipeline: PerceptionPipeline, user_input: str, template_name: str = "raw"):
+    return pipeline.async_extract(template_name=template_name, user_input=user_input, suggestion_type="default",
+                                  render_report=False, return_result=True)
+
+
+def test_pipeline_reuses_near_duplicate_result_when_enabled():
+    pipeline = _pipeline(NearDuplicateIndex(threshold=0.9))
+
+    async def main():
+        first = await _extract(pipeline, TEXT)
+        second = await _extract(pipeline, TEXT_REPUNCTUATED)
+        other_template = await _extract(pipeline, TEXT_REPUNCTUATED, template_name="other")
+        return first, second, other_template
+
+    first, second, other_template = asyncio.run(main())
+
+    assert pipeline.extractions == [TEXT, TEXT_REPUNCTUATED]
+    assert "near_duplicate" not in first
+    assert second["report_url"] == first["report_url"]
+    assert second["near_duplicate"]["similarity"] == 1.0
+    assert second["result"]["meta"]["near_duplicate"] == second["near_duplicate"]
+    # 模板不同时命名空间不同，不复用
+    assert "near_duplicate" not in other_template
+
+
+def test_near_duplicate_marker_does_not_leak_into_cached_entry(monkeypatch):
+    # 模拟读取时返回共享对象的缓存后端
+    monkeypatch.setattr(LLMCache, "_decode", lambda self, entry: entry.payload)
+    pipeline = _pipeline(NearDuplicateIndex(threshold=0.9))
+
+    async def main():
+        await _extract(pipeline, TEXT)
+        second = await _extract(pipeline, TEXT_REPUNCTUATED)
+        cached = await pipeline.llm_cache.get(second["near_duplicate"]["matched_key"])
+        return second, cached["data"]
+
+    second, cached = asyncio.run(main())
+
+    assert second["result"]["meta"]["near_duplicate"] == second["near_duplicate"]
+    assert "near_duplicate" not in cached["meta"]
+
+
+def test_pipeline_without_index_runs_full_extraction():
+    pipeline = _pipeline(None)
+
+    async def main():
+        await _extract(pipeline, TEXT)
+        return await _extract(pipeline, TEXT_REPUNCTUATED)
+
+    second = asyncio.run(main())
+
+    assert pipeline.extractions == [TEXT, TEXT_REPUNCTUATED]
+    assert "near_duplicate" not in second
+
+
+def test_pipeline_discards_candidates_whose_result_expired():
+    pipeline = _pipeline(NearDuplicateIndex(threshold=0.9))
+
+    async def main():
+        await _extract(pipeline, TEXT)
+        await pipeline.llm_cache.clear()
+        second = await _extract(pipeline, TEXT_REPUNCTUATED)
+        return second, await pipeline.near_dup_index.count()
+
+    second, count = asyncio.run(main())
+
+    assert pipeline.extractions == [TEXT, TEXT_REPUNCTUATED]
+    assert "near_duplicate" not in second
+    # 过期候选被移出，新结果登记
+    assert count == 1
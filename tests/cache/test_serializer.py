@@ -0,0 +1,98 @@
+import importlib.util
+import json
+import zlib
+
+import pytest
+
+from src.state_of_mind.cache.serializer import UTF8JsonSerializer, ValueCompressor, VersionedSerializer
+
+VALUE = {"step": "visual", "events": [{"content": "他说：\"明天见\"", "score": -2.5, "ok": True, "none": None}],
+         "nested": {"list": [1, 2, [3]]}}
+HAS_MSGPACK = importlib.util.find_spec("msgpack") is not None
+
+
+# ======================
+# 往返
+# ======================
+@pytest.mark.parametrize("fmt, compression", [
+    ("json", "none"), ("json", "zlib"), ("orjson", "none"), ("orjson", "zlib"),
+])
+def test_roundtrip(fmt, compression):
+    serializer = VersionedSerializer(fmt, compression)
+
+    assert serializer.loads(serializer.dumps(VALUE)) == VALUE
+
+
+def test_plain_json_is_written_without_header():
+    payload = VersionedSerializer("json", "none").dumps(VALUE)
+
+    # 与旧数据、redis-cli 可读性保持一致
+    assert json.loads(payload.decode("utf-8")) == VALUE
+    assert "明天见" in payload.decode("utf-8")
+
+
+def test_header_encodes_format_and_compression():
+    payload = VersionedSerializer("orjson", "zlib").dumps(VALUE)
+
+    assert payload[0] == VersionedSerializer.HEADER_V1 | (1 << 2) | 2
+    assert VersionedSerializer("orjson", "zlib").name == "orjson+zlib"
+    assert json.loads(zlib.decompress(payload[1:])) == VALUE
+
+
+def test_reader_decodes_values_written_with_other_settings():
+    """迁移期间不同进程按不同格式写入，读取端按头字节解码"""
+    reader = VersionedSerializer("json", "none")
+
+    for fmt, compression in (("orjson", "zlib"), ("json", "zlib"), ("orjson", "none")):
+        assert reader.loads(VersionedSerializer(fmt, compression).dumps(VALUE)) == VALUE
+
+
+# ======================
+# 旧数据兼容
+# ======================
+def test_reads_legacy_utf8_json_as_bytes_and_str():
+    legacy = UTF8JsonSerializer().dumps(VALUE)
+    serializer = VersionedSerializer("orjson", "zlib")
+
+    assert serializer.loads(legacy) == VALUE
+    assert serializer.loads(legacy.encode("utf-8")) == VALUE
+    assert serializer.loads(json.dumps([1, 2]).encode("utf-8")) == [1, 2]
+
+
+@pytest.mark.parametrize("empty", [None, b"", ""])
+def test_empty_values_load_as_none(empty):
+    assert VersionedSerializer().loads(empty) is None
+
+
+def test_unknown_header_raises():
+    # 压缩方式编号 3 未定义
+    header = VersionedSerializer.HEADER_V1 | (3 << 2) | 1
+
+    with pytest.raises(ValueError):
+        VersionedSerializer().loads(bytes([header]) + b"{}")
+
+
+# ======================
+# 配置校验与可选依赖
+# ======================
+def test_rejects_unknown_format_and_codec():
+    with pytest.raises(ValueError):
+        VersionedSerializer("pickle")
+    with pytest.raises(ValueError):
+        ValueCompressor("lz4")
+
+
+@pytest.mark.skipif(HAS_MSGPACK, reason="已安装 msgpack")
+def test_missing_optional_format_dependency_raises_runtime_error():
+    with pytest.raises(RuntimeError):
+        VersionedSerializer("msgpack")
+
+
+def test_value_compressor_decompresses_by_stored_codec():
+    raw = json.dumps(VALUE, ensure_ascii=False).encode("utf-8") * 20
+    compressed = ValueCompressor("zlib").compress(raw)
+
+    # 当前写入配置为 none 时仍能读取 zlib 条目
+    assert len(compressed) < len(raw)
+    assert ValueCompressor("none").decompress(compressed, "zlib") == raw
+    assert ValueCompressor("none").decompress(raw, "none") == raw
@@ -0,0 +1,209 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from src.state_of_mind.cache.single_flight import RedisSingleFlight, SingleFlight
+
+
+class CountingFn:
+    def __init__(self, result: Any = "value", delay: float = 0.05, error: Exception = None):
+        self.result = result
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+# ======================
+# 进程内单飞
+# ======================
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight()
+    fn = CountingFn()
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fn) for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert fn.calls == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert {value for value, _ in results} == {"value"}
+    assert flight.stats() == {"inflight": 0, "leads": 1, "shared": 4}
+
+
+def test_cancelled_follower_does_not_cancel_leader():
+    flight = SingleFlight()
+    fn = CountingFn()
+
+    async def main():
+        leader = asyncio.create_task(flight.do("k", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", fn))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert asyncio.run(main()) == ("value", False)
+    assert fn.calls == 1
+
+
+def test_cancelled_leader_hands_off_to_a_follower():
+    flight = SingleFlight()
+    fn = CountingFn()
+
+    async def main():
+        leader = asyncio.create_task(flight.do("k", fn))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.do("k", fn)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(*followers)
+
+    results = asyncio.run(main())
+
+    # 领跑者取消后由一个跟随者接替执行，另一个复用接替者的结果
+    assert fn.calls == 2
+    assert sorted(shared for _, shared in results) == [False, True]
+
+
+def test_leader_failure_propagates_to_followers():
+    flight = SingleFlight()
+    fn = CountingFn(error=ValueError("boom"))
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fn) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert fn.calls == 1
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.stats()["inflight"] == 0
+
+
+# ======================
+# Redis 单飞：锁续期
+# ======================
+class FakeLockRedis:
+    """SET NX PX / EXISTS 与释放、续期脚本的最小实现，按事件循环时间过期"""
+
+    def __init__(self):
+        self.locks: Dict[str, List[Any]] = {}
+        self.extensions = 0
+
+    def _now(self):
+        return asyncio.get_running_loop().time()
+
+    def _alive(self, key):
+        lock = self.locks.get(key)
+        if lock and lock[1] <= self._now():
+            del self.locks[key]
+            return None
+        return lock
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and self._alive(key):
+            return None
+        self.locks[key] = [value, self._now() + px / 1000]
+        return True
+
+    async def exists(self, key):
+        return int(self._alive(key) is not None)
+
+    async def release(self, keys, args):
+        lock = self._alive(keys[0])
+        if lock and lock[0] == args[0]:
+            del self.locks[keys[0]]
+            return 1
+        return 0
+
+    async def extend(self, keys, args):
+        lock = self._alive(keys[0])
+        if lock and lock[0] == args[0]:
+            lock[1] = self._now() + int(args[1]) / 1000
+            self.extensions += 1
+            return 1
+        return 0
+
+
+def _redis_flight(lock_ttl: float, poll_interval: float = 0.01) -> RedisSingleFlight:
+    config = SimpleNamespace(REDIS_HOST="localhost", REDIS_PORT=6379, REDIS_DB=0, REDIS_PASSWORD=None,
+                             REDIS_TIMEOUT=1)
+    flight = RedisSingleFlight(config, lock_ttl=lock_ttl, poll_interval=poll_interval)
+    fake = FakeLockRedis()
+    flight._client = fake
+    flight._release = fake.release
+    flight._extend = fake.extend
+    return flight
+
+
+def test_redis_lock_is_extended_while_leader_runs():
+    flight = _redis_flight(lock_ttl=0.15)
+    fn = CountingFn(delay=0.4)
+    lock_key = f"{RedisSingleFlight.NAMESPACE}:k"
+
+    async def main():
+        task = asyncio.create_task(flight.do("k", fn))
+        await asyncio.sleep(0.3)
+        # 已超过原 TTL，锁仍由领跑者持有
+        held = await flight._client.exists(lock_key)
+        result = await task
+        return held, result
+
+    held, result = asyncio.run(main())
+
+    assert held == 1
+    assert result == ("value", False)
+    assert flight._client.extensions >= 2
+    assert lock_key not in flight._client.locks
+
+
+def test_redis_heartbeat_stops_when_lock_is_taken_over():
+    flight = _redis_flight(lock_ttl=0.09)
+    fn = CountingFn(delay=0.2)
+    lock_key = f"{RedisSingleFlight.NAMESPACE}:k"
+
+    async def main():
+        task = asyncio.create_task(flight.do("k", fn))
+        await asyncio.sleep(0.01)
+        # 锁过期后被其他进程抢到（长 TTL）
+        flight._client.locks[lock_key] = ["other-process", flight._client._now() + 10]
+        await task
+
+    asyncio.run(main())
+
+    # 锁被其他进程持有后不再续期，也不会删除他人的锁
+    assert flight._client.extensions == 0
+    assert flight._client.locks[lock_key][0] == "other-process"
+
+
+def test_redis_follower_reuses_result_loaded_after_lock_release():
+    flight = _redis_flight(lock_ttl=5)
+    fn = CountingFn()
+    lock_key = f"{RedisSingleFlight.NAMESPACE}:k"
+    cache: Dict[str, Any] = {}
+
+    async def load():
+        return cache.get("k")
+
+    async def main():
+        # 其他进程持锁执行中
+        await flight._client.set(lock_key, "other-process", nx=True, px=5000)
+        task = asyncio.create_task(flight.do("k", fn, load=load))
+        await asyncio.sleep(0.05)
+        cache["k"] = "from-other-process"
+        del flight._client.locks[lock_key]
+        return await task
+
+    assert asyncio.run(main()) == ("from-other-process", True)
+    assert fn.calls == 0
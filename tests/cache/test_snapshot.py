@@ -0,0 +1,82 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from src.state_of_mind.cache.llm_cache import LLMCache
+from src.state_of_mind.cache.snapshot import CacheSnapshot
+from src.state_of_mind.cache.sqlite import SQLiteLLMCache
+
+ENTRIES = {f"key-{i}": {"step": "visual", "idx": i, "content": "光" * i} for i in range(5)}
+
+
+def _memory_cache() -> LLMCache:
+    return LLMCache(max_size=100, compression="none", max_bytes=0)
+
+
+def _read_lines(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_export_then_import_roundtrips_across_backends(tmp_path, monkeypatch):
+    monkeypatch.setattr(CacheSnapshot, "BATCH_SIZE", 2)
+    source = _memory_cache()
+    target = SQLiteLLMCache(path=tmp_path / "target.sqlite3", max_size=100, max_bytes=0, compression="zlib")
+    snapshot = tmp_path / "snapshots" / "cache.jsonl.gz"
+
+    async def main():
+        await source.set_many(ENTRIES)
+        exported = await CacheSnapshot(source).export(snapshot)
+        imported = await CacheSnapshot(target).load(snapshot)
+        values = (await target.get_many(list(ENTRIES)))["data"]
+        await target.close()
+        return exported, imported, values
+
+    exported, imported, values = asyncio.run(main())
+
+    assert exported == imported == len(ENTRIES)
+    assert values == ENTRIES
+    header = _read_lines(snapshot)[0]
+    assert (header["format"], header["version"], header["count"]) == (CacheSnapshot.FORMAT, 1, len(ENTRIES))
+    assert not snapshot.with_name(snapshot.name + ".tmp").exists()
+
+
+def test_import_skips_unparseable_lines(tmp_path):
+    snapshot = tmp_path / "cache.jsonl.gz"
+    with gzip.open(snapshot, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"format": CacheSnapshot.FORMAT, "version": CacheSnapshot.VERSION}) + "\n")
+        f.write(json.dumps({"key": "good", "value": {"v": 1}}) + "\n")
+        f.write("{半行\n\n")
+        f.write(json.dumps({"value": {"v": 2}}) + "\n")
+    cache = _memory_cache()
+
+    async def main():
+        count = await CacheSnapshot(cache).load(snapshot)
+        return count, (await cache.keys())["data"]
+
+    assert asyncio.run(main()) == (1, ["good"])
+
+
+@pytest.mark.parametrize("header, message", [
+    ({"format": "other"}, "不是缓存快照文件"),
+    ({"format": CacheSnapshot.FORMAT, "version": 99}, "不支持的快照版本"),
+])
+def test_import_rejects_foreign_or_newer_files(tmp_path, header, message):
+    snapshot = tmp_path / "cache.jsonl.gz"
+    with gzip.open(snapshot, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(header) + "\n")
+
+    with pytest.raises(ValueError, match=message):
+        asyncio.run(CacheSnapshot(_memory_cache()).load(snapshot))
+
+
+def test_export_requires_key_listing(tmp_path):
+    class NoKeysCache(LLMCache):
+        async def _akeys_raw(self):
+            raise NotImplementedError
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(CacheSnapshot(NoKeysCache(max_size=10, compression="none", max_bytes=0))
+                    .export(tmp_path / "cache.jsonl.gz"))
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+from src.state_of_mind.cache import sqlite as sqlite_module
+from src.state_of_mind.cache.sqlite import SQLiteLLMCache
+
+
+def _value(i: int = 0, n: int = 3):
+    return {"step": "visual", "idx": i, "events": [{"content": "光" * 20, "idx": j} for j in range(n)]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可拨动的时钟：缓存模块内的 time.time() 返回 clock[0]"""
+    now: List[float] = [time.time()]
+    monkeypatch.setattr(sqlite_module, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def _cache(tmp_path, **kwargs) -> SQLiteLLMCache:
+    kwargs.setdefault("max_size", 100)
+    kwargs.setdefault("max_bytes", 0)
+    kwargs.setdefault("compression", "none")
+    return SQLiteLLMCache(path=tmp_path / "cache.sqlite3", **kwargs)
+
+
+def _run(cache: SQLiteLLMCache, coro_fn):
+    async def main():
+        try:
+            return await coro_fn()
+        finally:
+            await cache.close()
+
+    return asyncio.run(main())
+
+
+# ======================
+# 基本读写
+# ======================
+def test_get_set_delete_roundtrip(tmp_path):
+    cache = _cache(tmp_path)
+
+    async def main():
+        miss = await cache.get("k")
+        await cache.set("k", _value(1))
+        hit = await cache.get("k")
+        await cache.set("k", _value(2))
+        overwritten = await cache.get("k")
+        await cache.delete("k")
+        return miss, hit, overwritten, await cache.get("k")
+
+    miss, hit, overwritten, deleted = _run(cache, main)
+
+    assert miss == {"success": True, "data": None, "error": None}
+    assert hit["data"] == _value(1)
+    assert overwritten["data"] == _value(2)
+    assert deleted["data"] is None
+    assert cache.hit_counts() == {"hits": 2, "misses": 2}
+    assert cache.memory_stats()["entries"] == 0
+
+
+def test_compressed_values_roundtrip(tmp_path):
+    cache = _cache(tmp_path, compression="zlib")
+    large = _value(n=200)
+
+    async def main():
+        await cache.set_many({"small": _value(), "large": large})
+        return await cache.get_many(["small", "large"])
+
+    values = _run(cache, main)["data"]
+
+    assert values == {"small": _value(), "large": large}
+    memory = cache.memory_stats()
+    assert memory["compression"] == "zlib"
+    assert memory["compression_ratio"] > 1.0
+
+
+def test_get_many_and_set_many_report_partial_misses(tmp_path):
+    # 超过单条语句绑定参数上限的批量也分块完成
+    items = {f"k{i}": _value(i) for i in range(SQLiteLLMCache.QUERY_CHUNK + 10)}
+    last = f"k{SQLiteLLMCache.QUERY_CHUNK + 9}"
+    cache = _cache(tmp_path, max_size=len(items))
+
+    async def main():
+        await cache.set_many(items)
+        return await cache.get_many(["k0", "missing", "k0", last])
+
+    response = _run(cache, main)
+
+    assert response["data"] == {"k0": _value(0), "missing": None, last: items[last]}
+    assert cache.memory_stats()["entries"] == len(items)
+
+
+def test_keys_and_clear(tmp_path):
+    cache = _cache(tmp_path)
+
+    async def main():
+        await cache.set_many({"a": _value(), "b": _value()})
+        keys = await cache.keys()
+        await cache.clear()
+        return keys, await cache.keys(), await cache.get("a")
+
+    keys, after_clear, cleared = _run(cache, main)
+
+    assert sorted(keys["data"]) == ["a", "b"]
+    assert after_clear["data"] == []
+    assert cleared["data"] is None
+    assert cache.memory_stats()["entries"] == 0
+    assert cache.memory_stats()["bytes_used"] == 0
+
+
+# ======================
+# 过期与淘汰
+# ======================
+def test_expired_entries_are_misses_and_swept_on_write(tmp_path, clock):
+    cache = _cache(tmp_path, ttl_seconds=60)
+
+    async def main():
+        await cache.set("old", _value())
+        clock[0] += 61
+        expired = await cache.get("old")
+        keys = await cache.keys()
+        cache._last_sweep = 0.0
+        await cache.set("new", _value())
+        return expired, keys
+
+    expired, keys = _run(cache, main)
+
+    assert expired["data"] is None
+    assert keys["data"] == []
+    memory = cache.memory_stats()
+    assert memory["entries"] == 1
+    assert memory["expirations"] == 1
+
+
+def test_evicts_least_recently_accessed_when_over_max_size(tmp_path, clock):
+    cache = _cache(tmp_path, max_size=2)
+
+    async def main():
+        for key in ("a", "b"):
+            await cache.set(key, _value())
+            clock[0] += 1
+        await cache.get("a")   # 访问时间随下一次写入落盘
+        clock[0] += 1
+        await cache.set("c", _value())
+        return await cache.keys()
+
+    keys = _run(cache, main)
+
+    assert sorted(keys["data"]) == ["a", "c"]
+    assert cache.memory_stats()["evictions"] == 1
+
+
+def test_rejects_single_entry_over_byte_budget(tmp_path):
+    cache = _cache(tmp_path, max_bytes=200)
+
+    async def main():
+        await cache.set("huge", _value(n=50))
+        return await cache.get("huge")
+
+    assert _run(cache, main)["data"] is None
+    assert cache.memory_stats()["rejected"] == 1
+
+
+# ======================
+# 持久化
+# ======================
+def test_entries_and_counters_survive_reopen(tmp_path):
+    first = _cache(tmp_path)
+    _run(first, lambda: first.set_many({"a": _value(1), "b": _value(2)}))
+    bytes_used = first.memory_stats()["bytes_used"]
+
+    reopened = _cache(tmp_path)
+    values = _run(reopened, lambda: reopened.get_many(["a", "b"]))["data"]
+
+    assert values == {"a": _value(1), "b": _value(2)}
+    memory = reopened.memory_stats()
+    assert memory["entries"] == 2
+    assert memory["bytes_used"] == bytes_used
+    assert memory["disk_bytes"] > 0
@@ -0,0 +1,201 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from src.state_of_mind.cache.llm_cache import LLMCache
+from src.state_of_mind.cache.tiered import TieredCache
+
+
+class FakeL2:
+    """内存版 L2；gate 被设置时读取会在返回前阻塞，用于构造读-回填竞争"""
+
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+        self.gate: Optional[asyncio.Event] = None
+        self.reading = asyncio.Event()
+
+    async def _wait(self):
+        if self.gate is not None:
+            self.reading.set()
+            await self.gate.wait()
+
+    async def _aget_raw(self, key):
+        value = self.data.get(key)
+        await self._wait()
+        return value
+
+    async def _aget_many_raw(self, keys):
+        values = [self.data.get(key) for key in keys]
+        await self._wait()
+        return values
+
+    async def _aset_raw(self, key, value):
+        self.data[key] = value
+
+    async def _aset_many_raw(self, items):
+        self.data.update(items)
+
+    async def _adelete_raw(self, key):
+        self.data.pop(key, None)
+
+    async def _adelete_many_raw(self, keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def _aclear_raw(self):
+        self.data.clear()
+
+    async def _akeys_raw(self):
+        return list(self.data)
+
+
+def _tiered(max_entry_bytes: int = 0, negative_ttl: float = 5.0) -> TieredCache:
+    config = SimpleNamespace(
+        TIERED_L1_MAX_ENTRY_BYTES=max_entry_bytes, TIERED_NEGATIVE_TTL=negative_ttl,
+        TIERED_INVALIDATION_CHANNEL="test:invalidation", REDIS_HOST="localhost", REDIS_PORT=6379, REDIS_DB=0,
+    )
+    l1 = LLMCache(max_size=16, ttl_seconds=60, max_bytes=0, compression="none", max_entry_bytes=max_entry_bytes)
+    cache = TieredCache(config, l1=l1, l2=FakeL2())
+    cache.published: List[Any] = []
+    cache._ensure_subscriber = lambda: None
+
+    async def publish(key):
+        cache.published.append(key)
+
+    async def publish_many(keys):
+        cache.published.append(list(keys))
+
+    cache._publish = publish
+    cache._publish_many = publish_many
+    return cache
+
+
+def test_l2_hit_backfills_l1():
+    async def main():
+        cache = _tiered()
+        cache.l2.data["k"] = {"v": 1}
+        first = await cache._aget_raw("k")
+        cache.l2.data.clear()
+        second = await cache._aget_raw("k")
+        return cache, first, second
+
+    cache, first, second = asyncio.run(main())
+
+    assert first == second == {"v": 1}
+    assert (cache._l2_hits, cache._l1_hits) == (1, 1)
+
+
+def test_oversized_values_are_rejected_by_l1_and_stale_copy_dropped():
+    big = {"content": "x" * 4096}
+
+    async def main():
+        cache = _tiered(max_entry_bytes=2048)
+        await cache._aset_raw("k", {"v": 1})
+        in_l1_before = "k" in cache.l1.cache
+        await cache._aset_raw("k", big)
+        return cache, in_l1_before, await cache._aget_raw("k")
+
+    cache, in_l1_before, value = asyncio.run(main())
+
+    assert in_l1_before
+    assert "k" not in cache.l1.cache
+    assert value == big
+    assert cache.l1.memory_stats()["rejected"] >= 1
+
+
+def test_set_during_l2_read_prevents_stale_backfill():
+    async def main():
+        cache = _tiered()
+        cache.l2.data["k"] = {"v": "old"}
+        cache.l2.gate = asyncio.Event()
+        reader = asyncio.create_task(cache._aget_raw("k"))
+        await cache.l2.reading.wait()
+        await cache._aset_raw("k", {"v": "new"})
+        cache.l2.gate.set()
+        stale = await reader
+        return stale, await cache.l1._aget_raw("k")
+
+    stale, l1_value = asyncio.run(main())
+
+    assert stale == {"v": "old"}
+    assert l1_value == {"v": "new"}
+
+
+def test_remote_invalidation_during_l2_read_prevents_backfill():
+    async def main():
+        cache = _tiered()
+        cache.l2.data["k"] = {"v": "old"}
+        cache.l2.gate = asyncio.Event()
+        reader = asyncio.create_task(cache._aget_raw("k"))
+        await cache.l2.reading.wait()
+        await cache._on_invalidation(json.dumps({"origin": "other-process", "key": "k"}))
+        cache.l2.gate.set()
+        await reader
+        return cache
+
+    cache = asyncio.run(main())
+
+    assert "k" not in cache.l1.cache
+    assert cache._reads == {}
+    assert cache._invalidations_received == 1
+
+
+def test_miss_racing_a_write_is_not_negatively_cached():
+    async def main():
+        cache = _tiered(negative_ttl=60)
+        cache.l2.gate = asyncio.Event()
+        reader = asyncio.create_task(cache._aget_raw("k"))
+        await cache.l2.reading.wait()
+        await cache._aset_raw("k", {"v": "new"})
+        await cache.l1._adelete_raw("k")
+        cache.l2.gate.set()
+        missed = await reader
+        cache.l2.gate = None
+        return missed, await cache._aget_raw("k")
+
+    missed, value = asyncio.run(main())
+
+    assert missed is None
+    assert value == {"v": "new"}
+
+
+def test_get_many_skips_backfill_only_for_invalidated_keys():
+    async def main():
+        cache = _tiered()
+        cache.l2.data.update({"a": {"v": "a"}, "b": {"v": "b-old"}})
+        cache.l2.gate = asyncio.Event()
+        reader = asyncio.create_task(cache._aget_many_raw(["a", "b"]))
+        await cache.l2.reading.wait()
+        await cache._adelete_raw("b")
+        cache.l2.gate.set()
+        values = await reader
+        return cache, values
+
+    cache, values = asyncio.run(main())
+
+    assert values == [{"v": "a"}, {"v": "b-old"}]
+    assert "a" in cache.l1.cache
+    assert "b" not in cache.l1.cache
+
+
+@pytest.mark.parametrize("message, expected_l1", [
+    ({"origin": "other-process", "key": "k"}, set()),
+    ({"origin": "other-process", "keys": ["k"]}, set()),
+    ({"origin": "other-process", "key": "*"}, set()),
+    ({"origin": "self", "key": "k"}, {"k"}),
+])
+def test_invalidation_messages_drop_l1_copies(message, expected_l1):
+    async def main():
+        cache = _tiered()
+        if message["origin"] == "self":
+            message["origin"] = cache._origin
+        await cache._aset_raw("k", {"v": 1})
+        await cache._on_invalidation(json.dumps(message))
+        return cache
+
+    cache = asyncio.run(main())
+
+    assert set(cache.l1.cache) == expected_l1
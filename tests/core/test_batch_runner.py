@@ -0,0 +1,164 @@
+import asyncio
+import json
+from typing import Any, Dict, List
+
+import pytest
+
+from src.state_of_mind.core.batch_runner import BatchRunner
+
+
+class FakeStage:
+    """记录调用与最大并发数的阶段；outcomes 按原文指定返回值或异常，默认成功"""
+
+    def __init__(self, delay: float = 0.01, outcomes: Dict[str, Any] = None):
+        self.delay = delay
+        self.outcomes = outcomes or {}
+        self.calls: List[str] = []
+        self.cancelled: List[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def run(self, user_input: str, category: str, **kwargs) -> Dict[str, Any]:
+        self.calls.append(user_input)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(user_input)
+            raise
+        finally:
+            self.in_flight -= 1
+        outcome = self.outcomes.get(user_input, {"report_url": f"/reports/{user_input}.html", "success": True})
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def _collect(runner: BatchRunner, user_inputs, category: str = "raw", **kwargs):
+    async def main():
+        return [item async for item in runner.iter_results(user_inputs, category, **kwargs)]
+
+    return asyncio.run(main())
+
+
+def _checkpoint_hashes(path) -> List[str]:
+    return [json.loads(line)["input_hash"] for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+# ======================
+# 有界并发
+# ======================
+def test_in_flight_documents_never_exceed_limit_and_inputs_are_pulled_lazily():
+    stage = FakeStage()
+    pulled: List[int] = []
+
+    def inputs():
+        for i in range(10):
+            pulled.append(i)
+            yield f"doc-{i}"
+
+    async def main():
+        items = []
+        async for item in BatchRunner(stage, max_in_flight=3).iter_results(inputs(), "raw"):
+            # 每产出一个结果时，拉取的输入不超过 已产出 + 在途上限
+            assert len(pulled) <= len(items) + 1 + 3
+            items.append(item)
+        return items
+
+    items = asyncio.run(main())
+
+    assert stage.max_in_flight == 3
+    assert sorted(item.index for item in items) == list(range(10))
+    assert all(item.success for item in items)
+
+
+def test_rejects_non_positive_limit():
+    with pytest.raises(ValueError):
+        BatchRunner(FakeStage(), max_in_flight=0)
+
+
+# ======================
+# 成功判定与断点
+# ======================
+def test_resumed_run_skips_completed_documents(tmp_path):
+    checkpoint = tmp_path / "batch.ckpt.jsonl"
+    first = FakeStage()
+    second = FakeStage()
+
+    _collect(BatchRunner(first, checkpoint_path=checkpoint), ["a", "b"])
+    items = _collect(BatchRunner(second, checkpoint_path=checkpoint), ["a", "b", "c"])
+
+    assert second.calls == ["c"]
+    resumed = sorted((item.index, item.result["report_url"]) for item in items if item.resumed)
+    assert resumed == [(0, "/reports/a.html"), (1, "/reports/b.html")]
+
+
+def test_failed_documents_are_not_checkpointed(tmp_path):
+    checkpoint = tmp_path / "batch.ckpt.jsonl"
+    stage = FakeStage(outcomes={
+        "invalid": {"report_url": "", "success": False},
+        "no-report": {"report_url": ""},
+        "error": RuntimeError("boom"),
+    })
+    runner = BatchRunner(stage, checkpoint_path=checkpoint)
+
+    items = {item.index: item for item in _collect(runner, ["ok", "invalid", "no-report", "error"])}
+
+    assert [items[i].success for i in range(4)] == [True, False, False, False]
+    assert items[1].result == {"report_url": "", "success": False}
+    assert "RuntimeError: boom" in items[3].error
+    assert _checkpoint_hashes(checkpoint) == [BatchRunner.hash_input("ok", "raw")]
+    # 重跑时失败文档重新执行
+    retry = FakeStage()
+    _collect(BatchRunner(retry, checkpoint_path=checkpoint), ["ok", "invalid", "no-report", "error"])
+    assert sorted(retry.calls) == ["error", "invalid", "no-report"]
+
+
+def test_missing_report_is_not_a_failure_when_rendering_is_disabled():
+    stage = FakeStage(outcomes={"a": {"report_url": "", "success": True}})
+
+    items = _collect(BatchRunner(stage), ["a"], render_report=False)
+
+    assert items[0].success
+
+
+def test_changed_options_do_not_resume(tmp_path):
+    checkpoint = tmp_path / "batch.ckpt.jsonl"
+    _collect(BatchRunner(FakeStage(), checkpoint_path=checkpoint), ["a"], title="报告 A", render_report=True)
+
+    stage = FakeStage()
+    _collect(BatchRunner(stage, checkpoint_path=checkpoint), ["a"], title="报告 B", render_report=True,
+             on_event=lambda message: None)
+
+    assert stage.calls == ["a"]
+    # 回调不参与哈希
+    assert BatchRunner.hash_input("a", "raw", {"title": "报告 B"}) != BatchRunner.hash_input("a", "raw")
+
+
+# ======================
+# 提前退出
+# ======================
+def test_breaking_out_early_cancels_in_flight_documents():
+    class FastFirstStage(FakeStage):
+        async def run(self, user_input, category, **kwargs):
+            if user_input == "fast":
+                self.calls.append(user_input)
+                return {"report_url": "/reports/fast.html"}
+            return await super().run(user_input, category, **kwargs)
+
+    stage = FastFirstStage(delay=0.5)
+
+    async def main():
+        generator = BatchRunner(stage, max_in_flight=3).iter_results(["slow-1", "slow-2", "fast", "slow-3"], "raw")
+        async for item in generator:
+            first = item
+            break
+        await generator.aclose()
+        return first
+
+    first = asyncio.run(main())
+
+    assert first.index == 2
+    assert sorted(stage.cancelled) == ["slow-1", "slow-2"]
+    assert "slow-3" not in stage.calls
@@ -0,0 +1,316 @@
+import asyncio
+import fnmatch
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from src.state_of_mind.core.job_queue import (
+    JobManager, JobStatusConst, LocalJobQueue, RedisJobQueue, StepStatusConst
+)
+from src.state_of_mind.stages.perception.constants import (
+    EVENT_PIPELINE_START, EVENT_STEP_RESULT, EVENT_STEP_SKIPPED, EVENT_REPORT
+)
+
+
+class FakeOrchestrator:
+    """按固定事件序列推进的编排器；release 未设置时一直阻塞"""
+
+    def __init__(self, block: bool = False):
+        self.release = asyncio.Event() if block else None
+        self.started: List[str] = []
+
+    async def run(self, stage_name, user_input, on_event=None, **kwargs):
+        self.started.append(user_input)
+        await on_event({"event": EVENT_PIPELINE_START, "steps": [{"id": "a"}, {"id": "b"}]})
+        if self.release is not None:
+            await self.release.wait()
+        await on_event({"event": EVENT_STEP_RESULT, "step_id": "a", "response": {"__success": True}})
+        await on_event({"event": EVENT_STEP_SKIPPED, "step_id": "b"})
+        await on_event({"event": EVENT_REPORT, "report_url": "/reports/x.html"})
+        return {"report_url": "/reports/x.html"}
+
+
+class FakeRedis:
+    """RedisJobQueue 用到的最小异步 Redis 子集（LIST / 字符串 / SCAN）"""
+
+    def __init__(self):
+        self.lists: Dict[str, List[str]] = {}
+        self.values: Dict[str, Any] = {}
+
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    async def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, value)
+
+    async def lmove(self, first_list, second_list, src="LEFT", dest="RIGHT"):
+        items = self.lists.get(first_list)
+        if not items:
+            return None
+        value = items.pop(-1 if src == "RIGHT" else 0)
+        target = self.lists.setdefault(second_list, [])
+        target.append(value) if dest == "RIGHT" else target.insert(0, value)
+        return value
+
+    async def blmove(self, first_list, second_list, timeout, src="LEFT", dest="RIGHT"):
+        value = await self.lmove(first_list, second_list, src, dest)
+        if value is None:
+            await asyncio.sleep(0.01)
+        return value
+
+    async def rpop(self, key):
+        items = self.lists.get(key)
+        return items.pop(-1) if items else None
+
+    async def lrem(self, key, count, value):
+        items = self.lists.get(key, [])
+        if value in items:
+            items.remove(value)
+            return 1
+        return 0
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def exists(self, key):
+        return int(key in self.values)
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+    async def scan_iter(self, match):
+        for key in list(self.lists):
+            if fnmatch.fnmatchcase(key, match) and self.lists[key]:
+                yield key
+
+    async def aclose(self):
+        pass
+
+
+def _redis_queue(client: FakeRedis, namespace: str = "tenant_a") -> RedisJobQueue:
+    config = SimpleNamespace(REDIS_HOST="localhost", REDIS_PORT=6379, REDIS_DB=0, REDIS_PASSWORD=None,
+                             REDIS_TIMEOUT=1, CACHE_NAMESPACE=namespace)
+    queue = RedisJobQueue(config, max_size=10, result_ttl=60)
+    queue._client = client
+    return queue
+
+
+async def _wait_for_status(manager: JobManager, job_id: str, statuses, timeout: float = 2.0) -> Dict[str, Any]:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        job = await manager.get(job_id)
+        if job["status"] in statuses or asyncio.get_running_loop().time() > deadline:
+            return job
+        await asyncio.sleep(0.01)
+
+
+# ======================
+# HTTP 接口
+# ======================
+@pytest.fixture
+def client(monkeypatch):
+    manager = JobManager(FakeOrchestrator(), LocalJobQueue(max_size=1, result_ttl=60), workers=1)
+    monkeypatch.setattr(main, "job_manager", manager)
+    # 不进入 with 块，不触发 startup：worker 不消费，任务停留在队列中
+    return TestClient(main.app)
+
+
+def test_submit_job_returns_429_with_retry_after_when_queue_full(client):
+    first = client.post("/api/jobs", json={"text": "第一段"})
+    second = client.post("/api/jobs", json={"text": "第二段"})
+
+    assert first.status_code == 202
+    assert second.status_code == 429
+    assert second.headers["Retry-After"] == "30"
+
+
+def test_job_status_endpoint_reports_queued_job_and_404_for_unknown(client):
+    submitted = client.post("/api/jobs", json={"text": "原文"}).json()
+
+    status = client.get(submitted["status_url"])
+
+    assert status.status_code == 200
+    body = status.json()
+    assert body["job_id"] == submitted["job_id"]
+    assert body["status"] == JobStatusConst.QUEUED
+    assert body["queue_depth"] == 1
+    assert "user_input" not in body
+    assert client.get("/api/jobs/does-not-exist").status_code == 404
+
+
+# ======================
+# JobManager
+# ======================
+def test_worker_runs_job_and_tracks_step_status():
+    async def main_():
+        manager = JobManager(FakeOrchestrator(), LocalJobQueue(max_size=5, result_ttl=60), workers=1)
+        await manager.start()
+        job = await manager.submit("原文")
+        done = await _wait_for_status(manager, job["job_id"], JobStatusConst.finished())
+        await manager.stop()
+        return done
+
+    done = asyncio.run(main_())
+
+    assert done["status"] == JobStatusConst.SUCCEEDED
+    assert done["steps"] == {"a": StepStatusConst.SUCCEEDED, "b": StepStatusConst.SKIPPED}
+    assert done["progress"] == {"completed": 2, "total": 2}
+    assert done["report_url"] == "/reports/x.html"
+
+
+def test_reconfigure_migrates_queued_jobs_to_new_queue():
+    async def main_():
+        orchestrator = FakeOrchestrator()
+        manager = JobManager(orchestrator, LocalJobQueue(max_size=5, result_ttl=60), workers=1)
+        job = await manager.submit("排队中")
+        new_queue = LocalJobQueue(max_size=5, result_ttl=60)
+        await manager.reconfigure(new_queue, workers=3)
+        done = await _wait_for_status(manager, job["job_id"], JobStatusConst.finished())
+        workers = len(manager._worker_tasks)
+        await manager.stop()
+        return manager, new_queue, done, workers
+
+    manager, new_queue, done, workers = asyncio.run(main_())
+
+    assert manager.job_queue is new_queue
+    assert workers == 3
+    assert done["status"] == JobStatusConst.SUCCEEDED
+
+
+class FlakyLocalJobQueue(LocalJobQueue):
+    """读取 unreadable 任务记录时抛出连接错误"""
+
+    async def get(self, job_id):
+        if job_id == "unreadable":
+            raise ConnectionError("redis down")
+        return await super().get(job_id)
+
+
+def test_worker_survives_record_read_errors_and_malformed_records():
+    async def main_():
+        queue = FlakyLocalJobQueue(max_size=5, result_ttl=60)
+        manager = JobManager(FakeOrchestrator(), queue, workers=1)
+        manager.POLL_TIMEOUT_SECONDS = 0.01
+        await queue.submit({"job_id": "unreadable", "status": JobStatusConst.QUEUED})
+        await queue.submit({"job_id": "malformed"})
+        await manager.start()
+        job = await manager.submit("正常任务")
+        done = await _wait_for_status(manager, job["job_id"], JobStatusConst.finished())
+        malformed = await queue.get("malformed")
+        await manager.stop()
+        return done, malformed
+
+    done, malformed = asyncio.run(main_())
+
+    assert done["status"] == JobStatusConst.SUCCEEDED
+    assert malformed["status"] == JobStatusConst.FAILED
+    assert "KeyError" in malformed["error"]
+
+
+# ======================
+# RedisJobQueue
+# ======================
+def test_redis_queue_keys_use_configured_namespace():
+    queue = _redis_queue(FakeRedis(), namespace="tenant_b")
+
+    assert queue._queue_key == "tenant_b:jobs:queue"
+    assert queue._job_key("j1") == "tenant_b:jobs:j1"
+
+
+def test_redis_queue_keeps_job_in_processing_list_until_ack():
+    async def main_():
+        redis = FakeRedis()
+        queue = _redis_queue(redis)
+        await queue.submit({"job_id": "j1", "status": JobStatusConst.QUEUED})
+        job_id = await queue.next_job(1, worker=2)
+        in_flight = list(redis.lists[queue._processing_key(2)])
+        await queue.ack(job_id, worker=2)
+        return job_id, in_flight, redis.lists[queue._processing_key(2)], await queue.depth()
+
+    job_id, in_flight, after_ack, depth = asyncio.run(main_())
+
+    assert job_id == "j1"
+    assert in_flight == ["j1"]
+    assert after_ack == []
+    assert depth == 0
+
+
+def test_redis_queue_requeues_jobs_left_by_dead_consumers_on_start():
+    async def main_():
+        redis = FakeRedis()
+        crashed, alive, restarted = _redis_queue(redis), _redis_queue(redis), _redis_queue(redis)
+        await crashed.start()
+        await alive.start()
+        await crashed.submit({"job_id": "lost", "status": JobStatusConst.QUEUED})
+        await alive.submit({"job_id": "busy", "status": JobStatusConst.QUEUED})
+        await crashed.next_job(1, worker=0)
+        await alive.next_job(1, worker=0)
+        # 模拟进程崩溃：心跳停止（key 过期），处理中列表未确认
+        crashed._heartbeat_task.cancel()
+        await redis.delete(crashed._heartbeat_key(crashed.consumer_id))
+
+        await restarted.start()
+        recovered = await restarted.next_job(1, worker=0)
+        busy = list(redis.lists[alive._processing_key(0)])
+        for queue in (alive, restarted):
+            await queue.close()
+        return recovered, busy
+
+    recovered, busy = asyncio.run(main_())
+
+    assert recovered == "lost"
+    assert busy == ["busy"]
+
+
+def test_durable_queue_keeps_cancelled_job_for_redelivery():
+    async def main_():
+        redis = FakeRedis()
+        queue = _redis_queue(redis)
+        manager = JobManager(FakeOrchestrator(block=True), queue, workers=1)
+        await manager.start()
+        job = await manager.submit("长任务")
+        await _wait_for_status(manager, job["job_id"], {JobStatusConst.RUNNING})
+        await manager.stop()
+        return job["job_id"], await queue.get(job["job_id"]), redis.lists[queue._processing_key(0)]
+
+    job_id, stored, processing = asyncio.run(main_())
+
+    assert stored["status"] == JobStatusConst.QUEUED
+    assert processing == [job_id]
+
+
+def test_redis_queue_migrates_queued_jobs_to_local_queue():
+    async def main_():
+        redis = FakeRedis()
+        queue = _redis_queue(redis)
+        for job_id in ("j1", "j2"):
+            await queue.submit({"job_id": job_id, "status": JobStatusConst.QUEUED})
+        local = LocalJobQueue(max_size=1, result_ttl=60)
+        migrated = await queue.migrate_to(local)
+        return migrated, redis, local, queue
+
+    migrated, redis, local, queue = asyncio.run(main_())
+
+    assert migrated == 1
+    assert redis.lists[queue._queue_key] == []
+    assert redis.values == {}
+    # 按出队顺序迁移；新队列已满的任务标记为失败
+    assert asyncio.run(local.next_job(1)) == "j1"
+    assert asyncio.run(local.get("j2"))["status"] == JobStatusConst.FAILED
+
+
+def test_redis_queue_migration_to_same_list_is_a_no_op():
+    async def main_():
+        redis = FakeRedis()
+        queue = _redis_queue(redis)
+        await queue.submit({"job_id": "j1", "status": JobStatusConst.QUEUED})
+        migrated = await queue.migrate_to(_redis_queue(redis))
+        return migrated, await queue.depth()
+
+    assert asyncio.run(main_()) == (0, 1)
@@ -0,0 +1,171 @@
+import asyncio
+from typing import List
+
+import httpx
+import pytest
+
+from src.state_of_mind.config import config
+from src.state_of_mind.llm import base as base_module
+from src.state_of_mind.llm.deepseek import AsyncDeepSeekBackend
+from src.state_of_mind.utils.registry import GlobalSingletonRegistry
+from src.state_of_mind.utils.retry_util import reset_circuit_breakers
+
+
+@pytest.fixture(autouse=True)
+def _breaker_config(monkeypatch):
+    monkeypatch.setattr(config, "LLM_BREAKER_FAILURE_RATE", 0.5)
+    reset_circuit_breakers()
+    yield
+    reset_circuit_breakers()
+
+
+def _backend(api_key: str, api_url: str = "https://llm.example.com", scope: str = None) -> AsyncDeepSeekBackend:
+    async def init():
+        backend = await AsyncDeepSeekBackend().init({"api_key": api_key, "api_url": api_url})
+        await backend.client.aclose()
+        return backend
+
+    backend = asyncio.run(init())
+    backend.breaker_scope = scope
+    return backend
+
+
+# ======================
+# 熔断器 key
+# ======================
+def test_breaker_is_isolated_per_api_key_without_exposing_it():
+    first = _backend("sk-first-secret").circuit_breaker()
+    second = _backend("sk-second-secret").circuit_breaker()
+    same_key = _backend("sk-first-secret").circuit_breaker()
+
+    assert first is not second
+    assert first is same_key
+    assert "sk-first-secret" not in first.key
+    assert first.key.startswith("AsyncDeepSeekBackend|https://llm.example.com/chat/completions|key:")
+
+
+def test_breaker_is_isolated_per_route():
+    route_a = _backend("sk-shared", scope="route:a").circuit_breaker()
+    route_b = _backend("sk-shared", scope="route:b").circuit_breaker()
+
+    assert route_a is not route_b
+    assert "|route:a|" in route_a.key
+
+
+def test_breaker_disabled_when_failure_rate_is_zero(monkeypatch):
+    monkeypatch.setattr(config, "LLM_BREAKER_FAILURE_RATE", 0)
+
+    assert _backend("sk").circuit_breaker() is None
+
+
+# ======================
+# 退役与连接预热
+# ======================
+async def _serving_backend(handler) -> AsyncDeepSeekBackend:
+    """真实 DeepSeek 后端，连接池换成进程内应答的 MockTransport（仍按普通网络传输处理，可预热）"""
+    backend = await AsyncDeepSeekBackend().init({"api_key": "sk", "api_url": "https://llm.example.com"})
+    await backend.client.aclose()
+    backend.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return backend
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(GlobalSingletonRegistry, "_backend_instances", {})
+    monkeypatch.setattr(GlobalSingletonRegistry, "_draining", set())
+    monkeypatch.setattr(GlobalSingletonRegistry, "_rate_limiter", None)
+    monkeypatch.setattr(GlobalSingletonRegistry, "_lock", None)
+    return GlobalSingletonRegistry
+
+
+def test_reload_waits_for_inflight_request_before_closing(registry):
+    async def main():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def handler(request):
+            started.set()
+            await release.wait()
+            return httpx.Response(200, json={"choices": []})
+
+        backend = await _serving_backend(handler)
+        registry._backend_instances["key"] = backend
+        request = asyncio.create_task(backend._post_with_limits({"model": "m"}, "prompt", {}))
+        await started.wait()
+
+        # 配置重载：实例立即退役，连接池保持到在途请求结束
+        await registry.async_clear_llm_caches()
+        await asyncio.sleep(0.02)
+        open_during_drain = backend.client is not None and not backend.client.is_closed
+
+        release.set()
+        response = await request
+        await asyncio.gather(*registry._draining)
+        return backend, open_during_drain, response
+
+    backend, open_during_drain, response = asyncio.run(main())
+
+    assert backend.retired
+    assert open_during_drain
+    assert response.status_code == 200
+    assert backend.client is None
+    assert backend._inflight == 0
+
+
+def test_drain_timeout_closes_stuck_requests():
+    async def main():
+        async def handler(request):
+            await asyncio.sleep(10)
+
+        backend = await _serving_backend(handler)
+        request = asyncio.create_task(backend._post_with_limits({"model": "m"}, "prompt", {}))
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(backend.drain_and_close(timeout=0.05), 1)
+        request.cancel()
+        return backend
+
+    backend = asyncio.run(main())
+
+    assert backend.retired
+    assert backend.client is None
+
+
+@pytest.mark.parametrize("status", [200, 404, 405, 500])
+def test_prewarm_counts_any_http_response_as_warmed(status, monkeypatch):
+    warnings: List[str] = []
+    monkeypatch.setattr(base_module.logger, "warning", lambda msg, *args, **kwargs: warnings.append(msg))
+
+    async def main():
+        methods = []
+
+        async def handler(request):
+            methods.append(request.method)
+            return httpx.Response(status)
+
+        backend = await _serving_backend(handler)
+        warmed = await backend.prewarm(3)
+        await backend.close()
+        return warmed, methods
+
+    warmed, methods = asyncio.run(main())
+
+    assert warmed == 3
+    assert methods == ["HEAD"] * 3
+    assert warnings == []
+
+
+def test_prewarm_logs_transport_errors(monkeypatch):
+    warnings: List[str] = []
+    monkeypatch.setattr(base_module.logger, "warning", lambda msg, *args, **kwargs: warnings.append(msg))
+
+    async def main():
+        async def handler(request):
+            raise httpx.ConnectError("connection refused", request=request)
+
+        backend = await _serving_backend(handler)
+        warmed = await backend.prewarm(2)
+        await backend.close()
+        return warmed
+
+    assert asyncio.run(main()) == 0
+    assert len(warnings) == 2
+    assert all("ConnectError" in message for message in warnings)
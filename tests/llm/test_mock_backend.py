@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.state_of_mind.config import config
+from src.state_of_mind.llm.mock import AsyncMockLLMBackend
+from src.state_of_mind.stages.perception.constants import CATEGORY_RAW
+from src.state_of_mind.stages.perception.data_validator import DataValidator
+
+USER_INPUT = "今天和同事吵了一架，心里很不舒服。晚上回家后一直在想这件事，明天想去道个歉。"
+
+
+@pytest.fixture(autouse=True)
+def _mock_config(monkeypatch):
+    monkeypatch.setattr(config, "MOCK_SEED", 7)
+    monkeypatch.setattr(config, "MOCK_LATENCY_MS", 0)
+    for name in ("MOCK_ERROR_RATE", "MOCK_RATE_LIMIT_RATE", "MOCK_MALFORMED_RATE"):
+        monkeypatch.setattr(config, name, 0)
+
+
+def _step_prompt(backend: AsyncMockLLMBackend, index: int = 0, user_input: str = USER_INPUT):
+    role, step_name = backend._role_index[index]
+    prompt = f"{role}\n### USER_INPUT BEGIN（用户原始输入开始）\n{user_input}\n### USER_INPUT END"
+    return prompt, step_name
+
+
+def _request(prompt: str, json_mode: bool = True) -> httpx.Request:
+    messages = ([{"role": "system", "content": "json"}] if json_mode else []) + [{"role": "user", "content": prompt}]
+    return httpx.Request("POST", "http://mock.local/chat/completions",
+                         json={"model": "mock-chat", "messages": messages})
+
+
+def _content(backend: AsyncMockLLMBackend, request: httpx.Request) -> str:
+    response = asyncio.run(backend._handle_request(request))
+    return response.json()["choices"][0]["message"]["content"]
+
+
+# ======================
+# 确定性
+# ======================
+def test_same_seed_and_prompt_produce_identical_content_across_instances():
+    first, second = AsyncMockLLMBackend(), AsyncMockLLMBackend()
+    prompt, _ = _step_prompt(first)
+
+    assert first.render_content(prompt, True) == second.render_content(prompt, True)
+    # 重复调用不影响内容（内容随机数只由 seed 与 prompt 决定）
+    assert first.render_content(prompt, True) == first.render_content(prompt, True)
+    assert first.render_content(prompt, False) == second.render_content(prompt, False)
+
+
+def test_different_seed_changes_content(monkeypatch):
+    baseline = AsyncMockLLMBackend()
+    monkeypatch.setattr(config, "MOCK_SEED", 8)
+    reseeded = AsyncMockLLMBackend()
+    prompts = [_step_prompt(baseline, i)[0] for i in range(len(baseline._role_index))]
+
+    assert [baseline.render_content(p, True) for p in prompts] != [reseeded.render_content(p, True) for p in prompts]
+
+
+def test_participants_depend_only_on_user_input():
+    names = AsyncMockLLMBackend.participant_names(USER_INPUT)
+
+    assert names == AsyncMockLLMBackend.participant_names(USER_INPUT)
+    assert 2 <= len(names) <= 3
+
+
+# ======================
+# 结构合法性
+# ======================
+def test_every_step_renders_structurally_valid_json():
+    backend = AsyncMockLLMBackend()
+    validator = DataValidator()
+
+    for index in range(len(backend._role_index)):
+        prompt, step_name = _step_prompt(backend, index)
+        data = json.loads(backend.render_content(prompt, True))
+        result = validator.validate(data=data, template_name=CATEGORY_RAW, step_name=step_name)
+        assert result["is_valid"], (step_name, result["errors"])
+
+
+def test_unknown_prompt_returns_empty_object():
+    assert AsyncMockLLMBackend().render_content("不属于任何步骤的 prompt", True) == "{}"
+
+
+# ======================
+# 传输层与故障注入
+# ======================
+def test_http_response_matches_render_content():
+    backend = AsyncMockLLMBackend()
+    prompt, _ = _step_prompt(backend)
+
+    assert _content(backend, _request(prompt)) == backend.render_content(prompt, True)
+    assert backend.calls == 1
+
+
+@pytest.mark.parametrize("rate_name, status", [("MOCK_ERROR_RATE", 503), ("MOCK_RATE_LIMIT_RATE", 429)])
+def test_fault_injection_returns_error_status(monkeypatch, rate_name, status):
+    monkeypatch.setattr(config, rate_name, 1.0)
+    backend = AsyncMockLLMBackend()
+
+    response = asyncio.run(backend._handle_request(_request(_step_prompt(backend)[0])))
+
+    assert response.status_code == status
+    if status == 429:
+        assert response.headers["Retry-After"] == str(AsyncMockLLMBackend.RETRY_AFTER_SECONDS)
+
+
+def test_malformed_injection_truncates_json(monkeypatch):
+    monkeypatch.setattr(config, "MOCK_MALFORMED_RATE", 1.0)
+    backend = AsyncMockLLMBackend()
+    prompt, _ = _step_prompt(backend)
+
+    content = _content(backend, _request(prompt))
+
+    assert backend.render_content(prompt, True).startswith(content)
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(content)
+
+
+def test_fault_sequence_is_reproducible_for_a_seed(monkeypatch):
+    monkeypatch.setattr(config, "MOCK_ERROR_RATE", 0.5)
+
+    def statuses():
+        backend = AsyncMockLLMBackend()
+        request = _request(_step_prompt(backend)[0])
+        return [asyncio.run(backend._handle_request(request)).status_code for _ in range(20)]
+
+    first = statuses()
+
+    assert first == statuses()
+    assert {200, 503} == set(first)
@@ -0,0 +1,222 @@
+import asyncio
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+from redis.exceptions import NoScriptError
+
+from src.state_of_mind.llm import rate_limiter as rate_limiter_module
+from src.state_of_mind.llm.rate_limiter import LLMRateLimiter, RedisLLMRateLimiter, parse_retry_after
+
+
+class FakeClock:
+    """替换模块内的 time：monotonic / time 都由测试推进"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter_module, "time", fake)
+    return fake
+
+
+# ======================
+# 令牌桶
+# ======================
+def test_request_bucket_refills_at_configured_rate(clock):
+    limiter = LLMRateLimiter(requests_per_second=2)
+
+    async def main():
+        burst = [await limiter._try_take(0) for _ in range(2)]
+        blocked = await limiter._try_take(0)
+        clock.advance(0.5)
+        refilled = await limiter._try_take(0)
+        return burst, blocked, refilled
+
+    burst, blocked, refilled = asyncio.run(main())
+
+    assert burst == [0.0, 0.0]
+    assert blocked == pytest.approx(0.5)
+    assert refilled == 0.0
+
+
+def test_token_bucket_waits_for_tpm_and_reconciles_actual_usage(clock):
+    limiter = LLMRateLimiter(tokens_per_minute=60)
+
+    async def main():
+        lease = await limiter.acquire(estimated_tokens=60)
+        blocked = await limiter._try_take(30)
+        # 实际只用了 20 个 token，多扣的 40 个归还到桶里
+        await limiter.release(lease, actual_tokens=20)
+        after_refund = await limiter._try_take(30)
+        return blocked, after_refund
+
+    blocked, after_refund = asyncio.run(main())
+
+    assert blocked == pytest.approx(30.0)
+    assert after_refund == 0.0
+
+
+# ======================
+# 并发上限
+# ======================
+def test_concurrency_cap_blocks_until_a_lease_is_released():
+    limiter = LLMRateLimiter(max_concurrency=2)
+
+    async def main():
+        first = await limiter.acquire()
+        await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.02)
+        blocked = not waiting.done()
+        await limiter.release(first)
+        await asyncio.wait_for(waiting, timeout=1)
+        return blocked, limiter.stats()
+
+    blocked, stats = asyncio.run(main())
+
+    assert blocked
+    assert stats["in_flight"] == 2
+    assert stats["admitted"] == 3
+
+
+# ======================
+# 429 / Retry-After 退避
+# ======================
+def test_rate_limited_pauses_admission_and_lowers_rate(clock):
+    limiter = LLMRateLimiter(requests_per_second=10)
+
+    async def main():
+        await limiter.on_rate_limited(retry_after=3)
+        paused = await limiter._try_take(0)
+        clock.advance(3)
+        resumed = await limiter._try_take(0)
+        return paused, resumed
+
+    paused, resumed = asyncio.run(main())
+
+    assert paused == pytest.approx(3.0)
+    assert resumed == 0.0
+    assert limiter.stats()["rate_factor"] == 0.5
+    assert limiter.stats()["effective_requests_per_second"] == 5.0
+
+
+def test_backoff_doubles_without_retry_after_and_resets_on_success(clock):
+    limiter = LLMRateLimiter(requests_per_second=10)
+
+    async def main():
+        await limiter.on_rate_limited()
+        first = await limiter._try_take(0)
+        await limiter.on_rate_limited()
+        second = limiter._paused_until - clock.time()
+        await limiter.on_success()
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert first == pytest.approx(LLMRateLimiter.BASE_BACKOFF_SECONDS)
+    assert second == pytest.approx(LLMRateLimiter.BASE_BACKOFF_SECONDS * 2)
+    assert limiter._backoff_seconds == LLMRateLimiter.BASE_BACKOFF_SECONDS
+    assert limiter.stats()["rate_factor"] == pytest.approx(0.25 + LLMRateLimiter.RATE_INCREASE)
+
+
+def test_parse_retry_after_accepts_seconds_and_http_date():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(formatdate(usegmt=True)) == pytest.approx(0.0, abs=1.5)
+
+
+# ======================
+# Redis 限流：降级与脚本重载
+# ======================
+class FakeScript:
+    def __init__(self, results):
+        self.results = list(results)
+        self.sha = "old-sha"
+        self.script = "return 1"
+        self.calls = 0
+
+    async def __call__(self, keys=None, args=None, client=None):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _redis_limiter(**kwargs) -> RedisLLMRateLimiter:
+    config = SimpleNamespace(REDIS_HOST="localhost", REDIS_PORT=6379, REDIS_DB=0, REDIS_PASSWORD=None,
+                             REDIS_TIMEOUT=1)
+    return RedisLLMRateLimiter(config, **kwargs)
+
+
+def test_redis_errors_fall_back_to_local_limits():
+    limiter = _redis_limiter(requests_per_second=1, max_concurrency=1)
+    limiter._slot = FakeScript([ConnectionError("down")])
+    limiter._take = FakeScript([])
+
+    async def main():
+        lease = await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.02)
+        blocked = not waiting.done()
+        waiting.cancel()
+        await limiter.release(lease)
+        return lease, blocked
+
+    lease, blocked = asyncio.run(main())
+
+    # 降级窗口内不再访问 Redis，并发上限由进程内信号量保证
+    assert lease.local_slot
+    assert blocked
+    assert limiter._slot.calls == 1
+    assert limiter._take.calls == 0
+    assert not limiter._redis_available()
+
+
+def test_redis_limiter_retries_after_fallback_window():
+    limiter = _redis_limiter(requests_per_second=5)
+    limiter._take = FakeScript([ConnectionError("down"), b"0"])
+
+    async def main():
+        first = await limiter._try_take(0)
+        limiter._fallback_until = 0.0
+        second = await limiter._try_take(0)
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert (first, second) == (0.0, 0.0)
+    assert limiter._take.calls == 2
+
+
+def test_redis_script_reloaded_on_noscript():
+    limiter = _redis_limiter(requests_per_second=5)
+    limiter._take = FakeScript([NoScriptError("NOSCRIPT"), b"0.25"])
+    loaded = []
+
+    async def script_load(script):
+        loaded.append(script)
+        return "new-sha"
+
+    limiter._client = SimpleNamespace(script_load=script_load)
+
+    wait = asyncio.run(limiter._try_take(0))
+
+    assert wait == 0.25
+    assert loaded == ["return 1"]
+    assert limiter._take.sha == "new-sha"
+    assert limiter._redis_available()
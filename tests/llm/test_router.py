@@ -0,0 +1,181 @@
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+import src.state_of_mind  # noqa: F401  注册各 LLM 后端
+from src.state_of_mind.llm.base import BaseLLMBackend
+from src.state_of_mind.llm.router import RoutingLLMBackend, _Route
+from src.state_of_mind.utils.registry import GlobalSingletonRegistry
+
+
+class FakeRouteBackend:
+    """按预设依次返回结果的路由实例；delay 用于制造在途请求"""
+
+    def __init__(self, results: List[Dict[str, Any]] = None, delay: float = 0.0):
+        self.results = list(results or [])
+        self.delay = delay
+        self.calls: List[Dict[str, Any]] = []
+
+    async def async_call(self, **kwargs) -> Dict[str, Any]:
+        self.calls.append(kwargs)
+        await asyncio.sleep(self.delay)
+        result = self.results.pop(0) if self.results else {"__success": True}
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _router(*routes: _Route, pins: Dict[str, str] = None) -> RoutingLLMBackend:
+    router = RoutingLLMBackend()
+    router.routes = list(routes)
+    router.pins = pins or {}
+    return router
+
+
+def _route(name: str, weight: float = 1, backend_name: str = "deepseek", model: str = "deepseek-chat",
+           backend: FakeRouteBackend = None) -> _Route:
+    return _Route(name, backend_name, model, weight, backend or FakeRouteBackend())
+
+
+def _call(router: RoutingLLMBackend, step_name: str = "step"):
+    return router.async_call(prompt="p", model="ignored", params={}, template_name="raw", step_name=step_name,
+                             prompt_type="json")
+
+
+# ======================
+# 契约
+# ======================
+def test_router_implements_protocol_agnostic_contract_only():
+    assert issubclass(RoutingLLMBackend, BaseLLMBackend)
+    # 不再继承 HTTP 后端的请求体构建等协议方法
+    assert not hasattr(RoutingLLMBackend, "_build_json_payload")
+    assert not hasattr(RoutingLLMBackend, "_post_with_limits")
+
+
+def test_init_builds_routes_with_isolated_breaker_scope():
+    async def main():
+        router = await RoutingLLMBackend().init({
+            "timeout": 5,
+            "routes": [{"name": "m1", "backend": "mock", "weight": 2}, {"name": "m2", "backend": "mock"}],
+            "route_pins": {"step": "m1", "other": "missing"},
+        })
+        await router.close()
+        return router
+
+    router = asyncio.run(main())
+
+    assert [route.name for route in router.routes] == ["m1", "m2"]
+    assert [route.backend.breaker_scope for route in router.routes] == ["route:m1", "route:m2"]
+    assert router.pins == {"step": "m1"}
+
+
+def test_init_rejects_nested_router():
+    with pytest.raises(ValueError):
+        asyncio.run(RoutingLLMBackend().init({"routes": [{"name": "r", "backend": "router"}]}))
+
+
+def test_registry_rejects_classes_outside_backend_contract():
+    with pytest.raises(TypeError):
+        GlobalSingletonRegistry.register_backend("not-a-backend", object)
+
+
+# ======================
+# 加权最少在途选择
+# ======================
+def test_pick_prefers_weighted_least_outstanding():
+    heavy, light = _route("heavy", weight=2), _route("light", weight=1)
+    router = _router(heavy, light)
+
+    assert router._pick(router.routes, set()) is heavy
+    heavy.outstanding = 2
+    # (2 + 1) / 2 > (0 + 1) / 1
+    assert router._pick(router.routes, set()) is light
+    assert router._pick(router.routes, {"light"}) is heavy
+    assert router._pick(router.routes, {"heavy", "light"}) is None
+
+
+def test_concurrent_calls_spread_by_weight():
+    heavy = _route("heavy", weight=2, backend=FakeRouteBackend(delay=0.05))
+    light = _route("light", weight=1, backend=FakeRouteBackend(delay=0.05))
+    router = _router(heavy, light)
+
+    async def main():
+        await asyncio.gather(*(_call(router) for _ in range(6)))
+
+    asyncio.run(main())
+
+    assert (len(heavy.backend.calls), len(light.backend.calls)) == (4, 2)
+    assert heavy.outstanding == light.outstanding == 0
+
+
+def test_unhealthy_route_receives_less_traffic():
+    healthy, failing = _route("healthy"), _route("failing")
+    for _ in range(5):
+        failing.record(False, 0.1, RoutingLLMBackend.HEALTH_ALPHA)
+    router = _router(failing, healthy)
+
+    healthy.outstanding = 3
+    assert router._pick(router.routes, set()) is healthy
+
+
+# ======================
+# 步骤固定
+# ======================
+def test_pinned_step_only_uses_routes_with_same_model():
+    ds_1, ds_2 = _route("ds-1"), _route("ds-2")
+    qwen = _route("qwen", weight=10, backend_name="qwen", model="qwen-plus")
+    router = _router(ds_1, ds_2, qwen, pins={"coreference": "ds-2"})
+
+    assert router._candidates("coreference") == [ds_1, ds_2]
+    assert router._candidates("other") == [ds_1, ds_2, qwen]
+
+    ds_1.backend.results = [{"__success": False, "__api_error": "[503] busy"}]
+    ds_2.backend.results = [{"__success": False, "__api_error": "[503] busy"}]
+    result = asyncio.run(_call(router, step_name="coreference"))
+
+    # 固定步骤的故障切换不会落到其他模型
+    assert result["__api_error"] == "[503] busy"
+    assert qwen.backend.calls == []
+    assert [call["model"] for call in ds_1.backend.calls + ds_2.backend.calls] == ["deepseek-chat"] * 2
+
+
+# ======================
+# 故障切换
+# ======================
+@pytest.mark.parametrize("error", ["[503] unavailable", "[429] slow down", "[401] invalid key", "[404] no model"])
+def test_route_specific_errors_fail_over(error):
+    first = _route("first", weight=2, backend=FakeRouteBackend([{"__success": False, "__api_error": error}]))
+    second = _route("second")
+    router = _router(first, second)
+
+    result = asyncio.run(_call(router))
+
+    assert result["__success"] is True
+    assert len(second.backend.calls) == 1
+    assert (first.failures, second.failures) == (1, 0)
+
+
+@pytest.mark.parametrize("error", ["[400] bad request", "[413] too large", "[422] unprocessable"])
+def test_request_errors_are_returned_without_failover(error):
+    first = _route("first", weight=2, backend=FakeRouteBackend([{"__success": False, "__api_error": error}]))
+    second = _route("second")
+    router = _router(first, second)
+
+    result = asyncio.run(_call(router))
+
+    assert result["__api_error"] == error
+    assert second.backend.calls == []
+
+
+def test_exceptions_become_system_errors_and_fail_over():
+    first = _route("first", weight=2, backend=FakeRouteBackend([RuntimeError("boom")]))
+    second = _route("second", backend=FakeRouteBackend([RuntimeError("boom again")]))
+    router = _router(first, second)
+
+    result = asyncio.run(_call(router))
+
+    # 每个路由最多尝试一次，全部失败时返回最后一个错误
+    assert result["__success"] is False
+    assert "boom again" in result["__system_error"]
+    assert (len(first.backend.calls), len(second.backend.calls)) == (1, 1)
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict
+
+from src.state_of_mind.cache.llm_cache import LLMCache
+from src.state_of_mind.stages.perception.cache_rebuilder import ArtifactCacheRebuilder
+from src.state_of_mind.stages.perception.constants import PARALLEL_PERCEPTION, PARALLEL_PREPROCESSING
+from src.state_of_mind.stages.perception.executor import StepExecutor
+
+MODEL = "test-model"
+
+
+class FakeValidator:
+    """events 为列表时视为结构有效"""
+
+    def validate(self, data, template_name, step_name) -> Dict[str, Any]:
+        valid = isinstance(data, dict) and isinstance(data.get("events"), list)
+        return {"is_valid": valid, "cleaned_data": data if valid else None, "errors": []}
+
+
+def _rebuilder(tmp_path: Path) -> ArtifactCacheRebuilder:
+    cache = LLMCache(max_size=100, compression="none", max_bytes=0)
+    pipeline = SimpleNamespace(
+        llm_cache=cache,
+        llm_model=MODEL,
+        step_executor=StepExecutor("mock", MODEL, {}, cache, prompt_builder=None),
+        DYE_VAT_DIR=tmp_path / "dye_vat",
+        RAW_DATA_DIR=tmp_path / "raw",
+    )
+    rebuilder = ArtifactCacheRebuilder(pipeline)
+    rebuilder.validator = FakeValidator()
+    return rebuilder
+
+
+def _write(path: Path, data: Any, mtime: float) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def _dye(model: str = MODEL, response: str = '{"events": [{"content": "吵架"}]}') -> Dict[str, Any]:
+    return {
+        "category": "raw",
+        "model": model,
+        "prompt_records": {
+            PARALLEL_PREPROCESSING: [{"step_name": "coreference", "prompt": "prompt-a"}],
+            PARALLEL_PERCEPTION: [{"step_name": "emotion", "prompt": "prompt-b"}],
+        },
+        "raw_response_records": {
+            PARALLEL_PREPROCESSING: [{"step_name": "coreference", "raw_response": f"```json\n{response}\n```"}],
+            PARALLEL_PERCEPTION: [{"step_name": "emotion", "raw_response": '{"oops": 1}'}],
+        },
+    }
+
+
+def test_rebuilds_valid_step_results_from_dye_vat(tmp_path):
+    rebuilder = _rebuilder(tmp_path)
+    _write(rebuilder.pipeline.DYE_VAT_DIR / "raw_a_1.json", _dye(), mtime=1000)
+    _write(rebuilder.pipeline.DYE_VAT_DIR / "raw_b_2.json", _dye(model="other-model"), mtime=1001)
+    (rebuilder.pipeline.DYE_VAT_DIR / "broken.json").write_text("{半个", encoding="utf-8")
+
+    async def main():
+        stats = await rebuilder.rebuild()
+        key = rebuilder.step_executor.make_step_cache_key("prompt-a", "raw", "coreference")
+        return stats, (await rebuilder.cache.get(key))["data"], (await rebuilder.cache.keys())["data"]
+
+    stats, entry, keys = asyncio.run(main())
+
+    # 结构无效的步骤、模型不一致与无法解析的文件均跳过
+    assert stats == {"files": 2, "steps": 1, "results": 0, "skipped": 3}
+    assert len(keys) == 1
+    assert entry["__success"] is True
+    assert entry["data"] == {"events": [{"content": "吵架"}]}
+    assert entry["step_name"] == "coreference"
+
+
+def test_newest_artifact_wins_for_the_same_step(tmp_path):
+    rebuilder = _rebuilder(tmp_path)
+    _write(rebuilder.pipeline.DYE_VAT_DIR / "z_old.json", _dye(response='{"events": ["旧"]}'), mtime=1000)
+    _write(rebuilder.pipeline.DYE_VAT_DIR / "a_new.json", _dye(response='{"events": ["新"]}'), mtime=2000)
+
+    async def main():
+        await rebuilder.rebuild()
+        key = rebuilder.step_executor.make_step_cache_key("prompt-a", "raw", "coreference")
+        return (await rebuilder.cache.get(key))["data"]
+
+    assert asyncio.run(main())["data"] == {"events": ["新"]}
+
+
+def test_rebuilds_whole_results_from_raw_only_when_requested(tmp_path):
+    rebuilder = _rebuilder(tmp_path)
+    result = {"source": {"content": "原文"}, "meta": {"llm_model": MODEL}}
+    _write(rebuilder.pipeline.RAW_DATA_DIR / "raw_1a2b3c4d_20240101.json", result, mtime=1000)
+    _write(rebuilder.pipeline.RAW_DATA_DIR / "raw_5e6f7a8b_20240102.json",
+           {"source": {"content": "其他"}, "meta": {"llm_model": "other-model"}}, mtime=1001)
+    key = rebuilder.cache.make_key("raw", user_input="原文", llm_model=MODEL)
+
+    async def main():
+        without = await rebuilder.rebuild()
+        missing = (await rebuilder.cache.get(key))["data"]
+        with_results = await rebuilder.rebuild(include_results=True)
+        return without, missing, with_results, (await rebuilder.cache.get(key))["data"]
+
+    without, missing, with_results, entry = asyncio.run(main())
+
+    assert without["results"] == 0 and missing is None
+    assert (with_results["results"], with_results["skipped"]) == (1, 1)
+    assert entry == result
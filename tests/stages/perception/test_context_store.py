@@ -0,0 +1,77 @@
+import pytest
+
+from src.state_of_mind.stages.perception.constants import (
+    MARKER_LEGITIMATE_PARTICIPANTS, MARKER_PARTICIPANTS_VALID_INFORMATION, MARKER_USER_INPUT
+)
+from src.state_of_mind.stages.perception.context_store import ContextStore
+
+
+def test_first_write_wins_and_bumps_version():
+    store = ContextStore()
+
+    assert store.put(MARKER_USER_INPUT, "原文块") is True
+    assert store.put(MARKER_USER_INPUT, "重复块") is False
+
+    assert store.get(MARKER_USER_INPUT) == "原文块"
+    assert MARKER_USER_INPUT in store
+    assert len(store) == 1
+    assert store.version == 1
+
+
+@pytest.mark.parametrize("marker, block", [("", "块"), (MARKER_USER_INPUT, "")])
+def test_empty_marker_or_block_is_ignored(marker, block):
+    store = ContextStore()
+
+    assert store.put(marker, block) is False
+    assert len(store) == 0 and store.version == 0
+
+
+def test_snapshot_is_a_stable_read_only_view():
+    store = ContextStore()
+    store.put(MARKER_USER_INPUT, "原文块")
+    snapshot = store.snapshot()
+
+    store.put(MARKER_LEGITIMATE_PARTICIPANTS, "参与者块")
+
+    # 写时复制：之前的快照不受后续写入影响
+    assert snapshot.version == 1
+    assert dict(snapshot.blocks) == {MARKER_USER_INPUT: "原文块"}
+    assert store.snapshot().version == 2
+    with pytest.raises(TypeError):
+        snapshot.blocks["other"] = "块"
+
+
+def test_render_orders_blocks_by_marker_order_and_skips_missing():
+    store = ContextStore()
+    store.put(MARKER_LEGITIMATE_PARTICIPANTS, "[参与者]")
+    store.put("zz_unregistered", "[未登记]")
+    store.put(MARKER_USER_INPUT, "[原文]")
+
+    rendered = store.render("骨架|", [
+        "zz_unregistered", MARKER_LEGITIMATE_PARTICIPANTS, MARKER_PARTICIPANTS_VALID_INFORMATION, MARKER_USER_INPUT
+    ])
+
+    # 已登记 marker 按固定顺序排列，未登记的排在末尾；未写入的 marker 跳过
+    assert rendered == "骨架|[原文][参与者][未登记]"
+
+
+def test_render_uses_given_snapshot():
+    store = ContextStore()
+    store.put(MARKER_USER_INPUT, "[原文]")
+    snapshot = store.snapshot()
+    store.put(MARKER_LEGITIMATE_PARTICIPANTS, "[参与者]")
+
+    markers = [MARKER_USER_INPUT, MARKER_LEGITIMATE_PARTICIPANTS]
+
+    assert store.render("", markers, snapshot) == "[原文]"
+    assert store.render("", markers) == "[原文][参与者]"
+
+
+def test_ordered_markers_are_memoized_per_marker_set():
+    store = ContextStore()
+
+    first = store.ordered_markers([MARKER_LEGITIMATE_PARTICIPANTS, MARKER_USER_INPUT])
+    second = store.ordered_markers(frozenset({MARKER_USER_INPUT, MARKER_LEGITIMATE_PARTICIPANTS}))
+
+    assert first == (MARKER_USER_INPUT, MARKER_LEGITIMATE_PARTICIPANTS)
+    assert second is first
@@ -0,0 +1,82 @@
+import asyncio
+from pathlib import Path
+from typing import Any, Dict
+
+from src.state_of_mind.common.raw_data_factory import create_raw_basic_data
+from src.state_of_mind.stages.perception.stage_pipeline import PerceptionPipeline
+
+DOCUMENT_KEY = PerceptionPipeline.DOCUMENT_CACHE_PREFIX + "k"
+
+
+class SharedObjectCache:
+    """读取时直接返回已存对象（不复制）的缓存，模拟进程内对象缓存"""
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+
+    async def get(self, key: str) -> Dict[str, Any]:
+        return {"success": key in self.values, "data": self.values.get(key)}
+
+
+class FakeResultAssembler:
+    async def inject_watermark_into_result(self, result: Dict[str, Any]) -> None:
+        result["meta"]["watermark"] = "wm"
+
+    async def preprocess_for_html_rendering(self, result: Dict[str, Any]) -> None:
+        result["html_sections"] = ["已预处理"]
+
+
+class FakeReportGenerator:
+    def __init__(self):
+        self.rendered = 0
+
+    def render_report_to_html(self, result: Dict[str, Any]) -> Path:
+        self.rendered += 1
+        return Path(f"/tmp/report-{self.rendered}.html")
+
+
+def _pipeline() -> PerceptionPipeline:
+    """跳过重量级初始化，只保留整篇结果缓存与报告渲染依赖"""
+    pipeline = PerceptionPipeline.__new__(PerceptionPipeline)
+    pipeline.llm_cache = SharedObjectCache()
+    pipeline.result_assembler = FakeResultAssembler()
+    pipeline.report_generator = FakeReportGenerator()
+    pipeline.llm_cache.values[DOCUMENT_KEY] = {
+        "id": "raw_cached", "timestamp": "t0", "formatter_time": "f0", "meta": {"validity_level": "full"},
+        "events": [{"content": "原文事件"}],
+    }
+    return pipeline
+
+
+def test_document_cache_hits_get_their_own_copy():
+    pipeline = _pipeline()
+
+    async def main():
+        runs = []
+        for _ in range(2):
+            basic_data = create_raw_basic_data("原文", "test-model")
+            result = await pipeline._load_cached_document(DOCUMENT_KEY, basic_data)
+            loaded = {"id": result["id"], "html_sections": "html_sections" in result,
+                      "watermark": "watermark" in result["meta"]}
+            await pipeline._render_report(result)
+            runs.append((basic_data, loaded, result))
+        return runs
+
+    (first_basic, first_loaded, first), (second_basic, second_loaded, second) = asyncio.run(main())
+
+    assert first_loaded["id"] == first_basic["id"]
+    assert second_loaded == {"id": second_basic["id"], "html_sections": False, "watermark": False}
+    assert first["id"] != second["id"]
+    assert first["meta"]["report_url"] != second["meta"]["report_url"]
+    # 缓存中的结果保持写入时的状态
+    cached = pipeline.llm_cache.values[DOCUMENT_KEY]
+    assert cached["id"] == "raw_cached"
+    assert "html_sections" not in cached and "report_url" not in cached["meta"]
+
+
+def test_document_cache_miss_returns_none():
+    pipeline = _pipeline()
+
+    result = asyncio.run(pipeline._load_cached_document("doc:missing", create_raw_basic_data("原文", "m")))
+
+    assert result is None
@@ -0,0 +1,161 @@
+import asyncio
+import time
+from typing import Any, Dict, List
+
+import pytest
+
+from src.state_of_mind.cache.llm_cache import LLMCache
+from src.state_of_mind.config import config
+from src.state_of_mind.stages.perception.executor import StepExecutor
+from src.state_of_mind.stages.perception.latency_tracker import StepLatencyTracker
+
+HEDGE_AFTER = 0.05
+
+
+class FakeBackend:
+    """第 n 次调用耗时 delays[n]；记录每次调用的开始时间与被取消的调用"""
+    retired = False
+
+    def __init__(self, delays: List[float], success: bool = True):
+        self.delays = delays
+        self.success = success
+        self.started: List[float] = []
+        self.cancelled: List[int] = []
+
+    async def async_call(self, **kwargs) -> Dict[str, Any]:
+        attempt = len(self.started)
+        self.started.append(time.monotonic())
+        try:
+            await asyncio.sleep(self.delays[attempt])
+        except asyncio.CancelledError:
+            self.cancelled.append(attempt)
+            raise
+        return {"__success": self.success, "attempt": attempt, "data": {}}
+
+
+@pytest.fixture(autouse=True)
+def _hedge_config(monkeypatch):
+    monkeypatch.setattr(config, "LLM_HEDGE_QUANTILES", {"json": 0.5})
+    monkeypatch.setattr(config, "LLM_HEDGE_MIN_SAMPLES", 3)
+
+
+def _executor(backend: FakeBackend, samples: List[float] = ()) -> StepExecutor:
+    executor = StepExecutor("mock", "test-model", {}, LLMCache(max_size=100, compression="none", max_bytes=0),
+                            prompt_builder=None)
+    executor._backend = backend
+    for seconds in samples:
+        executor.latency_tracker.record("step", seconds)
+    return executor
+
+
+def _execute(executor: StepExecutor, deadline: float = None, prompt_type: str = "json"):
+    return executor.execute_step("prompt", "raw", "step", prompt_type, deadline=deadline)
+
+
+# ======================
+# 对冲
+# ======================
+def test_hedge_fires_at_quantile_and_cancels_slow_primary():
+    backend = FakeBackend(delays=[1.0, 0.01])
+    executor = _executor(backend, samples=[0.01, HEDGE_AFTER, 0.5])
+
+    result = asyncio.run(_execute(executor))
+
+    assert result["attempt"] == 1
+    # 副本在主请求发出后约一个分位数耗时时发出
+    assert backend.started[1] - backend.started[0] == pytest.approx(HEDGE_AFTER, abs=0.03)
+    assert backend.cancelled == [0]
+    assert executor.hedge_counts() == {"fired": 1, "won": 1, "deadline_exceeded": 0}
+
+
+def test_primary_win_cancels_hedge():
+    backend = FakeBackend(delays=[HEDGE_AFTER + 0.05, 1.0])
+    executor = _executor(backend, samples=[0.01, HEDGE_AFTER, 0.5])
+
+    result = asyncio.run(_execute(executor))
+
+    assert result["attempt"] == 0
+    assert backend.cancelled == [1]
+    assert executor.hedge_counts() == {"fired": 1, "won": 0, "deadline_exceeded": 0}
+
+
+def test_no_hedge_without_enough_samples_or_for_unconfigured_group():
+    cold = FakeBackend(delays=[0.1])
+    unconfigured = FakeBackend(delays=[0.1])
+
+    asyncio.run(_execute(_executor(cold, samples=[0.01, 0.01])))
+    asyncio.run(_execute(_executor(unconfigured, samples=[0.01] * 5), prompt_type="high_order"))
+
+    assert len(cold.started) == len(unconfigured.started) == 1
+
+
+def test_hedge_both_failing_returns_failure():
+    backend = FakeBackend(delays=[0.1, 0.05], success=False)
+    executor = _executor(backend, samples=[0.01, HEDGE_AFTER, 0.5])
+
+    result = asyncio.run(_execute(executor))
+
+    assert result["__success"] is False
+    assert len(backend.started) == 2
+    assert executor.hedge_counts()["won"] == 0
+
+
+# ======================
+# 截止时间
+# ======================
+def test_deadline_returns_system_error_and_records_timed_out_attempt():
+    backend = FakeBackend(delays=[1.0])
+    executor = _executor(backend)
+
+    async def main():
+        return await _execute(executor, deadline=time.monotonic() + 0.05)
+
+    result = asyncio.run(main())
+
+    assert result["__success"] is False
+    assert "截止时间" in result["__system_error"]
+    assert backend.cancelled == [0]
+    assert executor.hedge_counts()["deadline_exceeded"] == 1
+    # 超时的调用计入耗时样本，且不写入步骤缓存
+    assert executor.latency_tracker.sample_count("step") == 1
+    assert executor.latency_tracker.quantile("step", 1.0) == pytest.approx(0.05, abs=0.03)
+    assert executor.llm_cache.cache == {}
+
+
+def test_expired_deadline_skips_the_call():
+    backend = FakeBackend(delays=[0.0])
+    executor = _executor(backend)
+
+    result = asyncio.run(_execute(executor, deadline=time.monotonic() - 1))
+
+    assert result["__success"] is False
+    assert backend.started == []
+    assert executor.latency_tracker.sample_count("step") == 0
+
+
+def test_hedge_is_skipped_when_budget_is_shorter_than_quantile():
+    backend = FakeBackend(delays=[0.01])
+    executor = _executor(backend, samples=[1.0] * 3)
+
+    async def main():
+        return await _execute(executor, deadline=time.monotonic() + 0.5)
+
+    result = asyncio.run(main())
+
+    assert result["__success"] is True
+    assert executor.hedge_counts()["fired"] == 0
+
+
+# ======================
+# 耗时分位数
+# ======================
+def test_latency_tracker_quantile_uses_nearest_rank_over_window():
+    tracker = StepLatencyTracker(window=4)
+    for seconds in (9.0, 1.0, 2.0, 3.0, 4.0):
+        tracker.record("step", seconds)
+
+    assert tracker.sample_count("step") == 4
+    assert tracker.quantile("step", 0.5) == 2.0
+    assert tracker.quantile("step", 1.0) == 4.0
+    assert tracker.quantile("step", 0.5, min_samples=5) is None
+    assert tracker.quantile("other", 0.5) is None
@@ -0,0 +1,72 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from src.state_of_mind.config import config
+from src.state_of_mind.stages.perception.prompt_builder import PromptBuilder
+from src.state_of_mind.types.perception import PromptSkeleton
+
+
+@pytest.fixture
+def compile_calls(monkeypatch) -> List[str]:
+    """已拆分 pipeline 的构造器；记录每次骨架编译涉及的步骤类型"""
+    PromptBuilder().pre_basic_data()
+    calls: List[str] = []
+    build_step_prompts = PromptBuilder._build_step_prompts
+
+    def _recording(steps, step_type):
+        calls.append(step_type)
+        return build_step_prompts(steps, step_type)
+
+    monkeypatch.setattr(PromptBuilder, "_build_step_prompts", staticmethod(_recording))
+    PromptBuilder.invalidate_compiled_prompts()
+    yield calls
+    PromptBuilder.invalidate_compiled_prompts()
+
+
+def test_build_raw_compiles_once_and_reuses_skeletons(compile_calls):
+    builder = PromptBuilder()
+
+    first = builder.build_raw()
+    calls_after_first = len(compile_calls)
+    second = PromptBuilder().build_raw()
+
+    assert calls_after_first == 4
+    assert len(compile_calls) == calls_after_first
+    assert first == second
+    assert all(isinstance(s, PromptSkeleton) for skeletons in first.values() for s in skeletons)
+    assert first["perception_prompts"][0] is second["perception_prompts"][0]
+
+
+def test_returned_lists_do_not_alias_the_compiled_cache(compile_calls):
+    builder = PromptBuilder()
+
+    first = builder.build_raw()
+    first["perception_prompts"].clear()
+
+    assert builder.build_raw()["perception_prompts"]
+
+
+def test_invalidate_forces_recompile(compile_calls):
+    builder = PromptBuilder()
+    builder.build_raw()
+
+    PromptBuilder.invalidate_compiled_prompts()
+    builder.build_raw()
+
+    assert len(compile_calls) == 8
+
+
+def test_config_reload_invalidates_compiled_prompts(compile_calls):
+    PromptBuilder().build_raw()
+
+    asyncio.run(config.reload())
+
+    assert PromptBuilder._compiled is None
+    PromptBuilder().build_raw()
+    assert len(compile_calls) == 8
+
+
+def test_compose_appends_blocks_to_skeleton():
+    assert PromptBuilder.compose("骨架\n", ["输入\n", "上下文"]) == "骨架\n输入\n上下文"
@@ -0,0 +1,274 @@
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from src.state_of_mind.stages.perception import step_scheduler as scheduler_module
+from src.state_of_mind.stages.perception.constants import (
+    PARALLEL_PREPROCESSING, PARALLEL_PERCEPTION, PARALLEL_HIGH_ORDER, SERIAL_SUGGESTION,
+    MARKER_USER_INPUT, MARKER_PERCEPTUAL_CONTEXT_BATCH, MARKER_LEGITIMATE_PARTICIPANTS,
+    MARKER_STRATEGY_ANCHOR_CONTEXT, EVENT_PHASE_START, EVENT_PHASE_END, EVENT_STEP_RESULT, EVENT_STEP_SKIPPED
+)
+from src.state_of_mind.stages.perception.context_builder import ContextBuilder
+from src.state_of_mind.stages.perception.context_store import ContextStore
+from src.state_of_mind.stages.perception.event_stream import PipelineEventEmitter
+from src.state_of_mind.stages.perception.step_scheduler import StepScheduler
+
+PROMPTS = {
+    PARALLEL_PREPROCESSING: [
+        ("participants_step", "participants", "参与者"),
+        ("pre_screening_step", "pre_screening", "预筛"),
+        ("eligibility_step", "eligibility", "资格"),
+    ],
+    PARALLEL_PERCEPTION: [
+        ("visual_step", "visual", "视觉"),
+        ("auditory_step", "auditory", "听觉"),
+    ],
+    PARALLEL_HIGH_ORDER: [
+        ("strategy_step", "strategy_anchor", "策略"),
+        ("contradiction_step", "contradiction_map", "矛盾"),
+        ("manipulation_step", "manipulation_decode", "操控"),
+    ],
+    SERIAL_SUGGESTION: [
+        ("advice_step", "minimal_viable_advice", "建议"),
+    ],
+}
+
+HIGH_ORDER = {"strategy_step", "contradiction_step", "manipulation_step"}
+
+
+class FakeCache:
+    async def get_many(self, keys):
+        return {"success": True, "data": {}}
+
+    async def get(self, key):
+        return {"success": False, "data": None}
+
+    async def set(self, key, value, ttl=None):
+        return {"success": True}
+
+
+class FakeExecutor:
+    def __init__(self, data_by_step: Dict[str, Dict[str, Any]]):
+        self.data_by_step = data_by_step
+        self.llm_cache = FakeCache()
+        self.calls: List[str] = []
+        self.delays: Dict[str, float] = {}
+
+    def make_step_cache_key(self, prompt, template_name, step_name):
+        return f"step:{step_name}"
+
+    def make_filtered_cache_key(self, step_key, participants):
+        return f"filtered:{step_key}"
+
+    async def execute_step(self, prompt_template, template_name, step_name, prompt_type, **kwargs):
+        self.calls.append(step_name)
+        await asyncio.sleep(self.delays.get(step_name, 0))
+        return {"__success": True, "__valid_structure": True, "step_name": step_name,
+                "prompt_type": prompt_type, "data": self.data_by_step.get(step_name, {})}
+
+
+class FakeParticipantFilter:
+    def build_legitimate_participants_set(self, context):
+        return {p["name"] for p in context.get("participants", [])}
+
+    async def filter_perception_results(self, user_input, result, participants, prompt_records, step_results):
+        return None
+
+
+class FakeContextBuilder:
+    build_user_input_context = staticmethod(ContextBuilder.build_user_input_context)
+    inject_allowed_context = staticmethod(ContextBuilder.inject_allowed_context)
+    update_context_from_result = staticmethod(ContextBuilder.update_context_from_result)
+
+    def __init__(self):
+        self.common_context_steps: List[str] = []
+
+    def build_common_context(self, step_name, context, context_store):
+        self.common_context_steps.append(step_name)
+
+    def build_perception_context_batch(self, context):
+        return "感知上下文"
+
+    def build_legitimate_participants_context(self, context):
+        return "合法参与者"
+
+
+class FakeConcurrency:
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(4)
+
+
+@pytest.fixture(autouse=True)
+def perception_keys(monkeypatch):
+    # 感知字段集合通常由 PromptBuilder.pre_basic_data() 加载，这里直接指定
+    monkeypatch.setattr(scheduler_module, "PARALLEL_PERCEPTION_KEYS", {"visual", "auditory"})
+
+
+def _data(eligible=True, perceived=("visual",)):
+    return {
+        "participants_step": {"participants": [{"name": "我"}]},
+        "pre_screening_step": {"pre_screening": {"visual": "visual" in perceived,
+                                                 "auditory": "auditory" in perceived}},
+        "eligibility_step": {"eligibility": {"eligible": eligible}},
+        "visual_step": {"visual": [{"content": "光"}]},
+        "auditory_step": {"auditory": [{"content": "声"}]},
+    }
+
+
+def _run(graph, executor, context_builder=None, prompt_records=None):
+    events: List[Dict[str, Any]] = []
+
+    async def sink(message):
+        events.append(message)
+
+    async def main():
+        scheduler = StepScheduler(
+            executor, context_builder or FakeContextBuilder(), FakeParticipantFilter(), FakeConcurrency(),
+            "mock-chat", PipelineEventEmitter(sink)
+        )
+        results: List[Dict] = []
+        await scheduler.run(graph, {"user_input": "原文"}, "tpl", results,
+                            {} if prompt_records is None else prompt_records, ContextStore())
+        return results
+
+    return asyncio.run(main()), events
+
+
+# ======================
+# build_graph
+# ======================
+def test_build_graph_derives_dependencies_from_markers():
+    graph = StepScheduler.build_graph(PROMPTS)
+
+    assert list(graph) == [name for t in StepScheduler.STEP_TYPE_ORDER for name, _, _ in PROMPTS[t]]
+    for name in ("participants_step", "pre_screening_step", "eligibility_step"):
+        assert graph[name].deps == frozenset()
+        assert graph[name].markers == frozenset({MARKER_USER_INPUT})
+
+    # 感知步骤：仅受预筛门控，参与者步骤作为后置依赖（过滤）
+    assert graph["visual_step"].deps == {"pre_screening_step"}
+    assert graph["visual_step"].gate_step == "pre_screening_step"
+    assert graph["visual_step"].post_deps == {"participants_step"}
+
+    # 高阶步骤：PERCEPTUAL_CONTEXT_BATCH 由全部感知步骤产出，LEGITIMATE_PARTICIPANTS 由参与者步骤产出
+    strategy = graph["strategy_step"]
+    assert MARKER_PERCEPTUAL_CONTEXT_BATCH in strategy.markers
+    assert MARKER_LEGITIMATE_PARTICIPANTS in strategy.markers
+    assert strategy.deps == {"visual_step", "auditory_step", "participants_step", "eligibility_step"}
+
+    assert graph["advice_step"].deps == HIGH_ORDER | {"participants_step", "eligibility_step"}
+
+
+def test_build_graph_rejects_cycles(monkeypatch):
+    # 资格判断若依赖策略锚定的上下文，而策略锚定又受资格门控，即构成环
+    markers = dict(scheduler_module.ALLOWED_MARKERS_BY_TYPE)
+    markers[PARALLEL_PREPROCESSING] = {0: {MARKER_USER_INPUT}, 1: {MARKER_USER_INPUT},
+                                       2: {MARKER_STRATEGY_ANCHOR_CONTEXT}}
+    monkeypatch.setattr(scheduler_module, "ALLOWED_MARKERS_BY_TYPE", markers)
+
+    with pytest.raises(ValueError, match="环"):
+        StepScheduler.build_graph(PROMPTS)
+
+
+def test_downstream_depths_follow_longest_chain():
+    depths = StepScheduler.downstream_depths(StepScheduler.build_graph(PROMPTS))
+
+    assert depths["advice_step"] == 0
+    assert depths["strategy_step"] == 1
+    assert depths["visual_step"] == 2
+    assert depths["pre_screening_step"] == 3
+    assert depths["participants_step"] == 3
+
+
+# ======================
+# _run_node
+# ======================
+def test_run_executes_steps_after_their_dependencies():
+    graph = StepScheduler.build_graph(PROMPTS)
+    executor = FakeExecutor(_data(perceived=("visual", "auditory")))
+
+    results, events = _run(graph, executor)
+
+    order = {name: idx for idx, name in enumerate(executor.calls)}
+    for name, node in graph.items():
+        for dep in node.deps:
+            assert order[dep] < order[name], f"{name} 在依赖 {dep} 之前执行"
+    assert len(results) == len(graph)
+    assert [e["step_id"] for e in events if e["event"] == EVENT_STEP_RESULT].count("advice_step") == 1
+
+
+def test_run_skips_gated_steps_and_emits_skip_events():
+    graph = StepScheduler.build_graph(PROMPTS)
+    executor = FakeExecutor(_data(eligible=False, perceived=("visual",)))
+
+    results, events = _run(graph, executor)
+
+    skipped = {e["step_id"] for e in events if e["event"] == EVENT_STEP_SKIPPED}
+    assert skipped == {"auditory_step"} | HIGH_ORDER | {"advice_step"}
+    assert not skipped & set(executor.calls)
+    assert {r["step_name"] for r in results} == {"participants_step", "pre_screening_step",
+                                                 "eligibility_step", "visual_step"}
+
+
+def test_run_emits_paired_phase_events():
+    graph = StepScheduler.build_graph(PROMPTS)
+
+    _, events = _run(graph, FakeExecutor(_data(eligible=False)))
+
+    for phase in StepScheduler.STEP_TYPE_ORDER:
+        phase_events = [e["event"] for e in events
+                        if e.get("phase") == phase and e["event"] in (EVENT_PHASE_START, EVENT_PHASE_END)]
+        assert phase_events == [EVENT_PHASE_START, EVENT_PHASE_END]
+    names = [e["event"] for e in events]
+    for phase in StepScheduler.STEP_TYPE_ORDER:
+        start = next(i for i, e in enumerate(events) if e["event"] == EVENT_PHASE_START and e["phase"] == phase)
+        end = next(i for i, e in enumerate(events) if e["event"] == EVENT_PHASE_END and e["phase"] == phase)
+        step_events = [i for i, e in enumerate(events)
+                       if e["event"] in (EVENT_STEP_RESULT, EVENT_STEP_SKIPPED) and e["phase"] == phase]
+        assert all(start < i < end for i in step_events), names
+
+
+def test_run_node_failure_returns_system_error_and_unblocks_dependents():
+    graph = StepScheduler.build_graph(PROMPTS)
+
+    class FailingExecutor(FakeExecutor):
+        async def execute_step(self, prompt_template, template_name, step_name, prompt_type, **kwargs):
+            if step_name == "eligibility_step":
+                raise RuntimeError("boom")
+            return await super().execute_step(prompt_template, template_name, step_name, prompt_type, **kwargs)
+
+    results, events = _run(graph, FailingExecutor(_data()))
+
+    failed = next(r for r in results if r["step_name"] == "eligibility_step")
+    assert failed["__success"] is False
+    assert "boom" in failed["__system_error"]
+    # 资格结果缺失时，高阶与建议步骤按门控跳过，而不是永久等待
+    skipped = {e["step_id"] for e in events if e["event"] == EVENT_STEP_SKIPPED}
+    assert HIGH_ORDER | {"advice_step"} <= skipped
+
+
+def test_results_follow_graph_order_not_completion_order():
+    graph = StepScheduler.build_graph(PROMPTS)
+    executor = FakeExecutor(_data(perceived=("visual", "auditory")))
+    # 同一阶段内越靠前的步骤越慢，完成顺序与图顺序相反
+    executor.delays = {"participants_step": 0.03, "pre_screening_step": 0.02, "visual_step": 0.02,
+                       "strategy_step": 0.03, "contradiction_step": 0.02}
+    prompt_records: Dict[str, List] = {}
+
+    results, _ = _run(graph, executor, prompt_records=prompt_records)
+
+    assert [r["step_name"] for r in results] == list(graph)
+    for step_type, records in prompt_records.items():
+        expected = [name for name, node in graph.items() if node.prompt_type == step_type]
+        assert [r["step_name"] for r in records] == expected
+
+
+def test_context_producing_steps_build_common_context_even_without_consumers():
+    graph = StepScheduler.build_graph(PROMPTS)
+    builder = FakeContextBuilder()
+
+    _run(graph, FakeExecutor(_data(perceived=("visual", "auditory"))), context_builder=builder)
+
+    # 参与者有效信息块不被内置 ALLOWED_* 表引用，但自定义模板可能使用
+    assert set(builder.common_context_steps) == {"participants_step"} | HIGH_ORDER | {"advice_step"}
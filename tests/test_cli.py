@@ -0,0 +1,163 @@
+import asyncio
+import json
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from src.state_of_mind import cli
+from src.state_of_mind.core.batch_runner import BatchRunner
+from src.state_of_mind.stages.perception import prompt_builder as prompt_builder_module
+from src.state_of_mind.stages.perception import stage_pipeline as stage_pipeline_module
+from src.state_of_mind.stages.perception.constants import EVENT_STEP_RESULT
+
+
+class FakePipeline:
+    """以真实 BatchRunner 驱动的流水线替身：原文含“失败”时返回未成功结果，并为每个文档上报一次步骤耗时"""
+    instances: List["FakePipeline"] = []
+
+    def __init__(self):
+        self.calls: List[str] = []
+        self.llm_cache = SimpleNamespace(hit_counts=lambda: {"hits": 1, "misses": 3})
+        self.step_executor = SimpleNamespace(
+            backend_name="mock",
+            cache_counts=lambda: {"hits": 0, "misses": 0},
+            hedge_counts=lambda: {"fired": 0, "won": 0, "deadline_exceeded": 0},
+        )
+        FakePipeline.instances.append(self)
+
+    def iter_batch(self, user_inputs, category, max_in_flight, checkpoint_path, **kwargs):
+        return BatchRunner(self, max_in_flight, checkpoint_path).iter_results(user_inputs, category, **kwargs)
+
+    async def run(self, user_input: str, category: str, on_event=None, **kwargs) -> Dict[str, Any]:
+        self.calls.append(user_input)
+        await on_event({"event": EVENT_STEP_RESULT, "step_id": "coreference", "duration_ms": 10.0 * len(self.calls)})
+        if "失败" in user_input:
+            return {"report_url": "", "success": False, "result": None}
+        return {"report_url": f"/reports/{len(self.calls)}.html", "success": True, "result": {"text": user_input}}
+
+
+@pytest.fixture(autouse=True)
+def fake_pipeline(monkeypatch):
+    FakePipeline.instances = []
+    monkeypatch.setattr(stage_pipeline_module, "PerceptionPipeline", FakePipeline)
+    monkeypatch.setattr(prompt_builder_module, "PromptBuilder", lambda: SimpleNamespace(pre_basic_data=lambda: None))
+
+    async def _noop(*args, **kwargs):
+        return 0
+
+    monkeypatch.setattr(cli.GlobalSingletonRegistry, "async_prewarm", _noop)
+    monkeypatch.setattr(cli.GlobalSingletonRegistry, "async_close_all", _noop)
+    monkeypatch.setattr(cli, "get_circuit_breaker_status", dict)
+    return FakePipeline
+
+
+def _read_output(path: Path) -> List[Dict[str, Any]]:
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    return sorted(records, key=lambda record: record["index"])
+
+
+# ======================
+# 输入解析
+# ======================
+def test_jsonl_input_skips_invalid_lines_and_passes_ids(tmp_path):
+    source = tmp_path / "corpus.jsonl"
+    source.write_text("\n".join([
+        json.dumps({"id": "a", "text": "第一段"}, ensure_ascii=False),
+        "不是 JSON",
+        json.dumps({"id": "b", "content": "缺少文本字段"}, ensure_ascii=False),
+        "",
+        json.dumps("直接是字符串", ensure_ascii=False),
+        json.dumps({"id": "c", "text": "第三段"}, ensure_ascii=False),
+    ]), encoding="utf-8")
+    ids: Dict[int, Any] = {}
+
+    texts = list(cli._iter_jsonl(source, "text", "id", ids))
+
+    assert texts == ["第一段", "直接是字符串", "第三段"]
+    assert ids == {0: "a", 2: "c"}
+
+
+def test_csv_input_uses_text_column_and_rejects_missing_column(tmp_path):
+    source = tmp_path / "corpus.csv"
+    source.write_text("id,content\n1,第一段\n2,\n3,\"含,逗号\"\n", encoding="utf-8-sig")
+    ids: Dict[int, Any] = {}
+
+    texts = list(cli._iter_csv(source, "content", "id", ids))
+
+    assert texts == ["第一段", "含,逗号"]
+    assert ids == {0: "1", 1: "3"}
+    with pytest.raises(ValueError):
+        list(cli._iter_csv(source, "text", "id", {}))
+
+
+# ======================
+# batch 子命令
+# ======================
+def test_batch_writes_results_and_returns_failure_code(tmp_path, capsys):
+    source = tmp_path / "corpus.csv"
+    source.write_text("id,text\nx,第一段\ny,这段会失败\n", encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+
+    code = cli.main(["batch", "-i", str(source), "-o", str(output), "-c", "1"])
+
+    records = _read_output(output)
+    assert code == 1
+    assert [(r["id"], r["success"], r["resumed"]) for r in records] == [("x", True, False), ("y", False, False)]
+    assert records[0]["result"] == {"text": "第一段"}
+    assert records[1]["error"] and records[1]["report_url"] is None
+    summary = capsys.readouterr().out
+    assert "文档总数: 2 | 成功: 1 | 失败: 1 | 断点跳过: 0" in summary
+    assert "缓存命中率（全部）: 25.00%" in summary
+    assert "coreference" in summary
+
+
+def test_resume_with_new_output_replays_checkpointed_results(tmp_path, capsys):
+    source = tmp_path / "corpus.jsonl"
+    source.write_text("\n".join(json.dumps({"id": i, "text": f"第{i}段"}, ensure_ascii=False) for i in range(3)),
+                      encoding="utf-8")
+    checkpoint = tmp_path / "corpus.ckpt.jsonl"
+    first_output, second_output = tmp_path / "first.jsonl", tmp_path / "second.jsonl"
+
+    assert cli.main(["batch", "-i", str(source), "-o", str(first_output), "--checkpoint", str(checkpoint)]) == 0
+    capsys.readouterr()
+    assert cli.main(["batch", "-i", str(source), "-o", str(second_output), "--checkpoint", str(checkpoint)]) == 0
+
+    first, second = _read_output(first_output), _read_output(second_output)
+    # 第二次运行全部命中断点，不再调用流水线，但输出仍包含全部文档
+    assert FakePipeline.instances[1].calls == []
+    assert [r["id"] for r in second] == [0, 1, 2]
+    assert all(r["resumed"] for r in second)
+    assert [r["result"] for r in second] == [r["result"] for r in first]
+    assert [r["report_url"] for r in second] == [r["report_url"] for r in first]
+    assert "文档总数: 3 | 成功: 0 | 失败: 0 | 断点跳过: 3" in capsys.readouterr().out
+
+
+def test_batch_rejects_missing_input_and_bad_concurrency(tmp_path):
+    assert cli.main(["batch", "-i", str(tmp_path / "missing.jsonl")]) == 2
+    assert cli.main(["batch", "-i", str(tmp_path / "missing.jsonl"), "-c", "0"]) == 2
+
+
+# ======================
+# 指标
+# ======================
+def test_metrics_percentiles_use_nearest_rank():
+    values = [float(v) for v in range(1, 11)]
+
+    assert cli.BatchMetrics.percentile(values, 50) == 5.0
+    assert cli.BatchMetrics.percentile(values, 95) == 10.0
+    assert cli.BatchMetrics.percentile([], 50) == 0.0
+
+
+def test_metrics_collect_step_latencies_from_events():
+    metrics = cli.BatchMetrics()
+
+    async def main():
+        await metrics.on_event({"event": EVENT_STEP_RESULT, "step_id": "a", "duration_ms": 12.5})
+        await metrics.on_event({"event": EVENT_STEP_RESULT, "step_id": "a"})
+        await metrics.on_event({"event": "other", "step_id": "b", "duration_ms": 1.0})
+
+    asyncio.run(main())
+
+    assert metrics.step_latencies == {"a": [12.5]}
@@ -0,0 +1,149 @@
+import json
+from typing import List
+
+import pytest
+
+from src.state_of_mind.utils.json_stream import IncrementalJSONParser, StreamEvent
+
+DOCUMENT = {
+    "temporal": {
+        "events": [
+            {"content": "他说：\"我明天再来\"", "time": "昨天", "scores": [1, -2.5e3, [0.1, True, None]]},
+            {"content": "路径 C:\\temp\\新建", "tags": [], "nested": {"events": [{"deep": 1}]}},
+            ["raw", {"x": False}],
+        ],
+        "summary": "结束\n换行\t制表 \\u0041 \u00e9",
+    },
+    "events": [{"top": 1}],
+    "empty": {},
+}
+TEXT = json.dumps(DOCUMENT, ensure_ascii=False)
+
+
+def _chunks(text: str, size: int) -> List[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _feed_all(parser: IncrementalJSONParser, chunks: List[str]) -> List[StreamEvent]:
+    events: List[StreamEvent] = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return events
+
+
+# ======================
+# 任意切分
+# ======================
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(TEXT)])
+def test_chunks_split_anywhere_produce_same_events_and_value(size):
+    parser = IncrementalJSONParser()
+
+    events = _feed_all(parser, _chunks(TEXT, size))
+
+    assert parser.done and parser.error is None
+    assert parser.value() == DOCUMENT
+    assert [(e.path, e.rule_path) for e in events] == [
+        ("temporal.events[0]", "temporal.events.*"),
+        ("temporal.events[1].nested.events[0]", "temporal.events.*.nested.events.*"),
+        ("temporal.events[1]", "temporal.events.*"),
+        ("temporal.events[2]", "temporal.events.*"),
+        ("events[0]", "events.*"),
+    ]
+    assert [e.value for e in events][0] == DOCUMENT["temporal"]["events"][0]
+
+
+def test_events_are_emitted_as_soon_as_each_element_closes():
+    parser = IncrementalJSONParser()
+    first_end = TEXT.index('"time"')
+
+    early = parser.feed(TEXT[:first_end])
+    closed = parser.feed(TEXT[first_end:TEXT.index("]]}") + 3])
+
+    assert early == []
+    assert [e.path for e in closed] == ["temporal.events[0]"]
+    assert not parser.done
+
+
+@pytest.mark.parametrize("split_at", ['\\"', "\\\\", "\\u", "e3", "true", "null"])
+def test_split_inside_escape_or_literal(split_at):
+    text = '{"events": [{"q": "say \\"hi\\"", "p": "a\\\\", "u": "\\u4f60", "n": -2.5e3, "t": true, "z": null}]}'
+    cut = text.index(split_at) + 1
+    parser = IncrementalJSONParser()
+
+    events = _feed_all(parser, [text[:cut], text[cut:]])
+
+    assert parser.value() == json.loads(text)
+    assert events[0].value == {"q": 'say "hi"', "p": "a\\", "u": "你", "n": -2500.0, "t": True, "z": None}
+
+
+def test_escaped_quotes_and_brackets_inside_strings_do_not_close_containers():
+    text = '{"events": [{"content": "\\"]}\\" 仍在字符串内 [{"}, {"content": "}"}]}'
+    parser = IncrementalJSONParser()
+
+    events = _feed_all(parser, _chunks(text, 1))
+
+    assert [e.value["content"] for e in events] == ['"]}" 仍在字符串内 [{', "}"]
+    assert parser.done
+
+
+def test_escaped_key_names_are_decoded():
+    parser = IncrementalJSONParser()
+
+    events = _feed_all(parser, _chunks('{"ev\\u0065nts": [{"a": 1}]}', 3))
+
+    assert [e.path for e in events] == ["events[0]"]
+
+
+# ======================
+# 前后缀与截断
+# ======================
+def test_markdown_fence_and_trailing_text_are_ignored():
+    parser = IncrementalJSONParser()
+
+    _feed_all(parser, ["好的，结果如下：\n```js", "on\n", TEXT[:10], TEXT[10:] + "\n```\n说明文字 {}"])
+
+    assert parser.skipped == len("好的，结果如下：\n```json\n")
+    assert parser.value() == DOCUMENT
+    assert parser.text == TEXT
+
+
+def test_truncated_stream_keeps_closed_events_without_value():
+    cut = TEXT.index('"summary"')
+    parser = IncrementalJSONParser()
+
+    events = _feed_all(parser, _chunks(TEXT[:cut], 5))
+
+    assert len(events) == 4
+    assert not parser.done
+    assert parser.error is None
+    assert parser.value() is None
+
+
+def test_truncated_inside_string_is_not_done():
+    parser = IncrementalJSONParser()
+
+    events = parser.feed('{"events": [{"content": "被截断的\\')
+
+    assert events == []
+    assert not parser.done and parser.value() is None
+
+
+# ======================
+# 语法错误
+# ======================
+@pytest.mark.parametrize("text, message", [
+    ('{"events": [{"a": 1}}', "期望 ','"),
+    ('{"a" 1}', "期望 ':'"),
+    ('{"a": 1 "b": 2}', "期望 ','"),
+    ('{"a": tru}', "非法字面量"),
+    ('{"a": [1,]}', "期望值"),
+    ("{'a': 1}", "期望键名"),
+])
+def test_syntax_errors_stop_parsing(text, message):
+    parser = IncrementalJSONParser()
+
+    _feed_all(parser, _chunks(text, 2))
+
+    assert message in parser.error
+    assert parser.value() is None
+    assert parser.feed("更多内容") == []
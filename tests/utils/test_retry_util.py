@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+from src.state_of_mind.utils import retry_util as retry_util_module
+from src.state_of_mind.utils.retry_util import (
+    CircuitBreaker, CircuitOpenError, get_circuit_breaker, reset_circuit_breakers, retry_decorator
+)
+
+
+class FakeClock:
+    """替换模块内的 time：熔断器的 monotonic 由测试推进"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(retry_util_module, "time", fake)
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def _reset_breakers():
+    reset_circuit_breakers()
+    yield
+    reset_circuit_breakers()
+
+
+def _breaker(**kwargs) -> CircuitBreaker:
+    settings = dict(failure_rate=0.5, min_calls=4, window_seconds=10, open_seconds=5)
+    settings.update(kwargs)
+    return CircuitBreaker("test", **settings)
+
+
+# ======================
+# 状态迁移
+# ======================
+def test_breaker_opens_half_opens_and_closes_on_probe_success(clock):
+    breaker = _breaker()
+    for failed in (False, True, False):
+        breaker.record_failure() if failed else breaker.record_success()
+    # 调用数未达到 min_calls，不打开
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_after() == pytest.approx(5)
+
+    clock.advance(5)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.status()["window_calls"] == 0
+    assert breaker.trips == 1
+
+
+def test_half_open_admits_a_single_probe_per_interval(clock):
+    breaker = _breaker(min_calls=1)
+    breaker.record_failure()
+    clock.advance(5)
+
+    assert breaker.allow()
+    # 探测请求进行中，其余调用仍快速失败
+    assert not breaker.allow()
+    clock.advance(2)
+    assert not breaker.allow()
+    assert breaker.retry_after() == pytest.approx(3)
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 2
+    assert breaker.rejected == 2
+
+    # 探测请求未返回结果（如被取消）时，下一个探测间隔到达后再放行一个
+    clock.advance(5)
+    assert breaker.allow()
+    clock.advance(5)
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_outcomes_outside_window_are_pruned(clock):
+    breaker = _breaker(min_calls=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.advance(11)
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    status = breaker.status()
+    assert status["window_calls"] == 1
+    assert status["window_failure_rate"] == 1.0
+
+    clock.advance(11)
+    assert breaker.status()["window_calls"] == 0
+
+
+def test_get_circuit_breaker_reuses_instance_and_applies_new_settings():
+    first = get_circuit_breaker("svc", failure_rate=0.5, min_calls=20, window_seconds=30, open_seconds=15)
+    second = get_circuit_breaker("svc", failure_rate=0.8, min_calls=5, window_seconds=30, open_seconds=15)
+
+    assert first is second
+    assert (second.failure_rate, second.min_calls) == (0.8, 5)
+    assert get_circuit_breaker("other") is not first
+
+
+# ======================
+# 重试装饰器与熔断
+# ======================
+def test_open_breaker_short_circuits_pending_retries():
+    breaker = _breaker(min_calls=2)
+    calls = []
+
+    @retry_decorator(max_retries=5, enable_exp_backoff=False, min_wait=0,
+                     circuit_breaker=lambda: breaker,
+                     on_circuit_open=lambda exc, call: f"degraded: {type(exc).__name__}")
+    async def flaky():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    result = asyncio.run(flaky())
+
+    # 第 2 次失败后熔断器打开，剩余 3 次重试不再调用函数
+    assert result == "degraded: CircuitOpenError"
+    assert len(calls) == 2
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_open_breaker_raises_without_fallback():
+    breaker = _breaker(min_calls=1)
+    breaker.record_failure()
+    calls = []
+
+    @retry_decorator(max_retries=3, enable_exp_backoff=False, min_wait=0, circuit_breaker=lambda: breaker)
+    def call():
+        calls.append(1)
+        return "ok"
+
+    with pytest.raises(CircuitOpenError):
+        call()
+    assert calls == []
+
+
+def test_non_retryable_errors_are_not_counted_as_failures():
+    breaker = _breaker(min_calls=1)
+
+    @retry_decorator(max_retries=3, enable_exp_backoff=False, min_wait=0, circuit_breaker=lambda: breaker)
+    def call():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        call()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.status()["window_calls"] == 0